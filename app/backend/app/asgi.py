@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 
 application = get_asgi_application()
+
+if os.environ.get("WARMUP_ON_START", "1") == "1":
+    from core.warmup import warm_up
+
+    warm_up()
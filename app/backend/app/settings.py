@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework_simplejwt",
     "rest_framework_simplejwt.token_blacklist",
@@ -45,9 +46,17 @@ INSTALLED_APPS = [
     "core",
     "authentication.apps.AuthenticationConfig",  # Custom Authentication flow
     "users",
+    "products",
+    "inventory",
+    "basket",
+    "orders",
+    "payments",
+    "benchmarks",
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -55,6 +64,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.RateLimitMiddleware",
 ]
 
 ROOT_URLCONF = "app.urls"
@@ -80,10 +90,30 @@ CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
         "LOCATION": os.environ.get("REDIS_URL", "redis://redis:6379/1"),
-        "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        "OPTIONS": {"CLIENT_CLASS": "core.metrics.InstrumentedRedisClient"},
     },
 }
 
+# Purges for the CDN caching catalog responses, see products/cdn.py
+CDN_PURGER = {"BACKEND": "products.cdn.LocalPurger"}
+if os.environ.get("FASTLY_SERVICE_ID"):
+    CDN_PURGER = {
+        "BACKEND": "products.cdn.FastlyPurger",
+        "OPTIONS": {
+            "service_id": os.environ["FASTLY_SERVICE_ID"],
+            "api_token": os.environ.get("FASTLY_API_TOKEN", ""),
+        },
+    }
+
+# Signing secret of the payment provider's webhook endpoint, see payments/webhooks.py
+PAYMENTS_WEBHOOK_SECRET = os.environ.get("PAYMENTS_WEBHOOK_SECRET", "whsec_dev" if DEBUG else "")
+
+# Bearer token Prometheus scrapes /metrics with, the endpoint is off without one, see core/views.py
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Where the outbox publisher sends domain events, see core/outbox.py
+OUTBOX_SINK = {"BACKEND": "core.outbox.RedisStreamSink", "OPTIONS": {"maxlen": 1_000_000}}
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": [
@@ -92,6 +122,22 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # Token buckets in Redis, see core/throttling.py. Each scope's rate can be set from the environment,
+    # as THROTTLE_RATE_LOGIN=20/min say, or turned off by setting it empty
+    "DEFAULT_THROTTLE_CLASSES": ["core.throttling.TokenBucketThrottle"],
+    "DEFAULT_THROTTLE_RATES": {
+        scope: os.environ.get(f"THROTTLE_RATE_{scope.upper()}", rate) or None
+        for scope, rate in {
+            "anon": "300/min",
+            "user": "1200/min",
+            "login": "10/min",
+            "register": "10/hour",
+            "refresh": "30/min",
+        }.items()
+    },
+    # Proxies in front of the API appending to X-Forwarded-For, so clients are told apart by their own address.
+    # With none X-Forwarded-For is ignored, clients could set it to anything
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES") or 0),
 }
 
 SIMPLE_JWT = {
@@ -121,6 +167,9 @@ DATABASES = {
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASSWORD"),
+        # Keep connections open between requests so warm-up priming carries over
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
@@ -1,18 +1,31 @@
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularSwaggerView
 
 from authentication import urls as auth_urls
+from basket import urls as basket_urls
+from core.views import ExportView, SchemaView, healthz, metrics, readyz
+from orders import urls as order_urls
+from payments import urls as payment_urls
+from products import urls as product_urls
 from users import urls as user_urls
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("auth/", include(auth_urls)),
     path("users/", include(user_urls)),
-    path("schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("products/", include(product_urls)),
+    path("basket/", include(basket_urls)),
+    path("orders/", include(order_urls)),
+    path("payments/", include(payment_urls)),
+    path("exports/<str:name>.<str:file_format>", ExportView.as_view(), name="export"),
+    path("schema/", SchemaView.as_view(), name="schema"),
     path(
         "docs/",
         SpectacularSwaggerView.as_view(url_name="schema"),
         name="swagger-ui",
     ),
+    path("healthz", healthz, name="healthz"),
+    path("readyz", readyz, name="readyz"),
+    path("metrics", metrics, name="metrics"),
 ]
@@ -5,6 +5,7 @@ Custom Serializers for Authentication views
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.validators import validate_email
+from django.db import transaction
 from rest_framework import serializers
 
 from core.models import Profile
@@ -70,6 +71,7 @@ class RegisterRequestSerializer(serializers.ModelSerializer):
 
         return attrs
 
+    @transaction.atomic
     def create(self, validated_data):
         validated_data.pop("password_confirm")
         user = User.objects.create_user(
@@ -2,15 +2,59 @@
 Views for Authentication
 """
 
+import logging
+
+from drf_spectacular.utils import extend_schema
+from redis.exceptions import RedisError
 from rest_framework import status
 from rest_framework.generics import CreateAPIView
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from basket.store import merge
+from basket.views import basket_token, token_parameter
 
 from .serializers import RegisterRequestSerializer, RegisterResponseSerializer
 
+logger = logging.getLogger(__name__)
+
+
+def merge_basket(request, user):
+    """
+    Move the anonymous basket the request names, if any, into the user's basket.
+    Best effort: signing in still succeeds when Redis is unavailable, the anonymous basket is left as it was.
+    """
+    token = basket_token(request)
+    if token is None:
+        return
+    try:
+        merge(token, user.id)
+    except RedisError:
+        logger.warning("Basket not merged for user %s, Redis is unavailable", user.id, exc_info=True)
+
+
+@extend_schema(parameters=[token_parameter])
+class LoginView(TokenObtainPairView):
+    """
+    API View for Logging in, merging the visitor's anonymous basket into the user's
+    POST - auth/login
+    """
 
+    throttle_scope = "login"
+
+    def get_serializer(self, *args, **kwargs):
+        self.serializer = super().get_serializer(*args, **kwargs)
+        return self.serializer
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        merge_basket(request, self.serializer.user)
+        return response
+
+
+@extend_schema(parameters=[token_parameter])
 class RegistrationView(CreateAPIView):
     """
     API View for Registering new Users
@@ -19,6 +63,7 @@ class RegistrationView(CreateAPIView):
 
     serializer_class = RegisterRequestSerializer
     permission_classes = [AllowAny]
+    throttle_scope = "register"
 
     def create(self, request):
         """
@@ -37,6 +82,7 @@ class RegistrationView(CreateAPIView):
             return Response(status=status.HTTP_400_BAD_REQUEST, data=serializer.errors)
 
         user = serializer.save()
+        merge_basket(request, user)
         token = RefreshToken.for_user(user)
         res = RegisterResponseSerializer(
             {
@@ -48,3 +94,12 @@ class RegistrationView(CreateAPIView):
             }
         )
         return Response(status=status.HTTP_201_CREATED, data=res.data)
+
+
+class RefreshView(TokenRefreshView):
+    """
+    API View for exchanging a refresh token for new tokens
+    POST - auth/refresh
+    """
+
+    throttle_scope = "refresh"
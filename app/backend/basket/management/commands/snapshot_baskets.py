@@ -0,0 +1,22 @@
+"""
+Django command to snapshot long-lived baskets
+"""
+
+from django.core.management.base import BaseCommand
+
+from basket.store import SNAPSHOT_AFTER, snapshot_due
+
+
+class Command(BaseCommand):
+    """Copy user baskets that have lived in Redis for a while to Postgres, so they outlive their expiry"""
+
+    help = "Snapshot user baskets first changed more than --older-than seconds ago"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than", type=int, default=SNAPSHOT_AFTER, help="Seconds since a basket was first changed"
+        )
+
+    def handle(self, *args, **options):
+        snapshotted = snapshot_due(older_than=options["older_than"])
+        self.stdout.write(self.style.SUCCESS(f"Snapshotted {snapshotted:,} baskets"))
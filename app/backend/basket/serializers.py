@@ -0,0 +1,60 @@
+"""
+Serializers for the Basket
+"""
+
+from rest_framework import serializers
+
+from .store import MAX_QUANTITY
+
+
+class BasketLineSerializer(serializers.Serializer):
+    """A product and its quantity in a basket"""
+
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_QUANTITY)
+
+
+class BasketQuantitySerializer(serializers.Serializer):
+    """New quantity of a basket line, 0 removes it"""
+
+    quantity = serializers.IntegerField(min_value=0, max_value=MAX_QUANTITY)
+
+
+class BasketSerializer(serializers.Serializer):
+    """Schema of a basket"""
+
+    token = serializers.CharField(
+        allow_null=True, help_text="Token to send as X-Basket-Token, null for signed-in users"
+    )
+    items = BasketLineSerializer(many=True)
+    count = serializers.IntegerField(help_text="Units across every line")
+
+
+class AppliedPromotionSerializer(serializers.Serializer):
+    """A promotion taking money off a line"""
+
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+
+
+class PricedLineSerializer(serializers.Serializer):
+    """A basket line at the current price, after its best promotion"""
+
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    discount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    promotion = AppliedPromotionSerializer(allow_null=True)
+
+
+class BasketTotalsSerializer(serializers.Serializer):
+    """Schema of a priced basket"""
+
+    lines = PricedLineSerializer(many=True)
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    discount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    unavailable = serializers.ListField(
+        child=serializers.IntegerField(), help_text="Products in the basket that are no longer for sale"
+    )
@@ -0,0 +1,221 @@
+"""
+Redis-backed shopping baskets
+
+A basket is a Redis hash of quantity by product id, keyed by the user or by
+the random token of an anonymous visitor, and expires after a period without
+changes. Every change runs as one Lua script, so the line and quantity caps
+hold however many requests change a basket at once, and no basket operation
+touches Postgres.
+
+Changed user baskets are recorded in a sorted set by when they were first
+changed. A background command copies the baskets that have lived long enough
+to BasketSnapshot rows, so they can be restored after Redis expires them, and
+checkout snapshots the basket it empties.
+"""
+
+import time
+import uuid
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from core.models import BasketSnapshot, User
+from core.tasks import task
+
+USER_TTL = getattr(settings, "BASKET_USER_TTL", 30 * 24 * 60 * 60)
+ANONYMOUS_TTL = getattr(settings, "BASKET_ANONYMOUS_TTL", 7 * 24 * 60 * 60)
+MAX_LINES = getattr(settings, "BASKET_MAX_LINES", 100)
+MAX_QUANTITY = getattr(settings, "BASKET_MAX_QUANTITY", 99)
+# User baskets changed at least this long ago are snapshotted
+SNAPSHOT_AFTER = getattr(settings, "BASKET_SNAPSHOT_AFTER", 24 * 60 * 60)
+
+DIRTY_KEY = "basket:dirty"
+
+# KEYS: basket, dirty set. ARGV: product, quantity, max lines, max quantity, ttl, user id or "", now, replace
+# Returns the line's new quantity, or -1 when the basket has no room for another line
+CHANGE_SCRIPT = """
+local quantity = tonumber(ARGV[2])
+if quantity <= 0 then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    quantity = 0
+else
+    if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 and redis.call('HLEN', KEYS[1]) >= tonumber(ARGV[3]) then
+        return -1
+    end
+    if ARGV[8] == '0' then
+        quantity = quantity + tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+    end
+    quantity = math.min(quantity, tonumber(ARGV[4]))
+    redis.call('HSET', KEYS[1], ARGV[1], quantity)
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+end
+if ARGV[6] ~= '' then
+    redis.call('ZADD', KEYS[2], 'NX', ARGV[7], ARGV[6])
+end
+return quantity
+"""
+
+# KEYS: anonymous basket, user basket, dirty set. ARGV: max lines, max quantity, ttl, user id, now
+# Adds every anonymous line to the user's basket within the caps, deletes the anonymous basket
+# and returns the number of lines merged
+MERGE_SCRIPT = """
+local lines = redis.call('HGETALL', KEYS[1])
+local merged = 0
+for i = 1, #lines, 2 do
+    local current = redis.call('HGET', KEYS[2], lines[i])
+    if current or redis.call('HLEN', KEYS[2]) < tonumber(ARGV[1]) then
+        local quantity = math.min(tonumber(current or '0') + tonumber(lines[i + 1]), tonumber(ARGV[2]))
+        redis.call('HSET', KEYS[2], lines[i], quantity)
+        merged = merged + 1
+    end
+end
+redis.call('DEL', KEYS[1])
+if merged > 0 then
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+    redis.call('ZADD', KEYS[3], 'NX', ARGV[5], ARGV[4])
+end
+return merged
+"""
+
+
+class BasketFull(Exception):
+    """The basket already holds the maximum number of lines"""
+
+
+def _redis():
+    return get_redis_connection("default")
+
+
+def new_token():
+    return uuid.uuid4().hex
+
+
+def valid_token(token):
+    """Whether token looks like one new_token issued, so it cannot name another key"""
+    try:
+        return uuid.UUID(hex=token).hex == token
+    except (TypeError, ValueError):
+        return False
+
+
+class Basket:
+    """The basket of a user, or of the anonymous visitor holding a token"""
+
+    def __init__(self, user_id=None, token=None):
+        if (user_id is None) == (token is None):
+            raise ValueError("A basket belongs to either a user or an anonymous token")
+        self.user_id = user_id
+        self.token = token
+        self.key = f"basket:user:{user_id}" if user_id is not None else f"basket:anon:{token}"
+        self.ttl = USER_TTL if user_id is not None else ANONYMOUS_TTL
+
+    def items(self):
+        """Quantity by product id"""
+        return {int(product): int(quantity) for product, quantity in _redis().hgetall(self.key).items()}
+
+    def _change(self, product_id, quantity, replace):
+        script = _redis().register_script(CHANGE_SCRIPT)
+        result = script(
+            keys=[self.key, DIRTY_KEY],
+            args=[
+                product_id,
+                quantity,
+                MAX_LINES,
+                MAX_QUANTITY,
+                self.ttl,
+                "" if self.user_id is None else self.user_id,
+                time.time(),
+                int(replace),
+            ],
+        )
+        if result == -1:
+            raise BasketFull(f"A basket holds at most {MAX_LINES} products")
+        return result
+
+    def add(self, product_id, quantity=1):
+        """Add units of a product, returning the line's quantity"""
+        return self._change(product_id, quantity, replace=False)
+
+    def set(self, product_id, quantity):
+        """Set a line's quantity, removing the line at 0"""
+        return self._change(product_id, quantity, replace=True)
+
+    def remove(self, product_id):
+        self._change(product_id, 0, replace=True)
+
+    def clear(self):
+        redis = _redis()
+        redis.delete(self.key)
+        if self.user_id is not None:
+            redis.zadd(DIRTY_KEY, {self.user_id: time.time()}, nx=True)
+
+
+def merge(token, user_id):
+    """Move an anonymous basket into a user's basket, returning the number of lines merged"""
+    basket = Basket(user_id=user_id)
+    restore(basket)
+    script = _redis().register_script(MERGE_SCRIPT)
+    return script(
+        keys=[f"basket:anon:{token}", basket.key, DIRTY_KEY],
+        args=[MAX_LINES, MAX_QUANTITY, USER_TTL, user_id, time.time()],
+    )
+
+
+def restore(basket):
+    """Reload a user's basket from its snapshot when Redis no longer has it"""
+    redis = _redis()
+    if redis.exists(basket.key):
+        return
+    snapshot = BasketSnapshot.objects.filter(user_id=basket.user_id).values_list("items", flat=True).first()
+    if snapshot:
+        with redis.pipeline() as pipe:
+            pipe.hset(basket.key, mapping=snapshot)
+            pipe.expire(basket.key, USER_TTL)
+            pipe.execute()
+
+
+def persist(user_ids):
+    """Copy the current baskets of these users to their snapshots, deleting the snapshots of empty ones"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    with _redis().pipeline(transaction=False) as pipe:
+        for user_id in user_ids:
+            pipe.hgetall(f"basket:user:{user_id}")
+        baskets = dict(zip(user_ids, pipe.execute(), strict=True))
+
+    # Users deleted since they changed their basket have nothing to snapshot
+    existing = set(User.objects.filter(id__in=user_ids).values_list("id", flat=True))
+    snapshots = [
+        BasketSnapshot(user_id=user_id, items={product.decode(): int(quantity) for product, quantity in items.items()})
+        for user_id, items in baskets.items()
+        if items and user_id in existing
+    ]
+    BasketSnapshot.objects.bulk_create(
+        snapshots, update_conflicts=True, unique_fields=["user"], update_fields=["items", "updated_at"]
+    )
+    BasketSnapshot.objects.filter(user_id__in=[user_id for user_id, items in baskets.items() if not items]).delete()
+
+
+@task
+def persist_basket(user_id):
+    """Snapshot a user's basket on a background worker"""
+    persist([user_id])
+
+
+def snapshot_due(older_than=SNAPSHOT_AFTER, batch_size=1000):
+    """Snapshot the user baskets first changed at least older_than seconds ago, returning how many"""
+    redis = _redis()
+    snapshotted = 0
+    while True:
+        due = redis.zrangebyscore(DIRTY_KEY, "-inf", time.time() - older_than, start=0, num=batch_size, withscores=True)
+        if not due:
+            return snapshotted
+        # Unmark before reading, so a change made while persisting marks the basket again
+        redis.zrem(DIRTY_KEY, *(member for member, _ in due))
+        try:
+            persist(int(member) for member, _ in due)
+        except Exception:
+            redis.zadd(DIRTY_KEY, dict(due), nx=True)
+            raise
+        snapshotted += len(due)
@@ -0,0 +1,271 @@
+"""
+Test the Redis-backed Basket
+"""
+
+from datetime import date
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django_redis import get_redis_connection
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework import status
+
+from basket import store
+from basket.store import Basket, BasketFull
+from core.helpers import API_Client
+from core.models import BasketSnapshot
+
+BASKET_URL = reverse("basket")
+
+
+def line_url(product_id):
+    return reverse("basket-line", args=[product_id])
+
+
+def create_user(email="user@example.com"):
+    return get_user_model().objects.create_user(email=email, password="password123", date_of_birth=date(1990, 1, 1))
+
+
+class BasketTestCase(TestCase):
+    """Base class starting every test with no baskets in Redis"""
+
+    def setUp(self):
+        redis = get_redis_connection("default")
+        keys = list(redis.scan_iter("basket:*"))
+        if keys:
+            redis.delete(*keys)
+        self.client = API_Client()
+
+
+class Basket_Store(BasketTestCase):
+    """Test basket operations in Redis"""
+
+    def test_add_set_remove(self):
+        """Test adding accumulates, setting replaces and removing drops a line"""
+        basket = Basket(token=store.new_token())
+        self.assertEqual(basket.add(1, 2), 2)
+        self.assertEqual(basket.add(1, 3), 5)
+        basket.set(2, 4)
+        basket.remove(1)
+        self.assertEqual(basket.items(), {2: 4})
+
+    def test_quantity_is_capped(self):
+        """Test a line never exceeds the maximum quantity"""
+        basket = Basket(token=store.new_token())
+        basket.add(1, store.MAX_QUANTITY)
+        self.assertEqual(basket.add(1, 5), store.MAX_QUANTITY)
+
+    @patch.object(store, "MAX_LINES", 2)
+    def test_line_limit(self):
+        """Test a full basket refuses new products but still changes existing lines"""
+        basket = Basket(token=store.new_token())
+        basket.add(1)
+        basket.add(2)
+        with self.assertRaises(BasketFull):
+            basket.add(3)
+        self.assertEqual(basket.add(2), 2)
+
+    def test_baskets_expire(self):
+        """Test every change renews the basket's expiry"""
+        basket = Basket(token=store.new_token())
+        basket.add(1)
+        self.assertAlmostEqual(get_redis_connection("default").ttl(basket.key), store.ANONYMOUS_TTL, delta=5)
+
+    def test_operations_never_query_the_database(self):
+        """Test basket operations only talk to Redis"""
+        basket = Basket(user_id=1)
+        with self.assertNumQueries(0):
+            basket.add(1)
+            basket.set(2, 3)
+            basket.remove(1)
+            basket.items()
+            basket.clear()
+
+    def test_invalid_tokens(self):
+        """Test only tokens in the issued format are accepted"""
+        self.assertTrue(store.valid_token(store.new_token()))
+        for token in (None, "", "user:1", store.new_token().upper()):
+            self.assertFalse(store.valid_token(token))
+
+
+class Basket_Snapshots(BasketTestCase):
+    """Test persisting long-lived baskets to Postgres"""
+
+    def test_snapshot_due(self):
+        """Test baskets changed long enough ago are snapshotted once, and restored after expiring"""
+        user = create_user()
+        basket = Basket(user_id=user.id)
+        basket.add(7, 2)
+        self.assertEqual(store.snapshot_due(older_than=60), 0)
+        self.assertEqual(store.snapshot_due(older_than=0), 1)
+        self.assertEqual(BasketSnapshot.objects.get(user=user).items, {"7": 2})
+        self.assertEqual(store.snapshot_due(older_than=0), 0)
+
+        get_redis_connection("default").delete(basket.key)
+        store.restore(basket)
+        self.assertEqual(basket.items(), {7: 2})
+
+    def test_emptied_basket_drops_snapshot(self):
+        """Test clearing a basket removes its snapshot"""
+        user = create_user()
+        BasketSnapshot.objects.create(user=user, items={"7": 2})
+        Basket(user_id=user.id).clear()
+        store.snapshot_due(older_than=0)
+        self.assertFalse(BasketSnapshot.objects.exists())
+
+
+class Basket_API(BasketTestCase):
+    """Test the Basket endpoints"""
+
+    def test_anonymous_basket(self):
+        """Test an anonymous visitor gets a token with their first item and uses it afterwards"""
+        response = self.client.post(BASKET_URL, {"product": 5, "quantity": 2}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        token = response.data["token"]
+        self.assertTrue(store.valid_token(token))
+
+        response = self.client.post(BASKET_URL, {"product": 5, "quantity": 1}, format="json", HTTP_X_BASKET_TOKEN=token)
+        self.assertEqual(response.data["items"], [{"product": 5, "quantity": 3}])
+        self.assertEqual(response.data["count"], 3)
+
+    def test_empty_basket_without_token(self):
+        """Test reading without a token returns an empty basket and issues no token"""
+        response = self.client.get(BASKET_URL)
+        self.assertEqual(response.data, {"token": None, "items": [], "count": 0})
+
+    def test_user_basket_without_database(self):
+        """Test a signed-in user's basket is served from the access token and Redis alone"""
+        user = create_user()
+        self.client.authorize(user)
+        with self.assertNumQueries(0):
+            self.client.post(BASKET_URL, {"product": 5, "quantity": 1}, format="json")
+            self.client.put(line_url(6), {"quantity": 4}, format="json")
+            response = self.client.get(BASKET_URL)
+        self.assertIsNone(response.data["token"])
+        self.assertEqual(response.data["count"], 5)
+
+    def test_update_and_remove_line(self):
+        """Test a line's quantity can be replaced, and removed with 0 or DELETE"""
+        user = create_user()
+        self.client.authorize(user)
+        self.client.post(BASKET_URL, {"product": 5, "quantity": 1}, format="json")
+        self.client.post(BASKET_URL, {"product": 6, "quantity": 1}, format="json")
+        self.client.put(line_url(5), {"quantity": 0}, format="json")
+        response = self.client.delete(line_url(6))
+        self.assertEqual(response.data["items"], [])
+
+    def test_clear(self):
+        """Test clearing a basket"""
+        response = self.client.post(BASKET_URL, {"product": 5, "quantity": 1}, format="json")
+        token = response.data["token"]
+        response = self.client.delete(BASKET_URL, HTTP_X_BASKET_TOKEN=token)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(BASKET_URL, HTTP_X_BASKET_TOKEN=token).data["items"], [])
+
+    def test_invalid_line(self):
+        """Test quantities outside the limits are rejected"""
+        response = self.client.post(BASKET_URL, {"product": 5, "quantity": 0}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch.object(store, "MAX_LINES", 1)
+    def test_full_basket(self):
+        """Test adding to a full basket is rejected"""
+        token = self.client.post(BASKET_URL, {"product": 5, "quantity": 1}, format="json").data["token"]
+        response = self.client.post(BASKET_URL, {"product": 6, "quantity": 1}, format="json", HTTP_X_BASKET_TOKEN=token)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class Basket_Merge(BasketTestCase):
+    """Test anonymous baskets merge into the user's basket on login and registration"""
+
+    def anonymous_basket(self, *lines):
+        basket = Basket(token=store.new_token())
+        for product, quantity in lines:
+            basket.add(product, quantity)
+        return basket
+
+    def test_login_merges_basket(self):
+        """Test logging in adds the anonymous lines to the user's basket and deletes the anonymous one"""
+        user = create_user()
+        Basket(user_id=user.id).add(5, 1)
+        anonymous = self.anonymous_basket((5, 2), (6, 1))
+        response = self.client.post(
+            reverse("login"),
+            {"email": user.email, "password": "password123"},
+            format="json",
+            HTTP_X_BASKET_TOKEN=anonymous.token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Basket(user_id=user.id).items(), {5: 3, 6: 1})
+        self.assertEqual(anonymous.items(), {})
+
+    def test_failed_login_keeps_basket(self):
+        """Test a failed login leaves the anonymous basket alone"""
+        user = create_user()
+        anonymous = self.anonymous_basket((5, 2))
+        self.client.post(
+            reverse("login"),
+            {"email": user.email, "password": "wrong-password"},
+            format="json",
+            HTTP_X_BASKET_TOKEN=anonymous.token,
+        )
+        self.assertEqual(anonymous.items(), {5: 2})
+
+    def test_login_restores_snapshot(self):
+        """Test a basket Redis expired comes back from its snapshot before merging"""
+        user = create_user()
+        BasketSnapshot.objects.create(user=user, items={"7": 1})
+        anonymous = self.anonymous_basket((5, 2))
+        store.merge(anonymous.token, user.id)
+        self.assertEqual(Basket(user_id=user.id).items(), {5: 2, 7: 1})
+
+    def test_registration_merges_basket(self):
+        """Test registering keeps the anonymous basket"""
+        anonymous = self.anonymous_basket((5, 2))
+        response = self.client.post(
+            reverse("register"),
+            {
+                "email": "new@example.com",
+                "password": "password123",
+                "password_confirm": "password123",
+                "first_name": "Jane",
+                "last_name": "Doe",
+                "date_of_birth": "1990-01-01",
+            },
+            format="json",
+            HTTP_X_BASKET_TOKEN=anonymous.token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user_id = response.data["user"]["id"]
+        self.assertEqual(Basket(user_id=user_id).items(), {5: 2})
+
+    def test_redis_outage_does_not_fail_sign_in(self):
+        """Test logging in and registering succeed without merging the basket when Redis is unavailable"""
+        user = create_user()
+        with (
+            patch("authentication.views.merge", side_effect=RedisConnectionError),
+            self.assertLogs("authentication.views", "WARNING"),
+        ):
+            response = self.client.post(
+                reverse("login"),
+                {"email": user.email, "password": "password123"},
+                format="json",
+                HTTP_X_BASKET_TOKEN=store.new_token(),
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.post(
+                reverse("register"),
+                {
+                    "email": "new@example.com",
+                    "password": "password123",
+                    "password_confirm": "password123",
+                    "first_name": "Jane",
+                    "last_name": "Doe",
+                    "date_of_birth": "1990-01-01",
+                },
+                format="json",
+                HTTP_X_BASKET_TOKEN=store.new_token(),
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,13 @@
+"""
+URLs for the Basket
+"""
+
+from django.urls import path
+
+from .views import BasketLineView, BasketTotalsView, BasketView
+
+urlpatterns = [
+    path("", BasketView.as_view(), name="basket"),
+    path("totals/", BasketTotalsView.as_view(), name="basket-totals"),
+    path("items/<int:product_id>/", BasketLineView.as_view(), name="basket-line"),
+]
@@ -0,0 +1,144 @@
+"""
+API Views for the Basket
+"""
+
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+from products.pricing import Quote, quote
+
+from .serializers import BasketLineSerializer, BasketQuantitySerializer, BasketSerializer, BasketTotalsSerializer
+from .store import Basket, BasketFull, new_token, valid_token
+
+TOKEN_HEADER = "X-Basket-Token"
+
+token_parameter = OpenApiParameter(
+    TOKEN_HEADER,
+    str,
+    OpenApiParameter.HEADER,
+    description="Token of an anonymous basket, as returned when its first item was added",
+)
+
+
+class StatelessJWTScheme(SimpleJWTScheme):
+    """Name the stateless JWT authentication apart, the schema needs one name per authentication class"""
+
+    target_class = JWTStatelessUserAuthentication
+    name = "jwtStatelessAuth"
+    priority = 1
+
+
+def basket_token(request):
+    """The anonymous basket token sent with a request, None when missing or malformed"""
+    token = request.headers.get(TOKEN_HEADER)
+    return token if valid_token(token) else None
+
+
+class BasketMixin:
+    """
+    Resolve the basket of the signed-in user, or of the anonymous visitor's token.
+    The user is read from the access token alone, so no request touches the database.
+    """
+
+    authentication_classes = [JWTStatelessUserAuthentication]
+    permission_classes = [AllowAny]
+
+    def get_basket(self, create=False):
+        """The request's basket, with a new anonymous token when create is set, or None"""
+        if self.request.user.is_authenticated:
+            return Basket(user_id=self.request.user.id)
+        token = basket_token(self.request)
+        if token is None and create:
+            token = new_token()
+        return Basket(token=token) if token is not None else None
+
+    def basket_response(self, basket):
+        items = sorted(basket.items().items()) if basket is not None else []
+        data = {
+            "token": basket.token if basket is not None else None,
+            "items": [{"product": product, "quantity": quantity} for product, quantity in items],
+            "count": sum(quantity for _, quantity in items),
+        }
+        return Response(BasketSerializer(data).data)
+
+    @staticmethod
+    def change(func, *args):
+        try:
+            return func(*args)
+        except BasketFull as exc:
+            raise ValidationError({"product": [str(exc)]}) from None
+
+
+@extend_schema(parameters=[token_parameter])
+class BasketView(BasketMixin, APIView):
+    """
+    View for the Basket
+    GET - basket/
+    POST - basket/
+    DELETE - basket/
+    """
+
+    @extend_schema(responses=BasketSerializer)
+    def get(self, request):
+        return self.basket_response(self.get_basket())
+
+    @extend_schema(request=BasketLineSerializer, responses=BasketSerializer)
+    def post(self, request):
+        """Add units of a product, starting an anonymous basket when there is none"""
+        line = BasketLineSerializer(data=request.data)
+        line.is_valid(raise_exception=True)
+        basket = self.get_basket(create=True)
+        self.change(basket.add, line.validated_data["product"], line.validated_data["quantity"])
+        return self.basket_response(basket)
+
+    @extend_schema(responses={204: None})
+    def delete(self, request):
+        basket = self.get_basket()
+        if basket is not None:
+            basket.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@extend_schema(parameters=[token_parameter])
+class BasketLineView(BasketMixin, APIView):
+    """
+    View for a line of the Basket
+    PUT - basket/items/{product_id}/
+    DELETE - basket/items/{product_id}/
+    """
+
+    @extend_schema(request=BasketQuantitySerializer, responses=BasketSerializer)
+    def put(self, request, product_id):
+        quantity = BasketQuantitySerializer(data=request.data)
+        quantity.is_valid(raise_exception=True)
+        basket = self.get_basket(create=True)
+        self.change(basket.set, product_id, quantity.validated_data["quantity"])
+        return self.basket_response(basket)
+
+    @extend_schema(responses=BasketSerializer)
+    def delete(self, request, product_id):
+        basket = self.get_basket()
+        if basket is not None:
+            basket.remove(product_id)
+        return self.basket_response(basket)
+
+
+@extend_schema(parameters=[token_parameter])
+class BasketTotalsView(BasketMixin, APIView):
+    """
+    View for the Basket's totals, priced with the current promotions in one read of the products
+    GET - basket/totals/
+    """
+
+    @extend_schema(responses=BasketTotalsSerializer)
+    def get(self, request):
+        basket = self.get_basket()
+        lines = basket.items() if basket is not None else {}
+        priced = quote(lines) if lines else Quote()
+        return Response(BasketTotalsSerializer(priced).data)
@@ -0,0 +1,315 @@
+"""
+HTTP load test for the authentication and profile flows
+
+Seeds users through the registration endpoint, then drives a weighted mix of
+requests from concurrent virtual users against a running server and reports
+throughput and latency percentiles per endpoint.
+"""
+
+import http.client
+import itertools
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import UTC, datetime
+from urllib.parse import urlsplit
+
+DEFAULT_MIX = {
+    "register": 5,
+    "login": 15,
+    "refresh": 15,
+    "get_profile": 30,
+    "patch_profile": 10,
+    "get_user": 25,
+}
+PASSWORD = "LoadTest!Password123"
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def parse_mix(value):
+    """Parse a mix such as 'login=20,get_profile=80' into weights"""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown action '{name}', expected one of {', '.join(DEFAULT_MIX)}")
+        mix[name] = int(weight)
+    return mix
+
+
+class HttpSession:
+    """Keep-alive HTTP connection owned by a single worker thread"""
+
+    def __init__(self, base_url, timeout=30.0):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.factory = lambda: connection_class(parts.hostname, parts.port, timeout=timeout)
+        self.prefix = parts.path.rstrip("/")
+        self.connection = None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def request(self, method, path, body=None, token=None):
+        """Send a JSON request and return (status, decoded body)"""
+        headers = {"Accept": "application/json"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+
+        reused = self.connection is not None
+        if self.connection is None:
+            self.connection = self.factory()
+        try:
+            self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            self.close()
+            if not reused:
+                raise
+            # The server closed an idle keep-alive connection, retry once on a fresh one
+            return self.request(method, path, body, token)
+
+        if response.getheader("Connection", "").lower() == "close":
+            self.close()
+        is_json = data and response.getheader("Content-Type", "").startswith("application/json")
+        return response.status, json.loads(data) if is_json else None
+
+
+class VirtualUser:
+    """A registered user with its own tokens, performing one action at a time"""
+
+    def __init__(self, email):
+        self.email = email
+        self.user_id = None
+        self.access = None
+        self.refresh = None
+
+    def _store_tokens(self, tokens):
+        self.access = tokens["access"]
+        self.refresh = tokens["refresh"]
+
+    def register(self, session, email=None):
+        body = {
+            "email": email or self.email,
+            "password": PASSWORD,
+            "password_confirm": PASSWORD,
+            "first_name": "Load",
+            "last_name": "Test",
+            "date_of_birth": "1990-01-01",
+        }
+        status, data = session.request("POST", "/auth/register/", body)
+        if status == 201 and email is None:
+            self.user_id = data["user"]["id"]
+            self._store_tokens(data["tokens"])
+        return status
+
+    def login(self, session):
+        status, data = session.request("POST", "/auth/login/", {"email": self.email, "password": PASSWORD})
+        if status == 200:
+            self._store_tokens(data)
+        return status
+
+    def refresh_tokens(self, session):
+        status, data = session.request("POST", "/auth/refresh/", {"refresh": self.refresh})
+        if status == 200:
+            # Rotation issues a new refresh token and blacklists the old one
+            self._store_tokens(data)
+        return status
+
+    def get_profile(self, session):
+        return session.request("GET", f"/users/{self.user_id}/profile/", token=self.access)[0]
+
+    def patch_profile(self, session):
+        body = {"bio": f"Updated at {time.time():.3f}"}
+        return session.request("PATCH", f"/users/{self.user_id}/profile/", body, token=self.access)[0]
+
+    def get_user(self, session):
+        return session.request("GET", f"/users/{self.user_id}/", token=self.access)[0]
+
+
+class EndpointStats:
+    """Latencies and status codes recorded for one action"""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = 0
+
+    def merge(self, other):
+        self.latencies.extend(other.latencies)
+        self.statuses.update(other.statuses)
+        self.errors += other.errors
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+                "p50": round(percentile(latencies, 50) * 1000, 3),
+                "p95": round(percentile(latencies, 95) * 1000, 3),
+                "p99": round(percentile(latencies, 99) * 1000, 3),
+                "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            },
+            "statuses": {str(code): count for code, count in sorted(self.statuses.items())},
+        }
+
+
+class LoadTest:
+    """Seed virtual users, then drive the request mix until the duration or request budget runs out"""
+
+    def __init__(
+        self,
+        base_url,
+        users=20,
+        concurrency=10,
+        duration=30.0,
+        requests=None,
+        mix=None,
+        seed=0,
+        timeout=30.0,
+    ):
+        self.base_url = base_url
+        self.users = max(users, concurrency)
+        self.concurrency = concurrency
+        self.duration = duration
+        self.requests = requests
+        self.mix = mix or DEFAULT_MIX
+        self.seed = seed
+        self.timeout = timeout
+        self.run_id = uuid.uuid4().hex[:8]
+
+    def _email(self, index):
+        return f"loadtest-{self.run_id}-{index}@example.com"
+
+    def _in_parallel(self, target):
+        threads = [threading.Thread(target=target, args=(worker,)) for worker in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def seed_users(self):
+        """Register the virtual users concurrently"""
+        virtual_users = [VirtualUser(self._email(index)) for index in range(self.users)]
+        failures = []
+
+        def register(worker):
+            session = HttpSession(self.base_url, self.timeout)
+            for virtual_user in virtual_users[worker :: self.concurrency]:
+                status = virtual_user.register(session)
+                if status != 201:
+                    failures.append((virtual_user.email, status))
+            session.close()
+
+        self._in_parallel(register)
+        if failures:
+            raise RuntimeError(f"Could not seed {len(failures)} users, first failure: {failures[0]}")
+        return virtual_users
+
+    def run(self):
+        """Run the load test and return the results document"""
+        started_at = datetime.now(UTC)
+        seed_started = time.perf_counter()
+        virtual_users = self.seed_users()
+        seed_elapsed = time.perf_counter() - seed_started
+
+        actions = list(self.mix)
+        weights = [self.mix[action] for action in actions]
+        budget = itertools.count()
+        extra_users = itertools.count(self.users)
+        per_worker = [{} for _ in range(self.concurrency)]
+
+        def drive(worker):
+            rng = random.Random(self.seed * 1000 + worker)
+            own_users = virtual_users[worker :: self.concurrency]
+            session = HttpSession(self.base_url, self.timeout)
+            stats = per_worker[worker]
+            while time.perf_counter() < deadline:
+                if self.requests is not None and next(budget) >= self.requests:
+                    break
+                action = rng.choices(actions, weights)[0]
+                virtual_user = rng.choice(own_users)
+                started = time.perf_counter()
+                try:
+                    if action == "register":
+                        status = virtual_user.register(session, email=self._email(next(extra_users)))
+                    elif action == "refresh":
+                        status = virtual_user.refresh_tokens(session)
+                    else:
+                        status = getattr(virtual_user, action)(session)
+                except (http.client.HTTPException, OSError):
+                    status = None
+                elapsed = time.perf_counter() - started
+
+                endpoint = stats.get(action)
+                if endpoint is None:
+                    endpoint = stats[action] = EndpointStats()
+                endpoint.latencies.append(elapsed)
+                endpoint.statuses[status or 0] += 1
+                if status is None or status >= 400:
+                    endpoint.errors += 1
+                if status == 401 and action != "login":
+                    virtual_user.login(session)
+            session.close()
+
+        run_started = time.perf_counter()
+        deadline = run_started + self.duration
+        self._in_parallel(drive)
+        elapsed = time.perf_counter() - run_started
+
+        merged = {}
+        for stats in per_worker:
+            for action, endpoint in stats.items():
+                merged.setdefault(action, EndpointStats()).merge(endpoint)
+        total = EndpointStats()
+        for endpoint in merged.values():
+            total.merge(endpoint)
+
+        return {
+            "started_at": started_at.isoformat(),
+            "base_url": self.base_url,
+            "concurrency": self.concurrency,
+            "users": self.users,
+            "seed": self.seed,
+            "mix": self.mix,
+            "seeding": {"users": self.users, "duration_s": round(seed_elapsed, 3)},
+            "duration_s": round(elapsed, 3),
+            "totals": total.summary(elapsed),
+            "endpoints": {action: merged[action].summary(elapsed) for action in actions if action in merged},
+        }
+
+
+def compare_results(previous, current):
+    """Yield (endpoint, metric, before, after, change %) for the headline numbers of two runs"""
+    for endpoint, after in current["endpoints"].items():
+        before = previous.get("endpoints", {}).get(endpoint)
+        if before is None:
+            continue
+        metrics = [("throughput_rps", before["throughput_rps"], after["throughput_rps"])]
+        for name in ("p50", "p95", "p99"):
+            metrics.append((name, before["latency_ms"][name], after["latency_ms"][name]))
+        for metric, old, new in metrics:
+            change = (new - old) / old * 100 if old else 0.0
+            yield endpoint, metric, old, new, change
@@ -0,0 +1,83 @@
+"""
+Django command to run the micro-benchmarks
+"""
+
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import runner
+
+
+class Command(BaseCommand):
+    """Run the in-process micro-benchmarks, store baselines and flag regressions"""
+
+    help = "Run micro-benchmarks and compare them against a stored baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument("pattern", nargs="?", default="*", help="Only run benchmarks matching this glob")
+        parser.add_argument("--warmup", type=float, default=0.2, help="Seconds of warm-up per benchmark")
+        parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per timed sample")
+        parser.add_argument("--repeat", type=int, default=7, help="Timed samples per benchmark")
+        parser.add_argument("--save", type=Path, default=None, help="Write the results as a baseline file")
+        parser.add_argument("--compare", type=Path, default=None, help="Baseline file to compare against")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=10.0,
+            help="Percentage slowdown in median time that counts as a regression",
+        )
+        parser.add_argument("--list", action="store_true", help="List the registered benchmarks and exit")
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            for name in runner.discover():
+                self.stdout.write(name)
+            return
+
+        baseline = None
+        if options["compare"] is not None:
+            try:
+                baseline = json.loads(options["compare"].read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Could not read baseline {options['compare']}: {exc}") from exc
+
+        self.stdout.write(f"{'benchmark':<40}{'median us':>12}{'min us':>12}{'stdev us':>12}{'iterations':>12}")
+        results = runner.run(
+            options["pattern"],
+            warmup=options["warmup"],
+            min_time=options["min_time"],
+            repeat=options["repeat"],
+            on_result=self.report,
+        )
+        if not results["benchmarks"]:
+            raise CommandError(f"No benchmarks match '{options['pattern']}'")
+
+        if options["save"] is not None:
+            options["save"].parent.mkdir(parents=True, exist_ok=True)
+            options["save"].write_text(json.dumps(results, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['save']}"))
+
+        if baseline is not None:
+            self.compare(baseline, results, options["threshold"])
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:<40}{result['median_us']:>12.2f}{result['min_us']:>12.2f}"
+            f"{result['stdev_us']:>12.2f}{result['iterations']:>12}"
+        )
+
+    def compare(self, baseline, results, threshold):
+        self.stdout.write(f"\nCompared with the baseline from {baseline.get('created_at', 'unknown')}:")
+        regressions = []
+        for name, before, after, change, regressed in runner.compare(baseline, results, threshold):
+            line = f"{name:<40}{before:>12.2f} -> {after:>12.2f} ({change:+.1f}%)"
+            if regressed:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(f"{line} REGRESSION"))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(f"{len(regressions)} benchmark(s) slower than the baseline by more than {threshold}%")
+        self.stdout.write(self.style.SUCCESS("No regressions"))
@@ -0,0 +1,84 @@
+"""
+Django command to load test a running server
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.loadtest import DEFAULT_MIX, LoadTest, compare_results, parse_mix
+
+RESULTS_DIR = Path(__file__).resolve().parents[2] / "results"
+
+
+class Command(BaseCommand):
+    """Seed users and drive the auth and profile endpoints at a given concurrency"""
+
+    help = "Load test the auth and profile endpoints of a running server"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000", help="Server to load test")
+        parser.add_argument("--users", type=int, default=20, help="Virtual users to seed")
+        parser.add_argument("--concurrency", type=int, default=10, help="Concurrent workers")
+        parser.add_argument("--duration", type=float, default=30.0, help="Seconds to drive load for")
+        parser.add_argument("--requests", type=int, default=None, help="Stop after this many requests")
+        parser.add_argument(
+            "--mix",
+            default=",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()),
+            help="Weighted request mix, e.g. login=20,get_profile=80",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Seed for the request mix")
+        parser.add_argument("--output", type=Path, default=None, help="Where to write the JSON results")
+        parser.add_argument("--compare", type=Path, default=None, help="Previous results to compare against")
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options["mix"])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        load_test = LoadTest(
+            options["base_url"],
+            users=options["users"],
+            concurrency=options["concurrency"],
+            duration=options["duration"],
+            requests=options["requests"],
+            mix=mix,
+            seed=options["seed"],
+        )
+        self.stdout.write(f"Seeding {load_test.users} users against {options['base_url']}...")
+        try:
+            results = load_test.run()
+        except (RuntimeError, OSError) as exc:
+            raise CommandError(f"Load test failed: {exc}") from exc
+
+        self.report(results)
+
+        output = options["output"]
+        if output is None:
+            RESULTS_DIR.mkdir(exist_ok=True)
+            output = RESULTS_DIR / f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json"
+        output.write_text(json.dumps(results, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+        if options["compare"] is not None:
+            self.compare(json.loads(options["compare"].read_text()), results)
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'endpoint':<16}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        )
+        rows = list(results["endpoints"].items()) + [("total", results["totals"])]
+        for endpoint, summary in rows:
+            latency = summary["latency_ms"]
+            self.stdout.write(
+                f"{endpoint:<16}{summary['requests']:>10}{summary['errors']:>8}{summary['throughput_rps']:>10.1f}"
+                f"{latency['p50']:>10.2f}{latency['p95']:>10.2f}{latency['p99']:>10.2f}"
+            )
+
+    def compare(self, previous, results):
+        self.stdout.write(f"\nCompared with the run started {previous.get('started_at', 'unknown')}:")
+        for endpoint, metric, before, after, change in compare_results(previous, results):
+            self.stdout.write(f"{endpoint:<16}{metric:<16}{before:>10.2f} -> {after:>10.2f} ({change:+.1f}%)")
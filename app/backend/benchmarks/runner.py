@@ -0,0 +1,126 @@
+"""
+Micro-benchmark runner
+
+Benchmarks are registered with @benchmark on a factory that does its setup
+and returns the zero-argument callable to time. The runner warms the callable
+up, calibrates how many calls make a sample long enough to time reliably and
+collects repeated samples with the garbage collector disabled.
+"""
+
+import gc
+import importlib
+import pkgutil
+import platform
+import statistics
+import time
+from datetime import UTC, datetime
+from fnmatch import fnmatch
+
+import django
+from django.conf import settings
+from django.db import transaction
+from django.test.utils import override_settings
+
+_registry = {}
+
+
+def benchmark(name):
+    """Register a benchmark factory under a dotted name"""
+
+    def decorator(factory):
+        _registry[name] = factory
+        return factory
+
+    return decorator
+
+
+def discover():
+    """Import every suite module so its benchmarks register themselves"""
+    from benchmarks import suites
+
+    for module in pkgutil.iter_modules(suites.__path__):
+        importlib.import_module(f"{suites.__name__}.{module.name}")
+    return dict(sorted(_registry.items()))
+
+
+def _time(func, number):
+    started = time.perf_counter()
+    for _ in range(number):
+        func()
+    return time.perf_counter() - started
+
+
+def measure(func, warmup=0.2, min_time=0.05, repeat=7):
+    """Time func and return per-call statistics in microseconds"""
+    deadline = time.perf_counter() + warmup
+    while time.perf_counter() < deadline:
+        func()
+
+    number = 1
+    while True:
+        if _time(func, number) >= min_time:
+            break
+        number *= 2
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        samples = [_time(func, number) / number * 1e6 for _ in range(repeat)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return {
+        "median_us": round(statistics.median(samples), 3),
+        "min_us": round(min(samples), 3),
+        "mean_us": round(statistics.fmean(samples), 3),
+        "stdev_us": round(statistics.stdev(samples), 3) if repeat > 1 else 0.0,
+        "iterations": number,
+        "repeat": repeat,
+    }
+
+
+def run(pattern="*", warmup=0.2, min_time=0.05, repeat=7, on_result=None):
+    """
+    Run every registered benchmark matching pattern and return the results document.
+    Benchmarks run in a transaction that is rolled back, so fixtures never persist,
+    and with DEBUG off so query logging does not skew database-bound timings.
+    Like the test runner, "testserver" is allowed so benchmarks can build requests.
+    """
+    results = {}
+    with override_settings(DEBUG=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        for name, factory in discover().items():
+            if not fnmatch(name, pattern):
+                continue
+            with transaction.atomic():
+                func = factory()
+                results[name] = measure(func, warmup=warmup, min_time=min_time, repeat=repeat)
+                transaction.set_rollback(True)
+            if on_result is not None:
+                on_result(name, results[name])
+
+    return {
+        "created_at": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "machine": platform.machine(),
+        "benchmarks": results,
+    }
+
+
+def compare(baseline, current, threshold=10.0):
+    """
+    Compare median timings against a baseline.
+    Returns (name, before, after, change %, regressed) for benchmarks present in both runs.
+    A benchmark only counts as regressed when its minimum is also slower by more than
+    the threshold, which filters out one-off noise from a busy machine.
+    """
+    rows = []
+    for name, result in current["benchmarks"].items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if before is None:
+            continue
+        change = (result["median_us"] - before["median_us"]) / before["median_us"] * 100
+        min_change = (result["min_us"] - before["min_us"]) / before["min_us"] * 100
+        rows.append((name, before["median_us"], result["median_us"], change, min(change, min_change) > threshold))
+    return rows
@@ -0,0 +1,3 @@
+"""
+Benchmark suites, discovered by benchmarks.runner
+"""
@@ -0,0 +1,104 @@
+"""
+Benchmarks for the authentication and user hot paths
+"""
+
+from datetime import date
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from authentication.serializers import RegisterRequestSerializer
+from benchmarks.runner import benchmark
+from core.models import Profile
+from core.permissions import UserIsOwnerOrReadOnly
+from core.serializers import ProfileSerializer, UserSerializer
+
+
+def create_user():
+    """Create a user and profile inside the benchmark transaction"""
+    user = get_user_model().objects.create_user(
+        email="bench@example.com",
+        password="password123",
+        first_name="Bench",
+        last_name="Mark",
+        date_of_birth=date(1990, 1, 1),
+    )
+    Profile.objects.create(user=user, display_name="Bench Mark", bio="Benchmark bio", location="Belfast")
+    return user
+
+
+@benchmark("serializers.register_validation")
+def register_validation():
+    data = {
+        "email": "new-user@example.com",
+        "password": "password123",
+        "password_confirm": "password123",
+        "first_name": "New",
+        "last_name": "User",
+        "date_of_birth": "1990-01-01",
+    }
+
+    def run():
+        RegisterRequestSerializer(data=data).is_valid(raise_exception=True)
+
+    return run
+
+
+@benchmark("serializers.user_render")
+def user_render():
+    user = create_user()
+
+    def run():
+        return UserSerializer(user).data
+
+    return run
+
+
+@benchmark("serializers.profile_render")
+def profile_render():
+    profile = create_user().profile
+
+    def run():
+        return ProfileSerializer(profile).data
+
+    return run
+
+
+@benchmark("permissions.owner_or_read_only")
+def owner_or_read_only():
+    user = create_user()
+    other = SimpleNamespace(id=user.id + 1)
+    permission = UserIsOwnerOrReadOnly()
+    requests = [
+        SimpleNamespace(method="GET", user=other),
+        SimpleNamespace(method="PATCH", user=user),
+        SimpleNamespace(method="PATCH", user=other),
+    ]
+    profile = user.profile
+
+    def run():
+        for request in requests:
+            permission.has_object_permission(request, None, profile)
+
+    return run
+
+
+@benchmark("tokens.refresh_for_user")
+def refresh_for_user():
+    user = create_user()
+
+    def run():
+        return RefreshToken.for_user(user)
+
+    return run
+
+
+@benchmark("tokens.access_decode")
+def access_decode():
+    token = str(RefreshToken.for_user(create_user()).access_token)
+
+    def run():
+        return AccessToken(token)
+
+    return run
@@ -0,0 +1,65 @@
+"""
+Benchmarks for the product catalog read paths
+"""
+
+from io import StringIO
+from urllib.parse import urlsplit
+
+from django.core.management import call_command
+from rest_framework.test import APIRequestFactory
+
+from benchmarks.runner import benchmark
+from core.models import Brand, Category, Product
+from products.views import ProductListView
+
+MIN_PRODUCTS = 10_000
+
+
+def ensure_catalog():
+    """Seed a catalog inside the benchmark transaction unless a bigger one already exists"""
+    if not Product.objects.filter(pk__gt=0)[MIN_PRODUCTS - 1 : MIN_PRODUCTS].exists():
+        call_command(
+            "seed", users=0, brands=50, categories=20, products=MIN_PRODUCTS, orders=0, workers=1, stdout=StringIO()
+        )
+    return Brand.objects.order_by("id").first(), Category.objects.order_by("id").first()
+
+
+def list_view(path, pages=1):
+    """Return a callable that renders a product list page, following `pages - 1` cursors first"""
+    factory = APIRequestFactory()
+    view = ProductListView.as_view()
+    for _ in range(pages - 1):
+        next_url = urlsplit(view(factory.get(path)).data["next"])
+        path = f"{next_url.path}?{next_url.query}"
+    request = factory.get(path)
+
+    def run():
+        response = view(request)
+        response.render()
+        return response
+
+    return run
+
+
+@benchmark("catalog.category_by_price")
+def category_by_price():
+    _, category = ensure_catalog()
+    return list_view(f"/products/?category={category.id}&ordering=price")
+
+
+@benchmark("catalog.category_by_price_deep")
+def category_by_price_deep():
+    _, category = ensure_catalog()
+    return list_view(f"/products/?category={category.id}&ordering=price", pages=20)
+
+
+@benchmark("catalog.brand_newest")
+def brand_newest():
+    brand, _ = ensure_catalog()
+    return list_view(f"/products/?brand={brand.id}")
+
+
+@benchmark("catalog.newest")
+def newest():
+    ensure_catalog()
+    return list_view("/products/")
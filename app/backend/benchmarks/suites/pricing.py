@@ -0,0 +1,76 @@
+"""
+Benchmarks for pricing baskets with promotions
+"""
+
+import random
+from decimal import Decimal
+
+from benchmarks.runner import benchmark
+from benchmarks.suites.catalog import ensure_catalog
+from core.models import Brand, Category, Product, Promotion
+from products import pricing
+
+PROMOTIONS = 5_000
+
+
+def ensure_promotions():
+    """Seed promotions on products, brands and categories inside the benchmark transaction"""
+    ensure_catalog()
+    if Promotion.objects.filter(is_active=True)[PROMOTIONS - 1 : PROMOTIONS].exists():
+        return
+    rng = random.Random(0)
+    products = list(Product.objects.values_list("id", flat=True)[:PROMOTIONS])
+    brands = list(Brand.objects.values_list("id", flat=True))
+    categories = list(Category.objects.values_list("id", flat=True))
+    promotions = []
+    for n in range(PROMOTIONS):
+        target = {"product_id": rng.choice(products)}
+        if n % 10 == 0:
+            target = {"brand_id": rng.choice(brands)}
+        elif n % 10 == 1:
+            target = {"category_id": rng.choice(categories)}
+        if n % 3:
+            kind = {"kind": Promotion.Kind.PERCENT_OFF, "percent": Decimal(rng.randint(5, 50))}
+        else:
+            kind = {"kind": Promotion.Kind.BUY_X_GET_Y, "buy_quantity": rng.randint(1, 3), "free_quantity": 1}
+        promotions.append(Promotion(name=f"Promotion {n}", **target, **kind))
+    Promotion.objects.bulk_create(promotions)
+
+
+def basket_pricing(size):
+    """Return a callable that prices a basket of size lines against the compiled promotions"""
+    ensure_promotions()
+    book = pricing.compile_promotions()
+    rng = random.Random(size)
+    lines = {
+        product_id: rng.randint(1, 5)
+        for product_id in rng.sample(list(Product.objects.values_list("id", flat=True)), size)
+    }
+    products = pricing.product_terms(lines)
+    return lambda: book.price(lines, products)
+
+
+@benchmark("pricing.compile")
+def compile_promotions():
+    ensure_promotions()
+    return pricing.compile_promotions
+
+
+@benchmark("pricing.basket_1")
+def basket_1():
+    return basket_pricing(1)
+
+
+@benchmark("pricing.basket_10")
+def basket_10():
+    return basket_pricing(10)
+
+
+@benchmark("pricing.basket_100")
+def basket_100():
+    return basket_pricing(100)
+
+
+@benchmark("pricing.basket_500")
+def basket_500():
+    return basket_pricing(500)
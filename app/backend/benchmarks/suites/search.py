@@ -0,0 +1,47 @@
+"""
+Benchmarks for faceted product search
+"""
+
+from benchmarks.runner import benchmark
+from benchmarks.suites.catalog import ensure_catalog
+from products.search import ProductSearch
+
+
+def uncached(search):
+    """Return a callable that runs the result and facet queries of a search, bypassing the cache"""
+
+    def run():
+        queryset = search.get_queryset()
+        return search.facets(queryset), search.results(queryset)
+
+    return run
+
+
+@benchmark("search.keyword")
+def keyword():
+    ensure_catalog()
+    return uncached(ProductSearch(q="wireless drill"))
+
+
+@benchmark("search.keyword_broad")
+def keyword_broad():
+    ensure_catalog()
+    return uncached(ProductSearch(q="portable"))
+
+
+@benchmark("search.keyword_in_category")
+def keyword_in_category():
+    _, category = ensure_catalog()
+    return uncached(ProductSearch(q="lamp", category=category.id, max_price=100))
+
+
+@benchmark("search.cached")
+def cached():
+    ensure_catalog()
+    search = ProductSearch(q="wireless drill")
+    search.execute(list)
+
+    def run():
+        return search.execute(list)
+
+    return run
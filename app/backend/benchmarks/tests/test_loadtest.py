@@ -0,0 +1,82 @@
+"""
+Tests for the HTTP Load Test Harness
+"""
+
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from benchmarks.loadtest import EndpointStats, compare_results, parse_mix, percentile
+
+
+class Load_Test_Statistics(SimpleTestCase):
+    """Test result aggregation"""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = [i / 100 for i in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 0.5)
+        self.assertEqual(percentile(values, 95), 0.95)
+        self.assertEqual(percentile(values, 99), 0.99)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_endpoint_summary(self):
+        """Test per-endpoint summaries report throughput and status codes"""
+        stats = EndpointStats()
+        stats.latencies.extend([0.01, 0.02, 0.03, 0.04])
+        stats.statuses.update([200, 200, 200, 401])
+        stats.errors = 1
+
+        summary = stats.summary(elapsed=2.0)
+        self.assertEqual(summary["requests"], 4)
+        self.assertEqual(summary["throughput_rps"], 2.0)
+        self.assertEqual(summary["latency_ms"]["p50"], 20.0)
+        self.assertEqual(summary["statuses"], {"200": 3, "401": 1})
+
+    def test_parse_mix(self):
+        """Test request mixes are validated"""
+        self.assertEqual(parse_mix("login=20,get_profile=80"), {"login": 20, "get_profile": 80})
+        with self.assertRaises(ValueError):
+            parse_mix("checkout=10")
+
+    def test_compare_results(self):
+        """Test runs are compared per endpoint"""
+        previous = {"endpoints": {"login": {"throughput_rps": 100, "latency_ms": {"p50": 10, "p95": 20, "p99": 40}}}}
+        current = {"endpoints": {"login": {"throughput_rps": 50, "latency_ms": {"p50": 10, "p95": 30, "p99": 40}}}}
+        changes = {metric: change for _, metric, _, _, change in compare_results(previous, current)}
+        self.assertEqual(changes, {"throughput_rps": -50.0, "p50": 0.0, "p95": 50.0, "p99": 0.0})
+
+
+class Load_Test_Command(LiveServerTestCase):
+    """Test the load test against a live server"""
+
+    def test_load_test_run(self):
+        """Test a short run exercises every endpoint and writes JSON results"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "results.json"
+            call_command(
+                "loadtest",
+                f"--base-url={self.live_server_url}",
+                "--users=2",
+                "--concurrency=2",
+                "--requests=40",
+                "--mix=login=1,refresh=1,get_profile=1,patch_profile=1,get_user=1",
+                f"--output={output}",
+                stdout=StringIO(),
+            )
+            results = json.loads(output.read_text())
+
+        self.assertEqual(results["totals"]["requests"], 40)
+        self.assertEqual(results["totals"]["errors"], 0)
+        for endpoint in ["login", "refresh", "get_profile", "patch_profile", "get_user"]:
+            self.assertIn(endpoint, results["endpoints"])
+            self.assertIn("p99", results["endpoints"][endpoint]["latency_ms"])
+
+    def test_unknown_action(self):
+        """Test an invalid mix is rejected before any load is sent"""
+        with self.assertRaises(CommandError):
+            call_command("loadtest", "--mix=checkout=1", stdout=StringIO())
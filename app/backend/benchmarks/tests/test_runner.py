@@ -0,0 +1,117 @@
+"""
+Tests for the Micro-Benchmark Runner
+"""
+
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from benchmarks import runner
+from benchmarks.suites import catalog
+from core.models import Order, Product
+
+
+def result(median_us, min_us):
+    return {"median_us": median_us, "min_us": min_us}
+
+
+class Benchmark_Runner(SimpleTestCase):
+    """Test timing and baseline comparison"""
+
+    def test_measure(self):
+        """Test per-call statistics are reported"""
+        stats = runner.measure(lambda: sum(range(100)), warmup=0.01, min_time=0.001, repeat=3)
+        self.assertEqual(stats["repeat"], 3)
+        self.assertGreaterEqual(stats["iterations"], 1)
+        self.assertLessEqual(stats["min_us"], stats["median_us"])
+        self.assertGreater(stats["min_us"], 0)
+
+    def test_compare_flags_regression(self):
+        """Test a slowdown beyond the threshold is flagged"""
+        baseline = {"benchmarks": {"a": result(100, 90), "b": result(100, 90)}}
+        current = {"benchmarks": {"a": result(130, 120), "b": result(105, 95)}}
+        rows = {name: regressed for name, _, _, _, regressed in runner.compare(baseline, current, threshold=10)}
+        self.assertEqual(rows, {"a": True, "b": False})
+
+    def test_compare_ignores_noisy_median(self):
+        """Test a slower median with an unchanged minimum is not a regression"""
+        baseline = {"benchmarks": {"a": result(100, 90)}}
+        current = {"benchmarks": {"a": result(150, 91)}}
+        [(_, _, _, change, regressed)] = runner.compare(baseline, current, threshold=10)
+        self.assertEqual(change, 50.0)
+        self.assertFalse(regressed)
+
+    def test_compare_skips_new_benchmarks(self):
+        """Test benchmarks missing from the baseline are not compared"""
+        current = {"benchmarks": {"new": result(100, 90)}}
+        self.assertEqual(runner.compare({"benchmarks": {}}, current), [])
+
+
+class Benchmark_Command(TestCase):
+    """Test the bench command"""
+
+    def test_suites_are_registered(self):
+        """Test the auth hot paths have benchmarks"""
+        out = StringIO()
+        call_command("bench", "--list", stdout=out)
+        for name in [
+            "serializers.register_validation",
+            "serializers.user_render",
+            "serializers.profile_render",
+            "permissions.owner_or_read_only",
+            "tokens.refresh_for_user",
+            "tokens.access_decode",
+        ]:
+            self.assertIn(name, out.getvalue())
+
+    def test_save_and_compare_baseline(self):
+        """Test results are saved as a baseline and compared against"""
+        options = ["--warmup=0", "--min-time=0.001", "--repeat=2"]
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "baseline.json"
+            call_command("bench", "tokens.*", *options, f"--save={path}", stdout=StringIO())
+            baseline = json.loads(path.read_text())
+            self.assertEqual(set(baseline["benchmarks"]), {"tokens.refresh_for_user", "tokens.access_decode"})
+
+            out = StringIO()
+            call_command("bench", "tokens.*", *options, f"--compare={path}", "--threshold=100000", stdout=out)
+            self.assertIn("No regressions", out.getvalue())
+
+    def test_regression_fails(self):
+        """Test the command fails when a benchmark is slower than the baseline"""
+        baseline = {"benchmarks": {"tokens.access_decode": result(0.001, 0.001)}}
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as file:
+            json.dump(baseline, file)
+            file.flush()
+            with self.assertRaises(CommandError):
+                call_command(
+                    "bench",
+                    "tokens.access_decode",
+                    "--warmup=0",
+                    "--min-time=0.001",
+                    "--repeat=2",
+                    f"--compare={file.name}",
+                    stdout=StringIO(),
+                )
+
+    def test_catalog_seeded_when_empty(self):
+        """Test the catalog benchmarks seed products without users or orders on an empty database"""
+        with patch.object(catalog, "MIN_PRODUCTS", 50):
+            brand, category = catalog.ensure_catalog()
+        self.assertIsNotNone(brand)
+        self.assertIsNotNone(category)
+        self.assertEqual(Product.objects.count(), 50)
+        self.assertFalse(Order.objects.exists())
+
+    def test_fixtures_are_rolled_back(self):
+        """Test benchmark fixtures do not persist"""
+        call_command(
+            "bench", "serializers.user_render", "--warmup=0", "--min-time=0.001", "--repeat=1", stdout=StringIO()
+        )
+        self.assertFalse(get_user_model().objects.filter(email="bench@example.com").exists())
@@ -0,0 +1,13 @@
+"""
+Fixtures shared by every test
+"""
+
+import pytest
+
+from core import throttling
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Start each test with full rate limit buckets, as the whole suite shares one client address"""
+    throttling.reset()
@@ -2,11 +2,22 @@
 Django admin customisation
 """
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.options import IS_POPUP_VAR
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.exceptions import PermissionDenied
+from django.db.models.functions import Now
+from django.http import HttpResponse, HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
 from core import models
+from core.profiling import TOKEN_MAX_AGE, make_token
+from orders.rollups import by_category, totals
+from products.importer import start_import
+from users.deletion import request_deletion, resume_deletion
 
 
 class UserAdmin(BaseUserAdmin):
@@ -48,7 +59,361 @@ class UserAdmin(BaseUserAdmin):
             },
         ),
     )
+    actions = ["delete_accounts"]
+
+    @admin.action(description=_("Delete selected accounts in the background"), permissions=["delete"])
+    def delete_accounts(self, request, queryset):
+        deletions = request_deletion(queryset.values_list("pk", flat=True), requested_by=request.user)
+        messages.info(request, f"Deactivated and queued the deletion of {len(deletions)} account(s)")
+
+    # Deleting from the admin goes through the workers too, a cascade in the request would hold its locks
+    # for as long as it takes and is refused for users with orders
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+    def get_deleted_objects(self, objs, request):
+        # Nothing is protected, accounts with orders are anonymised rather than deleted
+        return [str(obj) for obj in objs], {self.opts.verbose_name_plural: len(objs)}, set(), []
+
+    def delete_model(self, request, obj):
+        request_deletion([obj.pk], requested_by=request.user)
+
+    def delete_queryset(self, request, queryset):
+        request_deletion(queryset.values_list("pk", flat=True), requested_by=request.user)
+
+    def response_delete(self, request, obj_display, obj_id):
+        if IS_POPUP_VAR in request.POST:
+            return super().response_delete(request, obj_display, obj_id)
+        messages.info(request, f"Deactivated {obj_display} and queued the deletion of the account")
+        return HttpResponseRedirect(reverse("admin:core_user_changelist"))
+
+
+class AccountDeletionAdmin(admin.ModelAdmin):
+    """Follow the account deletions run by the workers, and resume the failed ones"""
+
+    list_display = ["id", "user_pk", "status", "step", "rows_deleted", "anonymized", "created_at", "finished_at"]
+    list_filter = ["status", "anonymized"]
+    search_fields = ["=user_pk"]
+    readonly_fields = [
+        "user_pk",
+        "status",
+        "step",
+        "rows_deleted",
+        "anonymized",
+        "error",
+        "requested_by",
+        "created_at",
+        "started_at",
+        "finished_at",
+    ]
+    actions = ["resume_deletions"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description=_("Resume selected failed deletions"))
+    def resume_deletions(self, request, queryset):
+        deletions = list(queryset.filter(status=models.AccountDeletion.Status.FAILED))
+        for deletion in deletions:
+            resume_deletion(deletion)
+        messages.info(request, f"Resuming {len(deletions)} deletion(s)")
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    """Browse and download on-demand request profiles"""
+
+    list_display = ["created_at", "method", "path", "status_code", "duration_ms", "query_count", "user"]
+    list_filter = ["method", "status_code"]
+    search_fields = ["path"]
+    exclude = ["pstats", "speedscope"]
+    readonly_fields = [
+        "user",
+        "method",
+        "path",
+        "status_code",
+        "duration_ms",
+        "query_count",
+        "query_time_ms",
+        "queries",
+        "downloads",
+        "created_at",
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path(
+                "<int:pk>/pstats/",
+                self.admin_site.admin_view(self.download_pstats),
+                name="core_requestprofile_pstats",
+            ),
+            path(
+                "<int:pk>/speedscope/",
+                self.admin_site.admin_view(self.download_speedscope),
+                name="core_requestprofile_speedscope",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def changelist_view(self, request, extra_context=None):
+        """Show the staff member a token for profiling their own requests"""
+        messages.info(
+            request,
+            f"Profile a request by sending the header X-Profile: {make_token(request.user)} "
+            f"(valid for {TOKEN_MAX_AGE // 60} minutes)",
+        )
+        return super().changelist_view(request, extra_context)
+
+    @admin.display(description=_("Downloads"))
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">pstats</a> | <a href="{}">speedscope</a>',
+            reverse("admin:core_requestprofile_pstats", args=[obj.pk]),
+            reverse("admin:core_requestprofile_speedscope", args=[obj.pk]),
+        )
+
+    def download_pstats(self, request, pk):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        profile = get_object_or_404(models.RequestProfile, pk=pk)
+        response = HttpResponse(bytes(profile.pstats), content_type="application/octet-stream")
+        response["Content-Disposition"] = f'attachment; filename="profile-{pk}.prof"'
+        return response
+
+    def download_speedscope(self, request, pk):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        profile = get_object_or_404(models.RequestProfile, pk=pk)
+        response = HttpResponse(bytes(profile.speedscope), content_type="application/json")
+        response["Content-Disposition"] = f'attachment; filename="profile-{pk}.speedscope.json"'
+        return response
+
+
+class BrandAdmin(admin.ModelAdmin):
+    """Define the admin pages for Brands"""
+
+    list_display = ["id", "name", "slug"]
+    search_fields = ["name"]
+    prepopulated_fields = {"slug": ("name",)}
+
+
+class CategoryAdmin(admin.ModelAdmin):
+    """Define the admin pages for Categories"""
+
+    list_display = ["id", "name", "slug", "parent", "depth"]
+    list_select_related = ["parent"]
+    readonly_fields = ["path", "depth"]
+    search_fields = ["name"]
+    prepopulated_fields = {"slug": ("name",)}
+    autocomplete_fields = ["parent"]
+
+
+class ProductAdmin(admin.ModelAdmin):
+    """Define the admin pages for Products"""
+
+    ordering = ["-id"]
+    list_display = ["id", "sku", "name", "price", "brand", "category", "is_active"]
+    list_select_related = ["brand", "category"]
+    search_fields = ["sku"]
+    autocomplete_fields = ["brand", "category"]
+    # Counting millions of rows on every changelist page is slow
+    show_full_result_count = False
+
+
+class PromotionAdmin(admin.ModelAdmin):
+    """Define the admin pages for Promotions, which reprice baskets as soon as they are saved"""
+
+    ordering = ["-id"]
+    list_display = ["id", "name", "kind", "product", "brand", "category", "starts_at", "ends_at", "is_active"]
+    list_filter = ["kind", "is_active"]
+    list_select_related = ["product", "brand", "category"]
+    search_fields = ["name"]
+    autocomplete_fields = ["product", "brand", "category"]
+    fieldsets = [
+        (None, {"fields": ["name", "kind", "percent", "buy_quantity", "free_quantity", "is_active"]}),
+        (_("Applies to one of"), {"fields": ["product", "brand", "category"]}),
+        (_("Runs"), {"fields": ["starts_at", "ends_at"]}),
+    ]
+
+
+class ImportJobAdmin(admin.ModelAdmin):
+    """Upload product feeds and follow their import"""
+
+    list_display = ["id", "file", "format", "status", "rows_processed", "rows_imported", "rows_failed", "created_at"]
+    list_filter = ["status", "format"]
+    fields = [
+        "file",
+        "format",
+        "chunk_size",
+        "status",
+        "rows_processed",
+        "rows_imported",
+        "rows_failed",
+        "error",
+        "errors",
+        "created_by",
+        "created_at",
+        "started_at",
+        "finished_at",
+    ]
+    actions = ["resume_imports"]
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return [field for field in self.fields if field not in ("file", "format", "chunk_size")]
+        return self.fields
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+        if not change:
+            start_import(obj)
+            messages.info(request, f"{obj} started, refresh this page to follow its progress")
+
+    @admin.action(description=_("Resume selected failed imports"))
+    def resume_imports(self, request, queryset):
+        jobs = list(queryset.filter(status=models.ImportJob.Status.FAILED))
+        for job in jobs:
+            start_import(job)
+        messages.info(request, f"Resuming {len(jobs)} import(s)")
+
+
+class StockAdmin(admin.ModelAdmin):
+    """Define the admin pages for Stock, sharding is changed through inventory.reservations.set_shards"""
+
+    list_display = ["product", "available", "shards"]
+    list_select_related = ["product"]
+    readonly_fields = ["shards"]
+    search_fields = ["product__sku"]
+    autocomplete_fields = ["product"]
+
+
+class ReservationAdmin(admin.ModelAdmin):
+    """Define the admin pages for Reservations"""
+
+    ordering = ["-id"]
+    list_display = ["id", "product", "quantity", "shard", "created_at", "expires_at"]
+    list_select_related = ["product"]
+    readonly_fields = ["product", "shard", "quantity", "created_at", "expires_at"]
+
+
+class OrderItemInline(admin.TabularInline):
+    model = models.OrderItem
+    extra = 0
+    can_delete = False
+    fields = ["product", "quantity", "unit_price", "discount"]
+    readonly_fields = fields
+
+
+class OrderAdmin(admin.ModelAdmin):
+    """Define the admin pages for Orders, which are placed through checkout only"""
+
+    ordering = ["-id"]
+    list_display = ["id", "user", "status", "total", "created_at"]
+    list_filter = ["status"]
+    list_select_related = ["user"]
+    search_fields = ["user__email"]
+    readonly_fields = ["user", "total", "created_at", "updated_at"]
+    inlines = [OrderItemInline]
+
+    def has_add_permission(self, request):
+        return False
+
+
+class TaskAdmin(admin.ModelAdmin):
+    """Define the admin pages for background Tasks, mostly to inspect and retry failed ones"""
+
+    ordering = ["-id"]
+    list_display = ["id", "name", "status", "priority", "attempts", "run_at", "locked_by"]
+    list_filter = ["status", "name"]
+    readonly_fields = ["name", "args", "kwargs", "attempts", "last_error", "locked_by", "locked_at", "created_at"]
+    actions = ["retry_tasks"]
+
+    @admin.action(description=_("Retry selected failed tasks"))
+    def retry_tasks(self, request, queryset):
+        retried = queryset.filter(status=models.Task.Status.FAILED).update(
+            status=models.Task.Status.QUEUED, attempts=0, run_at=Now()
+        )
+        messages.info(request, f"Queued {retried} task(s) again")
+
+
+class PaymentEventAdmin(admin.ModelAdmin):
+    """Define the admin pages for received payment events, to find the ones that could not be applied"""
+
+    ordering = ["-id"]
+    list_display = ["event_id", "event_type", "payment_intent", "created", "processed_at", "error"]
+    list_filter = ["event_type"]
+    search_fields = ["event_id", "payment_intent"]
+    readonly_fields = ["event_id", "event_type", "payment_intent", "payload", "created", "received_at", "processed_at"]
+
+    def has_add_permission(self, request):
+        return False
+
+
+class SalesAdmin(admin.ModelAdmin):
+    """
+    Read-only sales reports over the rollup tables, so they cost the same however many orders there are.
+    The changelist's filters select the period and category; the totals show above the rows.
+    """
+
+    change_list_template = "admin/core/sales_change_list.html"
+    list_filter = ["category"]
+    list_select_related = ["product", "category"]
+    search_fields = ["product__name", "product__sku"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        # The totals follow the filtered changelist, only known once it is built, and render with it
+        changelist = getattr(response, "context_data", {}).get("cl")
+        if changelist is not None:
+            queryset = changelist.queryset.order_by()
+            response.context_data.update(summary=totals(queryset), categories=list(by_category(queryset)[:5]))
+        return response
+
+
+class HourlySalesAdmin(SalesAdmin):
+    ordering = ["-hour", "-revenue"]
+    list_display = ["hour", "product", "category", "orders", "units", "revenue"]
+    date_hierarchy = "hour"
+
+
+class DailySalesAdmin(SalesAdmin):
+    ordering = ["-day", "-revenue"]
+    list_display = ["day", "product", "category", "orders", "units", "revenue"]
+    date_hierarchy = "day"
 
 
 admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Profile)
+admin.site.register(models.AccountDeletion, AccountDeletionAdmin)
+admin.site.register(models.RequestProfile, RequestProfileAdmin)
+admin.site.register(models.Brand, BrandAdmin)
+admin.site.register(models.Category, CategoryAdmin)
+admin.site.register(models.Product, ProductAdmin)
+admin.site.register(models.Promotion, PromotionAdmin)
+admin.site.register(models.ImportJob, ImportJobAdmin)
+admin.site.register(models.Stock, StockAdmin)
+admin.site.register(models.Reservation, ReservationAdmin)
+admin.site.register(models.Order, OrderAdmin)
+admin.site.register(models.Task, TaskAdmin)
+admin.site.register(models.PaymentEvent, PaymentEventAdmin)
+admin.site.register(models.HourlySales, HourlySalesAdmin)
+admin.site.register(models.DailySales, DailySalesAdmin)
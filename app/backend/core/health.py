@@ -0,0 +1,65 @@
+"""
+Dependency probes for the readiness endpoint
+"""
+
+import logging
+import threading
+import time
+
+from django.db import connections
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+PROBE_TTL = 1.0
+
+
+class CachedProbe:
+    """
+    Run a dependency check at most once per `ttl` seconds in this process.
+    Concurrent callers share the cached result instead of re-checking.
+    """
+
+    def __init__(self, name, check, ttl=PROBE_TTL):
+        self.name = name
+        self.check = check
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._expires_at = 0.0
+        self._healthy = False
+
+    def __call__(self):
+        if time.monotonic() < self._expires_at:
+            return self._healthy
+        with self._lock:
+            if time.monotonic() >= self._expires_at:
+                self._healthy = self._run()
+                self._expires_at = time.monotonic() + self.ttl
+        return self._healthy
+
+    def _run(self):
+        try:
+            self.check()
+        except Exception:
+            logger.warning("Readiness probe %s failed", self.name, exc_info=True)
+            return False
+        return True
+
+    def reset(self):
+        """Forget the cached result so the next call checks again"""
+        self._expires_at = 0.0
+
+
+def check_database():
+    """Run a trivial query on the default database"""
+    with connections["default"].cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+def check_redis():
+    """Ping the Redis server behind the default cache"""
+    get_redis_connection("default").ping()
+
+
+database_probe = CachedProbe("database", check_database)
+redis_probe = CachedProbe("redis", check_redis)
@@ -0,0 +1,87 @@
+"""
+Idempotency keys
+
+A client retrying a POST sends the same Idempotency-Key header. The first
+request claims the key in Redis, and once it succeeds its response is stored
+under the key, so retries get that response back without running the view
+again. A request that fails releases the key, so a retry runs the view again.
+A retry arriving while the first request is still running is turned away,
+and a key reused for a different request body is refused.
+
+The claim only lasts CLAIM_TTL, longer than any request takes, so a key whose
+request died with its worker can be used again shortly after rather than being
+refused until it expires. The stored response is kept for KEY_TTL.
+"""
+
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django_redis import get_redis_connection
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = "Idempotency-Key"
+KEY_TTL = getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60)
+# Longer than a request may run, the workers' timeout
+CLAIM_TTL = getattr(settings, "IDEMPOTENCY_CLAIM_TTL", 60)
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _error(status_code, detail):
+    return Response({"detail": detail}, status=status_code)
+
+
+def idempotent(method):
+    """
+    Make a view method replay its stored response for a repeated Idempotency-Key.
+    Keys are scoped to the user and the path, and only successful responses are stored, failures can be retried.
+    """
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return method(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return _error(status.HTTP_400_BAD_REQUEST, f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters")
+
+        redis = get_redis_connection("default")
+        digest = hashlib.sha256(f"{request.user.pk}:{request.path}:{key}".encode()).hexdigest()
+        redis_key = f"idempotency:{digest}"
+        fingerprint = _fingerprint(request)
+
+        claim = json.dumps({"fingerprint": fingerprint, "status": None})
+        if not redis.set(redis_key, claim, nx=True, ex=CLAIM_TTL):
+            stored = redis.get(redis_key)
+            if stored is None:
+                # Expired between the two calls, the retry is told to try again rather than run twice
+                return _error(status.HTTP_409_CONFLICT, f"A request with this {HEADER} is in progress")
+            stored = json.loads(stored)
+            if stored["fingerprint"] != fingerprint:
+                return _error(status.HTTP_422_UNPROCESSABLE_ENTITY, f"This {HEADER} was used with a different request")
+            if stored["status"] is None:
+                return _error(status.HTTP_409_CONFLICT, f"A request with this {HEADER} is in progress")
+            return Response(stored["data"], status=stored["status"], headers={"Idempotent-Replayed": "true"})
+
+        try:
+            response = method(self, request, *args, **kwargs)
+        except Exception:
+            redis.delete(redis_key)
+            raise
+        # Only successes are replayed, a refusal such as running out of stock may go the other way on a retry
+        if not status.is_success(response.status_code):
+            redis.delete(redis_key)
+        else:
+            result = {"fingerprint": fingerprint, "status": response.status_code, "data": response.data}
+            redis.set(redis_key, json.dumps(result, cls=DjangoJSONEncoder), ex=KEY_TTL)
+        return response
+
+    return wrapper
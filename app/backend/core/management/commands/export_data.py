@@ -0,0 +1,42 @@
+"""
+Django command to export users or orders
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand
+
+from core.exports import CHUNK_SIZE, EXPORTS, FORMATS, stream
+
+
+class Command(BaseCommand):
+    """
+    Stream every row of an export to a file or standard output, as CSV or JSON Lines,
+    in constant memory whatever the number of rows
+    """
+
+    help = "Export users or orders as CSV or JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("export", choices=sorted(EXPORTS), help="What to export")
+        parser.add_argument("--format", choices=sorted(FORMATS), default="csv", help="Output format")
+        parser.add_argument("--gzip", action="store_true", help="Compress the output with gzip")
+        parser.add_argument("--output", "-o", default="-", help="File to write, - for standard output")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows fetched from Postgres at a time")
+
+    def handle(self, *args, **options):
+        blocks = stream(options["export"], options["format"], options["gzip"], options["chunk_size"])
+        if options["output"] == "-":
+            self.write(blocks, sys.stdout.buffer)
+            return
+        with open(options["output"], "wb") as output:
+            written = self.write(blocks, output)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written:,} bytes to {options['output']}"))
+
+    @staticmethod
+    def write(blocks, output):
+        written = 0
+        for block in blocks:
+            written += output.write(block)
+        output.flush()
+        return written
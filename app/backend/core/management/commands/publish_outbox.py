@@ -0,0 +1,35 @@
+"""
+Django command to publish outbox events
+"""
+
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.outbox import BATCH_SIZE, Publisher
+
+
+class Command(BaseCommand):
+    """
+    Drain the outbox to its sink until stopped. Several can run for availability,
+    only the one holding the publisher lock publishes.
+    """
+
+    help = "Publish outbox events"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Events published at a time")
+        parser.add_argument("--once", action="store_true", help="Publish what is waiting and exit")
+
+    def handle(self, *args, **options):
+        publisher = Publisher(batch_size=options["batch_size"])
+        if options["once"]:
+            published = publisher.drain()
+            if published is None:
+                raise CommandError("Another publisher is running")
+            self.stdout.write(self.style.SUCCESS(f"Published {published:,} events"))
+            return
+
+        signal.signal(signal.SIGTERM, publisher.stop)
+        signal.signal(signal.SIGINT, publisher.stop)
+        publisher.run()
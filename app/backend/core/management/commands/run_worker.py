@@ -0,0 +1,59 @@
+"""
+Django command to run background task workers
+"""
+
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.tasks import BATCH_SIZE, Worker
+
+
+def run_worker(batch_size):
+    """Run a worker until it is sent SIGTERM or SIGINT, finishing its current batch first"""
+    worker = Worker(batch_size=batch_size)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+class Command(BaseCommand):
+    """
+    Run workers claiming tasks from the Postgres queue. Any number of these
+    commands can run at once, on one host or many, without blocking each other.
+    """
+
+    help = "Run background task workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1, help="Worker processes to run")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Tasks claimed at a time per process")
+
+    def handle(self, *args, **options):
+        if options["processes"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--processes and --batch-size must be at least 1")
+        if options["processes"] == 1:
+            run_worker(options["batch_size"])
+            return
+
+        # Forked children must open their own database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=run_worker, args=(options["batch_size"],), daemon=False)
+            for _ in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+
+        def forward(signum, frame):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        for process in processes:
+            process.join()
+        self.stdout.write(self.style.SUCCESS(f"Stopped {len(processes)} workers"))
@@ -0,0 +1,71 @@
+"""
+Django command to seed the database with synthetic data
+"""
+
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from core.seeding import TABLES, Seeder, SeedPlan
+
+DEFAULT_ORDERS = 100_000
+
+
+class Command(BaseCommand):
+    """Stream deterministic users, profiles, catalog rows and orders into Postgres with COPY"""
+
+    help = "Seed users, profiles, brands, categories, products and orders in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Seed for the generated data")
+        parser.add_argument("--users", type=int, default=10_000, help="Users to seed, each with a profile")
+        parser.add_argument("--brands", type=int, default=500, help="Brands to seed")
+        parser.add_argument("--categories", type=int, default=200, help="Categories to seed")
+        parser.add_argument("--products", type=int, default=100_000, help="Products to seed")
+        parser.add_argument(
+            "--orders",
+            type=int,
+            help="Orders to seed with their items, by default 100,000 or none when no users or products are seeded",
+        )
+        parser.add_argument("--password", default="password123", help="Password of every seeded user")
+        parser.add_argument("--workers", type=int, default=4, help="Processes streaming chunks in parallel")
+        parser.add_argument("--chunk-size", type=int, default=50_000, help="Rows per COPY")
+        parser.add_argument(
+            "--keep-indexes",
+            action="store_true",
+            help="Maintain indexes while loading instead of rebuilding them afterwards",
+        )
+
+    def handle(self, *args, **options):
+        if options["orders"] is None:
+            options["orders"] = DEFAULT_ORDERS if options["users"] and options["products"] else 0
+        counts = {name: options[name] for name in TABLES if name not in ("profiles", "order_items")}
+        counts["profiles"] = counts["users"]
+        counts["order_items"] = counts["orders"]
+        plan = SeedPlan(counts, seed=options["seed"], password=options["password"], chunk_size=options["chunk_size"])
+        seeder = Seeder(
+            plan,
+            workers=options["workers"],
+            defer_indexes=not options["keep_indexes"],
+            # Orders have a varying number of items, so there is no total to count those towards
+            on_progress=lambda name, rows: self.stdout.write(
+                f"{name}: {rows:,}" if name == "order_items" else f"{name}: {rows:,} / {counts[name]:,}"
+            ),
+        )
+
+        started = time.perf_counter()
+        try:
+            written = seeder.run()
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        elapsed = time.perf_counter() - started
+
+        # Cached category trees and search results no longer match the catalog
+        cache.delete_pattern("catalog:*")
+
+        total = sum(written.values())
+        summary = ", ".join(f"{rows:,} {name}" for name, rows in written.items())
+        self.stdout.write(
+            self.style.SUCCESS(f"Seeded {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s): {summary}")
+        )
@@ -0,0 +1,48 @@
+"""
+Django command to wait for the database to be available
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import OperationalError
+from psycopg import OperationalError as PsycopgError
+
+
+class Command(BaseCommand):
+    """Block until the database accepts connections, backing off between attempts"""
+
+    help = "Wait for the database to accept connections"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias to wait for")
+        parser.add_argument("--timeout", type=float, default=60.0, help="Give up after this many seconds")
+        parser.add_argument("--initial-delay", type=float, default=0.25, help="First retry delay in seconds")
+        parser.add_argument("--max-delay", type=float, default=5.0, help="Upper bound for the retry delay")
+
+    def check(self, *args, databases=None, **kwargs):
+        """Run the database system checks and open a real connection to each database"""
+        super().check(*args, databases=databases, **kwargs)
+        for alias in databases or []:
+            connections[alias].ensure_connection()
+
+    def handle(self, *args, **options):
+        database = options["database"]
+        delay = options["initial_delay"]
+        deadline = time.monotonic() + options["timeout"]
+
+        self.stdout.write("Waiting for database...")
+        while True:
+            try:
+                self.check(databases=[database])
+                break
+            except (OperationalError, PsycopgError) as exc:
+                if time.monotonic() + delay > deadline:
+                    raise CommandError(f"Database '{database}' unavailable after {options['timeout']}s") from exc
+                self.stdout.write(f"Database unavailable, retrying in {delay:.2f}s...")
+                time.sleep(delay)
+                delay = min(delay * 2, options["max_delay"])
+
+        self.stdout.write(self.style.SUCCESS("Database available!"))
@@ -0,0 +1,22 @@
+"""
+Django command to warm caches and connections before serving traffic
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.warmup import warm_up
+
+
+class Command(BaseCommand):
+    """Import URLconfs and serializers, prime the database and Redis and preload hot cache keys"""
+
+    help = "Warm imports, connections, the OpenAPI schema and hot cache keys"
+
+    def handle(self, *args, **options):
+        timings = warm_up()
+        for step, seconds in timings.items():
+            if seconds is None:
+                self.stdout.write(self.style.WARNING(f"{step:<24}   failed"))
+            else:
+                self.stdout.write(f"{step:<24} {seconds * 1000:8.1f} ms")
+        self.stdout.write(self.style.SUCCESS("Warm-up complete"))
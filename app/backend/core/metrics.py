@@ -0,0 +1,266 @@
+"""
+Per-view performance metrics
+
+Each process records into pre-bucketed counters and periodically flushes the
+deltas to a Redis hash, so /metrics reports totals aggregated across workers.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from django_redis.client import DefaultClient
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = "metrics:http"
+FLUSH_INTERVAL = getattr(settings, "METRICS_FLUSH_INTERVAL", 5.0)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+
+_MISSING = object()
+
+
+class RequestStats(threading.local):
+    """Database and cache activity of the request running on this thread"""
+
+    active = False
+    wrapped = False
+    queries = 0
+    query_time = 0.0
+    cache_hits = 0
+    cache_misses = 0
+
+    def start(self):
+        self.active = True
+        self.queries = 0
+        self.query_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+request_stats = RequestStats()
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper counting queries and their duration"""
+    if not request_stats.active:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        request_stats.queries += 1
+        request_stats.query_time += time.perf_counter() - started
+
+
+class InstrumentedRedisClient(DefaultClient):
+    """django-redis client counting cache hits and misses for the current request"""
+
+    def get(self, key, default=None, version=None, client=None):
+        value = super().get(key, default=_MISSING, version=version, client=client)
+        if value is _MISSING:
+            request_stats.cache_misses += 1
+            return default
+        request_stats.cache_hits += 1
+        return value
+
+    def get_many(self, keys, version=None, client=None):
+        keys = list(keys)
+        found = super().get_many(keys, version=version, client=client)
+        request_stats.cache_hits += len(found)
+        request_stats.cache_misses += len(keys) - len(found)
+        return found
+
+
+class ViewMetrics:
+    """Counters for a single view, reused by every request until the next flush"""
+
+    __slots__ = (
+        "requests",
+        "latency",
+        "latency_sum",
+        "size",
+        "size_sum",
+        "db_queries",
+        "db_time",
+        "cache_hits",
+        "cache_misses",
+    )
+
+    def __init__(self):
+        self.requests = [0] * len(STATUS_CLASSES)
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.size = [0] * (len(SIZE_BUCKETS) + 1)
+        self.size_sum = 0
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def fields(self, view):
+        """Yield (redis field, delta) pairs for the counters of this view"""
+        for index, count in enumerate(self.requests):
+            if count:
+                yield f"requests|{view}|{STATUS_CLASSES[index]}", count
+        for index, count in enumerate(self.latency):
+            if count:
+                yield f"latency|{view}|{index}", count
+        for index, count in enumerate(self.size):
+            if count:
+                yield f"size|{view}|{index}", count
+        yield f"latency_sum|{view}", self.latency_sum
+        yield f"size_sum|{view}", self.size_sum
+        yield f"db_queries|{view}", self.db_queries
+        yield f"db_time|{view}", self.db_time
+        yield f"cache_hits|{view}", self.cache_hits
+        yield f"cache_misses|{view}", self.cache_misses
+
+
+class MetricsRegistry:
+    """Process-local metrics, flushed to Redis every FLUSH_INTERVAL seconds"""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._views = {}
+        self._lock = threading.Lock()
+        self._next_flush = time.monotonic() + flush_interval
+
+    def record(self, view, status_code, duration, size, stats):
+        """Record a finished request"""
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = ViewMetrics()
+            metrics.requests[min(max(status_code // 100, 1), 5) - 1] += 1
+            metrics.latency[bisect_left(LATENCY_BUCKETS, duration)] += 1
+            metrics.latency_sum += duration
+            metrics.size[bisect_left(SIZE_BUCKETS, size)] += 1
+            metrics.size_sum += size
+            metrics.db_queries += stats.queries
+            metrics.db_time += stats.query_time
+            metrics.cache_hits += stats.cache_hits
+            metrics.cache_misses += stats.cache_misses
+        if time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def flush(self):
+        """Push the accumulated deltas to Redis and start counting from zero"""
+        with self._lock:
+            views, self._views = self._views, {}
+            self._next_flush = time.monotonic() + self.flush_interval
+        if not views:
+            return
+        try:
+            pipe = get_redis_connection("default").pipeline(transaction=False)
+            for view, metrics in views.items():
+                for field, delta in metrics.fields(view):
+                    if not delta:
+                        continue
+                    if isinstance(delta, float):
+                        pipe.hincrbyfloat(REDIS_KEY, field, delta)
+                    else:
+                        pipe.hincrby(REDIS_KEY, field, delta)
+            pipe.execute()
+        except Exception:
+            logger.warning("Could not flush metrics to Redis", exc_info=True)
+            self._restore(views)
+
+    def _restore(self, views):
+        """Merge unflushed deltas back so they are sent with the next flush"""
+        with self._lock:
+            for view, old in views.items():
+                current = self._views.get(view)
+                if current is None:
+                    self._views[view] = old
+                    continue
+                for name in ("requests", "latency", "size"):
+                    merged = [a + b for a, b in zip(getattr(current, name), getattr(old, name), strict=True)]
+                    setattr(current, name, merged)
+                for name in ("latency_sum", "size_sum", "db_queries", "db_time", "cache_hits", "cache_misses"):
+                    setattr(current, name, getattr(current, name) + getattr(old, name))
+
+    def reset(self):
+        """Drop local and aggregated metrics"""
+        with self._lock:
+            self._views = {}
+        get_redis_connection("default").delete(REDIS_KEY)
+
+
+registry = MetricsRegistry()
+
+
+def _number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def _histogram(lines, name, view, counts, total, bounds):
+    cumulative = 0
+    for index, bound in enumerate(bounds):
+        cumulative += counts.get(index, 0)
+        lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+    cumulative += counts.get(len(bounds), 0)
+    lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {cumulative}')
+    lines.append(f'{name}_sum{{view="{view}"}} {_number(total)}')
+    lines.append(f'{name}_count{{view="{view}"}} {cumulative}')
+
+
+def render_metrics():
+    """Render the aggregated metrics of every worker in Prometheus text format"""
+    registry.flush()
+    raw = get_redis_connection("default").hgetall(REDIS_KEY)
+
+    views = {}
+    for field, value in raw.items():
+        kind, view, *label = field.decode().split("|")
+        series = views.setdefault(view, {"requests": {}, "latency": {}, "size": {}})
+        if label:
+            key = label[0] if kind == "requests" else int(label[0])
+            series[kind][key] = int(float(value))
+        else:
+            series[kind] = float(value)
+
+    lines = []
+
+    def metric(name, kind, help_text):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    metric("http_requests_total", "counter", "Requests handled, by view and status class")
+    for view, series in sorted(views.items()):
+        for status_class, count in sorted(series["requests"].items()):
+            lines.append(f'http_requests_total{{view="{view}",status="{status_class}"}} {count}')
+
+    metric("http_request_duration_seconds", "histogram", "Request latency, by view")
+    for view, series in sorted(views.items()):
+        _histogram(
+            lines,
+            "http_request_duration_seconds",
+            view,
+            series["latency"],
+            series.get("latency_sum", 0),
+            LATENCY_BUCKETS,
+        )
+
+    metric("http_response_size_bytes", "histogram", "Response body size, by view")
+    for view, series in sorted(views.items()):
+        _histogram(lines, "http_response_size_bytes", view, series["size"], series.get("size_sum", 0), SIZE_BUCKETS)
+
+    for field, name, help_text in (
+        ("db_queries", "db_queries_total", "Database queries executed, by view"),
+        ("db_time", "db_query_duration_seconds_total", "Time spent in database queries, by view"),
+        ("cache_hits", "cache_hits_total", "Cache lookups that found a value, by view"),
+        ("cache_misses", "cache_misses_total", "Cache lookups that found nothing, by view"),
+    ):
+        metric(name, "counter", help_text)
+        for view, series in sorted(views.items()):
+            lines.append(f'{name}{{view="{view}"}} {_number(series.get(field, 0))}')
+
+    return "\n".join(lines) + "\n"
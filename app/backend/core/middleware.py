@@ -0,0 +1,87 @@
+"""
+Core Middleware
+"""
+
+import time
+
+from django.db import connections
+
+from core.metrics import registry, request_stats, time_query
+from core.profiling import profile_request, staff_user_for_token
+from core.throttling import headers as rate_limit_headers
+
+EXCLUDED_VIEWS = frozenset({"metrics", "healthz", "readyz"})
+
+
+class MetricsMiddleware:
+    """
+    Record latency, response size, database and cache activity for every view.
+    Must be first in MIDDLEWARE so the timings cover the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request_stats.wrapped:
+            for connection in connections.all():
+                connection.execute_wrappers.append(time_query)
+            request_stats.wrapped = True
+
+        request_stats.start()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - started
+        request_stats.active = False
+
+        match = request.resolver_match
+        view = match.url_name if match is not None and match.url_name else "unmatched"
+        if view not in EXCLUDED_VIEWS:
+            registry.record(view, response.status_code, duration, _response_size(response), request_stats)
+        return response
+
+
+def _response_size(response):
+    """Body size in bytes, read from Content-Length where CommonMiddleware has set it"""
+    if response.streaming:
+        return 0
+    length = response.headers.get("Content-Length")
+    return int(length) if length is not None else len(response.content)
+
+
+class ProfilingMiddleware:
+    """
+    Profile a single request when a staff member sends a signed profiling token
+    in the X-Profile header or the _profile query parameter
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request.META.get("HTTP_X_PROFILE")
+        if token is None and "_profile=" in request.META.get("QUERY_STRING", ""):
+            token = request.GET.get("_profile")
+        if not token:
+            return self.get_response(request)
+
+        user = staff_user_for_token(token)
+        if user is None:
+            return self.get_response(request)
+        return profile_request(request, self.get_response, user)
+
+
+class RateLimitMiddleware:
+    """Report the rate limit the throttle applied to a request in the headers of its response"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        rate_limit = getattr(request, "rate_limit", None)
+        # A response a CDN may cache would hand one client's limits to everyone
+        if rate_limit is not None and not response.has_header("Surrogate-Key"):
+            for header, value in rate_limit_headers(rate_limit).items():
+                response.headers.setdefault(header, value)
+        return response
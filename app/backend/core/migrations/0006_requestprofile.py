@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0005_remove_profile_address_remove_profile_date_of_birth_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestProfile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("method", models.CharField(max_length=10)),
+                ("path", models.CharField(max_length=2048)),
+                ("status_code", models.PositiveSmallIntegerField()),
+                ("duration_ms", models.FloatField()),
+                ("query_count", models.PositiveIntegerField()),
+                ("query_time_ms", models.FloatField()),
+                ("queries", models.JSONField(default=list)),
+                ("pstats", models.BinaryField()),
+                ("speedscope", models.BinaryField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0007_catalog"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="path",
+            field=models.CharField(default="", editable=False, max_length=255),
+        ),
+        migrations.RunSQL(
+            sql="""
+            WITH RECURSIVE tree (id, path, depth) AS (
+                SELECT id, id || '/', 0 FROM core_category WHERE parent_id IS NULL
+                UNION ALL
+                SELECT child.id, tree.path || child.id || '/', tree.depth + 1
+                FROM core_category AS child JOIN tree ON child.parent_id = tree.id
+            )
+            UPDATE core_category SET path = tree.path, depth = tree.depth
+            FROM tree WHERE core_category.id = tree.id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                fields=["path"],
+                name="category_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+    ]
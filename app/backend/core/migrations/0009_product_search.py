@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:49
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0008_category_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="brand_name",
+            field=models.CharField(default="", editable=False, max_length=255),
+        ),
+        migrations.RunSQL(
+            sql="""
+            UPDATE core_product SET brand_name = core_brand.name
+            FROM core_brand WHERE core_brand.id = core_product.brand_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.contrib.postgres.search.CombinedSearchVector(
+                    django.contrib.postgres.search.CombinedSearchVector(
+                        django.contrib.postgres.search.SearchVector(
+                            "name", config="english", weight="A"
+                        ),
+                        "||",
+                        django.contrib.postgres.search.SearchVector(
+                            "brand_name", config="english", weight="B"
+                        ),
+                        django.contrib.postgres.search.SearchConfig("english"),
+                    ),
+                    "||",
+                    django.contrib.postgres.search.SearchVector(
+                        "description", config="english", weight="C"
+                    ),
+                    django.contrib.postgres.search.SearchConfig("english"),
+                ),
+                output_field=django.contrib.postgres.search.SearchVectorField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="product_search_idx"
+            ),
+        ),
+    ]
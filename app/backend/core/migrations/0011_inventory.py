@@ -0,0 +1,93 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0010_importjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Stock",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stock",
+                        serialize=False,
+                        to="core.product",
+                    ),
+                ),
+                ("available", models.PositiveIntegerField(default=0)),
+                ("shards", models.PositiveSmallIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Reservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shard", models.PositiveSmallIntegerField(blank=True, null=True)),
+                ("quantity", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("expires_at", models.DateTimeField()),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="core.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["expires_at"], name="reservation_expires_idx")
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="StockShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shard", models.PositiveSmallIntegerField()),
+                ("available", models.PositiveIntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_shards",
+                        to="core.product",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "shard"), name="stock_shard_unique"
+                    )
+                ],
+            },
+        ),
+    ]
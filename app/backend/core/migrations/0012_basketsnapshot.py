@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0011_inventory"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BasketSnapshot",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="basket_snapshot",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("items", models.JSONField(default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
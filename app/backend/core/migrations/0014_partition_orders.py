@@ -0,0 +1,132 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Rebuilds the order tables as tables partitioned by month of created_at, copying any rows.
+# A partitioned table's primary key must include the partition key and PostgreSQL 16 has no
+# identity columns on partitioned tables, so ids come from a sequence owned by the column.
+PARTITION_SQL = """
+CREATE TABLE core_order_partitioned (
+    id bigint NOT NULL,
+    status varchar(20) NOT NULL,
+    total numeric(12, 2) NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    updated_at timestamp with time zone NOT NULL,
+    user_id bigint NOT NULL,
+    CONSTRAINT core_order_id_created_at_pk PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE core_orderitem_partitioned (
+    id bigint NOT NULL,
+    quantity integer NOT NULL CHECK (quantity >= 0),
+    unit_price numeric(10, 2) NOT NULL,
+    order_id bigint NOT NULL,
+    product_id bigint NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    CONSTRAINT core_orderitem_id_created_at_pk PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE core_order_default PARTITION OF core_order_partitioned DEFAULT;
+CREATE TABLE core_orderitem_default PARTITION OF core_orderitem_partitioned DEFAULT;
+
+-- Monthly partitions from the oldest order to three months ahead, bounded in UTC
+DO $$
+DECLARE
+    month timestamp;
+    last timestamp := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months';
+    parent text;
+BEGIN
+    month := date_trunc('month', coalesce((SELECT min(created_at) FROM core_order), now()) AT TIME ZONE 'UTC');
+    month := least(month, date_trunc('month', now() AT TIME ZONE 'UTC'));
+    WHILE month <= last LOOP
+        FOREACH parent IN ARRAY ARRAY['core_order', 'core_orderitem'] LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                parent || to_char(month, '"_y"YYYY"m"MM'),
+                parent || '_partitioned',
+                month AT TIME ZONE 'UTC',
+                (month + interval '1 month') AT TIME ZONE 'UTC'
+            );
+        END LOOP;
+        month := month + interval '1 month';
+    END LOOP;
+END $$;
+
+INSERT INTO core_order_partitioned (id, status, total, created_at, updated_at, user_id)
+SELECT id, status, total, created_at, updated_at, user_id FROM core_order;
+
+INSERT INTO core_orderitem_partitioned (id, quantity, unit_price, order_id, product_id, created_at)
+SELECT item.id, item.quantity, item.unit_price, item.order_id, item.product_id, core_order.created_at
+FROM core_orderitem AS item JOIN core_order ON core_order.id = item.order_id;
+
+DROP TABLE core_orderitem;
+DROP TABLE core_order;
+ALTER TABLE core_order_partitioned RENAME TO core_order;
+ALTER TABLE core_orderitem_partitioned RENAME TO core_orderitem;
+
+CREATE SEQUENCE core_order_id_seq OWNED BY core_order.id;
+ALTER TABLE core_order ALTER COLUMN id SET DEFAULT nextval('core_order_id_seq');
+SELECT setval('core_order_id_seq', coalesce(max(id), 0) + 1, false) FROM core_order;
+CREATE SEQUENCE core_orderitem_id_seq OWNED BY core_orderitem.id;
+ALTER TABLE core_orderitem ALTER COLUMN id SET DEFAULT nextval('core_orderitem_id_seq');
+SELECT setval('core_orderitem_id_seq', coalesce(max(id), 0) + 1, false) FROM core_orderitem;
+
+ALTER TABLE core_order ADD CONSTRAINT core_order_user_id_fk_core_user_id
+    FOREIGN KEY (user_id) REFERENCES core_user (id) DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE core_orderitem ADD CONSTRAINT core_orderitem_product_id_fk_core_product_id
+    FOREIGN KEY (product_id) REFERENCES core_product (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX core_orderitem_order_id ON core_orderitem (order_id);
+CREATE INDEX core_orderitem_product_id ON core_orderitem (product_id);
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0013_order"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql=PARTITION_SQL, reverse_sql=migrations.RunSQL.noop
+                ),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name="orderitem",
+                    name="created_at",
+                    field=models.DateTimeField(default=None),
+                    preserve_default=False,
+                ),
+                migrations.AlterField(
+                    model_name="order",
+                    name="user",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="orders",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="orderitem",
+                    name="order",
+                    field=models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="items",
+                        to="core.order",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="order_user_history_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,142 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:49
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0017_paymentevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailySales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("orders", models.PositiveIntegerField(default=0)),
+                ("units", models.PositiveIntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "daily sales",
+            },
+        ),
+        migrations.CreateModel(
+            name="HourlySales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                ("orders", models.PositiveIntegerField(default=0)),
+                ("units", models.PositiveIntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "hourly sales",
+            },
+        ),
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("value", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["updated_at"], name="order_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["created_at"], name="order_created_brin"
+            ),
+        ),
+        migrations.AddField(
+            model_name="dailysales",
+            name="category",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="core.category",
+            ),
+        ),
+        migrations.AddField(
+            model_name="dailysales",
+            name="product",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="core.product",
+            ),
+        ),
+        migrations.AddField(
+            model_name="hourlysales",
+            name="category",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="core.category",
+            ),
+        ),
+        migrations.AddField(
+            model_name="hourlysales",
+            name="product",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="core.product",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dailysales",
+            index=models.Index(
+                fields=["category", "day"], name="daily_sales_category_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailysales",
+            constraint=models.UniqueConstraint(
+                fields=("day", "product"), name="daily_sales_unique"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="hourlysales",
+            constraint=models.UniqueConstraint(
+                fields=("hour", "product"), name="hourly_sales_unique"
+            ),
+        ),
+    ]
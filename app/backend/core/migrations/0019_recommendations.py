@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:53
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0018_sales_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductPair",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("orders", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ProductRecommendation",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="recommendation",
+                        serialize=False,
+                        to="core.product",
+                    ),
+                ),
+                (
+                    "related",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.BigIntegerField(), default=list, size=None
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        db_default=django.db.models.functions.datetime.Now()
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["created_at"], name="orderitem_created_brin"
+            ),
+        ),
+        migrations.AddField(
+            model_name="productpair",
+            name="other",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="core.product",
+            ),
+        ),
+        migrations.AddField(
+            model_name="productpair",
+            name="product",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="core.product",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="productpair",
+            constraint=models.UniqueConstraint(
+                fields=("product", "other"), name="product_pair_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0019_recommendations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderitem",
+            name="discount",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name="Promotion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("percent_off", "Percentage off"),
+                            ("buy_x_get_y", "Buy X get Y free"),
+                        ],
+                        default="percent_off",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "percent",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=5, null=True
+                    ),
+                ),
+                (
+                    "buy_quantity",
+                    models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+                (
+                    "free_quantity",
+                    models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+                ("starts_at", models.DateTimeField(blank=True, null=True)),
+                ("ends_at", models.DateTimeField(blank=True, null=True)),
+                ("is_active", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "brand",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="promotions",
+                        to="core.brand",
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="promotions",
+                        to="core.category",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="promotions",
+                        to="core.product",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.CheckConstraint(
+                        condition=models.Q(
+                            models.Q(
+                                ("brand__isnull", True),
+                                ("category__isnull", True),
+                                ("product__isnull", False),
+                            ),
+                            models.Q(
+                                ("brand__isnull", False),
+                                ("category__isnull", True),
+                                ("product__isnull", True),
+                            ),
+                            models.Q(
+                                ("brand__isnull", True),
+                                ("category__isnull", False),
+                                ("product__isnull", True),
+                            ),
+                            _connector="OR",
+                        ),
+                        name="promotion_one_target",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0020_promotions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="view_count",
+            field=models.PositiveBigIntegerField(db_default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["view_count", "id"], name="product_popular_idx"),
+        ),
+    ]
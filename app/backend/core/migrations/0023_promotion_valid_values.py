@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0022_account_deletion"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="promotion",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    models.Q(("kind", "percent_off"), _negated=True),
+                    models.Q(
+                        ("percent__gt", 0),
+                        ("percent__isnull", False),
+                        ("percent__lte", 100),
+                    ),
+                    _connector="OR",
+                ),
+                name="promotion_valid_percent",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="promotion",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    models.Q(("kind", "buy_x_get_y"), _negated=True),
+                    models.Q(
+                        ("buy_quantity__gte", 1),
+                        ("buy_quantity__isnull", False),
+                        ("free_quantity__gte", 1),
+                        ("free_quantity__isnull", False),
+                    ),
+                    _connector="OR",
+                ),
+                name="promotion_valid_quantities",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:45
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0023_promotion_valid_values"),
+    ]
+
+    operations = [
+        # Pairs were counted from every order by created_at, the next refresh recounts the paid ones
+        migrations.RunSQL(
+            sql="""
+            DELETE FROM core_rollupwatermark WHERE name = 'recommendations';
+            TRUNCATE core_productpair, core_productrecommendation;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
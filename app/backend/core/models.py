@@ -7,7 +7,13 @@ from django.contrib.auth.models import (
     BaseUserManager,
     PermissionsMixin,
 )
-from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models.functions import Concat, Now, Substr
 
 
 class UserManager(BaseUserManager):
@@ -66,3 +72,599 @@ class Profile(models.Model):
 
     def __str__(self):
         return f"({self.user.email}): {self.display_name}"
+
+
+class RequestProfile(models.Model):
+    """Profile of a single request, captured on demand by a staff user"""
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="+")
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2048)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    query_time_ms = models.FloatField()
+    queries = models.JSONField(default=list)
+    pstats = models.BinaryField()
+    speedscope = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.1f} ms)"
+
+
+class AccountDeletion(models.Model):
+    """
+    The erasure of a User's account, run in batches by a worker, see users.deletion.
+    Only the id of the User is kept, so the record outlives the account it erased.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    user_pk = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    # The step being worked through, see users.deletion.STEPS
+    step = models.CharField(max_length=20, blank=True)
+    rows_deleted = models.PositiveBigIntegerField(default=0)
+    # A User with orders is anonymised rather than deleted, the orders being kept for the accounts
+    anonymized = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user_pk"],
+                condition=~models.Q(status="completed"),
+                name="account_deletion_open_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Deletion of user {self.user_pk} ({self.get_status_display()})"
+
+
+class Brand(models.Model):
+    """Product Brand"""
+
+    name = models.CharField(max_length=255, unique=True)
+    slug = models.SlugField(max_length=255, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Keep the copy searched by Product.search_vector in step with a renamed brand
+            Product.objects.filter(brand=self).exclude(brand_name=self.name).update(brand_name=self.name)
+
+
+class Category(models.Model):
+    """
+    Product Category
+
+    Each category stores its materialized path, the ids from the root down to
+    itself such as "1/7/42/", so subtree and ancestor reads are single indexed
+    lookups and moving a branch is a single UPDATE.
+    """
+
+    name = models.CharField(max_length=255)
+    slug = models.SlugField(max_length=255, unique=True)
+    parent = models.ForeignKey("self", on_delete=models.PROTECT, null=True, blank=True, related_name="children")
+    path = models.CharField(max_length=255, editable=False, default="")
+    depth = models.PositiveSmallIntegerField(editable=False, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name_plural = "categories"
+        indexes = [
+            # Pattern ops let `path LIKE '1/7/%'` use the index whatever the database collation
+            models.Index(fields=["path"], name="category_path_idx", opclasses=["varchar_pattern_ops"]),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        if self.pk is not None and self.parent_id is not None:
+            parent_path = Category.objects.values_list("path", flat=True).get(pk=self.parent_id)
+            if parent_path.startswith(self.path):
+                raise ValidationError({"parent": "A category cannot be moved under itself or its subcategories."})
+
+    def _path_under(self, parent_id):
+        """Path and depth this category would have under parent_id"""
+        if parent_id is None:
+            return f"{self.pk}/", 0
+        parent_path, parent_depth = Category.objects.values_list("path", "depth").get(pk=parent_id)
+        return f"{parent_path}{self.pk}/", parent_depth + 1
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if self.pk is None:
+                super().save(*args, **kwargs)
+                self.path, self.depth = self._path_under(self.parent_id)
+                Category.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+                return
+
+            path, depth = self._path_under(self.parent_id)
+            if path != self.path:
+                if path.startswith(self.path):
+                    raise ValueError("Category cannot be moved under its own subtree")
+                # Rewrite the prefix of the whole branch, this category included, in one statement
+                Category.objects.filter(path__startswith=self.path).update(
+                    path=Concat(
+                        models.Value(path), Substr("path", len(self.path) + 1), output_field=models.CharField()
+                    ),
+                    depth=models.F("depth") + (depth - self.depth),
+                )
+                self.path, self.depth = path, depth
+            super().save(*args, **kwargs)
+
+    def move_to(self, parent):
+        """Move this category and its subtree under parent, or to the root when parent is None"""
+        self.parent = parent
+        self.save()
+
+    def get_descendants(self, include_self=False):
+        """Every category below this one"""
+        queryset = Category.objects.filter(path__startswith=self.path)
+        return queryset if include_self else queryset.exclude(pk=self.pk)
+
+    def get_ancestors(self, include_self=False):
+        """Categories from the root down to this one, in order"""
+        ids = self.path.rstrip("/").split("/")
+        if not include_self:
+            ids = ids[:-1]
+        paths = ["".join(f"{pk}/" for pk in ids[: index + 1]) for index in range(len(ids))]
+        return Category.objects.filter(path__in=paths).order_by("depth")
+
+
+class Product(models.Model):
+    """Product in the Catalog"""
+
+    sku = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    # The composite indexes below lead with these columns, so the default FK indexes would be redundant
+    brand = models.ForeignKey(Brand, on_delete=models.PROTECT, related_name="products", db_index=False)
+    category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name="products", db_index=False)
+    # Copied from the brand because a generated column can only read its own row
+    brand_name = models.CharField(max_length=255, editable=False, default="")
+    is_active = models.BooleanField(default=True)
+    # Buffered in Redis and added in batches, see products.counters
+    view_count = models.PositiveBigIntegerField(db_default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("name", weight="A", config="english")
+            + SearchVector("brand_name", weight="B", config="english")
+            + SearchVector("description", weight="C", config="english")
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="product_search_idx"),
+            # Indexes match the list endpoint filters and their keyset ordering
+            models.Index(fields=["category", "price", "id"], name="product_category_price_idx"),
+            models.Index(fields=["brand", "created_at", "id"], name="product_brand_created_idx"),
+            models.Index(fields=["created_at", "id"], name="product_created_idx"),
+            models.Index(fields=["price", "id"], name="product_price_idx"),
+            models.Index(fields=["view_count", "id"], name="product_popular_idx"),
+        ]
+
+    def __str__(self):
+        return f"({self.sku}): {self.name}"
+
+    def save(self, *args, **kwargs):
+        self.brand_name = self.brand.name
+        super().save(*args, **kwargs)
+
+
+class Promotion(models.Model):
+    """
+    A discount rule on a Product, a Brand or a Category and its subcategories, see products.pricing.
+    Each basket line gets the single promotion that takes the most off it.
+    """
+
+    class Kind(models.TextChoices):
+        PERCENT_OFF = "percent_off", "Percentage off"
+        BUY_X_GET_Y = "buy_x_get_y", "Buy X get Y free"
+
+    name = models.CharField(max_length=255)
+    kind = models.CharField(max_length=20, choices=Kind.choices, default=Kind.PERCENT_OFF)
+    percent = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    buy_quantity = models.PositiveSmallIntegerField(null=True, blank=True)
+    free_quantity = models.PositiveSmallIntegerField(null=True, blank=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True, related_name="promotions")
+    brand = models.ForeignKey(Brand, on_delete=models.CASCADE, null=True, blank=True, related_name="promotions")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name="promotions")
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(product__isnull=False, brand__isnull=True, category__isnull=True)
+                    | models.Q(product__isnull=True, brand__isnull=False, category__isnull=True)
+                    | models.Q(product__isnull=True, brand__isnull=True, category__isnull=False)
+                ),
+                name="promotion_one_target",
+            ),
+            # Pricing divides by the quantities and multiplies by the percentage, see products.pricing.Rule
+            models.CheckConstraint(
+                condition=~models.Q(kind="percent_off")
+                | models.Q(percent__isnull=False, percent__gt=0, percent__lte=100),
+                name="promotion_valid_percent",
+            ),
+            models.CheckConstraint(
+                condition=~models.Q(kind="buy_x_get_y")
+                | models.Q(
+                    buy_quantity__isnull=False, buy_quantity__gte=1, free_quantity__isnull=False, free_quantity__gte=1
+                ),
+                name="promotion_valid_quantities",
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        if sum(target is not None for target in (self.product_id, self.brand_id, self.category_id)) != 1:
+            raise ValidationError("A promotion applies to exactly one product, brand or category.")
+        if self.kind == self.Kind.PERCENT_OFF and not (self.percent is not None and 0 < self.percent <= 100):
+            raise ValidationError({"percent": "A percentage off must be more than 0 and at most 100."})
+        if self.kind == self.Kind.BUY_X_GET_Y and not (self.buy_quantity and self.free_quantity):
+            raise ValidationError("Buy X get Y free needs both quantities.")
+        if self.starts_at and self.ends_at and self.starts_at >= self.ends_at:
+            raise ValidationError({"ends_at": "A promotion must end after it starts."})
+
+
+class ImportJob(models.Model):
+    """A bulk product import, with the progress needed to resume it"""
+
+    class Format(models.TextChoices):
+        CSV = "csv", "CSV"
+        JSONL = "jsonl", "JSON Lines"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    file = models.FileField(upload_to="imports/")
+    format = models.CharField(max_length=10, choices=Format.choices, default=Format.CSV)
+    chunk_size = models.PositiveIntegerField(default=5000)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    # Source rows covered by committed chunks, where a resumed import starts reading
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Import {self.pk} ({self.get_status_display()})"
+
+
+class Stock(models.Model):
+    """
+    Units of a Product available to reserve. A hot product can spread its units
+    over StockShard rows, so concurrent buyers lock different rows, in which case
+    the units live on the shards and available stays at zero.
+    """
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="stock")
+    # A positive integer column is also a CHECK constraint, the last guard against overselling
+    available = models.PositiveIntegerField(default=0)
+    shards = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f"Stock of product {self.product_id}"
+
+
+class StockShard(models.Model):
+    """A slice of the available units of a sharded Stock"""
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_shards", db_index=False)
+    shard = models.PositiveSmallIntegerField()
+    available = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["product", "shard"], name="stock_shard_unique")]
+
+    def __str__(self):
+        return f"Shard {self.shard} of product {self.product_id}"
+
+
+class Reservation(models.Model):
+    """Units taken from Stock and held for a buyer until confirmed, released or expired"""
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="reservations")
+    # The StockShard the units came from, None when the stock is not sharded
+    shard = models.PositiveSmallIntegerField(null=True, blank=True)
+    quantity = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["expires_at"], name="reservation_expires_idx")]
+
+    def __str__(self):
+        return f"Reservation {self.pk} of {self.quantity} x product {self.product_id}"
+
+
+class BasketSnapshot(models.Model):
+    """
+    Copy of a User's basket, which lives in Redis. Written in the background for
+    baskets kept long enough to outlive their Redis expiry, and at checkout.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="basket_snapshot")
+    # Quantity by product id, keys are strings as in JSON
+    items = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Basket of user {self.user_id}"
+
+
+class Order(models.Model):
+    """
+    An Order placed from a User's basket
+
+    The table is partitioned by month of created_at, see orders.partitions. Postgres keys
+    partitioned rows by (id, created_at), so id is unique by its sequence rather than a constraint.
+    """
+
+    class Status(models.TextChoices):
+        PENDING_PAYMENT = "pending_payment", "Pending payment"
+        PAID = "paid", "Paid"
+        CANCELLED = "cancelled", "Cancelled"
+
+    # The history index below leads with the user, so the default FK index would be redundant
+    user = models.ForeignKey(User, on_delete=models.PROTECT, related_name="orders", db_index=False)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING_PAYMENT)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="order_user_history_idx"),
+            # Sales rollups find changed orders by updated_at, then rescan their hours by created_at,
+            # which follows insertion order closely enough for a BRIN index
+            models.Index(fields=["updated_at"], name="order_updated_idx"),
+            BrinIndex(fields=["created_at"], name="order_created_brin"),
+        ]
+
+    def __str__(self):
+        return f"Order {self.pk} ({self.get_status_display()})"
+
+
+class OrderItem(models.Model):
+    """
+    A product in an Order, at the price it was ordered for
+
+    Partitioned like Order on a copy of the order's created_at, so both tables detach the same
+    months. A foreign key into a partitioned table must include its partition key, so the
+    reference to the order is not enforced by the database.
+    """
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items", db_constraint=False)
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name="+")
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Taken off the whole line by its promotion
+    discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        # Recommendations read the items of recently placed orders by created_at
+        indexes = [BrinIndex(fields=["created_at"], name="orderitem_created_brin")]
+
+    def __str__(self):
+        return f"{self.quantity} x product {self.product_id}"
+
+
+class Task(models.Model):
+    """
+    A background task waiting for, or being run by, a worker, see core.tasks.
+    Tasks are deleted once they succeed, so the table only holds pending and failed work.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        FAILED = "failed", "Failed"
+
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    # Higher priorities are claimed first
+    priority = models.SmallIntegerField(default=0)
+    run_at = models.DateTimeField(db_default=Now())
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Covers the claim query's filter and order, and only holds the queue itself
+            models.Index(
+                models.F("priority").desc(),
+                "run_at",
+                "id",
+                name="task_claim_idx",
+                condition=models.Q(status="queued"),
+            ),
+            models.Index(fields=["locked_at"], name="task_running_idx", condition=models.Q(status="running")),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+
+class OutboxEvent(models.Model):
+    """
+    A domain event written in the transaction that caused it, waiting to be
+    published, see core.outbox. Rows are deleted once published.
+    """
+
+    topic = models.CharField(max_length=50)
+    event_type = models.CharField(max_length=100)
+    key = models.CharField(max_length=100)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(db_default=Now())
+
+    def __str__(self):
+        return f"{self.event_type} {self.key}"
+
+
+class PaymentEvent(models.Model):
+    """
+    A webhook event from the payment provider, stored as received and applied to its
+    Order later, see payments.processing. The event id makes redeliveries no-ops.
+    """
+
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payment_intent = models.CharField(max_length=255)
+    payload = models.JSONField()
+    # When the provider created the event, which orders the events of an intent
+    created = models.DateTimeField()
+    received_at = models.DateTimeField(db_default=Now())
+    processed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["payment_intent", "created", "id"],
+                name="payment_event_pending_idx",
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_id}"
+
+
+class HourlySales(models.Model):
+    """
+    Paid sales of a Product in an hour, in UTC, maintained from the orders by
+    orders.rollups so reports never aggregate the order tables
+    """
+
+    hour = models.DateTimeField()
+    # The unique constraint below leads with the hour, and reports filter by it first
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+", db_index=False)
+    # The product's category when the hour was rolled up
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name="+", db_index=False)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = "hourly sales"
+        constraints = [models.UniqueConstraint(fields=["hour", "product"], name="hourly_sales_unique")]
+
+    def __str__(self):
+        return f"Sales of product {self.product_id} at {self.hour:%Y-%m-%d %H:00}"
+
+
+class DailySales(models.Model):
+    """Paid sales of a Product in a day, in UTC, rolled up from its HourlySales"""
+
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+", db_index=False)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name="+", db_index=False)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = "daily sales"
+        constraints = [models.UniqueConstraint(fields=["day", "product"], name="daily_sales_unique")]
+        indexes = [models.Index(fields=["category", "day"], name="daily_sales_category_idx")]
+
+    def __str__(self):
+        return f"Sales of product {self.product_id} on {self.day}"
+
+
+class RollupWatermark(models.Model):
+    """How far a rollup has consumed its source, by the source's change timestamp"""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} up to {self.value}"
+
+
+class ProductPair(models.Model):
+    """
+    How many orders held both of two Products: one cell of the sparse co-occurrence matrix,
+    stored in both directions, see products.recommendations
+    """
+
+    # The unique constraint below leads with the product
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+", db_index=False)
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+", db_index=False)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["product", "other"], name="product_pair_unique")]
+
+    def __str__(self):
+        return f"Products {self.product_id} and {self.other_id} in {self.orders} orders"
+
+
+class ProductRecommendation(models.Model):
+    """The Products most often bought with a Product, best first, read by primary key"""
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="recommendation")
+    related = ArrayField(models.BigIntegerField(), default=list)
+    updated_at = models.DateTimeField(db_default=Now())
+
+    def __str__(self):
+        return f"Recommendations for product {self.product_id}"
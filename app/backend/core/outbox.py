@@ -0,0 +1,212 @@
+"""
+Transactional outbox of domain events
+
+Model changes that other systems care about call emit(), which inserts an
+OutboxEvent in the same transaction as the change, so an event exists exactly
+when its change committed and the request path pays for one small INSERT.
+
+A single publisher process drains the table in id order, in large batches,
+to a sink, by default one Redis Stream per topic, and deletes what it sent.
+A crash between publishing and deleting sends a batch again, so delivery is at
+least once and consumers skip event ids they have already seen. Consumers read
+the streams through consumer groups, which keep each group's offset in Redis
+and redeliver whatever a consumer read but did not acknowledge.
+
+The publisher polls rather than being woken by NOTIFY, because NOTIFY takes a
+lock at commit that would serialise every transaction emitting an event.
+"""
+
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+from core.models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+SINK = getattr(settings, "OUTBOX_SINK", {"BACKEND": "core.outbox.RedisStreamSink"})
+BATCH_SIZE = getattr(settings, "OUTBOX_BATCH_SIZE", 1000)
+# Seconds an idle publisher waits before looking for new events
+POLL_INTERVAL = getattr(settings, "OUTBOX_POLL_INTERVAL", 0.2)
+# Advisory lock held by the publisher, so a standby publisher cannot reorder events
+PUBLISHER_LOCK = 0x6F7574626F78
+
+
+def emit(topic, event_type, key, payload):
+    """Record an event in the current transaction, payload being JSON-serialisable"""
+    return OutboxEvent.objects.create(topic=topic, event_type=event_type, key=str(key), payload=payload)
+
+
+def stream_name(topic):
+    return f"events:{topic}"
+
+
+class RedisStreamSink:
+    """Append events to a capped Redis Stream per topic"""
+
+    def __init__(self, maxlen=1_000_000):
+        self.maxlen = maxlen
+
+    def publish(self, events):
+        with get_redis_connection("default").pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.xadd(
+                    stream_name(event.topic),
+                    {
+                        "id": event.pk,
+                        "type": event.event_type,
+                        "key": event.key,
+                        "payload": json.dumps(event.payload, cls=DjangoJSONEncoder),
+                        "created_at": event.created_at.isoformat(),
+                    },
+                    maxlen=self.maxlen,
+                    approximate=True,
+                )
+            pipe.execute()
+
+
+class LocalSink:
+    """Keep published events in memory, for development and tests"""
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, events):
+        self.published.extend(events)
+
+
+_sink = None
+
+
+def get_sink():
+    global _sink
+    if _sink is None:
+        _sink = import_string(SINK["BACKEND"])(**SINK.get("OPTIONS", {}))
+    return _sink
+
+
+def publish_batch(batch_size=BATCH_SIZE, sink=None):
+    """
+    Publish the oldest events and delete them, returning how many were published.
+    Events committed out of id order are picked up by a later batch rather than skipped.
+    """
+    sink = sink or get_sink()
+    with transaction.atomic():
+        events = list(OutboxEvent.objects.order_by("id")[:batch_size])
+        if not events:
+            return 0
+        sink.publish(events)
+        # Deleting by id, a range could take events that committed after the read
+        OutboxEvent.objects.filter(id__in=[event.pk for event in events]).delete()
+    return len(events)
+
+
+class Publisher:
+    """Publishes events until stopped, while holding the publisher lock"""
+
+    def __init__(self, batch_size=BATCH_SIZE, poll_interval=POLL_INTERVAL, sink=None):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.sink = sink
+        self.stopping = False
+
+    def try_acquire(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [PUBLISHER_LOCK])
+            return cursor.fetchone()[0]
+
+    def release(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [PUBLISHER_LOCK])
+
+    def drain(self):
+        """Publish every waiting event and return how many, or None when another publisher is running"""
+        if not self.try_acquire():
+            return None
+        try:
+            total = 0
+            while published := publish_batch(self.batch_size, self.sink):
+                total += published
+            return total
+        finally:
+            self.release()
+
+    def run(self):
+        # Standby publishers wait for the lock, taking over when the publisher stops
+        while not self.try_acquire():
+            if self.stopping:
+                return
+            time.sleep(max(self.poll_interval, 1))
+        logger.info("Publishing outbox events")
+        try:
+            while not self.stopping:
+                if publish_batch(self.batch_size, self.sink) < self.batch_size:
+                    time.sleep(self.poll_interval)
+        finally:
+            self.release()
+
+    def stop(self, *args):
+        self.stopping = True
+
+
+class StreamConsumer:
+    """
+    Read a topic's events as a member of a consumer group. Redis keeps the group's
+    offset, and events are redelivered to this consumer until they are acknowledged.
+    """
+
+    def __init__(self, topic, group, consumer, count=100, block_ms=5000):
+        self.stream = stream_name(topic)
+        self.group = group
+        self.consumer = consumer
+        self.count = count
+        self.block_ms = block_ms
+        self.redis = get_redis_connection("default")
+        try:
+            # New groups start at the oldest event still in the stream
+            self.redis.xgroup_create(self.stream, group, id="0", mkstream=True)
+        except ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    @staticmethod
+    def decode(message_id, fields):
+        fields = {name.decode(): value.decode() for name, value in fields.items()}
+        return {
+            "message_id": message_id.decode(),
+            "id": int(fields["id"]),
+            "type": fields["type"],
+            "key": fields["key"],
+            "payload": json.loads(fields["payload"]),
+            "created_at": fields["created_at"],
+        }
+
+    def read(self):
+        """Events delivered to this consumer but not acknowledged, or else the next new ones"""
+        for start, block in (("0", None), (">", self.block_ms)):
+            response = self.redis.xreadgroup(
+                self.group, self.consumer, {self.stream: start}, count=self.count, block=block
+            )
+            messages = response[0][1] if response else []
+            if messages:
+                return [self.decode(message_id, fields) for message_id, fields in messages]
+        return []
+
+    def ack(self, events):
+        if events:
+            self.redis.xack(self.stream, self.group, *(event["message_id"] for event in events))
+
+    def consume(self, handler):
+        """Pass one batch of events to handler, acknowledging them once it returns, and return the batch"""
+        events = self.read()
+        if events:
+            handler(events)
+            self.ack(events)
+        return events
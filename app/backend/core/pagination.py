@@ -0,0 +1,140 @@
+"""
+Custom Pagination Classes
+"""
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a (key, id) pair.
+
+    Each page continues from the last row of the previous one with an indexed
+    range condition, so page 10,000 costs the same as page 1. Views choose the
+    orderings they support with `keyset_orderings`, a mapping of query value to
+    a (key, id) pair such as {"price": ("price", "id")}.
+    """
+
+    page_size = 24
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    ordering_query_param = "ordering"
+    default_orderings = {"newest": ("-created_at", "-id")}
+
+    def get_orderings(self, view):
+        return getattr(view, "keyset_orderings", None) or self.default_orderings
+
+    def get_ordering(self, request, view):
+        orderings = self.get_orderings(view)
+        name = request.query_params.get(self.ordering_query_param) or next(iter(orderings))
+        if name not in orderings:
+            raise ValidationError({self.ordering_query_param: [f"Choose one of: {', '.join(orderings)}"]})
+        return orderings[name]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request, queryset, ordering):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            fields = [queryset.model._meta.get_field(name.lstrip("-")) for name in ordering]
+            return [field.to_python(value) for field, value in zip(fields, values, strict=True)]
+        except (ValueError, TypeError, DjangoValidationError):
+            raise NotFound("Invalid cursor") from None
+
+    def encode_cursor(self, row, ordering):
+        values = []
+        for name in ordering:
+            value = getattr(row, name.lstrip("-"))
+            values.append(value.isoformat() if hasattr(value, "isoformat") else str(value))
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    @staticmethod
+    def after(ordering, values):
+        """
+        Rows after the cursor, written as `key >= v AND (key > v OR id > i)` so
+        the index range starts at the cursor instead of filtering from the top
+        """
+        (key, tiebreak), (key_value, tiebreak_value) = ordering, values
+        if key.startswith("-"):
+            key = key[1:]
+            return Q(**{f"{key}__lte": key_value}) & (
+                Q(**{f"{key}__lt": key_value}) | Q(**{f"{tiebreak.lstrip('-')}__lt": tiebreak_value})
+            )
+        return Q(**{f"{key}__gte": key_value}) & (
+            Q(**{f"{key}__gt": key_value}) | Q(**{f"{tiebreak.lstrip('-')}__gt": tiebreak_value})
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_ordering(request, view)
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*ordering)
+
+        cursor = self.decode_cursor(request, queryset, ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self.after(ordering, cursor))
+
+        rows = list(queryset[: page_size + 1])
+        self.request = request
+        self.next_cursor = self.encode_cursor(rows[page_size - 1], ordering) if len(rows) > page_size else None
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor from the `next` link of the previous page",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Results per page, at most {self.max_page_size}",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.ordering_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Result ordering",
+                "schema": {"type": "string", "enum": list(self.get_orderings(view))},
+            },
+        ]
@@ -0,0 +1,215 @@
+"""
+On-demand request profiling for staff
+
+A staff member sends a signed token in the `X-Profile` header (or the
+`_profile` query parameter) and only that request is profiled. Requests
+without a token pay for a single header lookup.
+"""
+
+import json
+import logging
+import marshal
+import sys
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+SIGNING_SALT = "core.profiling"
+TOKEN_MAX_AGE = getattr(settings, "PROFILING_TOKEN_MAX_AGE", 60 * 60)
+MAX_EVENTS = getattr(settings, "PROFILING_MAX_EVENTS", 500_000)
+
+
+def make_token(user):
+    """Create a signed profiling token for a staff user"""
+    return signing.dumps({"uid": user.pk}, salt=SIGNING_SALT)
+
+
+def staff_user_for_token(token):
+    """Return the active staff user a token was issued to, or None"""
+    try:
+        data = signing.loads(token, salt=SIGNING_SALT, max_age=TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return get_user_model().objects.filter(pk=data.get("uid"), is_staff=True, is_active=True).first()
+
+
+def _builtin_label(func):
+    module = getattr(func, "__module__", None)
+    name = getattr(func, "__qualname__", None) or repr(func)
+    return f"<built-in method {module}.{name}>" if module else f"<built-in method {name}>"
+
+
+class Tracer:
+    """
+    Deterministic profiler for the current thread.
+    Aggregates pstats-compatible totals and keeps a speedscope event log.
+    """
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self.max_events = max_events
+        self.frames = []
+        self.frame_ids = {}
+        self.events = []
+        self.stats = {}
+        self.stack = []
+        self.depths = {}
+        self.started = 0.0
+        self.finished = 0.0
+
+    def run(self, func, *args):
+        """Call func under the profiler and return its result"""
+        self.started = time.perf_counter()
+        sys.setprofile(self._event)
+        try:
+            return func(*args)
+        finally:
+            sys.setprofile(None)
+            self.finished = time.perf_counter()
+            while self.stack:
+                self._exit(self.finished)
+
+    def _event(self, frame, event, arg):
+        now = time.perf_counter()
+        if event == "call":
+            code = frame.f_code
+            self._enter((code.co_filename, code.co_firstlineno, code.co_name), now)
+        elif event == "c_call":
+            self._enter(("~", 0, _builtin_label(arg)), now)
+        elif self.stack:
+            self._exit(now)
+
+    def _frame(self, key):
+        index = self.frame_ids.get(key)
+        if index is None:
+            index = self.frame_ids[key] = len(self.frames)
+            self.frames.append(key)
+        return index
+
+    def _enter(self, key, now):
+        recorded = len(self.events) < self.max_events
+        if recorded:
+            self.events.append(("O", now, self._frame(key)))
+        self.stack.append([key, now, 0.0, recorded])
+        self.depths[key] = self.depths.get(key, 0) + 1
+
+    def _exit(self, now):
+        key, started, child_time, recorded = self.stack.pop()
+        elapsed = now - started
+        own_time = elapsed - child_time
+        depth = self.depths[key] = self.depths[key] - 1
+        recursive = depth > 0
+
+        stat = self.stats.get(key)
+        if stat is None:
+            stat = self.stats[key] = [0, 0, 0.0, 0.0, {}]
+        stat[1] += 1
+        stat[2] += own_time
+        if not recursive:
+            stat[0] += 1
+            stat[3] += elapsed
+
+        if self.stack:
+            parent = self.stack[-1]
+            parent[2] += elapsed
+            edge = stat[4].get(parent[0])
+            if edge is None:
+                edge = stat[4][parent[0]] = [0, 0, 0.0, 0.0]
+            edge[0] += 1
+            edge[2] += own_time
+            if not recursive:
+                edge[1] += 1
+                edge[3] += elapsed
+
+        if recorded:
+            self.events.append(("C", now, self._frame(key)))
+
+    def pstats_data(self):
+        """Marshalled stats, loadable with pstats.Stats or snakeviz"""
+        stats = {
+            key: (cc, nc, tt, ct, {caller: tuple(edge) for caller, edge in callers.items()})
+            for key, (cc, nc, tt, ct, callers) in self.stats.items()
+        }
+        return marshal.dumps(stats)
+
+    def speedscope_data(self, name):
+        """The event log in speedscope's evented file format"""
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "store-front",
+            "shared": {
+                "frames": [{"name": func, "file": file, "line": line} for file, line, func in self.frames],
+            },
+            "profiles": [
+                {
+                    "type": "evented",
+                    "name": name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": (self.finished - self.started) * 1000,
+                    "events": [
+                        {"type": kind, "frame": frame, "at": (at - self.started) * 1000}
+                        for kind, at, frame in self.events
+                    ],
+                }
+            ],
+        }
+        return json.dumps(document).encode()
+
+
+class QueryLog:
+    """Database execute wrapper recording each statement and its duration"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            self.queries.append({"sql": sql, "duration_ms": round(duration_ms, 3), "many": many})
+
+
+def profile_request(request, get_response, user):
+    """Run the request under the profiler and store the result"""
+    from core.models import RequestProfile
+
+    tracer = Tracer()
+    query_log = QueryLog()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(query_log))
+        response = tracer.run(get_response, request)
+
+    params = request.GET.copy()
+    params.pop("_profile", None)
+    path = f"{request.path}?{params.urlencode()}" if params else request.path
+
+    name = f"{request.method} {request.path}"
+    try:
+        profile = RequestProfile.objects.create(
+            user=user,
+            method=request.method,
+            path=path[:2048],
+            status_code=response.status_code,
+            duration_ms=(tracer.finished - tracer.started) * 1000,
+            query_count=len(query_log.queries),
+            query_time_ms=sum(query["duration_ms"] for query in query_log.queries),
+            queries=query_log.queries,
+            pstats=tracer.pstats_data(),
+            speedscope=tracer.speedscope_data(name),
+        )
+    except Exception:
+        logger.exception("Could not store the profile for %s", name)
+        return response
+
+    response["X-Profile-Id"] = str(profile.pk)
+    return response
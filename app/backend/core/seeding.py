@@ -0,0 +1,414 @@
+"""
+Deterministic bulk seeding
+
+Synthetic rows are generated chunk by chunk and streamed into Postgres with
+COPY. Every table gets a block of explicit ids after its current maximum, so
+foreign keys are computed rather than looked up, and every chunk draws from
+its own random generator seeded with (seed, table, chunk). The same seed and
+chunk size on the same starting database therefore produce the same rows
+however the chunks are spread across worker processes.
+
+Orders are spread over the history in id order, as real ones are placed, so
+each chunk covers a slice of time and lands in one or two monthly partitions,
+which are created before the load, and the BRIN indexes on created_at stay
+tight. Each order and its items are drawn from the order's own generator, so
+the two tables are loaded separately yet agree. Items take MAX_LINES ids per
+order, so their ids are computed like every other table's.
+"""
+
+import multiprocessing
+import random
+from datetime import UTC, date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections
+
+from core.models import Brand, Category, Order, OrderItem, Product, Profile, User
+from orders.partitions import create_partitions, month_start
+
+# Timestamps are spread over the three years before this instant, so they do not depend on the clock
+REFERENCE_TIME = datetime(2026, 1, 1, tzinfo=UTC)
+HISTORY_SECONDS = 3 * 365 * 24 * 60 * 60
+
+FIRST_NAMES = [
+    "Aisling", "Ben", "Ciara", "Dara", "Eoin", "Fiona", "Grace", "Harry", "Isla", "Jack",
+    "Kate", "Liam", "Maya", "Niamh", "Oscar", "Paula", "Quinn", "Ruth", "Sean", "Tara",
+]  # fmt: skip
+LAST_NAMES = [
+    "Adams", "Brennan", "Campbell", "Doherty", "Evans", "Fitzgerald", "Gallagher", "Hughes", "Irwin", "Kelly",
+    "Lynch", "McCann", "Nolan", "O'Neill", "Patterson", "Quigley", "Reid", "Stewart", "Thompson", "Walsh",
+]  # fmt: skip
+LOCATIONS = ["Belfast", "Derry", "Dublin", "Cork", "Galway", "Glasgow", "Leeds", "London", "Manchester", "Newry"]
+ADJECTIVES = [
+    "Classic", "Compact", "Cordless", "Deluxe", "Digital", "Ergonomic", "Foldable", "Heavy Duty", "Lightweight",
+    "Modern", "Portable", "Premium", "Rechargeable", "Smart", "Stainless", "Vintage", "Waterproof", "Wireless",
+]  # fmt: skip
+NOUNS = [
+    "Backpack", "Blender", "Camera", "Chair", "Drill", "Headphones", "Jacket", "Kettle", "Keyboard", "Lamp",
+    "Monitor", "Mug", "Speaker", "Tent", "Toaster", "Watch", "Shoes", "Desk", "Router", "Bicycle",
+]  # fmt: skip
+# Lines per order, from one up to MAX_LINES, weighted towards small baskets
+LINE_WEIGHTS = [35, 30, 18, 10, 7]
+MAX_LINES = len(LINE_WEIGHTS)
+MATERIALS = ["aluminium", "bamboo", "canvas", "ceramic", "cotton", "glass", "leather", "oak", "steel", "wool"]
+
+
+def _timestamp(rng):
+    return REFERENCE_TIME - timedelta(seconds=rng.randrange(HISTORY_SECONDS))
+
+
+def _price(rng):
+    # Log-normal prices cluster around 25 with a long tail of expensive products
+    return Decimal(f"{min(rng.lognormvariate(3.2, 1.0), 99_999.99):.2f}")
+
+
+def user_rows(plan, rng, ids):
+    for pk in ids:
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created_at = _timestamp(rng)
+        yield (
+            pk,
+            plan.password,
+            False,
+            f"seed-{pk}@example.com",
+            first_name,
+            last_name,
+            date(1950, 1, 1) + timedelta(days=rng.randrange(55 * 365)),
+            True,
+            False,
+            created_at,
+            created_at,
+        )
+
+
+def profile_rows(plan, rng, ids):
+    # Profile n of the block belongs to user n of the users block
+    user_offset = plan.first_id["users"] - plan.first_id["profiles"]
+    for pk in ids:
+        created_at = _timestamp(rng)
+        yield (
+            pk,
+            pk + user_offset,
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            f"Shopping for {rng.choice(NOUNS).lower()}s since {created_at.year}",
+            rng.choice(LOCATIONS),
+            created_at,
+            created_at,
+        )
+
+
+def brand_rows(plan, rng, ids):
+    for pk in ids:
+        created_at = _timestamp(rng)
+        yield pk, f"Brand {pk}", f"brand-{pk}", created_at, created_at
+
+
+def category_rows(plan, rng, ids):
+    # The first tenth of the block are roots, the rest are spread across them as children
+    first, roots = plan.first_id["categories"], plan.root_categories
+    for pk in ids:
+        created_at = _timestamp(rng)
+        if pk - first < roots:
+            parent, path, depth = None, f"{pk}/", 0
+        else:
+            parent = first + (pk - first) % roots
+            path, depth = f"{parent}/{pk}/", 1
+        yield pk, f"Category {pk}", f"category-{pk}", parent, path, depth, created_at, created_at
+
+
+def product_rows(plan, rng, ids):
+    first_brand, first_category = plan.first_id["brands"], plan.first_id["categories"]
+    for pk in ids:
+        brand = first_brand + rng.randrange(plan.counts["brands"])
+        created_at = _timestamp(rng)
+        yield (
+            pk,
+            f"SEED-{pk:010d}",
+            f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {pk}",
+            f"Made from {rng.choice(MATERIALS)}, seeded product {pk}",
+            _price(rng),
+            brand,
+            f"Brand {brand}",
+            first_category + rng.randrange(plan.counts["categories"]),
+            rng.random() > 0.02,
+            created_at,
+            created_at,
+        )
+
+
+def order(plan, pk):
+    """The user, status, timestamps and (product, quantity, unit price) lines of seeded order pk"""
+    rng = random.Random(f"{plan.seed}:orders:{pk}")
+    position = pk - plan.first_id["orders"]
+    created_at = REFERENCE_TIME - timedelta(
+        seconds=HISTORY_SECONDS * (1 - (position + rng.random()) / plan.counts["orders"])
+    )
+    user = plan.first_id["users"] + rng.randrange(plan.counts["users"])
+    roll = rng.random()
+    if roll < 0.9:
+        status, updated_at = Order.Status.PAID, created_at + timedelta(seconds=rng.randrange(5, 3600))
+    elif roll < 0.95:
+        status, updated_at = Order.Status.CANCELLED, created_at + timedelta(seconds=rng.randrange(60, 86400))
+    else:
+        status, updated_at = Order.Status.PENDING_PAYMENT, created_at
+    products = set()
+    wanted = min(rng.choices(range(1, MAX_LINES + 1), LINE_WEIGHTS)[0], plan.counts["products"])
+    while len(products) < wanted:
+        # Skewed towards the start of the block, so some products sell far more and are often bought together
+        products.add(plan.first_id["products"] + int(plan.counts["products"] * rng.random() ** 3))
+    lines = [(product, rng.choice([1, 1, 1, 2, 3]), _price(rng)) for product in sorted(products)]
+    return user, status, created_at, min(updated_at, REFERENCE_TIME), lines
+
+
+def order_rows(plan, rng, ids):
+    for pk in ids:
+        user, status, created_at, updated_at, lines = order(plan, pk)
+        total = sum(quantity * unit_price for _, quantity, unit_price in lines)
+        yield pk, user, status, total, created_at, updated_at
+
+
+def order_item_rows(plan, rng, ids):
+    # Chunked like the orders, id n of the items block stands for order n of the orders block,
+    # whose items take ids n * MAX_LINES onwards
+    first_item, first_order = plan.first_id["order_items"], plan.first_id["orders"]
+    for slot in ids:
+        pk = first_order + slot - first_item
+        _, _, created_at, _, lines = order(plan, pk)
+        for line, (product, quantity, unit_price) in enumerate(lines):
+            yield first_item + (pk - first_order) * MAX_LINES + line, pk, product, quantity, unit_price, 0, created_at
+
+
+class Table:
+    """
+    A seeded table, its COPY columns and the generator producing its rows.
+    Tables whose rows reference each other are loaded in one chunk, so no
+    child row is checked against a parent that another worker has not committed.
+    """
+
+    def __init__(self, name, model, columns, rows, split=True):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.rows = rows
+        self.split = split
+
+    @property
+    def db_table(self):
+        return self.model._meta.db_table
+
+
+TABLES = {
+    table.name: table
+    for table in [
+        Table(
+            "users",
+            User,
+            [
+                "id",
+                "password",
+                "is_superuser",
+                "email",
+                "first_name",
+                "last_name",
+                "date_of_birth",
+                "is_active",
+                "is_staff",
+                "created_at",
+                "updated_at",
+            ],
+            user_rows,
+        ),
+        Table(
+            "profiles",
+            Profile,
+            ["id", "user_id", "display_name", "bio", "location", "created_at", "updated_at"],
+            profile_rows,
+        ),
+        Table("brands", Brand, ["id", "name", "slug", "created_at", "updated_at"], brand_rows),
+        Table(
+            "categories",
+            Category,
+            ["id", "name", "slug", "parent_id", "path", "depth", "created_at", "updated_at"],
+            category_rows,
+            split=False,
+        ),
+        Table(
+            "products",
+            Product,
+            [
+                "id",
+                "sku",
+                "name",
+                "description",
+                "price",
+                "brand_id",
+                "brand_name",
+                "category_id",
+                "is_active",
+                "created_at",
+                "updated_at",
+            ],
+            product_rows,
+        ),
+        Table("orders", Order, ["id", "user_id", "status", "total", "created_at", "updated_at"], order_rows),
+        Table(
+            "order_items",
+            OrderItem,
+            ["id", "order_id", "product_id", "quantity", "unit_price", "discount", "created_at"],
+            order_item_rows,
+        ),
+    ]
+}
+
+# Tables in a stage only reference tables loaded in earlier stages
+STAGES = [["users", "brands", "categories"], ["profiles", "products"], ["orders", "order_items"]]
+
+
+class SeedPlan:
+    """How many rows each table gets and where its block of ids starts"""
+
+    def __init__(self, counts, seed=0, password="password123", chunk_size=50_000):
+        self.counts = counts
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.password = make_password(password, salt=f"seed{seed}")
+        self.root_categories = max(counts["categories"] // 10, 1)
+        self.first_id = {}
+
+    def validate(self):
+        if self.counts["profiles"] > 0 and self.counts["profiles"] != self.counts["users"]:
+            raise ValueError("Profiles are seeded one per seeded user")
+        if self.counts["products"] > 0 and (self.counts["brands"] == 0 or self.counts["categories"] == 0):
+            raise ValueError("Seeding products requires seeding brands and categories")
+        if self.counts["order_items"] != self.counts["orders"]:
+            raise ValueError("Order items are seeded with their orders")
+        if self.counts["orders"] > 0 and (self.counts["users"] == 0 or self.counts["products"] == 0):
+            raise ValueError("Seeding orders requires seeding users and products")
+
+    def allocate_ids(self):
+        """Start every table's block after its current highest id"""
+        with connection.cursor() as cursor:
+            for name, table in TABLES.items():
+                cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table.db_table}")
+                self.first_id[name] = cursor.fetchone()[0] + 1
+
+    def create_partitions(self):
+        """Create the monthly order partitions the seeded history spans"""
+        first, last = month_start(REFERENCE_TIME - timedelta(seconds=HISTORY_SECONDS)), month_start(REFERENCE_TIME)
+        create_partitions(months_ahead=(last.year - first.year) * 12 + last.month - first.month, now=first)
+
+    def chunks(self, stage):
+        for name in stage:
+            count = self.counts[name]
+            size = self.chunk_size if TABLES[name].split else max(count, 1)
+            for chunk, start in enumerate(range(0, count, size)):
+                yield self, name, chunk, start, min(size, count - start)
+
+
+def copy_chunk(task):
+    """Generate one chunk of a table and stream it into Postgres, returning (table, rows)"""
+    plan, name, chunk, start, count = task
+    table = TABLES[name]
+    rng = random.Random(f"{plan.seed}:{name}:{chunk}")
+    first = plan.first_id[name] + start
+    written = 0
+    connection.ensure_connection()
+    with connection.connection.cursor() as cursor:
+        with cursor.copy(f"COPY {table.db_table} ({', '.join(table.columns)}) FROM STDIN") as copy:
+            for row in table.rows(plan, rng, range(first, first + count)):
+                copy.write_row(row)
+                written += 1
+    return name, written
+
+
+def run_sql(statement):
+    """Run one statement, used to rebuild indexes in parallel"""
+    with connection.cursor() as cursor:
+        cursor.execute(statement)
+    return statement
+
+
+def deferrable_indexes(tables, counts):
+    """
+    Name and definition of the plain indexes worth rebuilding after the load, leaving primary keys and
+    unique indexes in place. Rebuilding only pays off when the load is at least as big as the table.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname, reltuples FROM pg_class WHERE oid = ANY(%s::regclass[])",
+            [[TABLES[name].db_table for name in tables]],
+        )
+        estimates = dict(cursor.fetchall())
+        tables = [name for name in tables if counts[name] >= estimates[TABLES[name].db_table]]
+        cursor.execute(
+            """
+            SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+            FROM pg_index AS i
+            WHERE i.indrelid = ANY(%s::regclass[]) AND NOT i.indisprimary AND NOT i.indisunique
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint AS c WHERE c.conindid = i.indexrelid)
+            """,
+            [[TABLES[name].db_table for name in tables]],
+        )
+        return cursor.fetchall()
+
+
+def reset_sequences(tables):
+    with connection.cursor() as cursor:
+        for name in tables:
+            db_table = TABLES[name].db_table
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 1)) FROM {db_table}",
+                [db_table],
+            )
+            cursor.execute(f"ANALYZE {db_table}")
+
+
+class Seeder:
+    """Load a SeedPlan stage by stage, with the chunks of each stage spread over worker processes"""
+
+    def __init__(self, plan, workers=1, defer_indexes=True, on_progress=None):
+        self.plan = plan
+        self.workers = workers
+        self.defer_indexes = defer_indexes
+        self.on_progress = on_progress or (lambda name, rows: None)
+
+    def map(self, func, tasks):
+        """Run func over tasks in this process, or on forked workers each with its own connection"""
+        if self.workers <= 1:
+            yield from map(func, tasks)
+            return
+        # Children must not share the parent's socket, they open their own connection on first use
+        connections.close_all()
+        with multiprocessing.get_context("fork").Pool(self.workers) as pool:
+            yield from pool.imap_unordered(func, list(tasks))
+
+    def run(self):
+        """Seed every table and return the rows written per table"""
+        self.plan.validate()
+        self.plan.allocate_ids()
+        if self.plan.counts["orders"] > 0:
+            self.plan.create_partitions()
+        tables = [name for name in TABLES if self.plan.counts[name] > 0]
+        indexes = deferrable_indexes(tables, self.plan.counts) if self.defer_indexes else []
+
+        written = dict.fromkeys(tables, 0)
+        with connection.cursor() as cursor:
+            for index_name, _ in indexes:
+                cursor.execute(f"DROP INDEX {index_name}")
+        try:
+            for stage in STAGES:
+                for name, rows in self.map(copy_chunk, self.plan.chunks(stage)):
+                    written[name] += rows
+                    self.on_progress(name, written[name])
+        finally:
+            # Django's foreign keys are deferred, so inside an outer transaction their checks are still
+            # pending, and Postgres refuses to build an index on a table with pending checks
+            if connection.in_atomic_block:
+                run_sql("SET CONSTRAINTS ALL IMMEDIATE")
+            # Rebuild the dropped indexes even when loading failed part way
+            for _ in self.map(run_sql, [definition for _, definition in indexes]):
+                pass
+
+        reset_sequences(tables)
+        return written
@@ -0,0 +1,59 @@
+"""
+Signals recording domain events of Users and Profiles in the outbox
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import outbox
+from core.models import Profile, User
+
+# Saves touching only these fields are bookkeeping rather than changes worth announcing
+IGNORED_FIELDS = {"last_login", "updated_at"}
+
+
+def user_payload(user):
+    return {
+        "id": user.pk,
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "is_active": user.is_active,
+    }
+
+
+def profile_payload(profile):
+    return {
+        "user": profile.user_id,
+        "display_name": profile.display_name,
+        "avatar": profile.avatar.name or None,
+        "bio": profile.bio,
+        "location": profile.location,
+    }
+
+
+def _ignored(update_fields):
+    return update_fields is not None and set(update_fields) <= IGNORED_FIELDS
+
+
+@receiver(post_save, sender=User)
+def user_saved(instance, created, update_fields, **kwargs):
+    if not _ignored(update_fields):
+        outbox.emit("user", "user.created" if created else "user.updated", instance.pk, user_payload(instance))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(instance, **kwargs):
+    outbox.emit("user", "user.deleted", instance.pk, {"id": instance.pk})
+
+
+@receiver(post_save, sender=Profile)
+def profile_saved(instance, created, update_fields, **kwargs):
+    if not _ignored(update_fields):
+        event_type = "profile.created" if created else "profile.updated"
+        outbox.emit("profile", event_type, instance.user_id, profile_payload(instance))
+
+
+@receiver(post_delete, sender=Profile)
+def profile_deleted(instance, **kwargs):
+    outbox.emit("profile", "profile.deleted", instance.user_id, {"user": instance.user_id})
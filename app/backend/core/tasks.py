@@ -0,0 +1,259 @@
+"""
+Background tasks queued in Postgres
+
+A function decorated with @task is queued with .enqueue(), which inserts a
+Task row in the caller's transaction: the task only becomes visible to
+workers when that transaction commits, and disappears with it on rollback, so
+a task never sees rows that were not committed. The insert also sends a
+NOTIFY, which Postgres delivers on commit, waking idle workers at once.
+
+Workers claim a batch of due tasks with FOR UPDATE SKIP LOCKED, highest
+priority first, so any number of worker processes share the queue without
+blocking each other. A task that raises is retried with exponential backoff
+until it runs out of attempts and is kept as failed, and tasks left running by
+a worker that died are queued again once they have been locked for too long.
+A live worker stamps a task's lock when it starts it, and keeps stamping it
+from a heartbeat thread while it runs, so tasks that run long or wait behind
+others of their batch are never taken for a dead worker's.
+"""
+
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models.functions import Now
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "core_tasks"
+BATCH_SIZE = getattr(settings, "TASK_BATCH_SIZE", 10)
+# Longest wait for a notification before polling for scheduled and retried tasks
+POLL_INTERVAL = getattr(settings, "TASK_POLL_INTERVAL", 5)
+# Tasks locked longer than this are assumed to belong to a dead worker
+LOCK_TIMEOUT = getattr(settings, "TASK_LOCK_TIMEOUT", 15 * 60)
+# How often the lock of a running task is stamped, well within LOCK_TIMEOUT
+HEARTBEAT_INTERVAL = getattr(settings, "TASK_HEARTBEAT_INTERVAL", LOCK_TIMEOUT / 5)
+RETRY_BASE_DELAY = getattr(settings, "TASK_RETRY_BASE_DELAY", 10)
+RETRY_MAX_DELAY = getattr(settings, "TASK_RETRY_MAX_DELAY", 60 * 60)
+
+CLAIM_SQL = """
+UPDATE core_task
+SET status = 'running', attempts = attempts + 1, locked_by = %(worker)s, locked_at = statement_timestamp()
+WHERE id IN (
+    SELECT id FROM core_task
+    WHERE status = 'queued' AND run_at <= statement_timestamp()
+    ORDER BY priority DESC, run_at, id
+    LIMIT %(limit)s
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id, name, args, kwargs, attempts, max_attempts
+"""
+
+HEARTBEAT_SQL = """
+UPDATE core_task SET locked_at = statement_timestamp() WHERE id = %s AND locked_by = %s AND status = 'running'
+"""
+
+REQUEUE_SQL = """
+UPDATE core_task SET status = 'queued', locked_by = '', locked_at = NULL
+WHERE id IN (
+    SELECT id FROM core_task
+    WHERE status = 'running' AND locked_at < statement_timestamp() - make_interval(secs => %(timeout)s)
+    FOR UPDATE SKIP LOCKED
+)
+"""
+
+_registry = {}
+
+
+class TaskFunction:
+    """A function that can run later on a worker, see task()"""
+
+    def __init__(self, func, name, priority, max_attempts):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, run_at=None, delay=None, priority=None, **kwargs):
+        """
+        Queue a run of the task with JSON-serialisable arguments, in the current transaction.
+        It runs once due, at run_at or after delay seconds when given.
+        """
+        if delay is not None:
+            run_at = timezone.now() + timedelta(seconds=delay)
+        # Tasks due now take the database's clock, the one claims compare against
+        scheduled = {"run_at": run_at} if run_at is not None else {}
+        queued = Task.objects.create(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts,
+            **scheduled,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, '')", [CHANNEL])
+        return queued
+
+
+def task(func=None, *, priority=0, max_attempts=5):
+    """Register a module-level function as a task, named by its import path"""
+
+    def register(func):
+        wrapped = TaskFunction(func, f"{func.__module__}.{func.__qualname__}", priority, max_attempts)
+        _registry[wrapped.name] = wrapped
+        return wrapped
+
+    return register(func) if func is not None else register
+
+
+def get_task(name):
+    """The task registered as name, importing its module first if needed"""
+    if name not in _registry:
+        import_string(name)
+    return _registry[name]
+
+
+def retry_delay(attempts):
+    """Seconds before retrying a task that failed its attempts-th run, doubling each time with jitter"""
+    delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class Worker:
+    """Claims and runs due tasks until stopped"""
+
+    def __init__(self, batch_size=BATCH_SIZE, poll_interval=POLL_INTERVAL):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = False
+
+    def claim(self):
+        with connection.cursor() as cursor:
+            cursor.execute(CLAIM_SQL, {"worker": self.name, "limit": self.batch_size})
+            rows = cursor.fetchall()
+        # Django leaves JSON columns of raw queries undecoded
+        return [
+            (task_id, name, json.loads(args), json.loads(kwargs), attempts, max_attempts)
+            for task_id, name, args, kwargs, attempts, max_attempts in rows
+        ]
+
+    @contextmanager
+    def heartbeat(self, task_id):
+        """Stamp the lock of a task now and then every HEARTBEAT_INTERVAL until it finishes"""
+        Task.objects.filter(pk=task_id, locked_by=self.name).update(locked_at=Now())
+        stopped = threading.Event()
+
+        def beat():
+            # Connections are per thread, so the stamps commit on their own whatever the task's transaction
+            try:
+                while not stopped.wait(HEARTBEAT_INTERVAL):
+                    try:
+                        with connection.cursor() as cursor:
+                            cursor.execute(HEARTBEAT_SQL, [task_id, self.name])
+                    except DatabaseError:
+                        logger.warning("Heartbeat of task %s failed", task_id, exc_info=True)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=beat, name=f"heartbeat-{task_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            thread.join()
+
+    def execute(self, task_id, name, args, kwargs, attempts, max_attempts):
+        try:
+            with self.heartbeat(task_id):
+                get_task(name)(*args, **kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            if attempts < max_attempts:
+                logger.warning("Task %s %s failed, attempt %s of %s", task_id, name, attempts, max_attempts)
+                run_at = timezone.now() + timedelta(seconds=retry_delay(attempts))
+                status = Task.Status.QUEUED
+            else:
+                logger.exception("Task %s %s failed for good after %s attempts", task_id, name, attempts)
+                run_at = timezone.now()
+                status = Task.Status.FAILED
+            Task.objects.filter(pk=task_id).update(
+                status=status, run_at=run_at, last_error=error, locked_by="", locked_at=None
+            )
+            return False
+        Task.objects.filter(pk=task_id).delete()
+        return True
+
+    def run_once(self):
+        """Run one batch of due tasks, returning how many were claimed"""
+        claimed = self.claim()
+        for row in claimed:
+            self.execute(*row)
+        return len(claimed)
+
+    def requeue_stale(self, timeout=LOCK_TIMEOUT):
+        """Queue again the tasks of workers that died while running them, returning how many"""
+        with connection.cursor() as cursor:
+            cursor.execute(REQUEUE_SQL, {"timeout": timeout})
+            return cursor.rowcount
+
+    def seconds_until_due(self):
+        """Seconds until the next scheduled task is due, capped at the poll interval"""
+        next_run = (
+            Task.objects.filter(status=Task.Status.QUEUED).order_by("run_at").values_list("run_at", flat=True).first()
+        )
+        if next_run is None:
+            return self.poll_interval
+        return min(max((next_run - timezone.now()).total_seconds(), 0), self.poll_interval)
+
+    def wait(self):
+        """Sleep until a task is enqueued or the next scheduled task is due"""
+        # A floor keeps a due task that another worker has locked from spinning this loop
+        timeout = max(self.seconds_until_due(), 0.1)
+        # Notifications arrive on the connection that listens, between transactions
+        for _ in connection.connection.notifies(timeout=timeout, stop_after=1):
+            pass
+
+    def listen(self):
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        self.listening = connection.connection
+
+    def run(self):
+        logger.info("Worker %s started", self.name)
+        self.listening = None
+        last_requeue = 0
+        while not self.stopping:
+            # A task that closed the connection also ended the LISTEN
+            if connection.connection is None or connection.connection is not self.listening:
+                self.listen()
+            if time.monotonic() - last_requeue > self.poll_interval:
+                if requeued := self.requeue_stale():
+                    logger.warning("Requeued %s tasks left running by dead workers", requeued)
+                last_requeue = time.monotonic()
+            # A full batch means more may be waiting, so only an incomplete one waits for news
+            if self.run_once() < self.batch_size and not self.stopping:
+                self.wait()
+        logger.info("Worker %s stopped", self.name)
+
+    def stop(self, *args):
+        self.stopping = True
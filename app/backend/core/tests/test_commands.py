@@ -2,26 +2,198 @@
 Test Custom Django Commands
 """
 
-# from unittest.mock import patch
-# from django.core.management import call_command
-# from django.db.utils import OperationalError
-# from psycopg import OperationalError as PsyCopgError
-# from django.test import SimpleTestCase
-
-# @patch('core.management.commands.wait_for_db.Command.check')
-# class CommandTests(SimpleTestCase):
-#     """Test Commands"""
-
-#     def test_wait_for_db_ready(self, patched_check):
-#         """Test waiting for the DB until ready"""
-#         patched_check.return_value = True
-#         call_command('wait_for_db')
-#         patched_check.assert_called_once_with(databases=['default'])
-
-#     @patch('time.sleep')
-#     def test_wait_for_db_delay(self, patched_sleep, patched_check):
-#         """Test waiting for the database when getting an Operational Error"""
-#         patched_check.side_effect = [OperationalError] * 2 + [PsyCopgError] * 3 + [True]
-#         call_command('wait_for_db')
-#         self.assertEqual(patched_check.call_count, 6)
-#         patched_check.assert_called_with(databases=['default'])
+from io import StringIO
+from unittest.mock import call, patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from psycopg import OperationalError as PsyCopgError
+
+from core import seeding
+from core.models import Brand, Category, Order, OrderItem, Product, Profile
+from orders.partitions import partitions
+
+
+@patch("core.management.commands.wait_for_db.Command.check")
+class CommandTests(SimpleTestCase):
+    """Test Commands"""
+
+    def test_wait_for_db_ready(self, patched_check):
+        """Test waiting for the DB until ready"""
+        patched_check.return_value = True
+        call_command("wait_for_db", stdout=StringIO())
+        patched_check.assert_called_once_with(databases=["default"])
+
+    @patch("time.sleep")
+    def test_wait_for_db_delay(self, patched_sleep, patched_check):
+        """Test waiting for the database when getting an Operational Error"""
+        patched_check.side_effect = [OperationalError] * 2 + [PsyCopgError] * 3 + [True]
+        call_command("wait_for_db", stdout=StringIO())
+        self.assertEqual(patched_check.call_count, 6)
+        patched_check.assert_called_with(databases=["default"])
+
+    @patch("time.sleep")
+    def test_wait_for_db_backs_off(self, patched_sleep, patched_check):
+        """Test retry delays double up to the maximum delay"""
+        patched_check.side_effect = [OperationalError] * 5 + [True]
+        call_command("wait_for_db", "--initial-delay=1", "--max-delay=4", stdout=StringIO())
+        self.assertEqual(patched_sleep.call_args_list, [call(1), call(2), call(4), call(4), call(4)])
+
+    @patch("time.sleep")
+    def test_wait_for_db_gives_up(self, patched_sleep, patched_check):
+        """Test the command fails once the timeout is exhausted"""
+        patched_check.side_effect = OperationalError
+        with self.assertRaises(CommandError):
+            call_command("wait_for_db", "--timeout=0", stdout=StringIO())
+        patched_sleep.assert_not_called()
+
+
+class WarmupCommandTests(TestCase):
+    """Test the warm-up command"""
+
+    def test_warmup_runs_every_step(self):
+        """Test each warm-up step is reported"""
+        out = StringIO()
+        call_command("warmup", stdout=out)
+        for step in ["import_urlconfs", "import_serializers", "prime_databases", "prebuild_schema"]:
+            self.assertIn(step, out.getvalue())
+        self.assertNotIn("failed", out.getvalue())
+
+    def test_warmup_continues_after_failure(self):
+        """Test a failing step does not stop the remaining steps"""
+        out = StringIO()
+        with patch("core.warmup.cache") as patched_cache:
+            patched_cache.get.side_effect = ConnectionError
+            call_command("warmup", stdout=out)
+        self.assertIn("prime_cache", out.getvalue())
+        self.assertIn("failed", out.getvalue())
+        self.assertIn("preload_cache_keys", out.getvalue())
+
+
+def seed(**options):
+    """Run the seed command with a small default catalog"""
+    defaults = {
+        "users": 30,
+        "brands": 5,
+        "categories": 20,
+        "products": 120,
+        "orders": 80,
+        "workers": 1,
+        "chunk_size": 50,
+    }
+    call_command("seed", stdout=StringIO(), **{**defaults, **options})
+
+
+class SeedCommandTests(TestCase):
+    """Test the seed command"""
+
+    def clear(self):
+        OrderItem.objects.all().delete()
+        Order.objects.all().delete()
+        Product.objects.all().delete()
+        Category.objects.filter(depth=1).delete()
+        for model in (Category, Brand, Profile, get_user_model()):
+            model.objects.all().delete()
+
+    def snapshot(self):
+        return (
+            list(get_user_model().objects.order_by("id").values_list("email", "first_name", "date_of_birth")),
+            list(Product.objects.order_by("id").values_list("sku", "name", "price", "brand_id", "category_id")),
+            list(Order.objects.order_by("id").values_list("user_id", "status", "total", "created_at")),
+            list(OrderItem.objects.order_by("id").values_list("order_id", "product_id", "quantity", "unit_price")),
+        )
+
+    def test_seed_creates_related_rows(self):
+        """Test seeding creates every table with consistent relations"""
+        seed()
+        self.assertEqual(get_user_model().objects.count(), 30)
+        self.assertEqual(Profile.objects.count(), 30)
+        self.assertEqual(Brand.objects.count(), 5)
+        self.assertEqual(Product.objects.count(), 120)
+        self.assertEqual(Order.objects.count(), 80)
+
+        user = get_user_model().objects.order_by("id").first()
+        self.assertTrue(user.check_password("password123"))
+        self.assertEqual(user.profile.user_id, user.id)
+
+        child = Category.objects.filter(depth=1).first()
+        self.assertEqual(child.path, f"{child.parent_id}/{child.id}/")
+        product = Product.objects.select_related("brand").first()
+        self.assertEqual(product.brand_name, product.brand.name)
+
+    def test_seed_orders(self):
+        """Test seeded orders fall in their monthly partitions in id order, with items adding up to their totals"""
+        seed()
+        self.assertEqual(Order.objects.count(), 80)
+        orders = list(Order.objects.order_by("id").prefetch_related("items"))
+        self.assertEqual([order.created_at for order in orders], sorted(order.created_at for order in orders))
+        for order in orders:
+            items = list(order.items.all())
+            self.assertTrue(1 <= len(items) <= seeding.MAX_LINES)
+            self.assertEqual(order.total, sum(item.quantity * item.unit_price for item in items))
+            self.assertEqual({item.created_at for item in items}, {order.created_at})
+            self.assertLessEqual(order.created_at, order.updated_at)
+        self.assertLessEqual({order.status for order in orders}, set(Order.Status.values))
+        self.assertIn("core_order_y2025m12", partitions("core_order"))
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM core_order_default")
+            self.assertEqual(cursor.fetchone(), (0,))
+
+    def test_seed_rejects_orders_without_products(self):
+        """Test orders cannot be seeded without products to reference"""
+        with self.assertRaises(CommandError):
+            seed(products=0)
+
+    def test_orders_default_to_none_without_users(self):
+        """Test a catalog-only seed leaves orders out unless they are asked for"""
+        call_command("seed", users=0, brands=5, categories=20, products=50, workers=1, stdout=StringIO())
+        self.assertEqual(Product.objects.count(), 50)
+        self.assertFalse(Order.objects.exists())
+
+    def test_seed_is_deterministic(self):
+        """Test the same seed on the same database produces the same rows"""
+        seed(seed=7)
+        first = self.snapshot()
+
+        self.clear()
+        seed(seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+        self.clear()
+        seed(seed=8)
+        self.assertNotEqual(self.snapshot()[1], first[1])
+
+    def test_seed_rebuilds_deferred_indexes(self):
+        """Test indexes dropped for the load exist again afterwards"""
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'core_product' ORDER BY 1")
+            before = cursor.fetchall()
+            seed()
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'core_product' ORDER BY 1")
+            self.assertEqual(cursor.fetchall(), before)
+
+    def test_new_rows_continue_the_sequences(self):
+        """Test rows created after seeding get ids after the seeded block"""
+        seed()
+        brand = Brand.objects.create(name="After Seed", slug="after-seed")
+        self.assertGreater(brand.id, Brand.objects.exclude(pk=brand.pk).order_by("-id").first().id)
+
+    def test_seed_rejects_products_without_brands(self):
+        """Test products cannot be seeded without brands to reference"""
+        with self.assertRaises(CommandError):
+            seed(brands=0)
+
+
+class SeedCommandWorkerTests(TransactionTestCase):
+    """Test the seed command with worker processes"""
+
+    def test_seed_with_workers(self):
+        """Test chunks loaded by forked workers all arrive"""
+        seed(workers=2, chunk_size=25)
+        self.assertEqual(get_user_model().objects.count(), 30)
+        self.assertEqual(Profile.objects.count(), 30)
+        self.assertEqual(Product.objects.count(), 120)
+        self.assertEqual(Order.objects.count(), 80)
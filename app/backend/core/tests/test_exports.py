@@ -0,0 +1,167 @@
+"""
+Test streaming exports
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from core import exports
+from core.helpers import API_Client
+from core.models import Order, Profile
+
+User = get_user_model()
+
+
+def export_url(name, file_format):
+    return reverse("export", args=[name, file_format])
+
+
+class ExportTestCase(TestCase):
+    """Base class with a few users, one with a profile, and an order"""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                email=f"user{n}@example.com",
+                password="password123",
+                first_name=f"First {n}",
+                last_name="Last, Jr.",
+                date_of_birth=date(1990, 1, n + 1),
+            )
+            for n in range(3)
+        ]
+        Profile.objects.create(user=self.users[0], display_name="Zero", location="Leeds", bio='Says "hi"\nTwice')
+        self.order = Order.objects.create(user=self.users[1], total=Decimal("12.50"))
+
+    def read(self, name, file_format="csv", compress=False, chunk_size=exports.CHUNK_SIZE):
+        data = b"".join(exports.stream(name, file_format, compress, chunk_size))
+        return gzip.decompress(data).decode() if compress else data.decode()
+
+
+class Export_Stream(ExportTestCase):
+    """Test encoding exports"""
+
+    def test_csv(self):
+        """Test the CSV has a header and a row per user in id order, quoting what needs it"""
+        rows = list(csv.DictReader(io.StringIO(self.read("users"))))
+        self.assertEqual([row["email"] for row in rows], [user.email for user in self.users])
+        self.assertEqual(rows[0]["last_name"], "Last, Jr.")
+        self.assertEqual(rows[0]["bio"], 'Says "hi"\nTwice')
+        self.assertEqual(rows[1]["display_name"], "")
+        self.assertNotIn("password", rows[0])
+
+    def test_csv_formulas_are_quoted(self):
+        """Test text a spreadsheet would run as a formula is prefixed with an apostrophe in CSV only"""
+        self.users[1].first_name = "=HYPERLINK(1)"
+        self.users[1].last_name = "-2+3"
+        self.users[1].save()
+        Profile.objects.create(user=self.users[1], display_name="@SUM(A1)", location="\tLeeds", bio="\r+1")
+        row = list(csv.DictReader(io.StringIO(self.read("users"))))[1]
+        self.assertEqual(row["first_name"], "'=HYPERLINK(1)")
+        self.assertEqual(row["last_name"], "'-2+3")
+        self.assertEqual(row["display_name"], "'@SUM(A1)")
+        self.assertEqual(row["location"], "'\tLeeds")
+        self.assertEqual(row["bio"], "'\r+1")
+        self.assertEqual(row["email"], self.users[1].email)
+
+        row = [json.loads(line) for line in self.read("users", "jsonl").splitlines()][1]
+        self.assertEqual(row["first_name"], "=HYPERLINK(1)")
+        self.assertEqual(row["bio"], "\r+1")
+
+    def test_jsonl(self):
+        """Test JSON Lines have an object per row with dates and decimals as strings"""
+        rows = [json.loads(line) for line in self.read("orders", "jsonl").splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], self.order.id)
+        self.assertEqual(rows[0]["email"], self.users[1].email)
+        self.assertEqual(rows[0]["total"], "12.50")
+        self.assertEqual(rows[0]["created_at"][:10], self.order.created_at.date().isoformat())
+
+        users = [json.loads(line) for line in self.read("users", "jsonl").splitlines()]
+        self.assertEqual(users[0]["date_of_birth"], "1990-01-01")
+        self.assertIsNone(users[1]["location"])
+
+    def test_gzip_in_blocks(self):
+        """Test a compressed export is one gzip stream whatever the number of blocks"""
+        with patch.object(exports, "BLOCK_SIZE", 100):
+            blocks = list(exports.stream("users", "csv", compress=True, chunk_size=1))
+            plain = list(exports.stream("users", "csv", chunk_size=1))
+        self.assertGreater(len(plain), 1)
+        self.assertEqual(gzip.decompress(b"".join(blocks)), b"".join(plain))
+
+    def test_rows_are_tuples(self):
+        """Test rows are read as plain tuples rather than model instances"""
+        row = next(exports.EXPORTS["users"].rows())
+        self.assertIsInstance(row, tuple)
+        self.assertEqual(row[:2], (self.users[0].id, self.users[0].email))
+
+
+class Export_Data_Command(ExportTestCase):
+    """Test the export command"""
+
+    def test_export_to_file(self):
+        """Test the command writes the export to a file, compressed when asked"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "users.jsonl.gz")
+            out = StringIO()
+            call_command("export_data", "users", "--format", "jsonl", "--gzip", "--output", path, stdout=out)
+            with gzip.open(path, "rt") as output:
+                self.assertEqual(output.read(), self.read("users", "jsonl"))
+        self.assertIn(f"to {path}", out.getvalue())
+
+
+class Export_API(ExportTestCase):
+    """Test downloading exports"""
+
+    def setUp(self):
+        super().setUp()
+        self.staff = User.objects.create_user(
+            email="staff@example.com", password="password123", date_of_birth=date(1980, 1, 1), is_staff=True
+        )
+        self.client = API_Client()
+
+    def test_staff_download(self):
+        """Test staff get a streamed attachment"""
+        self.client.authorize(self.staff)
+        response = self.client.get(export_url("users", "csv"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="users.csv"')
+        self.assertEqual(b"".join(response.streaming_content).decode(), self.read("users"))
+
+    def test_gzip_download(self):
+        """Test the download is gzipped when asked"""
+        self.client.authorize(self.staff)
+        response = self.client.get(export_url("orders", "jsonl"), {"gzip": "1"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="orders.jsonl.gz"')
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)).decode(), self.read("orders", "jsonl"))
+
+    def test_staff_only(self):
+        """Test other users and anonymous visitors cannot export"""
+        response = self.client.get(export_url("users", "csv"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.authorize(self.users[0])
+        response = self.client.get(export_url("users", "csv"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_unknown_export(self):
+        """Test unknown exports and formats are not found"""
+        self.client.authorize(self.staff)
+        self.assertEqual(self.client.get(export_url("products", "csv")).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(export_url("users", "xml")).status_code, status.HTTP_404_NOT_FOUND)
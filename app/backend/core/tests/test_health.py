@@ -0,0 +1,84 @@
+"""
+Tests for the Health and Readiness Endpoints
+"""
+
+from unittest.mock import Mock, patch
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from core.health import CachedProbe, database_probe, redis_probe
+
+
+class Cached_Probe(SimpleTestCase):
+    """Test probe result caching"""
+
+    def test_probe_result_is_cached(self):
+        """Test the check only runs once within the ttl"""
+        check = Mock()
+        probe = CachedProbe("test", check, ttl=60)
+        self.assertTrue(probe())
+        self.assertTrue(probe())
+        check.assert_called_once()
+
+    def test_probe_rechecks_after_ttl(self):
+        """Test the check runs again once the cached result expires"""
+        check = Mock()
+        probe = CachedProbe("test", check, ttl=0)
+        probe()
+        probe()
+        self.assertEqual(check.call_count, 2)
+
+    def test_probe_failure_is_cached(self):
+        """Test a failing check is reported unhealthy and not retried within the ttl"""
+        check = Mock(side_effect=ConnectionError)
+        probe = CachedProbe("test", check, ttl=60)
+        self.assertFalse(probe())
+        self.assertFalse(probe())
+        check.assert_called_once()
+
+
+class Health_Endpoints(TestCase):
+    """Test the healthz and readyz endpoints"""
+
+    def setUp(self):
+        database_probe.reset()
+        redis_probe.reset()
+
+    def test_healthz(self):
+        """Test liveness does not require authentication"""
+        res = self.client.get(reverse("healthz"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {"status": "ok"})
+
+    def test_readyz(self):
+        """Test readiness reports each dependency"""
+        with patch.object(redis_probe, "check"):
+            res = self.client.get(reverse("readyz"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["checks"], {"database": "ok", "cache": "ok"})
+
+    def test_readyz_dependency_down(self):
+        """Test readiness fails when a dependency is unreachable"""
+        with patch.object(redis_probe, "check", side_effect=ConnectionError):
+            res = self.client.get(reverse("readyz"))
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()["checks"]["cache"], "unavailable")
+
+    def test_readyz_probes_are_cached(self):
+        """Test repeated polling reuses the cached probe results"""
+        with patch.object(redis_probe, "check") as patched_check:
+            self.client.get(reverse("readyz"))
+            self.client.get(reverse("readyz"))
+        patched_check.assert_called_once()
+
+
+class Schema_Endpoint(TestCase):
+    """Test the OpenAPI schema endpoint"""
+
+    def test_schema_is_served(self):
+        """Test the cached schema lists the API routes"""
+        res = self.client.get(reverse("schema"), HTTP_ACCEPT="application/vnd.oai.openapi+json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("/auth/register/", res.json()["paths"])
@@ -0,0 +1,105 @@
+"""
+Tests for Request Metrics
+"""
+
+from datetime import date
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from core.helpers import API_Client
+from core.metrics import registry, render_metrics, request_stats
+from core.models import Profile
+
+
+class Request_Metrics(TestCase):
+    """Test per-view metrics collection and rendering"""
+
+    def setUp(self):
+        registry.reset()
+        self.client = API_Client()
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com",
+            password="password123",
+            date_of_birth=date(1990, 1, 1),
+        )
+        Profile.objects.create(user=self.user)
+        self.client.authorize(self.user)
+
+    def tearDown(self):
+        registry.reset()
+
+    def scrape(self, token=None):
+        """GET the metrics as Prometheus would, with token as its bearer token"""
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token is not None else {}
+        return Client().get(reverse("metrics"), **headers)
+
+    @patch("core.views.METRICS_TOKEN", "scrape-token")
+    def test_metrics_endpoint_format(self):
+        """Test the endpoint serves Prometheus text format"""
+        res = self.scrape("scrape-token")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn("# TYPE http_request_duration_seconds histogram", res.content.decode())
+
+    @patch("core.views.METRICS_TOKEN", "scrape-token")
+    def test_metrics_endpoint_needs_token(self):
+        """Test metrics are refused without the scrape token"""
+        self.assertEqual(self.scrape().status_code, status.HTTP_401_UNAUTHORIZED)
+        res = self.scrape("wrong")
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res["WWW-Authenticate"], 'Bearer realm="metrics"')
+
+    def test_metrics_endpoint_off_without_token(self):
+        """Test metrics are not served at all when no scrape token is configured"""
+        with patch("core.views.METRICS_TOKEN", ""):
+            res = self.scrape()
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_request_is_recorded_per_view(self):
+        """Test a request is counted against its url name"""
+        self.client.get(reverse("profile", args=[self.user.id]))
+        self.client.get(reverse("profile", args=[self.user.id]))
+        self.client.get(reverse("user-detail", args=[self.user.id]))
+
+        output = render_metrics()
+        self.assertIn('http_requests_total{view="profile",status="2xx"} 2', output)
+        self.assertIn('http_requests_total{view="user-detail",status="2xx"} 1', output)
+        self.assertIn('http_request_duration_seconds_count{view="profile"} 2', output)
+        self.assertIn('http_request_duration_seconds_bucket{view="profile",le="+Inf"} 2', output)
+
+    def test_status_class_is_recorded(self):
+        """Test failed requests are counted by status class"""
+        self.client.credentials()
+        self.client.get(reverse("profile", args=[self.user.id]))
+        self.assertIn('http_requests_total{view="profile",status="4xx"} 1', render_metrics())
+
+    def test_database_queries_are_counted(self):
+        """Test database activity is attributed to the view"""
+        self.client.get(reverse("profile", args=[self.user.id]))
+        output = render_metrics()
+        line = next(line for line in output.splitlines() if line.startswith('db_queries_total{view="profile"}'))
+        self.assertGreater(int(line.split()[-1]), 0)
+
+    def test_cache_lookups_are_counted(self):
+        """Test cache hits and misses are tracked for the running request"""
+        cache.set("metrics-test", "value")
+        request_stats.start()
+        cache.get("metrics-test")
+        cache.get("metrics-missing")
+        cache.get_many(["metrics-test", "metrics-missing"])
+        request_stats.active = False
+        self.assertEqual(request_stats.cache_hits, 2)
+        self.assertEqual(request_stats.cache_misses, 2)
+
+    def test_probe_endpoints_are_not_recorded(self):
+        """Test health and metrics polling is excluded"""
+        self.client.get(reverse("healthz"))
+        self.client.get(reverse("metrics"))
+        output = render_metrics()
+        self.assertNotIn('view="healthz"', output)
+        self.assertNotIn('view="metrics"', output)
@@ -5,10 +5,12 @@ Test Models in the system
 from datetime import date
 
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.db import IntegrityError
+from django.db.models import ProtectedError
 from django.test import TestCase
 
-from core.models import Profile
+from core.models import Brand, Category, Product, Profile
 
 
 def create_user(email="user@example.com", password="testpass123"):
@@ -66,3 +68,81 @@ class Profile_Model(TestCase):
                 display_name="Test User",
                 bio="Test bio",
             )
+
+
+class Catalog_Models(TestCase):
+    """Test Brand, Category and Product Models"""
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Acme", slug="acme")
+        self.category = Category.objects.create(name="Tools", slug="tools")
+
+    def test_product_sku_is_unique(self):
+        """Test two Products cannot share a SKU"""
+        Product.objects.create(sku="SKU-1", name="Hammer", price="9.99", brand=self.brand, category=self.category)
+        with self.assertRaises(IntegrityError):
+            Product.objects.create(sku="SKU-1", name="Saw", price="19.99", brand=self.brand, category=self.category)
+
+    def test_brand_with_products_cannot_be_deleted(self):
+        """Test deleting a Brand that still has Products is refused"""
+        Product.objects.create(sku="SKU-1", name="Hammer", price="9.99", brand=self.brand, category=self.category)
+        with self.assertRaises(ProtectedError):
+            self.brand.delete()
+
+
+class Category_Tree(TestCase):
+    """Test Category materialized paths"""
+
+    def setUp(self):
+        self.electronics = Category.objects.create(name="Electronics", slug="electronics")
+        self.computers = Category.objects.create(name="Computers", slug="computers", parent=self.electronics)
+        self.laptops = Category.objects.create(name="Laptops", slug="laptops", parent=self.computers)
+        self.garden = Category.objects.create(name="Garden", slug="garden")
+
+    def test_path_and_depth_on_create(self):
+        """Test a new Category stores the ids from the root down to itself"""
+        e, c, lap = self.electronics, self.computers, self.laptops
+        self.assertEqual(lap.path, f"{e.id}/{c.id}/{lap.id}/")
+        self.assertEqual((e.depth, c.depth, lap.depth), (0, 1, 2))
+
+    def test_descendants_and_ancestors(self):
+        """Test subtree and ancestor reads are a single query each"""
+        with self.assertNumQueries(1):
+            descendants = list(self.electronics.get_descendants())
+        self.assertCountEqual(descendants, [self.computers, self.laptops])
+
+        with self.assertNumQueries(1):
+            ancestors = list(self.laptops.get_ancestors(include_self=True))
+        self.assertEqual(ancestors, [self.electronics, self.computers, self.laptops])
+
+    def test_move_branch(self):
+        """Test moving a Category rewrites its whole subtree"""
+        self.computers.move_to(self.garden)
+        self.laptops.refresh_from_db()
+        self.assertEqual(self.laptops.path, f"{self.garden.id}/{self.computers.id}/{self.laptops.id}/")
+        self.assertEqual(self.laptops.depth, 2)
+        self.assertEqual(list(self.electronics.get_descendants()), [])
+
+        self.computers.move_to(None)
+        self.laptops.refresh_from_db()
+        self.assertEqual(self.laptops.path, f"{self.computers.id}/{self.laptops.id}/")
+        self.assertEqual(self.laptops.depth, 1)
+
+    def test_move_query_count_is_constant(self):
+        """Test moving a branch does not issue a query per descendant"""
+        for number in range(20):
+            Category.objects.create(name=f"Laptop {number}", slug=f"laptop-{number}", parent=self.laptops)
+        with self.assertNumQueries(5):
+            self.computers.move_to(self.garden)
+        self.assertEqual(self.garden.get_descendants().count(), 22)
+
+    def test_move_under_own_subtree_raises_error(self):
+        """Test a Category cannot be moved below one of its descendants"""
+        with self.assertRaises(ValueError):
+            self.electronics.move_to(self.laptops)
+
+    def test_clean_rejects_move_under_own_subtree(self):
+        """Test validation reports a move below a descendant before saving"""
+        self.electronics.parent = self.laptops
+        with self.assertRaises(ValidationError):
+            self.electronics.full_clean()
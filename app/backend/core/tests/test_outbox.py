@@ -0,0 +1,168 @@
+"""
+Test the transactional outbox
+"""
+
+import threading
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.urls import reverse
+from django_redis import get_redis_connection
+from rest_framework import status
+
+from core import outbox
+from core.helpers import API_Client
+from core.models import OutboxEvent, Profile
+
+
+def create_user(email="user@example.com"):
+    return get_user_model().objects.create_user(email=email, password="password123", date_of_birth=date(1990, 1, 1))
+
+
+class FailingSink:
+    def publish(self, events):
+        raise ConnectionError("sink is down")
+
+
+class Outbox_Events(TestCase):
+    """Test events are recorded with the changes that cause them"""
+
+    def test_emit_is_one_insert(self):
+        """Test recording an event costs a single query"""
+        with self.assertNumQueries(1):
+            outbox.emit("user", "user.updated", 1, {"id": 1})
+
+    def test_rolled_back_change_has_no_event(self):
+        """Test an event disappears with the transaction that recorded it"""
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            create_user()
+            raise RuntimeError
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_registration_events(self):
+        """Test registering records the new user and profile"""
+        response = API_Client().post(
+            reverse("register"),
+            {
+                "email": "new@example.com",
+                "password": "password123",
+                "password_confirm": "password123",
+                "first_name": "Jane",
+                "last_name": "Doe",
+                "date_of_birth": "1990-01-01",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user_id = response.data["user"]["id"]
+        events = list(OutboxEvent.objects.order_by("id").values_list("event_type", "key"))
+        self.assertEqual(events, [("user.created", str(user_id)), ("profile.created", str(user_id))])
+        self.assertNotIn("password", OutboxEvent.objects.get(event_type="user.created").payload)
+
+    def test_profile_update_event(self):
+        """Test updating a profile records its new state"""
+        user = create_user()
+        Profile.objects.create(user=user)
+        OutboxEvent.objects.all().delete()
+        client = API_Client()
+        client.authorize(user)
+        client.patch(reverse("profile", args=[user.id]), {"bio": "Hello"}, format="json")
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.event_type, event.payload["bio"]), ("profile.updated", "Hello"))
+
+    def test_login_bookkeeping_is_ignored(self):
+        """Test saving only the last login records nothing"""
+        user = create_user()
+        OutboxEvent.objects.all().delete()
+        user.save(update_fields=["last_login"])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+
+class Outbox_Publishing(TestCase):
+    """Test draining the outbox to a sink"""
+
+    def setUp(self):
+        self.sink = outbox.LocalSink()
+        for number in range(5):
+            outbox.emit("user", "user.updated", number, {"id": number})
+
+    def test_publish_in_order_and_delete(self):
+        """Test batches go out oldest first and leave the table"""
+        self.assertEqual(outbox.publish_batch(batch_size=3, sink=self.sink), 3)
+        self.assertEqual(outbox.publish_batch(batch_size=3, sink=self.sink), 2)
+        self.assertEqual(outbox.publish_batch(batch_size=3, sink=self.sink), 0)
+        self.assertEqual([event.key for event in self.sink.published], ["0", "1", "2", "3", "4"])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_failed_publish_keeps_events(self):
+        """Test events the sink did not take are published again later"""
+        with self.assertRaises(ConnectionError):
+            outbox.publish_batch(sink=FailingSink())
+        self.assertEqual(OutboxEvent.objects.count(), 5)
+
+    def test_publisher_lock(self):
+        """Test only the publisher holding the lock drains the outbox"""
+        publisher = outbox.Publisher(sink=self.sink)
+        self.assertEqual(publisher.drain(), 5)
+        results = []
+
+        def other_publisher():
+            # Advisory locks are per session, so the rival needs its own connection
+            try:
+                results.append(outbox.Publisher(sink=self.sink).try_acquire())
+            finally:
+                connection.close()
+
+        self.assertTrue(publisher.try_acquire())
+        try:
+            thread = threading.Thread(target=other_publisher)
+            thread.start()
+            thread.join()
+        finally:
+            publisher.release()
+        self.assertEqual(results, [False])
+
+    def test_command(self):
+        """Test the command can drain the outbox once"""
+        redis = get_redis_connection("default")
+        self.addCleanup(redis.delete, outbox.stream_name("user"))
+        out = StringIO()
+        call_command("publish_outbox", "--once", stdout=out)
+        self.assertIn("Published 5 events", out.getvalue())
+
+
+class Redis_Streams(TestCase):
+    """Test publishing to Redis Streams and reading through a consumer group"""
+
+    def setUp(self):
+        self.redis = get_redis_connection("default")
+        self.redis.delete(outbox.stream_name("test"))
+        self.addCleanup(self.redis.delete, outbox.stream_name("test"))
+
+    def test_consumer_group_delivery(self):
+        """Test a consumer gets every event, and unacknowledged ones again until it acknowledges them"""
+        for number in range(3):
+            outbox.emit("test", "test.happened", number, {"number": number})
+        outbox.publish_batch(sink=outbox.RedisStreamSink())
+
+        consumer = outbox.StreamConsumer("test", "indexer", "indexer-1", block_ms=10)
+        events = consumer.read()
+        self.assertEqual([event["payload"] for event in events], [{"number": n} for n in range(3)])
+
+        # Not acknowledged, so the same consumer reads them again
+        self.assertEqual([event["id"] for event in consumer.read()], [event["id"] for event in events])
+        consumer.ack(events)
+        self.assertEqual(consumer.read(), [])
+
+    def test_groups_keep_separate_offsets(self):
+        """Test each group reads the stream independently"""
+        outbox.emit("test", "test.happened", 1, {})
+        outbox.publish_batch(sink=outbox.RedisStreamSink())
+        seen = []
+        for group in ("indexer", "analytics"):
+            outbox.StreamConsumer("test", group, "worker", block_ms=10).consume(seen.extend)
+        self.assertEqual([event["key"] for event in seen], ["1", "1"])
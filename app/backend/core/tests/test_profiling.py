@@ -0,0 +1,163 @@
+"""
+Tests for On-Demand Request Profiling
+"""
+
+import json
+import pstats
+import tempfile
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.test import Client as HttpTestClient
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from core.helpers import API_Client
+from core.models import Profile, RequestProfile
+from core.profiling import Tracer, make_token
+
+
+def fibonacci(n):
+    """Recursive helper used to exercise the tracer"""
+    return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)
+
+
+class Profiler_Tracer(TestCase):
+    """Test the tracer output formats"""
+
+    def test_pstats_output_loads(self):
+        """Test the marshalled stats load with pstats and count recursive calls"""
+        tracer = Tracer()
+        self.assertEqual(tracer.run(fibonacci, 10), 55)
+
+        with tempfile.NamedTemporaryFile(suffix=".prof") as file:
+            file.write(tracer.pstats_data())
+            file.flush()
+            stats = pstats.Stats(file.name)
+
+        entry = next(value for key, value in stats.stats.items() if key[2] == "fibonacci")
+        primitive_calls, total_calls = entry[0], entry[1]
+        self.assertEqual(primitive_calls, 1)
+        self.assertEqual(total_calls, 177)
+
+    def test_speedscope_events_are_balanced(self):
+        """Test every opened frame is closed in order"""
+        tracer = Tracer()
+        tracer.run(fibonacci, 5)
+        document = json.loads(tracer.speedscope_data("fibonacci"))
+
+        stack = []
+        for event in document["profiles"][0]["events"]:
+            if event["type"] == "O":
+                stack.append(event["frame"])
+            else:
+                self.assertEqual(stack.pop(), event["frame"])
+        self.assertEqual(stack, [])
+
+    def test_event_log_is_capped(self):
+        """Test the event log stops growing at the cap but stays balanced"""
+        tracer = Tracer(max_events=10)
+        tracer.run(fibonacci, 10)
+        events = json.loads(tracer.speedscope_data("fibonacci"))["profiles"][0]["events"]
+        opened = sum(1 for event in events if event["type"] == "O")
+        self.assertLessEqual(opened, 10)
+        self.assertEqual(opened * 2, len(events))
+
+
+class Request_Profiling(TestCase):
+    """Test profiling requests through the middleware"""
+
+    def setUp(self):
+        self.client = API_Client()
+        self.staff = get_user_model().objects.create_user(
+            email="staff@mail.com",
+            password="password123",
+            date_of_birth=date(1990, 1, 1),
+            is_staff=True,
+        )
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com",
+            password="password123",
+            date_of_birth=date(1990, 1, 1),
+        )
+        Profile.objects.create(user=self.user)
+        self.client.authorize(self.user)
+        self.url = reverse("profile", args=[self.user.id])
+
+    def test_no_token_is_not_profiled(self):
+        """Test ordinary requests are not profiled"""
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-Profile-Id", res)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_staff_token_profiles_request(self):
+        """Test a staff token profiles the request and records its queries"""
+        res = self.client.get(self.url, HTTP_X_PROFILE=make_token(self.staff))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        profile = RequestProfile.objects.get(pk=res["X-Profile-Id"])
+        self.assertEqual(profile.user, self.staff)
+        self.assertEqual(profile.path, self.url)
+        self.assertEqual(profile.query_count, len(profile.queries))
+        self.assertGreater(profile.query_count, 0)
+        self.assertIn("core_profile", " ".join(query["sql"] for query in profile.queries))
+
+    def test_query_parameter_token(self):
+        """Test the token can be passed as a query parameter and is not stored"""
+        res = self.client.get(self.url, {"_profile": make_token(self.staff)})
+        profile = RequestProfile.objects.get(pk=res["X-Profile-Id"])
+        self.assertEqual(profile.path, self.url)
+
+    def test_non_staff_token_is_ignored(self):
+        """Test a token issued to a non-staff user does nothing"""
+        res = self.client.get(self.url, HTTP_X_PROFILE=make_token(self.user))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_tampered_token_is_ignored(self):
+        """Test an invalid signature does nothing"""
+        res = self.client.get(self.url, HTTP_X_PROFILE=make_token(self.staff) + "x")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(RequestProfile.objects.exists())
+
+
+class Request_Profile_Admin(TestCase):
+    """Test retrieving profiles from the admin"""
+
+    def setUp(self):
+        self.admin_user = get_user_model().objects.create_superuser(
+            email="admin@example.com",
+            password="password123",
+            date_of_birth=date(1990, 1, 1),
+        )
+        self.client = HttpTestClient()
+        self.client.force_login(self.admin_user)
+        res = self.client.get(reverse("healthz"), HTTP_X_PROFILE=make_token(self.admin_user))
+        self.profile = RequestProfile.objects.get(pk=res["X-Profile-Id"])
+
+    def test_profile_list(self):
+        """Test the changelist shows profiles and a profiling token"""
+        res = self.client.get(reverse("admin:core_requestprofile_changelist"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertContains(res, "X-Profile:")
+        self.assertContains(res, "/healthz")
+
+    def test_profile_detail(self):
+        """Test the profile page links to the downloads"""
+        res = self.client.get(reverse("admin:core_requestprofile_change", args=[self.profile.pk]))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertContains(res, reverse("admin:core_requestprofile_pstats", args=[self.profile.pk]))
+
+    def test_download_pstats(self):
+        """Test the pstats file can be downloaded"""
+        res = self.client.get(reverse("admin:core_requestprofile_pstats", args=[self.profile.pk]))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, bytes(self.profile.pstats))
+
+    def test_download_speedscope(self):
+        """Test the speedscope file can be downloaded"""
+        res = self.client.get(reverse("admin:core_requestprofile_speedscope", args=[self.profile.pk]))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(res.content)["profiles"][0]["type"], "evented")
@@ -0,0 +1,187 @@
+"""
+Test the Postgres task queue
+"""
+
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+runs = []
+_runs_lock = threading.Lock()
+
+
+@tasks.task
+def record(value):
+    with _runs_lock:
+        runs.append(value)
+
+
+@tasks.task(max_attempts=2)
+def explode():
+    raise ValueError("boom")
+
+
+@tasks.task
+def linger(seconds):
+    """Record the lock of the running task as it starts and after seconds"""
+    lock = Task.objects.filter(status=Task.Status.RUNNING).order_by("-locked_at").values_list("locked_at", flat=True)
+    started = lock.first()
+    time.sleep(seconds)
+    with _runs_lock:
+        runs.append((started, lock.first()))
+
+
+class Task_Queue(TestCase):
+    """Test enqueueing, claiming and retrying tasks"""
+
+    def setUp(self):
+        runs.clear()
+        self.worker = tasks.Worker(batch_size=10)
+
+    def test_enqueue_joins_the_transaction(self):
+        """Test a task enqueued in a transaction that rolls back is never queued"""
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            record.enqueue("lost")
+            raise RuntimeError
+        self.assertFalse(Task.objects.exists())
+
+    def test_success_deletes_task(self):
+        """Test a task runs with its arguments and leaves the queue"""
+        record.enqueue("done")
+        self.assertEqual(self.worker.run_once(), 1)
+        self.assertEqual(runs, ["done"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_priority_order(self):
+        """Test higher priorities are claimed first, then the longest due"""
+        record.enqueue("low", priority=-1)
+        record.enqueue("first")
+        record.enqueue("second")
+        record.enqueue("high", priority=5)
+        worker = tasks.Worker(batch_size=1)
+        while worker.run_once():
+            pass
+        self.assertEqual(runs, ["high", "first", "second", "low"])
+
+    def test_scheduled_task(self):
+        """Test a delayed task waits until it is due"""
+        queued = record.enqueue("later", delay=60)
+        self.assertEqual(self.worker.run_once(), 0)
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        self.assertEqual(self.worker.run_once(), 1)
+
+    def test_retry_with_backoff(self):
+        """Test a failing task is retried later and kept as failed once out of attempts"""
+        queued = explode.enqueue()
+        self.worker.run_once()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.Status.QUEUED, 1))
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=tasks.RETRY_BASE_DELAY * 0.4))
+        self.assertIn("ValueError: boom", queued.last_error)
+
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        self.worker.run_once()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.Status.FAILED, 2))
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_retry_delay_doubles(self):
+        """Test the backoff doubles per attempt up to the maximum"""
+        self.assertLessEqual(tasks.retry_delay(3), tasks.RETRY_BASE_DELAY * 4)
+        self.assertGreaterEqual(tasks.retry_delay(3), tasks.RETRY_BASE_DELAY * 2)
+        self.assertLessEqual(tasks.retry_delay(50), tasks.RETRY_MAX_DELAY)
+
+    def test_requeue_stale(self):
+        """Test tasks locked too long by a dead worker are queued again"""
+        record.enqueue("orphan")
+        self.worker.claim()
+        self.assertEqual(self.worker.requeue_stale(timeout=60), 0)
+        Task.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(self.worker.requeue_stale(timeout=60), 1)
+        self.assertEqual(self.worker.run_once(), 1)
+        self.assertEqual(runs, ["orphan"])
+
+    def test_command_arguments(self):
+        """Test the worker command refuses nonsensical arguments"""
+        with self.assertRaises(CommandError):
+            call_command("run_worker", "--processes", "0", stdout=StringIO())
+
+
+class Concurrent_Workers(TransactionTestCase):
+    """Test workers on their own connections share the queue"""
+
+    def setUp(self):
+        runs.clear()
+
+    def test_each_task_runs_once(self):
+        """Test workers claiming at the same time skip each other's tasks"""
+        with transaction.atomic():
+            for number in range(200):
+                record.enqueue(number)
+
+        def drain():
+            worker = tasks.Worker(batch_size=5)
+            try:
+                while worker.run_once():
+                    pass
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=drain) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(runs), list(range(200)))
+        self.assertFalse(Task.objects.exists())
+
+    def test_running_tasks_keep_their_lock(self):
+        """Test a task's lock is stamped when it starts and while it runs, so it is never taken for stale"""
+        with transaction.atomic():
+            linger.enqueue(0.5)
+            linger.enqueue(0.5)
+        worker = tasks.Worker(batch_size=2)
+        claimed_at = timezone.now()
+        with patch.object(tasks, "HEARTBEAT_INTERVAL", 0.1):
+            self.assertEqual(worker.run_once(), 2)
+        (first_start, first_end), (second_start, second_end) = runs
+        self.assertGreater(first_end, first_start)
+        # The second task waited behind the first, its lock was stamped when it started
+        self.assertGreaterEqual(second_start, claimed_at + timedelta(seconds=0.5))
+        self.assertGreater(second_end, second_start)
+
+    def test_notify_wakes_worker(self):
+        """Test an idle worker runs a new task as soon as it is committed, without waiting to poll"""
+        worker = tasks.Worker(poll_interval=30)
+
+        def run():
+            try:
+                worker.run()
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        try:
+            # Let the worker reach its wait before the task exists
+            time.sleep(0.5)
+            started = time.monotonic()
+            record.enqueue("now")
+            while not runs and time.monotonic() - started < 10:
+                time.sleep(0.01)
+            self.assertEqual(runs, ["now"])
+            self.assertLess(time.monotonic() - started, 5)
+        finally:
+            worker.stop()
+            record.enqueue("wake up")
+            thread.join()
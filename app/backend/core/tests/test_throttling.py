@@ -0,0 +1,136 @@
+"""
+Test rate limiting
+"""
+
+from datetime import date
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django_redis import get_redis_connection
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+from core.helpers import API_Client
+
+LOGIN_URL = reverse("login")
+PRODUCTS_URL = reverse("product-list")
+
+
+def rates(**changed):
+    """REST_FRAMEWORK settings with some throttle rates changed"""
+    return {
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": {**settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"], **changed},
+    }
+
+
+class Token_Bucket_Throttle(TestCase):
+    """Test throttling requests with token buckets"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.credentials = {"email": "nobody@example.com", "password": "wrong"}
+
+    def login(self, client=None, **extra):
+        return (client or self.client).post(LOGIN_URL, self.credentials, format="json", **extra)
+
+    @override_settings(REST_FRAMEWORK=rates(login="3/min"))
+    def test_endpoint_limit(self):
+        """Test an endpoint scope allows a burst of its rate, then refuses with a Retry-After"""
+        remaining = [self.login()["RateLimit-Remaining"] for _ in range(3)]
+        self.assertEqual(remaining, ["2", "1", "0"])
+
+        response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["RateLimit-Limit"], "3")
+        self.assertEqual(response["RateLimit-Remaining"], "0")
+        # A token every 20 seconds, part of one refilled since the first request
+        self.assertIn(int(response["Retry-After"]), range(15, 21))
+        self.assertIn(int(response["RateLimit-Reset"]), range(55, 61))
+
+    @override_settings(REST_FRAMEWORK=rates(login="3/min"))
+    def test_bucket_refills(self):
+        """Test tokens come back at the rate"""
+        for _ in range(3):
+            self.login()
+        redis = get_redis_connection("default")
+        key = f"{throttling.KEY_PREFIX}:login:ip:127.0.0.1"
+        # Move the bucket's last update a token's worth into the past
+        redis.hset(key, "at", float(redis.hget(key, "at")) - 20)
+        self.assertEqual(self.login().status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.login().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(REST_FRAMEWORK=rates(login="1/min"))
+    def test_clients_have_their_own_buckets(self):
+        """Test anonymous clients are limited by address"""
+        self.login()
+        self.assertEqual(self.login().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.login(REMOTE_ADDR="10.0.0.2").status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(REST_FRAMEWORK=rates(login="1/min"))
+    def test_forwarded_for_ignored_without_proxies(self):
+        """Test a client cannot get fresh buckets by sending a different X-Forwarded-For each time"""
+        self.assertEqual(self.login(HTTP_X_FORWARDED_FOR="10.1.0.1").status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.login(HTTP_X_FORWARDED_FOR="10.1.0.2")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(REST_FRAMEWORK={**rates(login="1/min"), "NUM_PROXIES": 1})
+    def test_forwarded_for_behind_proxy(self):
+        """Test behind a proxy clients are told apart by the address it forwards"""
+        self.assertEqual(self.login(HTTP_X_FORWARDED_FOR="10.1.0.1").status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.login(HTTP_X_FORWARDED_FOR="10.1.0.2").status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.login(HTTP_X_FORWARDED_FOR="10.1.0.2")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(REST_FRAMEWORK=rates(user="2/min"))
+    def test_user_limit(self):
+        """Test signed in users are limited by account, whatever their address"""
+        users = [
+            get_user_model().objects.create_user(
+                email=f"user{n}@example.com", password="password123", date_of_birth=date(1990, 1, 1)
+            )
+            for n in range(2)
+        ]
+        client = API_Client()
+        client.authorize(users[0])
+        url = reverse("user-detail", args=[users[0].pk])
+        self.assertEqual(client.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(client.get(url, REMOTE_ADDR="10.0.0.2").status_code, status.HTTP_200_OK)
+        self.assertEqual(client.get(url).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        other = API_Client()
+        other.authorize(users[1])
+        self.assertEqual(other.get(reverse("user-detail", args=[users[1].pk])).status_code, status.HTTP_200_OK)
+
+    @override_settings(REST_FRAMEWORK=rates(anon=None, login=None))
+    def test_scopes_without_rate(self):
+        """Test scopes with no rate are not limited"""
+        response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertNotIn("RateLimit-Limit", response)
+
+    def test_tightest_bucket_reported(self):
+        """Test the headers report the bucket closest to running out"""
+        response = self.login()
+        self.assertEqual(response["RateLimit-Limit"], "10")
+        self.assertEqual(response["RateLimit-Remaining"], "9")
+
+    def test_fails_open(self):
+        """Test requests are let through when Redis is unavailable"""
+        with patch.object(throttling, "get_redis_connection") as redis:
+            redis.return_value.register_script.return_value.side_effect = RedisConnectionError
+            response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertNotIn("RateLimit-Limit", response)
+
+    def test_cacheable_responses_have_no_headers(self):
+        """Test responses a CDN may cache do not carry one client's limits"""
+        response = self.client.get(PRODUCTS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("Surrogate-Key", response)
+        self.assertNotIn("RateLimit-Limit", response)
@@ -0,0 +1,159 @@
+"""
+Rate limiting with Redis token buckets
+
+Every request draws a token from the bucket of its client, the user when
+signed in and the IP address otherwise, and from the bucket of its endpoint
+when the view names a throttle_scope, such as login. A bucket holds as many
+tokens as its rate allows per period and refills continuously, so a client
+can burst up to the limit and is then held to the rate.
+
+All the buckets of a request are checked and drawn from by one Lua script,
+in a single round trip, and the script reads the time from Redis, so workers
+on different hosts share limits exactly without racing each other or
+depending on their clocks. Rate limiting fails open: when Redis is
+unavailable requests are let through rather than refused.
+
+The tightest bucket of each request is reported in RateLimit-Limit,
+RateLimit-Remaining and RateLimit-Reset headers, see RateLimitMiddleware.
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "throttle"
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+# KEYS: buckets. ARGV: capacity and tokens refilled per second of each bucket, in KEYS order
+# Draws a token from every bucket when all of them have one, and from none otherwise.
+# Returns whether the request is allowed, the index of the bucket with the fewest tokens left,
+# how many it has left, and the seconds until it allows a request and until it is full again
+TAKE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local allowed = 1
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local bucket = redis.call('HMGET', key, 'tokens', 'at')
+    local tokens = capacity
+    if bucket[1] then
+        tokens = math.min(capacity, tonumber(bucket[1]) + math.max(now - tonumber(bucket[2]), 0) * rate)
+    end
+    levels[i] = tokens
+    if tokens < 1 then
+        allowed = 0
+    end
+end
+local tightest, wait, reset = 1, 0, 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local tokens = levels[i] - allowed
+    levels[i] = tokens
+    local full_in = (capacity - tokens) / rate
+    redis.call('HSET', key, 'tokens', tokens, 'at', now)
+    redis.call('PEXPIRE', key, math.ceil(full_in * 1000) + 1000)
+    if tokens < levels[tightest] or i == 1 then
+        tightest = i
+        reset = full_in
+        wait = 0
+        if tokens < 1 then
+            wait = (1 - tokens) / rate
+        end
+    end
+end
+return {allowed, tightest - 1, math.floor(math.max(levels[tightest], 0)), tostring(wait), tostring(reset)}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """The state of a request's tightest bucket, for its response headers"""
+
+    limit: int
+    remaining: int
+    reset: float
+
+
+def parse_rate(rate):
+    """(capacity, tokens per second) of a rate such as '10/min'"""
+    count, period = rate.split("/")
+    count = int(count)
+    return count, count / PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle requests with token buckets in Redis, by client and by endpoint, using the
+    DEFAULT_THROTTLE_RATES of the "user" and "anon" scopes and of the view's throttle_scope
+    """
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_buckets(self, request, view):
+        """(scope, client) of each bucket the request draws from, signed in users by id and others by IP"""
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            scope, client = "user", f"user:{user.pk}"
+        else:
+            scope, client = "anon", f"ip:{self.get_ident(request)}"
+        buckets = [(scope, client)]
+        if endpoint_scope := getattr(view, "throttle_scope", None):
+            buckets.append((endpoint_scope, client))
+        return buckets
+
+    def allow_request(self, request, view):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        # A scope without a rate is not limited
+        buckets = [
+            (f"{KEY_PREFIX}:{scope}:{client}", parse_rate(rates[scope]))
+            for scope, client in self.get_buckets(request, view)
+            if rates.get(scope)
+        ]
+        if not buckets:
+            return True
+
+        try:
+            script = get_redis_connection("default").register_script(TAKE_SCRIPT)
+            allowed, tightest, remaining, wait, reset = script(
+                keys=[key for key, _ in buckets],
+                args=[value for _, rate in buckets for value in rate],
+            )
+        except RedisError:
+            logger.warning("Rate limits not applied, Redis is unavailable", exc_info=True)
+            return True
+
+        # Set on the Django request, which the middleware sees
+        request._request.rate_limit = RateLimit(buckets[tightest][1][0], remaining, float(reset))
+        self.retry_after = float(wait)
+        return bool(allowed)
+
+    def wait(self):
+        return self.retry_after
+
+
+def reset():
+    """Refill every bucket"""
+    redis = get_redis_connection("default")
+    keys = list(redis.scan_iter(f"{KEY_PREFIX}:*", count=1000))
+    if keys:
+        redis.delete(*keys)
+
+
+def headers(rate_limit):
+    """The RateLimit response headers of a request's tightest bucket"""
+    return {
+        "RateLimit-Limit": str(rate_limit.limit),
+        "RateLimit-Remaining": str(rate_limit.remaining),
+        "RateLimit-Reset": str(math.ceil(rate_limit.reset)),
+    }
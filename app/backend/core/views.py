@@ -0,0 +1,129 @@
+"""
+Core API Views
+"""
+
+import hmac
+import threading
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import translation
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from core.exports import EXPORTS, FORMATS, stream
+from core.health import database_probe, redis_probe
+from core.metrics import render_metrics
+
+# Metrics give away traffic and latency by route, so they are only served to a scraper holding this token
+METRICS_TOKEN = getattr(settings, "METRICS_TOKEN", "")
+
+_schemas = {}
+_schema_lock = threading.Lock()
+
+
+def get_openapi_schema(version=None):
+    """Return the public OpenAPI schema, generating it once per process"""
+    key = (version, translation.get_language())
+    schema = _schemas.get(key)
+    if schema is None:
+        with _schema_lock:
+            schema = _schemas.get(key)
+            if schema is None:
+                generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(api_version=version)
+                schema = _schemas[key] = generator.get_schema(request=None, public=True)
+    return schema
+
+
+class SchemaView(SpectacularAPIView):
+    """
+    OpenAPI schema served from the per-process cache
+    GET - schema/
+    """
+
+    def _get_schema_response(self, request):
+        version = self.api_version or request.version or self._get_version_parameter(request)
+        return Response(
+            data=get_openapi_schema(version),
+            headers={"Content-Disposition": f'inline; filename="{self._get_filename(request, version)}"'},
+        )
+
+
+class ExportView(APIView):
+    """
+    Staff download of every row of an export, streamed as it is read
+    GET - exports/{name}.{csv,jsonl}
+    """
+
+    # Sessions too, so staff signed in to the admin can download from the browser
+    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("name", str, OpenApiParameter.PATH, enum=sorted(EXPORTS)),
+            OpenApiParameter("file_format", str, OpenApiParameter.PATH, enum=sorted(FORMATS)),
+            OpenApiParameter("gzip", bool, description="Compress the download with gzip"),
+        ],
+        responses={(200, content_type): OpenApiTypes.BINARY for content_type in FORMATS.values()},
+    )
+    def get(self, request, name, file_format):
+        if name not in EXPORTS or file_format not in FORMATS:
+            raise NotFound()
+        compress = request.query_params.get("gzip") in ("1", "true")
+        response = StreamingHttpResponse(
+            stream(name, file_format, compress),
+            content_type="application/gzip" if compress else f"{FORMATS[file_format]}; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{EXPORTS[name].filename(file_format, compress)}"'
+        response["Cache-Control"] = "no-store"
+        return response
+
+
+def healthz(request):
+    """
+    Liveness probe - the process is up and serving requests
+    GET - healthz
+    """
+    return JsonResponse({"status": "ok"})
+
+
+def readyz(request):
+    """
+    Readiness probe - the database and Redis are reachable.
+    Probe results are cached so load balancer polling never hammers them.
+    GET - readyz
+    """
+    checks = {
+        "database": database_probe(),
+        "cache": redis_probe(),
+    }
+    ready = all(checks.values())
+    return JsonResponse(
+        {
+            "status": "ok" if ready else "unavailable",
+            "checks": {name: "ok" if ok else "unavailable" for name, ok in checks.items()},
+        },
+        status=200 if ready else 503,
+    )
+
+
+def metrics(request):
+    """
+    Prometheus metrics aggregated across every worker, for requests bearing METRICS_TOKEN
+    GET - metrics
+    """
+    if not METRICS_TOKEN:
+        raise Http404
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        return HttpResponse(status=401, headers={"WWW-Authenticate": 'Bearer realm="metrics"'})
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
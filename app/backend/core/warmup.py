@@ -0,0 +1,101 @@
+"""
+Process warm-up
+
+Pays the cold-start costs (imports, connections, schema generation and
+hot cache keys) before the first real request instead of during it.
+"""
+
+import logging
+import time
+from importlib import import_module
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+
+logger = logging.getLogger(__name__)
+
+_warmers = []
+
+
+def register_warmer(func):
+    """Register a callable that preloads hot cache keys during warm-up"""
+    _warmers.append(func)
+    return func
+
+
+def import_urlconfs():
+    """Import every included URLconf, and with it the views it routes to"""
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+
+    resolver = get_resolver()
+    walk(resolver.url_patterns)
+    _ = resolver.reverse_dict
+
+
+def import_serializers():
+    """Import the serializers module of every installed app that has one"""
+    for app_config in apps.get_app_configs():
+        try:
+            import_module(f"{app_config.name}.serializers")
+        except ModuleNotFoundError as exc:
+            if exc.name != f"{app_config.name}.serializers":
+                raise
+
+
+def prime_databases():
+    """Open a connection to every configured database"""
+    for alias in connections:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+
+def prime_cache():
+    """Open a connection to the cache backend"""
+    cache.get("warmup:ping")
+
+
+def prebuild_schema():
+    """Generate the OpenAPI schema so /schema/ is served from memory"""
+    from core.views import get_openapi_schema
+
+    get_openapi_schema()
+
+
+def preload_cache_keys():
+    """Run the warmers registered by installed apps"""
+    for warmer in _warmers:
+        warmer()
+
+
+STEPS = [
+    import_urlconfs,
+    import_serializers,
+    prime_databases,
+    prime_cache,
+    prebuild_schema,
+    preload_cache_keys,
+]
+
+
+def warm_up():
+    """
+    Run every warm-up step and return their timings in seconds.
+    A failing step is logged and timed as None so start-up is never blocked.
+    """
+    timings = {}
+    for step in STEPS:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("Warm-up step %s failed", step.__name__)
+            timings[step.__name__] = None
+            continue
+        timings[step.__name__] = time.perf_counter() - started
+    return timings
@@ -0,0 +1,20 @@
+"""
+Django command to release expired inventory reservations
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventory.reservations import REAP_BATCH_SIZE, reap_expired
+
+
+class Command(BaseCommand):
+    """Hand the units of expired reservations back to stock, one locked batch at a time"""
+
+    help = "Release expired inventory reservations"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=REAP_BATCH_SIZE, help="Reservations released per batch")
+
+    def handle(self, *args, **options):
+        released = reap_expired(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Released {released:,} expired reservations"))
@@ -0,0 +1,178 @@
+"""
+Inventory reservations
+
+Reserving takes units with a single conditional UPDATE that only succeeds
+while enough units are left, so concurrent buyers never read, check and write
+back a stock level and the row lock is held for one statement. Very hot
+products can spread their units over StockShard rows, where each buyer takes
+the first shard no one else has locked. Reservations that are neither
+confirmed nor released expire, and the reaper hands their units back in
+batches that skip rows another reaper is already working on.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from core.models import Reservation, Stock, StockShard
+
+RESERVATION_TTL = getattr(settings, "INVENTORY_RESERVATION_TTL", 15 * 60)
+REAP_BATCH_SIZE = getattr(settings, "INVENTORY_REAP_BATCH_SIZE", 500)
+# Attempts at an unlocked shard before waiting for a locked one
+SHARD_ATTEMPTS = 3
+
+TAKE_FROM_SHARD_SQL = """
+UPDATE core_stockshard SET available = available - %(quantity)s
+WHERE id = (
+    SELECT id FROM core_stockshard
+    WHERE product_id = %(product_id)s AND available >= %(quantity)s
+    ORDER BY {order}
+    LIMIT 1
+    FOR UPDATE {skip_locked}
+)
+RETURNING shard
+"""
+
+# Deletes the selected reservations and returns their units to the stock or shard they came from
+RELEASE_SQL = """
+WITH released AS (
+    DELETE FROM core_reservation WHERE id IN ({selection})
+    RETURNING product_id, shard, quantity
+),
+totals AS (
+    SELECT product_id, shard, sum(quantity) AS quantity FROM released GROUP BY product_id, shard
+),
+unsharded AS (
+    UPDATE core_stock SET available = core_stock.available + totals.quantity
+    FROM totals
+    WHERE totals.shard IS NULL AND core_stock.product_id = totals.product_id
+),
+sharded AS (
+    UPDATE core_stockshard SET available = core_stockshard.available + totals.quantity
+    FROM totals
+    WHERE core_stockshard.product_id = totals.product_id AND core_stockshard.shard = totals.shard
+)
+SELECT count(*) FROM released
+"""
+
+EXPIRED_SQL = """
+SELECT id FROM core_reservation
+WHERE expires_at <= %(now)s
+ORDER BY expires_at
+LIMIT %(limit)s
+FOR UPDATE SKIP LOCKED
+"""
+
+
+class OutOfStock(Exception):
+    """Not enough units are available to reserve"""
+
+
+def available(product_id):
+    """Units of a product that can still be reserved"""
+    stock = Stock.objects.filter(pk=product_id).values_list("available", flat=True).first() or 0
+    return stock + (StockShard.objects.filter(product_id=product_id).aggregate(total=Sum("available"))["total"] or 0)
+
+
+def restock(product_id, quantity):
+    """Add units to a product's stock, spread evenly over its shards when it has them"""
+    if quantity < 1:
+        raise ValueError("Restock quantity must be positive")
+    with transaction.atomic():
+        stock, _ = Stock.objects.select_for_update().get_or_create(product_id=product_id)
+        if not stock.shards:
+            Stock.objects.filter(pk=product_id).update(available=F("available") + quantity)
+            return
+        each, extra = divmod(quantity, stock.shards)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE core_stockshard SET available = available + %s + (shard < %s)::integer WHERE product_id = %s",
+                [each, extra, product_id],
+            )
+
+
+def set_shards(product_id, shards):
+    """Spread a product's units over this many shards, or gather them back onto the stock row with 0"""
+    with transaction.atomic():
+        stock, _ = Stock.objects.select_for_update().get_or_create(product_id=product_id)
+        total = stock.available
+        total += StockShard.objects.filter(product_id=product_id).aggregate(total=Sum("available"))["total"] or 0
+        StockShard.objects.filter(product_id=product_id).delete()
+        if shards:
+            each, extra = divmod(total, shards)
+            StockShard.objects.bulk_create(
+                StockShard(product_id=product_id, shard=shard, available=each + (shard < extra))
+                for shard in range(shards)
+            )
+            Reservation.objects.filter(product_id=product_id).update(shard=F("id") % shards)
+        else:
+            Reservation.objects.filter(product_id=product_id).update(shard=None)
+        Stock.objects.filter(pk=product_id).update(available=0 if shards else total, shards=shards)
+
+
+def _take_from_shard(product_id, quantity):
+    """Take units from one shard with enough of them, returning its number or None when none has"""
+    params = {"product_id": product_id, "quantity": quantity}
+    with connection.cursor() as cursor:
+        for attempt in range(SHARD_ATTEMPTS):
+            if attempt < SHARD_ATTEMPTS - 1:
+                sql = TAKE_FROM_SHARD_SQL.format(order="random()", skip_locked="SKIP LOCKED")
+            else:
+                # The last attempt waits for locked shards rather than skipping them. Postgres can keep a lock on
+                # a row that stopped matching while it waited, so shards are locked in one order to avoid deadlocks
+                sql = TAKE_FROM_SHARD_SQL.format(order="shard", skip_locked="")
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+            if row is not None:
+                return row[0]
+            if not StockShard.objects.filter(product_id=product_id, available__gte=quantity).exists():
+                return None
+    return None
+
+
+def reserve(product_id, quantity=1, ttl=None):
+    """
+    Hold units of a product for ttl seconds, raising OutOfStock when too few are left.
+    A sharded product can only reserve as many units as one shard holds.
+    """
+    if quantity < 1:
+        raise ValueError("Reservation quantity must be positive")
+    with transaction.atomic():
+        shard = None
+        taken = Stock.objects.filter(pk=product_id, shards=0, available__gte=quantity).update(
+            available=F("available") - quantity
+        )
+        if not taken:
+            shard = _take_from_shard(product_id, quantity)
+            if shard is None:
+                raise OutOfStock(f"Fewer than {quantity} units of product {product_id} are available")
+        expires_at = timezone.now() + timedelta(seconds=RESERVATION_TTL if ttl is None else ttl)
+        return Reservation.objects.create(product_id=product_id, shard=shard, quantity=quantity, expires_at=expires_at)
+
+
+def confirm(reservation_id):
+    """Turn a live reservation into a sale, returning False when it has expired or is gone"""
+    deleted, _ = Reservation.objects.filter(pk=reservation_id, expires_at__gt=timezone.now()).delete()
+    return bool(deleted)
+
+
+def release(reservation_id):
+    """Return a reservation's units to stock, returning False when it was already confirmed, released or reaped"""
+    with connection.cursor() as cursor:
+        cursor.execute(RELEASE_SQL.format(selection="%s"), [reservation_id])
+        return bool(cursor.fetchone()[0])
+
+
+def reap_expired(batch_size=REAP_BATCH_SIZE):
+    """Release every expired reservation a batch at a time, returning how many were released"""
+    released = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(RELEASE_SQL.format(selection=EXPIRED_SQL), {"now": timezone.now(), "limit": batch_size})
+            count = cursor.fetchone()[0]
+        released += count
+        if count < batch_size:
+            return released
@@ -0,0 +1,186 @@
+"""
+Test inventory reservations
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core.models import Brand, Category, Product, Reservation, Stock, StockShard
+from inventory import reservations
+from inventory.reservations import OutOfStock
+
+
+def create_product(sku="SKU-1"):
+    """Create a Product with its own brand and category"""
+    brand, _ = Brand.objects.get_or_create(name="Acme", slug="acme")
+    category, _ = Category.objects.get_or_create(name="Tools", slug="tools")
+    return Product.objects.create(sku=sku, name="Hammer", price="10.00", brand=brand, category=category)
+
+
+class Reservations(TestCase):
+    """Test reserving, confirming and releasing stock"""
+
+    def setUp(self):
+        self.product = create_product()
+        reservations.restock(self.product.id, 5)
+
+    def test_reserve_takes_stock(self):
+        """Test a reservation holds its units and expires after the TTL"""
+        reservation = reservations.reserve(self.product.id, 2, ttl=60)
+        self.assertEqual(reservations.available(self.product.id), 3)
+        self.assertIsNone(reservation.shard)
+        self.assertAlmostEqual(
+            reservation.expires_at, timezone.now() + timedelta(seconds=60), delta=timedelta(seconds=5)
+        )
+
+    def test_reserve_is_one_update(self):
+        """Test reserving unsharded stock is a conditional update and an insert, within a savepoint"""
+        with self.assertNumQueries(4):
+            reservations.reserve(self.product.id)
+
+    def test_out_of_stock(self):
+        """Test reserving more than is available fails and takes nothing"""
+        with self.assertRaises(OutOfStock):
+            reservations.reserve(self.product.id, 6)
+        self.assertEqual(reservations.available(self.product.id), 5)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_unstocked_product(self):
+        """Test a product without a stock row cannot be reserved"""
+        with self.assertRaises(OutOfStock):
+            reservations.reserve(create_product("SKU-2").id)
+
+    def test_confirm_keeps_units_sold(self):
+        """Test confirming a reservation removes it without returning its units"""
+        reservation = reservations.reserve(self.product.id, 2)
+        self.assertTrue(reservations.confirm(reservation.id))
+        self.assertFalse(reservations.confirm(reservation.id))
+        self.assertFalse(reservations.release(reservation.id))
+        self.assertEqual(reservations.available(self.product.id), 3)
+
+    def test_release_returns_units_once(self):
+        """Test releasing a reservation returns its units, and a second release does nothing"""
+        reservation = reservations.reserve(self.product.id, 2)
+        self.assertTrue(reservations.release(reservation.id))
+        self.assertFalse(reservations.release(reservation.id))
+        self.assertEqual(reservations.available(self.product.id), 5)
+
+    def test_expired_reservation_cannot_be_confirmed(self):
+        """Test an expired reservation is no longer a sale"""
+        reservation = reservations.reserve(self.product.id, ttl=-1)
+        self.assertFalse(reservations.confirm(reservation.id))
+
+    def test_reap_expired(self):
+        """Test expired reservations are released in batches and live ones are kept"""
+        for _ in range(3):
+            reservations.reserve(self.product.id, ttl=-1)
+        live = reservations.reserve(self.product.id, ttl=60)
+        self.assertEqual(reservations.reap_expired(batch_size=2), 3)
+        self.assertEqual(list(Reservation.objects.values_list("id", flat=True)), [live.id])
+        self.assertEqual(reservations.available(self.product.id), 4)
+
+    def test_reap_command(self):
+        """Test the reap_reservations command reports what it released"""
+        reservations.reserve(self.product.id, ttl=-1)
+        out = StringIO()
+        call_command("reap_reservations", stdout=out)
+        self.assertIn("Released 1 expired reservations", out.getvalue())
+
+
+class Sharded_Stock(TestCase):
+    """Test spreading a hot product's stock over shards"""
+
+    def setUp(self):
+        self.product = create_product()
+        reservations.restock(self.product.id, 10)
+        reservations.set_shards(self.product.id, 3)
+
+    def test_units_are_spread_over_shards(self):
+        """Test sharding moves every unit onto the shards"""
+        self.assertEqual(
+            list(StockShard.objects.filter(product=self.product).order_by("shard").values_list("available", flat=True)),
+            [4, 3, 3],
+        )
+        self.assertEqual(Stock.objects.get(pk=self.product.id).available, 0)
+        reservations.restock(self.product.id, 2)
+        self.assertEqual(reservations.available(self.product.id), 12)
+
+    def test_reserve_and_release_shard(self):
+        """Test a reservation is taken from a shard and returned to it"""
+        reservation = reservations.reserve(self.product.id, 3)
+        shard = StockShard.objects.get(product=self.product, shard=reservation.shard)
+        self.assertIn(shard.available, [0, 1])
+        reservations.release(reservation.id)
+        shard.refresh_from_db()
+        self.assertIn(shard.available, [3, 4])
+        self.assertEqual(reservations.available(self.product.id), 10)
+
+    def test_reservation_larger_than_any_shard(self):
+        """Test a sharded product cannot reserve more than one shard holds"""
+        with self.assertRaises(OutOfStock):
+            reservations.reserve(self.product.id, 5)
+
+    def test_unshard_keeps_reservations_releasable(self):
+        """Test gathering the shards back moves held reservations onto the stock row"""
+        reservation = reservations.reserve(self.product.id, 2)
+        reservations.set_shards(self.product.id, 0)
+        self.assertEqual(Stock.objects.get(pk=self.product.id).available, 8)
+        reservations.release(reservation.id)
+        self.assertEqual(Stock.objects.get(pk=self.product.id).available, 10)
+
+
+class Flash_Sale(TransactionTestCase):
+    """Test many buyers reserving the same product at once never oversell it"""
+
+    stock = 150
+    buyers = 400
+    workers = 32
+
+    def buy_concurrently(self, product_id):
+        """Run every buyer on a pool of threads, each with its own connection, returning their results"""
+        barrier = threading.Barrier(self.workers)
+
+        def on_every_thread(func):
+            # Each task waits for all the others, so every thread of the pool runs exactly one
+            def run(_):
+                func()
+                barrier.wait()
+
+            list(pool.map(run, range(self.workers)))
+
+        def buy(_):
+            try:
+                return reservations.reserve(product_id).id
+            except OutOfStock:
+                return None
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            results = list(pool.map(buy, range(self.buyers)))
+            on_every_thread(lambda: connection.close())
+        return results
+
+    def assert_no_oversell(self, product_id):
+        reserved = [pk for pk in self.buy_concurrently(product_id) if pk is not None]
+        self.assertEqual(len(reserved), self.stock)
+        self.assertEqual(reservations.available(product_id), 0)
+        self.assertEqual(sum(Reservation.objects.values_list("quantity", flat=True)), self.stock)
+
+    def test_single_row(self):
+        """Test contended reservations of one stock row sell exactly the stock"""
+        product = create_product()
+        reservations.restock(product.id, self.stock)
+        self.assert_no_oversell(product.id)
+
+    def test_sharded(self):
+        """Test contended reservations spread over shards sell exactly the stock"""
+        product = create_product()
+        reservations.restock(product.id, self.stock)
+        reservations.set_shards(product.id, 8)
+        self.assert_no_oversell(product.id)
@@ -0,0 +1,137 @@
+"""
+Order placement
+
+Checkout turns a user's basket into an Order in a fixed number of queries
+whatever the basket holds: one read of the product prices, priced with the
+compiled promotions, then one transaction that takes the stock of every line
+in a single statement, inserts the order, bulk inserts its items and records
+an order.placed event. Any line short of stock rolls the whole transaction
+back, so an order is placed complete or not at all.
+"""
+
+from django.db import connection, transaction
+
+from basket.store import Basket, persist_basket
+from core import outbox
+from core.models import Order, OrderItem
+from products.pricing import quote
+
+# Takes the stock of every line at once, returning the product id of each line it could fill.
+# Stock rows are locked in product order first, so two checkouts sharing products cannot deadlock.
+# Sharded stock gives each line the first shard with enough units that no one else has locked.
+TAKE_STOCK_SQL = """
+WITH lines AS (
+    SELECT * FROM unnest(%(products)s::bigint[], %(quantities)s::integer[]) AS lines(product_id, quantity)
+),
+locked AS MATERIALIZED (
+    SELECT product_id, shards FROM core_stock
+    WHERE product_id = ANY(%(products)s::bigint[])
+    ORDER BY product_id
+    FOR UPDATE
+),
+unsharded AS (
+    UPDATE core_stock SET available = core_stock.available - lines.quantity
+    FROM lines JOIN locked USING (product_id)
+    WHERE core_stock.product_id = lines.product_id AND locked.shards = 0 AND core_stock.available >= lines.quantity
+    RETURNING core_stock.product_id
+),
+picked AS MATERIALIZED (
+    SELECT lines.product_id, lines.quantity, (
+        SELECT id FROM core_stockshard AS shard
+        WHERE shard.product_id = lines.product_id AND shard.available >= lines.quantity
+        ORDER BY random()
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    ) AS shard_id
+    FROM lines JOIN locked USING (product_id)
+    WHERE locked.shards > 0
+),
+sharded AS (
+    UPDATE core_stockshard SET available = core_stockshard.available - picked.quantity
+    FROM picked
+    WHERE core_stockshard.id = picked.shard_id
+    RETURNING core_stockshard.product_id
+)
+SELECT product_id FROM unsharded UNION ALL SELECT product_id FROM sharded
+"""
+
+
+class CheckoutError(Exception):
+    """The basket cannot be ordered as it is"""
+
+    def __init__(self, message, product_ids=()):
+        super().__init__(message)
+        self.product_ids = sorted(product_ids)
+
+
+class EmptyBasket(CheckoutError):
+    pass
+
+
+class UnavailableProducts(CheckoutError):
+    pass
+
+
+class OutOfStock(CheckoutError):
+    pass
+
+
+def take_stock(lines):
+    """Take the stock of every line in one statement, returning the product ids it could fill"""
+    with connection.cursor() as cursor:
+        cursor.execute(TAKE_STOCK_SQL, {"products": list(lines), "quantities": list(lines.values())})
+        return {product_id for (product_id,) in cursor.fetchall()}
+
+
+def place_order(user):
+    """
+    Order everything in the user's basket, empty the basket and return the Order,
+    with its items on order.lines
+    """
+    basket = Basket(user_id=user.pk)
+    lines = basket.items()
+    if not lines:
+        raise EmptyBasket("The basket is empty")
+
+    priced = quote(lines)
+    if priced.unavailable:
+        raise UnavailableProducts("Some products are no longer available", priced.unavailable)
+
+    with transaction.atomic():
+        if short := set(lines) - take_stock(lines):
+            raise OutOfStock("Some products do not have enough stock", short)
+        order = Order.objects.create(user=user, total=priced.total)
+        order.lines = OrderItem.objects.bulk_create(
+            OrderItem(
+                order=order,
+                product_id=line.product,
+                quantity=line.quantity,
+                unit_price=line.unit_price,
+                discount=line.discount,
+                created_at=order.created_at,
+            )
+            for line in priced.lines
+        )
+        outbox.emit(
+            "order",
+            "order.placed",
+            order.pk,
+            {
+                "id": order.pk,
+                "user": user.pk,
+                "total": order.total,
+                "items": [
+                    {
+                        "product": item.product_id,
+                        "quantity": item.quantity,
+                        "unit_price": item.unit_price,
+                        "discount": item.discount,
+                    }
+                    for item in order.lines
+                ],
+            },
+        )
+        transaction.on_commit(basket.clear)
+        # Queued after the basket is emptied, so the worker cannot snapshot the ordered lines
+        transaction.on_commit(lambda: persist_basket.enqueue(user.pk))
+    return order
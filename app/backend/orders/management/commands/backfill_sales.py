@@ -0,0 +1,35 @@
+"""
+Django command to rebuild the sales rollups from the order history
+"""
+
+from datetime import UTC, date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.rollups import LAG, backfill
+
+
+def day_start(value):
+    return datetime.combine(value, datetime.min.time(), tzinfo=UTC)
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the sales rollups, a day at a time, after they are first deployed or to repair
+    a range. Safe to run alongside rollup_sales.
+    """
+
+    help = "Rebuild the hourly and daily sales rollups from the orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=date.fromisoformat, help="First day to rebuild, default the oldest order")
+        parser.add_argument("--until", type=date.fromisoformat, help="Day to stop before, default now")
+        parser.add_argument("--lag", type=int, default=LAG, help="Seconds a changed order waits to be rolled up")
+
+    def handle(self, *args, **options):
+        start = day_start(options["since"]) if options["since"] else None
+        end = day_start(options["until"]) if options["until"] else None
+        if start and end and start >= end:
+            raise CommandError("--since must be before --until")
+        days = backfill(start=start, end=end, lag=options["lag"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {days:,} days of sales"))
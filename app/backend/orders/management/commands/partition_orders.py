@@ -0,0 +1,38 @@
+"""
+Django command to maintain the monthly partitions of the order tables
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.partitions import ARCHIVE_SCHEMA, MONTHS_AHEAD, create_partitions, detach_partitions
+
+
+class Command(BaseCommand):
+    """Create upcoming order partitions, and detach or archive old ones. Run it daily."""
+
+    help = "Create future monthly order partitions and detach old ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead", type=int, default=MONTHS_AHEAD, help="Months of partitions to keep ready after this one"
+        )
+        parser.add_argument("--retain", type=int, help="Detach partitions older than this many months")
+        parser.add_argument(
+            "--archive", action="store_true", help=f"Move detached partitions to the {ARCHIVE_SCHEMA} schema"
+        )
+
+    def handle(self, *args, **options):
+        if options["ahead"] < 0 or (options["retain"] is not None and options["retain"] < 1):
+            raise CommandError("--ahead must be at least 0 and --retain at least 1")
+        if options["archive"] and options["retain"] is None:
+            raise CommandError("--archive needs --retain")
+
+        created = create_partitions(months_ahead=options["ahead"])
+        self.stdout.write(f"Created {len(created)} partitions{': ' + ', '.join(created) if created else ''}")
+        if options["retain"] is not None:
+            detached = detach_partitions(options["retain"], archive=options["archive"])
+            where = f" to {ARCHIVE_SCHEMA}" if options["archive"] else ""
+            self.stdout.write(
+                f"Detached {len(detached)} partitions{where}{': ' + ', '.join(detached) if detached else ''}"
+            )
+        self.stdout.write(self.style.SUCCESS("Order partitions are up to date"))
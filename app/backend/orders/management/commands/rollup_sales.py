@@ -0,0 +1,20 @@
+"""
+Django command to roll up recent sales
+"""
+
+from django.core.management.base import BaseCommand
+
+from orders.rollups import LAG, refresh
+
+
+class Command(BaseCommand):
+    """Roll up the orders changed since the last run. Run it every few minutes."""
+
+    help = "Roll up orders changed since the last run into the sales reports"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lag", type=int, default=LAG, help="Seconds a changed order waits to be rolled up")
+
+    def handle(self, *args, **options):
+        hours = refresh(lag=options["lag"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {hours:,} hours of sales"))
@@ -0,0 +1,117 @@
+"""
+Monthly partitions of the order tables
+
+Order and OrderItem are partitioned by month of created_at, in UTC, with a
+partition named like core_order_y2026m10 per month and a default partition
+catching rows no monthly partition covers. Partitions are created ahead of
+time, and old months are detached so history queries never plan around them,
+optionally moving them to an archive schema to be dumped or dropped.
+"""
+
+import re
+from datetime import UTC, datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+TABLES = ("core_order", "core_orderitem")
+MONTHS_AHEAD = getattr(settings, "ORDER_PARTITION_MONTHS_AHEAD", 3)
+ARCHIVE_SCHEMA = getattr(settings, "ORDER_PARTITION_ARCHIVE_SCHEMA", "order_archive")
+
+PARTITION_NAME = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def month_start(value):
+    """The first instant of value's month in UTC"""
+    value = value.astimezone(UTC)
+    return datetime(value.year, value.month, 1, tzinfo=UTC)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table, month):
+    return f"{table}_y{month:%Y}m{month:%m}"
+
+
+def partitions(table):
+    """The month of each monthly partition of table, by partition name"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            """,
+            [table],
+        )
+        names = [name for (name,) in cursor.fetchall()]
+    return {
+        name: datetime(int(match[1]), int(match[2]), 1, tzinfo=UTC)
+        for name in names
+        if (match := PARTITION_NAME.search(name))
+    }
+
+
+def _create_partition(cursor, table, month):
+    """
+    Create a month's partition, moving in any of its rows the default partition caught.
+    PostgreSQL refuses a partition whose rows are still in the default one, so the default
+    is detached while its rows move.
+    """
+    qn = connection.ops.quote_name
+    name, default = partition_name(table, month), f"{table}_default"
+    bounds = [month, add_months(month, 1)]
+    cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {qn(default)} WHERE created_at >= %s AND created_at < %s)", bounds)
+    (caught,) = cursor.fetchone()
+    if caught:
+        cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(default)}")
+    cursor.execute(f"CREATE TABLE {qn(name)} PARTITION OF {qn(table)} FOR VALUES FROM (%s) TO (%s)", bounds)
+    if caught:
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {qn(default)} WHERE created_at >= %s AND created_at < %s RETURNING *) "
+            f"INSERT INTO {qn(name)} SELECT * FROM moved",
+            bounds,
+        )
+        cursor.execute(f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(default)} DEFAULT")
+
+
+def create_partitions(months_ahead=MONTHS_AHEAD, now=None):
+    """Create the partitions of this month and the next months_ahead, returning the names created"""
+    current = month_start(now or timezone.now())
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in TABLES:
+            existing = set(partitions(table))
+            for offset in range(months_ahead + 1):
+                month = add_months(current, offset)
+                if partition_name(table, month) not in existing:
+                    _create_partition(cursor, table, month)
+                    created.append(partition_name(table, month))
+    return created
+
+
+def detach_partitions(retain_months, archive=False, now=None):
+    """
+    Detach the partitions of months before the last retain_months, moving them to the
+    archive schema when archive is set, and return the names detached.
+    Orders and their items leave together, in one transaction.
+    """
+    cutoff = add_months(month_start(now or timezone.now()), -retain_months)
+    qn = connection.ops.quote_name
+    detached = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        if archive:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {qn(ARCHIVE_SCHEMA)}")
+        for table in TABLES:
+            for name, month in sorted(partitions(table).items(), key=lambda item: item[1]):
+                if month >= cutoff:
+                    continue
+                cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}")
+                if archive:
+                    cursor.execute(f"ALTER TABLE {qn(name)} SET SCHEMA {qn(ARCHIVE_SCHEMA)}")
+                detached.append(name)
+    return detached
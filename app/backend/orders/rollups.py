@@ -0,0 +1,136 @@
+"""
+Sales rollups
+
+Paid order items are summed per product into hourly buckets, and the hourly
+buckets into daily ones, so reports read a row per product and bucket however
+long the order history grows.
+
+The rollup is incremental. A watermark records the updated_at the orders have
+been rolled up to; each refresh finds the orders changed since, then rebuilds
+only the hours those orders were placed in, and the days holding those hours.
+Rebuilding a bucket from scratch rather than adding deltas makes a refresh
+idempotent, and an order that is cancelled or paid later is picked up by its
+updated_at like a new one. Orders changed in the last LAG seconds are left for
+the next refresh, so a transaction still in flight when the watermark moves
+cannot be skipped.
+
+Buckets are only ever rebuilt from orders that exist, so the rollups keep the
+sales of months whose order partitions have been detached.
+"""
+
+from datetime import UTC, datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from core.models import Order, RollupWatermark
+
+WATERMARK = "sales"
+# Seconds a changed order waits before it is rolled up, longer than any checkout or payment transaction
+LAG = getattr(settings, "SALES_ROLLUP_LAG", 60)
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+CHANGED_HOURS_SQL = """
+SELECT DISTINCT date_trunc('hour', created_at) FROM core_order
+WHERE updated_at > %s AND updated_at <= %s
+"""
+
+CLEAR_HOURS_SQL = "DELETE FROM core_hourlysales WHERE hour = ANY(%s::timestamptz[])"
+
+REBUILD_HOURS_SQL = """
+WITH buckets AS (SELECT unnest(%(hours)s::timestamptz[]) AS hour)
+INSERT INTO core_hourlysales (hour, product_id, category_id, orders, units, revenue)
+SELECT buckets.hour, item.product_id, product.category_id, count(DISTINCT o.id),
+       sum(item.quantity), sum(item.quantity * item.unit_price - item.discount)
+FROM buckets
+JOIN core_order AS o ON o.created_at >= buckets.hour AND o.created_at < buckets.hour + interval '1 hour'
+JOIN core_orderitem AS item ON item.order_id = o.id AND item.created_at = o.created_at
+JOIN core_product AS product ON product.id = item.product_id
+WHERE o.status = %(status)s
+GROUP BY buckets.hour, item.product_id, product.category_id
+"""
+
+CLEAR_DAYS_SQL = "DELETE FROM core_dailysales WHERE day = ANY(%s::date[])"
+
+REBUILD_DAYS_SQL = """
+WITH buckets AS (SELECT unnest(%(days)s::date[])::timestamp AT TIME ZONE 'UTC' AS day)
+INSERT INTO core_dailysales (day, product_id, category_id, orders, units, revenue)
+SELECT buckets.day::date, hourly.product_id, hourly.category_id,
+       sum(hourly.orders), sum(hourly.units), sum(hourly.revenue)
+FROM buckets
+JOIN core_hourlysales AS hourly
+  ON hourly.hour >= buckets.day AND hourly.hour < buckets.day + interval '1 day'
+GROUP BY buckets.day, hourly.product_id, hourly.category_id
+"""
+
+
+def hour_start(value):
+    return value.astimezone(UTC).replace(minute=0, second=0, microsecond=0)
+
+
+def rebuild(hours):
+    """Recompute the hourly buckets starting at each of hours, and the daily buckets holding them"""
+    hours = sorted({hour_start(hour) for hour in hours})
+    if not hours:
+        return
+    days = sorted({hour.date() for hour in hours})
+    with connection.cursor() as cursor:
+        cursor.execute(CLEAR_HOURS_SQL, [hours])
+        cursor.execute(REBUILD_HOURS_SQL, {"hours": hours, "status": Order.Status.PAID})
+        cursor.execute(CLEAR_DAYS_SQL, [days])
+        cursor.execute(REBUILD_DAYS_SQL, {"days": days})
+
+
+def refresh(lag=LAG):
+    """Roll up the orders changed since the watermark, returning how many hours were rebuilt"""
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(
+            name=WATERMARK, defaults={"value": EPOCH}
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT statement_timestamp() - make_interval(secs => %s)", [lag])
+            (upper,) = cursor.fetchone()
+            if upper <= watermark.value:
+                return 0
+            cursor.execute(CHANGED_HOURS_SQL, [watermark.value, upper])
+            hours = [hour for (hour,) in cursor.fetchall()]
+        rebuild(hours)
+        watermark.value = upper
+        watermark.save(update_fields=["value"])
+    return len(hours)
+
+
+def backfill(start=None, end=None, lag=LAG):
+    """
+    Rebuild every hour from start up to end, a day per transaction. Defaults to the oldest order
+    up to now, in which case the watermark moves to where the backfill began, so orders changed
+    meanwhile are rolled up by the next refresh. Returns the number of days rebuilt.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT statement_timestamp() - make_interval(secs => %s)", [lag])
+        (began,) = cursor.fetchone()
+    if start is None:
+        start = Order.objects.order_by("created_at").values_list("created_at", flat=True).first()
+        if start is None:
+            return 0
+    day = datetime.combine(start.astimezone(UTC).date(), datetime.min.time(), tzinfo=UTC)
+    days = 0
+    while day < (began if end is None else end):
+        with transaction.atomic():
+            rebuild(day + timedelta(hours=hour) for hour in range(24))
+        day += timedelta(days=1)
+        days += 1
+    if end is None:
+        RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={"value": began})
+    return days
+
+
+def totals(queryset):
+    """Orders, units and revenue summed over a queryset of rollup rows"""
+    return queryset.aggregate(orders=Sum("orders"), units=Sum("units"), revenue=Sum("revenue"))
+
+
+def by_category(queryset):
+    """Revenue per category over a queryset of rollup rows, best selling first"""
+    return queryset.values("category__name").annotate(category_revenue=Sum("revenue")).order_by("-category_revenue")
@@ -0,0 +1,34 @@
+"""
+Serializers for Orders
+"""
+
+from rest_framework import serializers
+
+from core.models import Order, OrderItem
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    """Serializer for OrderItem Model"""
+
+    class Meta:
+        model = OrderItem
+        fields = ["product", "quantity", "unit_price", "discount"]
+        read_only_fields = fields
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    """Serializer for Order Model, with the items loaded on order.lines"""
+
+    items = OrderItemSerializer(source="lines", many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ["id", "status", "total", "created_at", "items"]
+        read_only_fields = fields
+
+
+class CheckoutErrorSerializer(serializers.Serializer):
+    """Schema of a basket that cannot be ordered"""
+
+    detail = serializers.CharField()
+    products = serializers.ListField(child=serializers.IntegerField())
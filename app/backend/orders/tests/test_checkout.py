@@ -0,0 +1,240 @@
+"""
+Test checkout
+"""
+
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django_redis import get_redis_connection
+from rest_framework import status
+
+from basket.store import Basket, persist_basket
+from core import idempotency
+from core.helpers import API_Client
+from core.models import Brand, Category, Order, Product, Promotion, StockShard, Task
+from inventory import reservations
+from orders.checkout import place_order
+from products import pricing, tree
+
+CHECKOUT_URL = reverse("checkout")
+
+
+def create_product(number, price="10.00", stock=10):
+    """Create a Product with stock"""
+    brand, _ = Brand.objects.get_or_create(name="Acme", slug="acme")
+    category, _ = Category.objects.get_or_create(name="Tools", slug="tools")
+    product = Product.objects.create(
+        sku=f"SKU-{number}", name=f"Product {number}", price=price, brand=brand, category=category
+    )
+    reservations.restock(product.id, stock)
+    return product
+
+
+class Checkout_API(TestCase):
+    """Test ordering the basket"""
+
+    def setUp(self):
+        redis = get_redis_connection("default")
+        keys = list(redis.scan_iter("basket:*")) + list(redis.scan_iter("idempotency:*"))
+        if keys:
+            redis.delete(*keys)
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="password123", date_of_birth=date(1990, 1, 1)
+        )
+        self.basket = Basket(user_id=self.user.id)
+        self.client = API_Client()
+        self.client.authorize(self.user)
+        # Compiled up front, so only checkout's own queries are counted
+        pricing.invalidate()
+        pricing.get_price_book()
+
+    def checkout(self, key=None, **data):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key is not None else {}
+        return self.client.post(CHECKOUT_URL, data, format="json", **headers)
+
+    def test_checkout(self):
+        """Test checkout orders the basket at current prices, takes the stock and empties the basket"""
+        hammer = create_product(1, price="10.00")
+        saw = create_product(2, price="2.50")
+        self.basket.add(hammer.id, 2)
+        self.basket.add(saw.id, 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.checkout()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Decimal(response.data["total"]), Decimal("27.50"))
+        self.assertEqual(response.data["status"], Order.Status.PENDING_PAYMENT)
+        self.assertEqual(
+            [(item["product"], item["quantity"]) for item in response.data["items"]], [(hammer.id, 2), (saw.id, 3)]
+        )
+        self.assertEqual(reservations.available(hammer.id), 8)
+        self.assertEqual(reservations.available(saw.id), 7)
+        self.assertEqual(self.basket.items(), {})
+        self.assertEqual(list(Task.objects.values_list("name", "args")), [(persist_basket.name, [self.user.id])])
+
+    def test_checkout_applies_promotions(self):
+        """Test each line is ordered after its best promotion, and the order total is what is left to pay"""
+        hammer = create_product(1, price="10.00")
+        saw = create_product(2, price="2.50")
+        Promotion.objects.create(name="Hammers 20% off", product=hammer, percent=20)
+        Promotion.objects.create(
+            name="3 for 2 on tools",
+            category=saw.category,
+            kind=Promotion.Kind.BUY_X_GET_Y,
+            buy_quantity=2,
+            free_quantity=1,
+        )
+        tree.invalidate()
+        pricing.invalidate()
+        self.basket.add(hammer.id, 2)
+        self.basket.add(saw.id, 3)
+
+        response = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Decimal(response.data["total"]), Decimal("21.00"))
+        self.assertEqual(
+            [(item["product"], Decimal(item["discount"])) for item in response.data["items"]],
+            [(hammer.id, Decimal("4.00")), (saw.id, Decimal("2.50"))],
+        )
+
+    def test_requires_authentication(self):
+        """Test anonymous visitors cannot check out"""
+        self.client.credentials()
+        self.assertEqual(self.checkout().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_empty_basket(self):
+        """Test an empty basket cannot be ordered"""
+        response = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+
+    def test_unavailable_product(self):
+        """Test a basket holding an inactive or deleted product is refused, naming the products"""
+        hammer = create_product(1)
+        Product.objects.filter(pk=hammer.pk).update(is_active=False)
+        self.basket.add(hammer.id)
+        self.basket.add(999999)
+        response = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["products"], [hammer.id, 999999])
+
+    def test_out_of_stock_rolls_back(self):
+        """Test one short line fails the whole order and takes no stock from the other lines"""
+        hammer = create_product(1, stock=5)
+        saw = create_product(2, stock=1)
+        self.basket.add(hammer.id, 2)
+        self.basket.add(saw.id, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.checkout()
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["products"], [saw.id])
+        self.assertEqual(reservations.available(hammer.id), 5)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.basket.items(), {hammer.id: 2, saw.id: 2})
+        self.assertFalse(Task.objects.exists())
+
+    def test_sharded_stock(self):
+        """Test lines of sharded products are taken from a single shard with enough units"""
+        hammer = create_product(1, stock=8)
+        reservations.set_shards(hammer.id, 4)
+        self.basket.add(hammer.id, 2)
+        response = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(reservations.available(hammer.id), 6)
+        self.assertEqual(
+            sorted(StockShard.objects.filter(product=hammer).values_list("available", flat=True)), [0, 2, 2, 2]
+        )
+
+    def test_constant_queries(self):
+        """Test checkout runs the same queries for one line as for twenty"""
+        products = [create_product(number) for number in range(20)]
+
+        self.basket.add(products[0].id)
+        with CaptureQueriesContext(connection) as single:
+            self.assertEqual(self.checkout().status_code, status.HTTP_201_CREATED)
+
+        for product in products:
+            self.basket.add(product.id)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(self.checkout().status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(len(single), len(many))
+
+    def test_idempotent_retry(self):
+        """Test retrying with the same key replays the order instead of placing another"""
+        hammer = create_product(1)
+        self.basket.add(hammer.id)
+        first = self.checkout(key="order-1")
+        self.basket.add(hammer.id)
+        retry = self.checkout(key="order-1")
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data["id"], first.data["id"])
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_idempotency_key_in_progress(self):
+        """Test a retry while the first request is still running is turned away"""
+        hammer = create_product(1)
+        self.basket.add(hammer.id)
+        nested = {}
+
+        def place_order_again(user):
+            nested["response"] = self.checkout(key="order-1")
+            raise RuntimeError
+
+        with patch("orders.views.place_order", side_effect=place_order_again), self.assertRaises(RuntimeError):
+            self.checkout(key="order-1")
+
+        self.assertEqual(nested["response"].status_code, status.HTTP_409_CONFLICT)
+        # The failed request released its key, so it can be retried
+        self.assertEqual(self.checkout(key="order-1").status_code, status.HTTP_201_CREATED)
+
+    def test_idempotency_claim_expires_soon(self):
+        """Test a key is only claimed briefly while its request runs, and its response kept for long"""
+        hammer = create_product(1)
+        self.basket.add(hammer.id)
+        redis = get_redis_connection("default")
+        ttls = {}
+
+        def place_order_claimed(user):
+            (key,) = redis.scan_iter("idempotency:*")
+            ttls["claim"] = redis.ttl(key)
+            return place_order(user)
+
+        with patch("orders.views.place_order", side_effect=place_order_claimed):
+            self.assertEqual(self.checkout(key="order-1").status_code, status.HTTP_201_CREATED)
+
+        self.assertLessEqual(ttls["claim"], idempotency.CLAIM_TTL)
+        (key,) = redis.scan_iter("idempotency:*")
+        self.assertGreater(redis.ttl(key), idempotency.CLAIM_TTL)
+
+    def test_idempotent_retry_after_out_of_stock(self):
+        """Test a refused checkout is not replayed, a retry with the same key runs once stock is back"""
+        hammer = create_product(1, stock=1)
+        self.basket.add(hammer.id, 2)
+        self.assertEqual(self.checkout(key="order-1").status_code, status.HTTP_409_CONFLICT)
+
+        reservations.restock(hammer.id, 1)
+        retry = self.checkout(key="order-1")
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", retry.headers)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_idempotency_key_reused(self):
+        """Test a key reused for a different request is refused"""
+        hammer = create_product(1)
+        self.basket.add(hammer.id)
+        self.checkout(key="order-1")
+        response = self.checkout(key="order-1", note="different")
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Order.objects.count(), 1)
@@ -0,0 +1,86 @@
+"""
+Test the order history
+"""
+
+from datetime import UTC, date, datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from core.helpers import API_Client
+from core.models import Brand, Category, Order, OrderItem, Product
+
+ORDERS_URL = reverse("order-list")
+
+
+def create_user(email="user@example.com"):
+    return get_user_model().objects.create_user(email=email, password="password123", date_of_birth=date(1990, 1, 1))
+
+
+def create_order(user, created_at, product, quantity=1):
+    """Create an Order with one item, placed at created_at"""
+    order = Order.objects.create(user=user, total=product.price * quantity)
+    Order.objects.filter(pk=order.pk).update(created_at=created_at)
+    OrderItem.objects.create(
+        order=order, product=product, quantity=quantity, unit_price=product.price, created_at=created_at
+    )
+    return order
+
+
+class Order_History_API(TestCase):
+    """Test listing the User's orders"""
+
+    def setUp(self):
+        brand = Brand.objects.create(name="Acme", slug="acme")
+        category = Category.objects.create(name="Tools", slug="tools")
+        self.product = Product.objects.create(
+            sku="SKU-1", name="Hammer", price=Decimal("10.00"), brand=brand, category=category
+        )
+        self.user = create_user()
+        self.client = API_Client()
+        self.client.authorize(self.user)
+
+    def test_requires_authentication(self):
+        """Test anonymous visitors have no order history"""
+        self.client.credentials()
+        self.assertEqual(self.client.get(ORDERS_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_history_newest_first_across_months(self):
+        """Test orders from several monthly partitions are listed newest first with their items"""
+        months = [datetime(2026, month, 15, tzinfo=UTC) for month in (7, 8, 9)]
+        orders = [
+            create_order(self.user, created_at, self.product, quantity=n + 1) for n, created_at in enumerate(months)
+        ]
+        create_order(create_user("other@example.com"), months[-1], self.product)
+
+        response = self.client.get(ORDERS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([order["id"] for order in response.data["results"]], [order.id for order in reversed(orders)])
+        self.assertEqual(
+            response.data["results"][0]["items"],
+            [{"product": self.product.id, "quantity": 3, "unit_price": "10.00", "discount": "0.00"}],
+        )
+
+    def test_keyset_pages(self):
+        """Test following the next links visits every order once"""
+        orders = [create_order(self.user, datetime(2026, 9, 1 + n, tzinfo=UTC), self.product) for n in range(5)]
+        seen, url = [], f"{ORDERS_URL}?page_size=2"
+        while url:
+            response = self.client.get(url)
+            seen += [order["id"] for order in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(seen, [order.id for order in reversed(orders)])
+
+    def test_constant_queries(self):
+        """Test a page costs the same queries however many orders and items it holds"""
+        create_order(self.user, datetime(2026, 9, 1, tzinfo=UTC), self.product)
+        with self.assertNumQueries(3):
+            self.client.get(ORDERS_URL)
+        for day in range(2, 20):
+            create_order(self.user, datetime(2026, 9, day, tzinfo=UTC), self.product)
+        with self.assertNumQueries(3):
+            self.client.get(ORDERS_URL)
@@ -0,0 +1,91 @@
+"""
+Test the monthly partitions of the order tables
+"""
+
+from datetime import UTC, date, datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Order
+from orders import partitions
+
+
+def table_of(order):
+    """The partition holding an order"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT tableoid::regclass::text FROM core_order WHERE id = %s", [order.id])
+        return cursor.fetchone()[0]
+
+
+class Order_Partitions(TestCase):
+    """Test creating and detaching order partitions"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="password123", date_of_birth=date(1990, 1, 1)
+        )
+
+    def create_order(self, created_at):
+        order = Order.objects.create(user=self.user, total="10.00")
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        return order
+
+    def test_tables_are_partitioned(self):
+        """Test both order tables are partitioned by range of created_at"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT partrelid::regclass::text FROM pg_partitioned_table WHERE partrelid = ANY(%s::regclass[])",
+                [list(partitions.TABLES)],
+            )
+            self.assertEqual(sorted(name for (name,) in cursor.fetchall()), sorted(partitions.TABLES))
+
+    def test_orders_land_in_their_month(self):
+        """Test a new order is stored in the partition of the current month"""
+        order = Order.objects.create(user=self.user, total="10.00")
+        self.assertEqual(
+            table_of(order), partitions.partition_name("core_order", partitions.month_start(order.created_at))
+        )
+
+    def test_create_partitions(self):
+        """Test partitions are created for this month and the months ahead, once"""
+        now = datetime(2040, 11, 20, tzinfo=UTC)
+        created = partitions.create_partitions(months_ahead=2, now=now)
+        self.assertEqual(
+            created,
+            [f"{table}_y{month}" for table in partitions.TABLES for month in ("2040m11", "2040m12", "2041m01")],
+        )
+        self.assertEqual(partitions.create_partitions(months_ahead=2, now=now), [])
+
+    def test_create_partition_moves_default_rows(self):
+        """Test rows the default partition caught move into their new monthly partition"""
+        order = self.create_order(datetime(2041, 5, 3, tzinfo=UTC))
+        self.assertEqual(table_of(order), "core_order_default")
+        partitions.create_partitions(months_ahead=0, now=datetime(2041, 5, 1, tzinfo=UTC))
+        self.assertEqual(table_of(order), "core_order_y2041m05")
+
+    def test_detach_and_archive(self):
+        """Test old months are detached from both tables and moved to the archive schema"""
+        partitions.create_partitions(months_ahead=1, now=datetime(2020, 1, 1, tzinfo=UTC))
+        old = self.create_order(datetime(2020, 1, 10, tzinfo=UTC))
+        kept = self.create_order(datetime(2020, 2, 10, tzinfo=UTC))
+
+        detached = partitions.detach_partitions(1, archive=True, now=datetime(2020, 3, 5, tzinfo=UTC))
+
+        self.assertEqual(detached, ["core_order_y2020m01", "core_orderitem_y2020m01"])
+        self.assertFalse(Order.objects.filter(pk=old.pk).exists())
+        self.assertTrue(Order.objects.filter(pk=kept.pk).exists())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM order_archive.core_order_y2020m01")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_command(self):
+        """Test the command keeps partitions ready and needs --retain to archive"""
+        out = StringIO()
+        call_command("partition_orders", stdout=out)
+        self.assertIn("Order partitions are up to date", out.getvalue())
+        with self.assertRaisesMessage(Exception, "--archive needs --retain"):
+            call_command("partition_orders", "--archive", stdout=out)
@@ -0,0 +1,164 @@
+"""
+Test the sales rollups
+"""
+
+from datetime import UTC, date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Brand, Category, DailySales, HourlySales, Order, OrderItem, Product, RollupWatermark
+from orders import rollups
+
+MORNING = datetime(2026, 9, 14, 9, 15, tzinfo=UTC)
+
+
+class RollupTestCase(TestCase):
+    """Base class with a catalog and a customer"""
+
+    def setUp(self):
+        brand = Brand.objects.create(name="Acme", slug="acme")
+        self.tools = Category.objects.create(name="Tools", slug="tools")
+        self.garden = Category.objects.create(name="Garden", slug="garden")
+        self.hammer = Product.objects.create(
+            sku="SKU-1", name="Hammer", price=Decimal("10.00"), brand=brand, category=self.tools
+        )
+        self.rake = Product.objects.create(
+            sku="SKU-2", name="Rake", price=Decimal("25.00"), brand=brand, category=self.garden
+        )
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="password123", date_of_birth=date(1990, 1, 1)
+        )
+
+    def create_order(self, created_at, lines, status=Order.Status.PAID):
+        """Create an Order of (product, quantity) lines placed at created_at"""
+        total = sum(product.price * quantity for product, quantity in lines)
+        order = Order.objects.create(user=self.user, total=total)
+        self.touch(order, status=status, created_at=created_at)
+        for product, quantity in lines:
+            OrderItem.objects.create(
+                order=order, product=product, quantity=quantity, unit_price=product.price, created_at=created_at
+            )
+        return order
+
+    def touch(self, order, **fields):
+        Order.objects.filter(pk=order.pk).update(updated_at=timezone.now(), **fields)
+
+
+class Sales_Rollups(RollupTestCase):
+    """Test rolling orders up into hourly and daily sales"""
+
+    def test_paid_orders_are_rolled_up(self):
+        """Test paid items are summed per product into their hour and day, and unpaid ones are not"""
+        self.create_order(MORNING, [(self.hammer, 2), (self.rake, 1)])
+        self.create_order(MORNING + timedelta(minutes=20), [(self.hammer, 1)])
+        self.create_order(MORNING + timedelta(hours=3), [(self.hammer, 4)])
+        self.create_order(MORNING, [(self.hammer, 7)], status=Order.Status.PENDING_PAYMENT)
+
+        self.assertEqual(rollups.refresh(lag=0), 2)
+        hourly = HourlySales.objects.get(hour=MORNING.replace(minute=0), product=self.hammer)
+        self.assertEqual((hourly.orders, hourly.units, hourly.revenue), (2, 3, Decimal("30.00")))
+        self.assertEqual(hourly.category, self.tools)
+        daily = DailySales.objects.get(day=MORNING.date(), product=self.hammer)
+        self.assertEqual((daily.orders, daily.units, daily.revenue), (3, 7, Decimal("70.00")))
+        self.assertEqual(DailySales.objects.get(product=self.rake).revenue, Decimal("25.00"))
+
+    def test_changed_order_is_picked_up(self):
+        """Test an order paid after the last refresh moves into the rollups on the next one"""
+        order = self.create_order(MORNING, [(self.hammer, 2)], status=Order.Status.PENDING_PAYMENT)
+        rollups.refresh(lag=0)
+        self.assertFalse(DailySales.objects.exists())
+
+        self.touch(order, status=Order.Status.PAID)
+        self.assertEqual(rollups.refresh(lag=0), 1)
+        self.assertEqual(DailySales.objects.get().units, 2)
+
+    def test_only_changed_hours_are_rebuilt(self):
+        """Test a refresh leaves the hours of unchanged orders alone"""
+        self.create_order(MORNING, [(self.hammer, 1)])
+        self.create_order(MORNING - timedelta(days=30), [(self.hammer, 1)])
+        rollups.refresh(lag=0)
+        # A bucket the next refresh must not recompute
+        HourlySales.objects.filter(hour__date=MORNING.date()).update(units=99)
+
+        self.create_order(MORNING - timedelta(days=30), [(self.rake, 1)])
+        self.assertEqual(rollups.refresh(lag=0), 1)
+        self.assertEqual(HourlySales.objects.get(hour__date=MORNING.date()).units, 99)
+        self.assertEqual(DailySales.objects.filter(day=(MORNING - timedelta(days=30)).date()).count(), 2)
+
+    def test_recent_changes_wait_for_the_lag(self):
+        """Test orders changed within the lag are left for a later refresh"""
+        self.create_order(MORNING, [(self.hammer, 1)])
+        self.assertEqual(rollups.refresh(lag=600), 0)
+        self.assertEqual(rollups.refresh(lag=0), 1)
+
+    def test_refresh_is_idempotent(self):
+        """Test rebuilding an hour twice gives the same rows"""
+        self.create_order(MORNING, [(self.hammer, 2)])
+        rollups.refresh(lag=0)
+        rollups.rebuild([MORNING])
+        self.assertEqual(DailySales.objects.get().units, 2)
+
+
+class Sales_Backfill(RollupTestCase):
+    """Test rebuilding the rollups from the order history"""
+
+    def test_backfill(self):
+        """Test a backfill rolls up every order and moves the watermark, so a refresh finds nothing to do"""
+        for days in range(3):
+            self.create_order(MORNING - timedelta(days=days), [(self.hammer, 1)])
+        out = StringIO()
+        call_command("backfill_sales", "--lag", "0", stdout=out)
+        self.assertIn("Rebuilt", out.getvalue())
+        self.assertEqual(DailySales.objects.count(), 3)
+        self.assertTrue(RollupWatermark.objects.filter(name=rollups.WATERMARK).exists())
+        self.assertEqual(rollups.refresh(lag=0), 0)
+
+    def test_backfill_range(self):
+        """Test a backfill of a range rebuilds only its days and keeps the watermark"""
+        self.create_order(MORNING, [(self.hammer, 1)])
+        self.create_order(MORNING - timedelta(days=5), [(self.hammer, 1)])
+        day = MORNING.replace(hour=0, minute=0)
+        days = rollups.backfill(start=day, end=day + timedelta(days=1))
+        self.assertEqual(days, 1)
+        self.assertEqual(list(DailySales.objects.values_list("day", flat=True)), [MORNING.date()])
+        self.assertFalse(RollupWatermark.objects.exists())
+
+
+class Sales_Admin(RollupTestCase):
+    """Test the sales reports in the admin"""
+
+    def setUp(self):
+        super().setUp()
+        self.create_order(MORNING, [(self.hammer, 2), (self.rake, 1)])
+        rollups.refresh(lag=0)
+        admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="password123", date_of_birth=date(1990, 1, 1)
+        )
+        self.client.force_login(admin)
+
+    def test_daily_report_reads_rollups(self):
+        """Test the daily report shows the rolled up sales and their totals"""
+        response = self.client.get(reverse("admin:core_dailysales_changelist"))
+        self.assertContains(response, "Hammer")
+        self.assertContains(response, "45.00 revenue from 3 units")
+        self.assertContains(response, "<td>Garden</td><td>25.00</td>", html=True)
+        self.assertEqual([row["category__name"] for row in response.context["categories"]], ["Garden", "Tools"])
+
+    def test_report_is_not_a_message(self):
+        """Test the totals are part of the report rather than a message left for the next page"""
+        response = self.client.get(reverse("admin:core_dailysales_changelist"))
+        self.assertEqual(list(get_messages(response.wsgi_request)), [])
+        self.assertNotContains(self.client.get(reverse("admin:index")), "revenue from")
+
+    def test_report_filters_by_category(self):
+        """Test the totals follow the changelist's filters"""
+        response = self.client.get(reverse("admin:core_hourlysales_changelist"), {"category__id__exact": self.tools.pk})
+        self.assertContains(response, "20.00 revenue from 2 units")
+        self.assertNotContains(response, "Rake")
@@ -0,0 +1,67 @@
+"""
+API Views for Orders
+"""
+
+from django.db.models import Prefetch, prefetch_related_objects
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import status
+from rest_framework.generics import ListAPIView
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.idempotency import HEADER, idempotent
+from core.models import Order, OrderItem
+from core.pagination import KeysetPagination
+
+from .checkout import CheckoutError, OutOfStock, place_order
+from .serializers import CheckoutErrorSerializer, OrderSerializer
+
+
+class CheckoutView(APIView):
+    """
+    View for ordering the contents of the User's basket
+    POST - orders/checkout/
+    """
+
+    @extend_schema(
+        request=None,
+        parameters=[
+            OpenApiParameter(
+                HEADER, str, OpenApiParameter.HEADER, description="Unique per order, retries resend the same key"
+            )
+        ],
+        responses={201: OrderSerializer, 400: CheckoutErrorSerializer, 409: CheckoutErrorSerializer},
+    )
+    @idempotent
+    def post(self, request):
+        try:
+            order = place_order(request.user)
+        except CheckoutError as exc:
+            # Stock can come back, so running out is a conflict the client may retry
+            status_code = status.HTTP_409_CONFLICT if isinstance(exc, OutOfStock) else status.HTTP_400_BAD_REQUEST
+            return Response({"detail": str(exc), "products": exc.product_ids}, status=status_code)
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+
+
+class OrderListView(ListAPIView):
+    """
+    View for the User's order history, newest first
+    GET - orders/
+    """
+
+    serializer_class = OrderSerializer
+    pagination_class = KeysetPagination
+    keyset_orderings = {"newest": ("-created_at", "-id")}
+
+    def get_queryset(self):
+        return Order.objects.filter(user=self.request.user).only("id", "status", "total", "created_at")
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page:
+            # Bounding the items by the page's dates keeps their query to the page's partitions
+            items = OrderItem.objects.filter(created_at__range=(page[-1].created_at, page[0].created_at)).only(
+                "order_id", "product_id", "quantity", "unit_price", "discount"
+            )
+            prefetch_related_objects(page, Prefetch("items", queryset=items.order_by("id"), to_attr="lines"))
+        return page
@@ -0,0 +1,67 @@
+"""
+A fake payment provider for local testing
+
+It builds payment intent events the way the provider sends them and signs
+them with the webhook secret. A burst delivers the events of many intents
+interleaved, each sent several times, the way a provider catching up after an
+outage would, to exercise deduplication and per-intent ordering.
+"""
+
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from .webhooks import SECRET, SIGNATURE_HEADER, sign
+
+
+class FakeProvider:
+    def __init__(self, secret=None, seed=None):
+        self.secret = SECRET if secret is None else secret
+        self.random = random.Random(seed)
+        self.clock = int(time.time())
+
+    def event(self, event_type, order, intent_id=None, amount=None):
+        """An event of a payment intent paying for order, created one second after the previous event"""
+        self.clock += 1
+        amount = int(order.total * 100) if amount is None else amount
+        return {
+            "id": f"evt_{uuid.uuid4().hex}",
+            "type": event_type,
+            "created": self.clock,
+            "data": {
+                "object": {
+                    "id": intent_id or f"pi_{order.pk}",
+                    "object": "payment_intent",
+                    "amount": amount,
+                    "amount_received": amount if event_type == "payment_intent.succeeded" else 0,
+                    "currency": "gbp",
+                    "metadata": {"order_id": str(order.pk)},
+                }
+            },
+        }
+
+    def delivery(self, event):
+        """The body and headers of a delivery of event"""
+        body = json.dumps(event).encode()
+        return body, {SIGNATURE_HEADER: sign(body, self.secret)}
+
+    def burst(self, events, copies=3):
+        """Deliveries of every event, each sent copies times, shuffled"""
+        deliveries = [self.delivery(event) for event in events for _ in range(copies)]
+        self.random.shuffle(deliveries)
+        return deliveries
+
+    @staticmethod
+    def send(url, body, headers, timeout=5):
+        """Post a delivery to a running server, returning the response status"""
+        request = urllib.request.Request(
+            url, data=body, method="POST", headers={"Content-Type": "application/json", **headers}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
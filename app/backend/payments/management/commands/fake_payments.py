@@ -0,0 +1,48 @@
+"""
+Django command to replay fake payment webhooks against a running server
+"""
+
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Order
+from payments.fake import FakeProvider
+
+
+class Command(BaseCommand):
+    """Pay for pending orders with a burst of signed, duplicated and shuffled webhook deliveries"""
+
+    help = "Send a burst of fake payment webhooks for pending orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://localhost:8000/payments/webhook/", help="Webhook endpoint")
+        parser.add_argument("--orders", type=int, default=100, help="Pending orders to pay for")
+        parser.add_argument("--copies", type=int, default=3, help="Times each event is delivered")
+        parser.add_argument("--concurrency", type=int, default=16, help="Deliveries in flight at once")
+        parser.add_argument("--seed", type=int, help="Seed of the delivery order")
+
+    def handle(self, *args, **options):
+        orders = list(Order.objects.filter(status=Order.Status.PENDING_PAYMENT).order_by("id")[: options["orders"]])
+        if not orders:
+            raise CommandError("There are no orders pending payment")
+
+        provider = FakeProvider(seed=options["seed"])
+        events = []
+        for order in orders:
+            events.append(provider.event("payment_intent.created", order))
+            events.append(provider.event("payment_intent.succeeded", order))
+        deliveries = provider.burst(events, copies=options["copies"])
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options["concurrency"]) as pool:
+            statuses = Counter(pool.map(lambda delivery: provider.send(options["url"], *delivery), deliveries))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {len(deliveries):,} deliveries of {len(events):,} events for {len(orders):,} orders "
+                f"in {elapsed:.2f}s ({len(deliveries) / elapsed:,.0f}/s), statuses: {dict(statuses)}"
+            )
+        )
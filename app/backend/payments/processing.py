@@ -0,0 +1,94 @@
+"""
+Applying payment events to Orders
+
+Each stored event queues a task for its payment intent. The task takes a
+transaction-level advisory lock on the intent and applies every pending event
+of the intent in the order the provider created them, so the events of one
+intent are applied one at a time and in order, while different intents are
+processed in parallel by as many workers as are running.
+
+Events only move an order along allowed transitions, so a stale event arriving
+after a later one changes nothing. The order's items carry the stock checkout
+took, which a cancelled order hands back.
+"""
+
+import logging
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from core import outbox
+from core.models import Order, OrderItem, PaymentEvent
+from core.tasks import task
+from inventory.reservations import restock
+
+logger = logging.getLogger(__name__)
+
+# First key of the intent locks, so they cannot collide with other advisory locks
+LOCK_SPACE = 0x706179
+
+# Event type: (new status, statuses it can move an order from)
+TRANSITIONS = {
+    "payment_intent.succeeded": (Order.Status.PAID, (Order.Status.PENDING_PAYMENT,)),
+    "payment_intent.canceled": (Order.Status.CANCELLED, (Order.Status.PENDING_PAYMENT,)),
+}
+
+
+class PaymentMismatch(Exception):
+    """An event that cannot apply to the order it names"""
+
+
+def apply(event):
+    """Move the event's order to the status the event calls for, if the transition is allowed"""
+    if event.event_type not in TRANSITIONS:
+        return
+    intent = event.payload["data"]["object"]
+    try:
+        order_id = int(intent["metadata"]["order_id"])
+    except (KeyError, TypeError, ValueError):
+        raise PaymentMismatch("The payment intent names no order") from None
+    status, from_statuses = TRANSITIONS[event.event_type]
+
+    order = Order.objects.select_for_update().filter(pk=order_id).first()
+    if order is None:
+        raise PaymentMismatch(f"Order {order_id} does not exist")
+    if order.status not in from_statuses:
+        logger.info("Ignoring %s for order %s, which is %s", event.event_type, order.pk, order.status)
+        return
+    if status == Order.Status.PAID and Decimal(intent.get("amount_received", 0)) != order.total * 100:
+        raise PaymentMismatch(f"Order {order.pk} costs {order.total} but {intent.get('amount_received')} was paid")
+
+    Order.objects.filter(pk=order.pk).update(status=status, updated_at=Now())
+    if status == Order.Status.CANCELLED:
+        # In product order, like checkout, so concurrent restocks cannot deadlock
+        items = OrderItem.objects.filter(order_id=order.pk, created_at=order.created_at).order_by("product_id")
+        for product_id, quantity in items.values_list("product_id", "quantity"):
+            restock(product_id, quantity)
+    outbox.emit("order", f"order.{status.value}", order.pk, {"id": order.pk, "user": order.user_id, "status": status})
+
+
+@task
+def process_payment_intent(payment_intent):
+    """Apply the pending events of a payment intent in order, returning how many were applied"""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s, hashtext(%s))", [LOCK_SPACE, payment_intent])
+        events = PaymentEvent.objects.filter(payment_intent=payment_intent, processed_at__isnull=True).order_by(
+            "created", "id"
+        )
+        applied = 0
+        for event in events:
+            try:
+                with transaction.atomic():
+                    apply(event)
+            except PaymentMismatch as exc:
+                # Retrying cannot fix the event, so it is kept with the reason for someone to look at
+                logger.error("Payment event %s not applied: %s", event.event_id, exc)
+                event.error = str(exc)
+            else:
+                applied += 1
+            event.processed_at = timezone.now()
+            event.save(update_fields=["processed_at", "error"])
+        return applied
@@ -0,0 +1,175 @@
+"""
+Test payment webhooks
+"""
+
+import json
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from core import tasks
+from core.helpers import API_Client
+from core.models import Brand, Category, Order, OrderItem, OutboxEvent, PaymentEvent, Product, Task
+from inventory import reservations
+from payments import webhooks
+from payments.fake import FakeProvider
+
+WEBHOOK_URL = reverse("payment-webhook")
+
+
+class PaymentTestCase(TestCase):
+    """Base class with a pending order and a fake provider"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="password123", date_of_birth=date(1990, 1, 1)
+        )
+        self.provider = FakeProvider(seed=1)
+        self.client = API_Client()
+        self.order = self.create_order()
+
+    def create_order(self, total=Decimal("25.00")):
+        return Order.objects.create(user=self.user, total=total)
+
+    def deliver(self, body, headers):
+        headers = {f"HTTP_{name.upper().replace('-', '_')}": value for name, value in headers.items()}
+        return self.client.post(WEBHOOK_URL, body, content_type="application/json", **headers)
+
+    def send(self, event):
+        return self.deliver(*self.provider.delivery(event))
+
+    def process(self):
+        worker = tasks.Worker()
+        while worker.run_once():
+            pass
+
+
+class Webhook_API(PaymentTestCase):
+    """Test receiving webhook deliveries"""
+
+    def test_signed_event_is_stored_and_queued(self):
+        """Test a verified event is stored and its processing queued, without touching the order"""
+        event = self.provider.event("payment_intent.succeeded", self.order)
+        response = self.send(event)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stored = PaymentEvent.objects.get()
+        self.assertEqual((stored.event_id, stored.payment_intent), (event["id"], f"pi_{self.order.pk}"))
+        self.assertIsNone(stored.processed_at)
+        self.assertEqual(Task.objects.get().args, [f"pi_{self.order.pk}"])
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.Status.PENDING_PAYMENT)
+
+    def test_fast_ack(self):
+        """Test acknowledging a delivery is one insert of the event and one of its task"""
+        body, headers = self.provider.delivery(self.provider.event("payment_intent.succeeded", self.order))
+        # Savepoint, event, task, notify, release
+        with self.assertNumQueries(5):
+            self.deliver(body, headers)
+
+    def test_duplicates_are_ignored(self):
+        """Test redeliveries of an event are acknowledged but stored and queued once"""
+        body, headers = self.provider.delivery(self.provider.event("payment_intent.succeeded", self.order))
+        for _ in range(3):
+            self.assertEqual(self.deliver(body, headers).status_code, status.HTTP_200_OK)
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_bad_signatures(self):
+        """Test deliveries with a wrong, stale or missing signature are refused"""
+        body = json.dumps(self.provider.event("payment_intent.succeeded", self.order)).encode()
+        for header in (
+            webhooks.sign(body, "wrong-secret"),
+            webhooks.sign(body, self.provider.secret, timestamp=int(time.time()) - webhooks.TOLERANCE - 60),
+            "",
+        ):
+            self.assertEqual(
+                self.deliver(body, {webhooks.SIGNATURE_HEADER: header}).status_code, status.HTTP_400_BAD_REQUEST
+            )
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_tampered_body(self):
+        """Test a body changed after signing is refused"""
+        body, headers = self.provider.delivery(self.provider.event("payment_intent.succeeded", self.order))
+        response = self.deliver(body.replace(b"2500", b"9999"), headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rolled_secret(self):
+        """Test any of several signatures may match while a secret is being rolled"""
+        body = json.dumps(self.provider.event("payment_intent.succeeded", self.order)).encode()
+        old = webhooks.sign(body, "old-secret")
+        new = webhooks.sign(body, self.provider.secret).split(",", 1)[1]
+        self.assertEqual(
+            self.deliver(body, {webhooks.SIGNATURE_HEADER: f"{old},{new}"}).status_code, status.HTTP_200_OK
+        )
+
+    def test_malformed_event(self):
+        """Test a signed body that is not an event is refused"""
+        response = self.deliver(*self.provider.delivery({"id": "evt_1"}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class Payment_Processing(PaymentTestCase):
+    """Test applying stored events to orders"""
+
+    def test_succeeded_pays_order(self):
+        """Test a successful payment marks the order paid and announces it"""
+        self.send(self.provider.event("payment_intent.succeeded", self.order))
+        self.process()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.Status.PAID)
+        self.assertIsNotNone(PaymentEvent.objects.get().processed_at)
+        self.assertTrue(OutboxEvent.objects.filter(event_type="order.paid", key=str(self.order.pk)).exists())
+
+    def test_events_apply_in_creation_order(self):
+        """Test an intent's events apply in the order the provider created them, whatever order they arrive in"""
+        canceled = self.provider.event("payment_intent.canceled", self.order)
+        succeeded = self.provider.event("payment_intent.succeeded", self.order)
+        self.send(succeeded)
+        self.send(canceled)
+        self.process()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.Status.CANCELLED)
+
+    def test_cancel_returns_stock(self):
+        """Test cancelling an order hands its units back to stock"""
+        brand = Brand.objects.create(name="Acme", slug="acme")
+        category = Category.objects.create(name="Tools", slug="tools")
+        product = Product.objects.create(sku="SKU-1", name="Hammer", price="12.50", brand=brand, category=category)
+        reservations.restock(product.id, 1)
+        OrderItem.objects.create(
+            order=self.order, product=product, quantity=2, unit_price="12.50", created_at=self.order.created_at
+        )
+        self.send(self.provider.event("payment_intent.canceled", self.order))
+        self.process()
+        self.assertEqual(reservations.available(product.id), 3)
+
+    def test_amount_mismatch(self):
+        """Test a payment for the wrong amount leaves the order pending and records why"""
+        self.send(self.provider.event("payment_intent.succeeded", self.order, amount=100))
+        self.process()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.Status.PENDING_PAYMENT)
+        self.assertIn("costs 25.00", PaymentEvent.objects.get().error)
+
+    def test_burst_with_duplicates(self):
+        """Test a shuffled burst of duplicated deliveries pays every order exactly once"""
+        orders = [self.order] + [self.create_order() for _ in range(9)]
+        events = []
+        for order in orders:
+            events += [
+                self.provider.event("payment_intent.created", order),
+                self.provider.event("payment_intent.succeeded", order),
+            ]
+        for delivery in self.provider.burst(events, copies=3):
+            self.assertEqual(self.deliver(*delivery).status_code, status.HTTP_200_OK)
+
+        self.assertEqual(PaymentEvent.objects.count(), 20)
+        self.process()
+        self.assertEqual(Order.objects.filter(status=Order.Status.PAID).count(), 10)
+        self.assertFalse(PaymentEvent.objects.filter(processed_at__isnull=True).exists())
+        self.assertEqual(OutboxEvent.objects.filter(event_type="order.paid").count(), 10)
@@ -0,0 +1,11 @@
+"""
+URLs for Payments
+"""
+
+from django.urls import path
+
+from .views import WebhookView
+
+urlpatterns = [
+    path("webhook/", WebhookView.as_view(), name="payment-webhook"),
+]
@@ -0,0 +1,34 @@
+"""
+API Views for Payments
+"""
+
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .webhooks import SIGNATURE_HEADER, WebhookError, record, verify
+
+
+@extend_schema(exclude=True)
+class WebhookView(APIView):
+    """
+    View receiving the payment provider's webhooks, authenticated by their signature
+    POST - payments/webhook/
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    # Deliveries come in bursts from the provider's few addresses and are verified by their signature
+    throttle_classes = []
+
+    def post(self, request):
+        # The signature covers the exact bytes sent, so the body is read raw rather than parsed
+        body = request.body
+        try:
+            verify(body, request.headers.get(SIGNATURE_HEADER))
+            record(body)
+        except WebhookError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"received": True})
@@ -0,0 +1,126 @@
+"""
+Shared HTTP caching for the catalog
+
+Catalog responses are the same for every visitor, so they are marked public
+and tagged with surrogate keys naming the products, brands and categories they
+show. A CDN in front of the API keeps them until their keys are purged, and
+browsers only keep them briefly. Model changes queue purges, which are sent
+in batches once the transaction that made them commits.
+"""
+
+import logging
+import threading
+import urllib.request
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+BROWSER_MAX_AGE = getattr(settings, "CDN_BROWSER_MAX_AGE", 10)
+SURROGATE_MAX_AGE = getattr(settings, "CDN_SURROGATE_MAX_AGE", 24 * 60 * 60)
+STALE_WHILE_REVALIDATE = getattr(settings, "CDN_STALE_WHILE_REVALIDATE", 30)
+PURGER = getattr(settings, "CDN_PURGER", {"BACKEND": "products.cdn.LocalPurger"})
+# Most CDNs cap the number of keys in one purge request
+PURGE_BATCH_SIZE = getattr(settings, "CDN_PURGE_BATCH_SIZE", 256)
+
+# Collection keys, purged when the set of rows a listing can show changes
+PRODUCTS = "products"
+BRANDS = "brands"
+CATEGORIES = "categories"
+
+
+def product_key(pk):
+    return f"product-{pk}"
+
+
+def brand_key(pk):
+    return f"brand-{pk}"
+
+
+def category_key(pk):
+    return f"category-{pk}"
+
+
+def add_cache_headers(response, keys, surrogate_max_age=None):
+    """Let shared caches keep a response until one of its keys is purged"""
+    surrogate_max_age = SURROGATE_MAX_AGE if surrogate_max_age is None else surrogate_max_age
+    response["Cache-Control"] = f"public, max-age={min(BROWSER_MAX_AGE, surrogate_max_age)}"
+    response["Surrogate-Control"] = f"max-age={surrogate_max_age}, stale-while-revalidate={STALE_WHILE_REVALIDATE}"
+    response["Surrogate-Key"] = " ".join(dict.fromkeys(keys))
+    return response
+
+
+class LocalPurger:
+    """Keep purged batches in memory, for development and tests"""
+
+    def __init__(self):
+        self.batches = []
+
+    def purge(self, keys):
+        logger.debug("Purging %s", " ".join(keys))
+        self.batches.append(keys)
+
+
+class FastlyPurger:
+    """Purge keys through the Fastly API, soft purging by default so stale copies can still be served"""
+
+    url = "https://api.fastly.com/service/{service_id}/purge"
+
+    def __init__(self, service_id, api_token, soft=True, timeout=5):
+        self.service_id = service_id
+        self.api_token = api_token
+        self.soft = soft
+        self.timeout = timeout
+
+    def purge(self, keys):
+        request = urllib.request.Request(
+            self.url.format(service_id=self.service_id),
+            method="POST",
+            headers={"Fastly-Key": self.api_token, "Surrogate-Key": " ".join(keys)},
+        )
+        if self.soft:
+            request.add_header("Fastly-Soft-Purge", "1")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+_purger = None
+_pending = threading.local()
+
+
+def get_purger():
+    global _purger
+    if _purger is None:
+        _purger = import_string(PURGER["BACKEND"])(**PURGER.get("OPTIONS", {}))
+    return _purger
+
+
+def _pending_keys():
+    if not hasattr(_pending, "keys"):
+        _pending.keys = set()
+    return _pending.keys
+
+
+def purge(*keys):
+    """
+    Queue keys to purge when the current transaction commits. Every commit sends
+    all the keys queued so far, so a transaction saving many rows purges once.
+    Keys queued by a transaction that rolls back go out with the next commit,
+    which costs no more than an early cache miss.
+    """
+    _pending_keys().update(keys)
+    transaction.on_commit(flush)
+
+
+def flush():
+    """Send the queued keys to the purger in batches, logging rather than raising when the CDN is unreachable"""
+    keys = sorted(_pending_keys())
+    _pending_keys().clear()
+    for start in range(0, len(keys), PURGE_BATCH_SIZE):
+        batch = keys[start : start + PURGE_BATCH_SIZE]
+        try:
+            get_purger().purge(batch)
+        except Exception:
+            logger.exception("Failed to purge %d surrogate keys", len(batch))
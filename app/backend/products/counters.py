@@ -0,0 +1,128 @@
+"""
+Product view counters and trending products
+
+A view is counted in Redis, never in Postgres: one round trip adds it to a
+hash of pending counts by product and to a sorted set of trending scores, so
+however popular a product gets no request waits on a row lock. The flush_views
+command periodically moves the pending hash aside and adds its counts to
+Product.view_count with one UPDATE, so a hot product costs one row update per
+flush rather than one per view, and the catalog can sort on the column.
+
+Trending scores decay exponentially: every flush multiplies them all by the
+share of a half-life that has passed, so views from a few half-lives ago
+hardly count, and trims the set to the best TRENDING_SIZE products.
+
+The view beacon does not look products up, so a flush drops the counts of ids
+that match no product and removes them from the trending set.
+"""
+
+import time
+import uuid
+
+from django.conf import settings
+from django.db import connection
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+from core.models import Product
+
+PENDING_KEY = "views:pending"
+TRENDING_KEY = "views:trending"
+DECAYED_AT_KEY = "views:trending:decayed_at"
+HALF_LIFE = getattr(settings, "TRENDING_HALF_LIFE", 6 * 60 * 60)
+TRENDING_SIZE = getattr(settings, "TRENDING_SIZE", 1000)
+# Scores decayed below this are dropped, they would take many views to trend again anyway
+MIN_SCORE = 0.01
+# How long counts moved aside by a flush that died before applying them are kept for inspection
+FLUSHING_TTL = 24 * 60 * 60
+# Largest id a bigint column holds, views of ids beyond it are refused by the beacon
+MAX_PRODUCT_ID = 2**63 - 1
+# trending() reads this many times the products asked for, to fill them when some are inactive or gone
+OVERFETCH = 3
+
+ADD_VIEWS_SQL = """
+UPDATE core_product SET view_count = core_product.view_count + views.delta
+FROM unnest(%s::bigint[], %s::bigint[]) AS views (id, delta)
+WHERE core_product.id = views.id
+RETURNING core_product.id
+"""
+
+
+def _redis():
+    return get_redis_connection("default")
+
+
+def record_view(product_id):
+    """Count a view of a product, in one Redis round trip"""
+    pipe = _redis().pipeline(transaction=False)
+    pipe.hincrby(PENDING_KEY, product_id, 1)
+    pipe.zincrby(TRENDING_KEY, 1, product_id)
+    pipe.execute()
+
+
+def add_views(deltas):
+    """Add {product id: views} to the products' view counts in one statement, returning the ids that matched"""
+    product_ids = sorted(deltas)
+    with connection.cursor() as cursor:
+        cursor.execute(ADD_VIEWS_SQL, [product_ids, [deltas[product_id] for product_id in product_ids]])
+        return {product_id for (product_id,) in cursor.fetchall()}
+
+
+def flush_views():
+    """Add the views counted since the last flush to Postgres and decay trending, returning the views flushed"""
+    redis = _redis()
+    flushing = f"views:flushing:{uuid.uuid4().hex}"
+    try:
+        # Views counted from here on go to a new pending hash
+        redis.rename(PENDING_KEY, flushing)
+    except ResponseError:
+        deltas = {}
+    else:
+        redis.expire(flushing, FLUSHING_TTL)
+        deltas = {int(product_id): int(views) for product_id, views in redis.hgetall(flushing).items()}
+    unknown = {product_id for product_id in deltas if not 0 < product_id <= MAX_PRODUCT_ID}
+    deltas = {product_id: views for product_id, views in deltas.items() if product_id not in unknown}
+    if deltas:
+        try:
+            unknown |= deltas.keys() - add_views(deltas)
+        except Exception:
+            # Put the counts back for the next flush
+            pipe = redis.pipeline(transaction=False)
+            for product_id, views in deltas.items():
+                pipe.hincrby(PENDING_KEY, product_id, views)
+            pipe.delete(flushing)
+            pipe.execute()
+            raise
+        redis.delete(flushing)
+    if unknown:
+        redis.zrem(TRENDING_KEY, *unknown)
+    decay()
+    return sum(views for product_id, views in deltas.items() if product_id not in unknown)
+
+
+def decay(now=None):
+    """Decay the trending scores by the time passed since they were last decayed"""
+    redis = _redis()
+    now = time.time() if now is None else now
+    decayed_at = redis.get(DECAYED_AT_KEY)
+    if decayed_at is not None:
+        factor = 0.5 ** (max(now - float(decayed_at), 0) / HALF_LIFE)
+        pipe = redis.pipeline()
+        pipe.zunionstore(TRENDING_KEY, {TRENDING_KEY: factor})
+        pipe.zremrangebyscore(TRENDING_KEY, "-inf", f"({MIN_SCORE}")
+        pipe.zremrangebyrank(TRENDING_KEY, 0, -TRENDING_SIZE - 1)
+        pipe.set(DECAYED_AT_KEY, now)
+        pipe.execute()
+    else:
+        redis.set(DECAYED_AT_KEY, now)
+
+
+def trending(limit=20):
+    """The active products viewed most lately, best first"""
+    # Ids viewed since the last flush may be inactive or unknown, read more than asked to make up for them
+    product_ids = [int(product_id) for product_id in _redis().zrevrange(TRENDING_KEY, 0, limit * OVERFETCH - 1)]
+    if not product_ids:
+        return []
+    products = Product.objects.filter(id__in=product_ids, is_active=True).select_related("brand", "category")
+    by_id = {product.id: product for product in products}
+    return [by_id[pk] for pk in product_ids if pk in by_id][:limit]
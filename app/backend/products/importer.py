@@ -0,0 +1,272 @@
+"""
+Streaming bulk product import
+
+Feeds are read row by row from CSV or JSON Lines, so memory does not grow with
+the file. Brands and categories are resolved through in-memory maps of slug to
+id. The valid rows of each chunk are copied into a temporary staging table and
+upserted into products with a single INSERT ... ON CONFLICT, in the same
+transaction that records the job's progress, so a failed import resumes at the
+first row of the chunk that did not commit. Invalid rows are recorded on the
+job and skipped.
+"""
+
+import csv
+import io
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.text import slugify
+
+from core.models import Brand, Category, ImportJob
+from core.tasks import task
+
+from . import cdn
+
+logger = logging.getLogger(__name__)
+
+# Errors kept on the job, later failures are still counted
+MAX_ERRORS = 1000
+TRUE_VALUES = {"1", "true", "yes", "y"}
+FALSE_VALUES = {"0", "false", "no", "n"}
+
+STAGING_SQL = """
+CREATE TEMPORARY TABLE IF NOT EXISTS product_import_staging (
+    row_number integer,
+    sku varchar(64),
+    name varchar(255),
+    description text,
+    price numeric(10, 2),
+    brand_id bigint,
+    brand_name varchar(255),
+    category_id bigint,
+    is_active boolean
+)
+"""
+
+# The last row wins when a chunk repeats a SKU, and unchanged products are not rewritten
+UPSERT_SQL = """
+INSERT INTO core_product (
+    sku, name, description, price, brand_id, brand_name, category_id, is_active, created_at, updated_at
+)
+SELECT DISTINCT ON (sku) sku, name, description, price, brand_id, brand_name, category_id, is_active, now(), now()
+FROM product_import_staging
+ORDER BY sku, row_number DESC
+ON CONFLICT (sku) DO UPDATE SET
+    name = EXCLUDED.name,
+    description = EXCLUDED.description,
+    price = EXCLUDED.price,
+    brand_id = EXCLUDED.brand_id,
+    brand_name = EXCLUDED.brand_name,
+    category_id = EXCLUDED.category_id,
+    is_active = EXCLUDED.is_active,
+    updated_at = EXCLUDED.updated_at
+WHERE (core_product.name, core_product.description, core_product.price, core_product.brand_id,
+       core_product.category_id, core_product.is_active)
+    IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.description, EXCLUDED.price, EXCLUDED.brand_id,
+                      EXCLUDED.category_id, EXCLUDED.is_active)
+RETURNING id
+"""
+
+
+class RowError(ValueError):
+    """A feed row that cannot be imported"""
+
+
+def read_records(job):
+    """Yield each record of the job's file as a dict, or a RowError for a line that cannot be parsed"""
+    with job.file.storage.open(job.file.name, "rb") as raw:
+        text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+        if job.format == ImportJob.Format.CSV:
+            yield from csv.DictReader(text)
+            return
+        for line in text:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield RowError(f"Invalid JSON: {exc.msg}")
+                continue
+            yield record if isinstance(record, dict) else RowError("Expected a JSON object")
+
+
+def _text(record, name, max_length, required=True):
+    value = record.get(name)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f"{name} is required")
+    if len(value) > max_length:
+        raise RowError(f"{name} is longer than {max_length} characters")
+    return value
+
+
+def _price(record):
+    try:
+        price = Decimal(str(record.get("price", "")).strip())
+    except InvalidOperation:
+        raise RowError("price is not a number") from None
+    if not price.is_finite() or price < 0 or price >= Decimal("100000000"):
+        raise RowError("price must be between 0 and 99999999.99")
+    return price.quantize(Decimal("0.01"))
+
+
+def _flag(record, name):
+    value = record.get(name)
+    if value is None or value == "":
+        return True
+    if isinstance(value, bool):
+        return value
+    if str(value).strip().lower() in TRUE_VALUES:
+        return True
+    if str(value).strip().lower() in FALSE_VALUES:
+        return False
+    raise RowError(f"{name} must be true or false")
+
+
+class ProductImporter:
+    """Run an ImportJob, committing one chunk of rows at a time"""
+
+    def __init__(self, job, on_progress=None):
+        self.job = job
+        self.on_progress = on_progress or (lambda job: None)
+        self.brands = {}
+        self.categories = {}
+
+    def load_maps(self):
+        self.brands = {slug: (pk, name) for pk, slug, name in Brand.objects.values_list("id", "slug", "name")}
+        self.categories = dict(Category.objects.values_list("slug", "id"))
+
+    def clean(self, record):
+        """Validate a record and return its product values, with the brand still as a (slug, name) pair"""
+        if isinstance(record, RowError):
+            raise record
+        brand_name = _text(record, "brand", 255)
+        brand_slug = slugify(brand_name)
+        if not brand_slug:
+            raise RowError("brand must contain letters or digits")
+        category = _text(record, "category", 255)
+        if category not in self.categories:
+            raise RowError(f"Unknown category '{category}'")
+        return [
+            _text(record, "sku", 64),
+            _text(record, "name", 255),
+            _text(record, "description", 100_000, required=False),
+            _price(record),
+            (brand_slug, brand_name),
+            self.categories[category],
+            _flag(record, "is_active"),
+        ]
+
+    def claim(self, force=False):
+        """Mark the job running unless another run owns it or it already finished"""
+        statuses = [ImportJob.Status.PENDING, ImportJob.Status.FAILED]
+        if force:
+            statuses.append(ImportJob.Status.RUNNING)
+        claimed = ImportJob.objects.filter(pk=self.job.pk, status__in=statuses).update(
+            status=ImportJob.Status.RUNNING, started_at=timezone.now(), error=""
+        )
+        self.job.refresh_from_db()
+        return bool(claimed)
+
+    def run(self, force=False):
+        """Import the rows after the last committed chunk, returning the job"""
+        if not self.claim(force):
+            raise RuntimeError(f"{self.job} is not pending or failed")
+
+        self.load_maps()
+        resume_after = self.job.rows_processed
+        rows, errors, number = [], [], resume_after
+        try:
+            for number, record in enumerate(read_records(self.job), start=1):
+                if number <= resume_after:
+                    continue
+                try:
+                    rows.append((number, *self.clean(record)))
+                except RowError as exc:
+                    sku = record.get("sku", "") if isinstance(record, dict) else ""
+                    errors.append({"row": number, "sku": str(sku or ""), "error": str(exc)})
+                if number - self.job.rows_processed >= self.job.chunk_size:
+                    self.commit_chunk(rows, errors, number)
+                    rows, errors = [], []
+            if number > self.job.rows_processed:
+                self.commit_chunk(rows, errors, number)
+        except Exception as exc:
+            ImportJob.objects.filter(pk=self.job.pk).update(
+                status=ImportJob.Status.FAILED, error=str(exc), finished_at=timezone.now()
+            )
+            self.job.refresh_from_db()
+            raise
+
+        ImportJob.objects.filter(pk=self.job.pk).update(status=ImportJob.Status.COMPLETED, finished_at=timezone.now())
+        self.job.refresh_from_db()
+        return self.job
+
+    def resolve_brands(self, rows, errors):
+        """
+        Create the brands first seen in this chunk and swap every row's brand for (id, name).
+        A new slug whose name an existing brand already has is taken to mean that brand, and
+        rows whose brand still cannot be resolved are moved to errors.
+        """
+        missing = {slug: name for *_, (slug, name), _, _ in rows if slug not in self.brands}
+        if missing:
+            Brand.objects.bulk_create(
+                [Brand(name=name, slug=slug) for slug, name in missing.items()], ignore_conflicts=True
+            )
+            cdn.purge(cdn.BRANDS)
+            for pk, slug, name in Brand.objects.filter(slug__in=missing).values_list("id", "slug", "name"):
+                self.brands[slug] = (pk, name)
+            # Skipped by the unique name rather than the slug
+            by_name = {slug: name for slug, name in missing.items() if slug not in self.brands}
+            if by_name:
+                brands = dict(Brand.objects.filter(name__in=by_name.values()).values_list("name", "id"))
+                for slug, name in by_name.items():
+                    if name in brands:
+                        self.brands[slug] = (brands[name], name)
+        for row in rows:
+            if (brand := self.brands.get(row[5][0])) is None:
+                errors.append({"row": row[0], "sku": row[1], "error": f"Brand '{row[5][1]}' could not be created"})
+                continue
+            yield (*row[:5], *brand, *row[6:])
+
+    def commit_chunk(self, rows, errors, processed):
+        """Upsert one chunk and record the job's progress in the same transaction"""
+        staged = []
+        with transaction.atomic():
+            if rows:
+                staged = list(self.resolve_brands(rows, errors))
+                with connection.cursor() as cursor:
+                    cursor.execute(STAGING_SQL)
+                    cursor.execute("TRUNCATE product_import_staging")
+                    with cursor.cursor.copy("COPY product_import_staging FROM STDIN") as copy:
+                        for row in staged:
+                            copy.write_row(row)
+                    cursor.execute(UPSERT_SQL)
+                    # The upsert bypasses the model signals, so purge the products it wrote here
+                    changed = [cdn.product_key(pk) for (pk,) in cursor.fetchall()]
+                if changed:
+                    cdn.purge(cdn.PRODUCTS, *changed)
+
+            kept = self.job.errors + errors[: max(MAX_ERRORS - len(self.job.errors), 0)]
+            ImportJob.objects.filter(pk=self.job.pk).update(
+                rows_processed=processed,
+                rows_imported=F("rows_imported") + len(staged),
+                rows_failed=F("rows_failed") + len(errors),
+                errors=kept,
+            )
+        self.job.refresh_from_db()
+        self.on_progress(self.job)
+
+
+@task(max_attempts=1)
+def run_import(job_id):
+    """Run an import on a worker. It is not retried, failed imports are resumed from the admin"""
+    ProductImporter(ImportJob.objects.get(pk=job_id)).run()
+
+
+def start_import(job):
+    """Queue an import for a background worker, which picks it up once the current transaction commits"""
+    run_import.enqueue(job.pk)
@@ -0,0 +1,20 @@
+"""
+Django command to flush the product view counters
+"""
+
+from django.core.management.base import BaseCommand
+
+from products.counters import flush_views
+
+
+class Command(BaseCommand):
+    """
+    Add the views counted in Redis since the last run to the products' view counts and decay
+    the trending scores. Run it every minute; counts wait in Redis until it does.
+    """
+
+    help = "Flush buffered product views to Postgres and decay trending scores"
+
+    def handle(self, *args, **options):
+        views = flush_views()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {views:,} views"))
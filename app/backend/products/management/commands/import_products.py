@@ -0,0 +1,64 @@
+"""
+Django command to import a product feed
+"""
+
+from pathlib import Path
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import ImportJob
+from products.importer import ProductImporter
+
+
+class Command(BaseCommand):
+    """Stream a CSV or JSON Lines product feed into the catalog, or resume an earlier import"""
+
+    help = "Import products from a CSV or JSON Lines feed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", type=Path, help="Feed to import")
+        parser.add_argument("--format", choices=ImportJob.Format.values, help="Feed format, by default the extension")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows committed per chunk")
+        parser.add_argument("--resume", type=int, metavar="JOB_ID", help="Resume a failed import")
+        parser.add_argument("--force", action="store_true", help="Resume an import still marked as running")
+
+    def handle(self, *args, **options):
+        if options["resume"] is not None:
+            try:
+                job = ImportJob.objects.get(pk=options["resume"])
+            except ImportJob.DoesNotExist:
+                raise CommandError(f"Import {options['resume']} does not exist") from None
+        elif options["path"] is not None:
+            job = self.create_job(options["path"], options["format"], options["chunk_size"])
+        else:
+            raise CommandError("Give a feed to import or --resume JOB_ID")
+
+        self.stdout.write(f"Importing {job.file.name} as import {job.pk}...")
+        try:
+            job = ProductImporter(job, on_progress=self.progress).run(force=options["force"])
+        except Exception as exc:
+            raise CommandError(f"Import {job.pk} failed, resume it with --resume {job.pk}: {exc}") from exc
+
+        for error in job.errors[:20]:
+            self.stdout.write(self.style.WARNING(f"Row {error['row']} ({error['sku']}): {error['error']}"))
+        self.stdout.write(
+            self.style.SUCCESS(f"Imported {job.rows_imported:,} rows, {job.rows_failed:,} failed (import {job.pk})")
+        )
+
+    def create_job(self, path, format, chunk_size):
+        if not path.is_file():
+            raise CommandError(f"{path} is not a file")
+        format = format or path.suffix.lstrip(".").lower()
+        if format not in ImportJob.Format.values:
+            raise CommandError(f"Cannot tell the format of {path}, pass --format")
+        job = ImportJob(format=format, chunk_size=chunk_size)
+        with path.open("rb") as feed:
+            job.file.save(path.name, File(feed), save=False)
+        job.save()
+        return job
+
+    def progress(self, job):
+        self.stdout.write(
+            f"{job.rows_processed:,} rows read, {job.rows_imported:,} imported, {job.rows_failed:,} failed"
+        )
@@ -0,0 +1,24 @@
+"""
+Django command to refresh the product recommendations
+"""
+
+from django.core.management.base import BaseCommand
+
+from products.recommendations import LAG, TOP_K, refresh
+
+
+class Command(BaseCommand):
+    """
+    Count the orders paid since the last run into the co-occurrence matrix and re-rank the
+    products they touched. Run it every few minutes; the first run counts the whole history.
+    """
+
+    help = "Refresh frequently bought together recommendations from recent orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-k", type=int, default=TOP_K, help="Recommendations kept per product")
+        parser.add_argument("--lag", type=int, default=LAG, help="Seconds a paid order waits to be counted")
+
+    def handle(self, *args, **options):
+        ranked = refresh(lag=options["lag"], top_k=options["top_k"])
+        self.stdout.write(self.style.SUCCESS(f"Re-ranked {ranked:,} products"))
@@ -0,0 +1,205 @@
+"""
+Promotion pricing
+
+Active promotions are compiled into a PriceBook that indexes them by the
+product, brand or category they apply to, category promotions being filed
+under every subcategory too. Pricing a basket is then one pass over its lines,
+each looking up at most three short lists, whatever the number of promotions.
+
+Like the category tree, every process keeps its own compiled snapshot and
+rebuilds it with one query when the version stored in the cache changes,
+which happens after any promotion change is committed, when the category tree
+changes, or when a promotion starts or ends.
+"""
+
+import threading
+import uuid
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Product, Promotion
+from core.warmup import register_warmer
+
+from .tree import get_tree
+
+VERSION_KEY = "catalog:promotions:version"
+CENT = Decimal("0.01")
+
+
+class Rule:
+    """A compiled promotion, working out its discount on a line"""
+
+    __slots__ = ("id", "name", "kind", "rate", "buy", "free")
+
+    def __init__(self, promotion):
+        self.id = promotion.id
+        self.name = promotion.name
+        self.kind = promotion.kind
+        self.rate = (promotion.percent or 0) / 100
+        self.buy = promotion.buy_quantity or 0
+        self.free = promotion.free_quantity or 0
+
+    @staticmethod
+    def valid(promotion):
+        """Whether a promotion has the values its kind needs, the database checks this too"""
+        if promotion.kind == Promotion.Kind.PERCENT_OFF:
+            return promotion.percent is not None and 0 < promotion.percent <= 100
+        if promotion.kind == Promotion.Kind.BUY_X_GET_Y:
+            return bool(promotion.buy_quantity and promotion.free_quantity)
+        return False
+
+    def discount(self, unit_price, quantity):
+        if self.kind == Promotion.Kind.PERCENT_OFF:
+            return (unit_price * quantity * self.rate).quantize(CENT, ROUND_HALF_UP)
+        free_units = quantity // (self.buy + self.free) * self.free
+        return unit_price * free_units
+
+
+@dataclass
+class PricedLine:
+    product: int
+    quantity: int
+    unit_price: Decimal
+    discount: Decimal = Decimal("0.00")
+    promotion: Rule | None = None
+
+    @property
+    def total(self):
+        return self.unit_price * self.quantity - self.discount
+
+
+@dataclass
+class Quote:
+    lines: list = field(default_factory=list)
+    # Products in the basket that are not for sale, left out of the totals
+    unavailable: list = field(default_factory=list)
+
+    @property
+    def subtotal(self):
+        return sum((line.unit_price * line.quantity for line in self.lines), Decimal("0.00"))
+
+    @property
+    def discount(self):
+        return sum((line.discount for line in self.lines), Decimal("0.00"))
+
+    @property
+    def total(self):
+        return self.subtotal - self.discount
+
+
+class PriceBook:
+    """The promotions active at a moment, indexed by what they apply to"""
+
+    def __init__(self, promotions, tree, now):
+        self.by_product = {}
+        self.by_brand = {}
+        self.by_category = {}
+        # The book is only valid until the next promotion starts or ends
+        self.expires_at = None
+        for promotion in promotions:
+            if not Rule.valid(promotion):
+                continue
+            boundary = promotion.starts_at if promotion.starts_at and promotion.starts_at > now else promotion.ends_at
+            if boundary is not None and (self.expires_at is None or boundary < self.expires_at):
+                self.expires_at = boundary
+            if promotion.starts_at and promotion.starts_at > now:
+                continue
+            rule = Rule(promotion)
+            if promotion.product_id is not None:
+                self.by_product.setdefault(promotion.product_id, []).append(rule)
+            elif promotion.brand_id is not None:
+                self.by_brand.setdefault(promotion.brand_id, []).append(rule)
+            else:
+                for category_id in tree.descendant_ids(promotion.category_id):
+                    self.by_category.setdefault(category_id, []).append(rule)
+
+    def expired(self, now):
+        return self.expires_at is not None and now >= self.expires_at
+
+    def price(self, lines, products):
+        """
+        Price {product id: quantity} lines, given {product id: (price, brand id, category id)},
+        giving each line the promotion that takes the most off it
+        """
+        quote = Quote()
+        no_rules = ()
+        for product_id, quantity in sorted(lines.items()):
+            if product_id not in products:
+                quote.unavailable.append(product_id)
+                continue
+            unit_price, brand_id, category_id = products[product_id]
+            line = PricedLine(product_id, quantity, unit_price)
+            for rules in (
+                self.by_product.get(product_id, no_rules),
+                self.by_brand.get(brand_id, no_rules),
+                self.by_category.get(category_id, no_rules),
+            ):
+                for rule in rules:
+                    discount = min(rule.discount(unit_price, quantity), unit_price * quantity)
+                    if discount > line.discount or (
+                        discount == line.discount and discount and rule.id < line.promotion.id
+                    ):
+                        line.discount, line.promotion = discount, rule
+            quote.lines.append(line)
+        return quote
+
+
+_lock = threading.Lock()
+_snapshot = (None, None, None)
+
+
+def compile_promotions(tree=None, now=None):
+    """A PriceBook of the promotions active now or starting later"""
+    now = now or timezone.now()
+    promotions = Promotion.objects.filter(is_active=True).filter(Q(ends_at__isnull=True) | Q(ends_at__gt=now))
+    return PriceBook(promotions.order_by("id"), tree or get_tree(), now)
+
+
+def get_price_book():
+    """Return the current snapshot, recompiling it if a promotion or category changed, started or ended"""
+    global _snapshot
+
+    version, tree, book = _snapshot
+    current = cache.get(VERSION_KEY)
+    now = timezone.now()
+    if book is not None and version == current and tree is get_tree() and not book.expired(now):
+        return book
+
+    with _lock:
+        if current is None:
+            cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            current = cache.get(VERSION_KEY)
+        # The version is read before the query, so a change committed meanwhile triggers another rebuild
+        tree = get_tree()
+        book = compile_promotions(tree, now)
+        _snapshot = (current, tree, book)
+    return book
+
+
+def invalidate():
+    """Make every process recompile its snapshot on next use"""
+    global _snapshot
+
+    _snapshot = (None, None, None)
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def product_terms(product_ids):
+    """{product id: (price, brand id, category id)} of the active products among product_ids, in one query"""
+    rows = Product.objects.filter(id__in=product_ids, is_active=True).values_list(
+        "id", "price", "brand_id", "category_id"
+    )
+    return {product_id: tuple(terms) for product_id, *terms in rows}
+
+
+def quote(lines, products=None):
+    """Price {product id: quantity} lines with the current promotions, reading the products unless given"""
+    products = product_terms(lines) if products is None else products
+    return get_price_book().price(lines, products)
+
+
+register_warmer(get_price_book)
@@ -0,0 +1,111 @@
+"""
+"Frequently bought together" recommendations
+
+The item-item co-occurrence matrix is kept sparse in ProductPair, one row per
+pair of products bought in the same paid order, in both directions, counting
+the orders. It is built incrementally: a watermark records how far, by
+updated_at, paid orders have been counted, and each refresh adds the pairs of
+the orders paid since in one set-based INSERT ... ON CONFLICT, then re-ranks
+only the products those pairs touched. An order is only paid once and never
+changes after, so it is counted when it is paid however long after it was
+placed, and orders left unpaid or cancelled are never counted. Orders paid in
+the last LAG seconds wait for the next refresh, so a payment still committing
+cannot be skipped.
+
+Each product's top neighbours are stored as an array of product ids in
+ProductRecommendation, so serving them is a primary key lookup whatever the
+size of the order history.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from core.models import Order, Product, ProductRecommendation, RollupWatermark
+
+WATERMARK = "recommendations"
+TOP_K = getattr(settings, "RECOMMENDATIONS_TOP_K", 10)
+LAG = getattr(settings, "RECOMMENDATIONS_LAG", 60)
+# Orders counted per transaction, by the span of time they were paid in
+WINDOW = timedelta(seconds=getattr(settings, "RECOMMENDATIONS_WINDOW", 24 * 60 * 60))
+# Orders with more distinct products than this are left out: they add a quadratic number of pairs
+# and say little about what goes together
+MAX_BASKET = getattr(settings, "RECOMMENDATIONS_MAX_BASKET", 50)
+
+ADD_PAIRS_SQL = """
+WITH items AS (
+    SELECT DISTINCT item.order_id, item.product_id
+    FROM core_order AS o
+    JOIN core_orderitem AS item ON item.order_id = o.id AND item.created_at = o.created_at
+    WHERE o.status = %(status)s AND o.updated_at > %(since)s AND o.updated_at <= %(until)s
+),
+baskets AS (
+    SELECT order_id FROM items GROUP BY order_id HAVING count(*) BETWEEN 2 AND %(max_basket)s
+)
+INSERT INTO core_productpair (product_id, other_id, orders)
+SELECT a.product_id, b.product_id, count(*)
+FROM items AS a
+JOIN items AS b ON b.order_id = a.order_id AND b.product_id <> a.product_id
+WHERE a.order_id IN (SELECT order_id FROM baskets)
+GROUP BY a.product_id, b.product_id
+ON CONFLICT (product_id, other_id) DO UPDATE SET orders = core_productpair.orders + EXCLUDED.orders
+RETURNING product_id
+"""
+
+RANK_SQL = """
+INSERT INTO core_productrecommendation (product_id, related, updated_at)
+SELECT product_id, (array_agg(other_id ORDER BY orders DESC, other_id))[1:%(top_k)s], statement_timestamp()
+FROM core_productpair
+WHERE product_id = ANY(%(products)s)
+GROUP BY product_id
+ON CONFLICT (product_id) DO UPDATE SET related = EXCLUDED.related, updated_at = EXCLUDED.updated_at
+"""
+
+
+def rank(product_ids, top_k=TOP_K):
+    """Store the top_k products most often bought with each of product_ids"""
+    if product_ids:
+        with connection.cursor() as cursor:
+            cursor.execute(RANK_SQL, {"products": sorted(product_ids), "top_k": top_k})
+
+
+def refresh(lag=LAG, window=WINDOW, top_k=TOP_K):
+    """Count the orders paid since the watermark, a window at a time, returning how many products were re-ranked"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT statement_timestamp() - make_interval(secs => %s)", [lag])
+        (upper,) = cursor.fetchone()
+    ranked = 0
+    while True:
+        with transaction.atomic():
+            watermark = RollupWatermark.objects.select_for_update().filter(name=WATERMARK).first()
+            if watermark is None:
+                paid = Order.objects.filter(status=Order.Status.PAID)
+                oldest = paid.order_by("updated_at").values_list("updated_at", flat=True).first()
+                if oldest is None:
+                    return ranked
+                # Just before the first paid order, as the window excludes its start
+                watermark = RollupWatermark.objects.create(name=WATERMARK, value=oldest - timedelta(microseconds=1))
+            if watermark.value >= upper:
+                return ranked
+            until = min(watermark.value + window, upper)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    ADD_PAIRS_SQL,
+                    {"since": watermark.value, "until": until, "status": Order.Status.PAID, "max_basket": MAX_BASKET},
+                )
+                touched = {product_id for (product_id,) in cursor.fetchall()}
+            rank(touched, top_k)
+            ranked += len(touched)
+            watermark.value = until
+            watermark.save(update_fields=["value"])
+
+
+def recommended(product_id):
+    """The active products most often bought with a product, best first"""
+    related = ProductRecommendation.objects.filter(pk=product_id).values_list("related", flat=True).first()
+    if not related:
+        return []
+    products = Product.objects.filter(id__in=related, is_active=True).select_related("brand", "category")
+    by_id = {product.id: product for product in products}
+    return [by_id[pk] for pk in related if pk in by_id]
@@ -0,0 +1,127 @@
+"""
+Faceted product search
+
+Matches use the weighted `search_vector` column and its GIN index. Facet
+counts for brands, categories and price buckets, and the total, come from a
+single GROUPING SETS pass over the same filtered rows. Whole responses are
+cached briefly, keyed by the normalised query.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import F
+
+from core.models import Product
+
+from .tree import get_tree
+
+CACHE_TIMEOUT = getattr(settings, "SEARCH_CACHE_TIMEOUT", 30)
+# Upper bounds of the price facet buckets, the last bucket is open ended
+PRICE_BUCKETS = getattr(settings, "SEARCH_PRICE_BUCKETS", [10, 25, 50, 100, 250, 500])
+PAGE_SIZE = 24
+FACET_LIMIT = 20
+
+FACETS_SQL = """
+SELECT brand_id, brand_name, category_id, bucket, count(*), GROUPING(brand_id, category_id, bucket)
+FROM (
+    SELECT matches.brand_id, matches.brand_name, matches.category_id,
+           width_bucket(matches.price, %s::numeric[]) AS bucket
+    FROM ({matches}) AS matches
+) AS facets
+GROUP BY GROUPING SETS ((brand_id, brand_name), (category_id), (bucket), ())
+"""
+
+
+class ProductSearch:
+    """A search query with its filters"""
+
+    def __init__(self, q="", brand=None, category=None, min_price=None, max_price=None, page=1):
+        self.q = " ".join(q.split())
+        self.brand = brand
+        self.category = category
+        self.min_price = min_price
+        self.max_price = max_price
+        self.page = page
+
+    def cache_key(self):
+        params = [self.q.lower(), self.brand, self.category, self.min_price, self.max_price, self.page]
+        digest = hashlib.sha1(json.dumps(params, default=str).encode()).hexdigest()
+        return f"catalog:search:{digest}"
+
+    def get_queryset(self):
+        """Active products matching the text query and every filter"""
+        queryset = Product.objects.filter(is_active=True)
+        if self.q:
+            queryset = queryset.filter(search_vector=SearchQuery(self.q, config="english", search_type="websearch"))
+        if self.brand is not None:
+            queryset = queryset.filter(brand_id=self.brand)
+        if self.category is not None:
+            queryset = queryset.filter(category_id__in=get_tree().descendant_ids(self.category))
+        if self.min_price is not None:
+            queryset = queryset.filter(price__gte=self.min_price)
+        if self.max_price is not None:
+            queryset = queryset.filter(price__lte=self.max_price)
+        return queryset
+
+    def results(self, queryset):
+        """One page of matches, best first"""
+        if self.q:
+            query = SearchQuery(self.q, config="english", search_type="websearch")
+            queryset = queryset.annotate(rank=SearchRank(F("search_vector"), query)).order_by("-rank", "id")
+        else:
+            queryset = queryset.order_by("-created_at", "-id")
+        offset = (self.page - 1) * PAGE_SIZE
+        return list(
+            queryset.select_related("brand", "category").only(
+                "id", "sku", "name", "price", "brand__name", "category__name"
+            )[offset : offset + PAGE_SIZE]
+        )
+
+    def facets(self, queryset):
+        """Total and facet counts over every match, in one query"""
+        try:
+            matches, params = queryset.values("brand_id", "brand_name", "category_id", "price").query.sql_with_params()
+        except EmptyResultSet:
+            return 0, {"brands": [], "categories": [], "prices": []}
+        with connection.cursor() as cursor:
+            cursor.execute(FACETS_SQL.format(matches=matches), [PRICE_BUCKETS, *params])
+            rows = cursor.fetchall()
+
+        nodes = get_tree().nodes
+        total, brands, categories, prices = 0, [], [], []
+        # GROUPING() sets one bit per column left out of the row's grouping set
+        for brand_id, brand_name, category_id, bucket, count, grouping in rows:
+            if grouping == 0b111:
+                total = count
+            elif grouping == 0b011:
+                brands.append({"id": brand_id, "name": brand_name, "count": count})
+            elif grouping == 0b101:
+                node = nodes.get(category_id)
+                categories.append({"id": category_id, "name": node.name if node else "", "count": count})
+            else:
+                bounds = [None, *PRICE_BUCKETS, None]
+                prices.append({"min": bounds[bucket], "max": bounds[bucket + 1], "count": count})
+
+        brands.sort(key=lambda facet: (-facet["count"], facet["name"]))
+        categories.sort(key=lambda facet: (-facet["count"], facet["name"]))
+        prices.sort(key=lambda facet: facet["min"] or 0)
+        return total, {"brands": brands[:FACET_LIMIT], "categories": categories[:FACET_LIMIT], "prices": prices}
+
+    def execute(self, render):
+        """Return the response body, rendering result rows with render and caching it briefly"""
+        key = self.cache_key()
+        body = cache.get(key)
+        if body is not None:
+            return body
+
+        queryset = self.get_queryset()
+        count, facets = self.facets(queryset)
+        body = {"count": count, "results": render(self.results(queryset)), "facets": facets}
+        cache.set(key, body, CACHE_TIMEOUT)
+        return body
@@ -0,0 +1,126 @@
+"""
+Serializers for the Product Catalog
+"""
+
+from drf_spectacular.utils import extend_schema_field
+from rest_framework import serializers
+
+from core.models import Brand, Category, Product
+
+from .tree import get_tree
+
+
+class BrandSerializer(serializers.ModelSerializer):
+    """Serializer for Brand Model"""
+
+    class Meta:
+        model = Brand
+        fields = ["id", "name", "slug"]
+
+
+class CategorySerializer(serializers.ModelSerializer):
+    """Serializer for Category Model"""
+
+    class Meta:
+        model = Category
+        fields = ["id", "name", "slug", "parent", "depth"]
+
+
+class CategorySummarySerializer(serializers.Serializer):
+    """Schema of a Category in a breadcrumb"""
+
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    slug = serializers.SlugField()
+
+
+class CategoryTreeSerializer(CategorySummarySerializer):
+    """Schema of a node in the Category tree"""
+
+    children = serializers.ListField(child=serializers.DictField())
+
+
+class ProductListSerializer(serializers.ModelSerializer):
+    """Slim Serializer for Product list pages"""
+
+    brand = serializers.CharField(source="brand.name", read_only=True)
+    category = serializers.CharField(source="category.name", read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ["id", "sku", "name", "price", "brand", "category"]
+        read_only_fields = fields
+
+
+class ProductDetailSerializer(serializers.ModelSerializer):
+    """Serializer for a single Product"""
+
+    brand = BrandSerializer(read_only=True)
+    category = CategorySerializer(read_only=True)
+    breadcrumb = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = [
+            "id",
+            "sku",
+            "name",
+            "description",
+            "price",
+            "brand",
+            "category",
+            "breadcrumb",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+    @extend_schema_field(CategorySummarySerializer(many=True))
+    def get_breadcrumb(self, product):
+        """Categories from the root down to the product's category, from the tree snapshot"""
+        return [
+            {"id": node.id, "name": node.name, "slug": node.slug} for node in get_tree().breadcrumb(product.category_id)
+        ]
+
+
+class ProductSearchRequestSerializer(serializers.Serializer):
+    """Serializer for Product Search query parameters"""
+
+    q = serializers.CharField(required=False, default="", allow_blank=True, max_length=200)
+    brand = serializers.IntegerField(required=False)
+    category = serializers.IntegerField(required=False)
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    page = serializers.IntegerField(required=False, default=1, min_value=1, max_value=40)
+
+
+class FacetSerializer(serializers.Serializer):
+    """Schema of a brand or category facet"""
+
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class PriceFacetSerializer(serializers.Serializer):
+    """Schema of a price bucket facet, max is exclusive"""
+
+    min = serializers.IntegerField(allow_null=True)
+    max = serializers.IntegerField(allow_null=True)
+    count = serializers.IntegerField()
+
+
+class FacetsSerializer(serializers.Serializer):
+    """Schema of the facets of a search"""
+
+    brands = FacetSerializer(many=True)
+    categories = FacetSerializer(many=True)
+    prices = PriceFacetSerializer(many=True)
+
+
+class ProductSearchResponseSerializer(serializers.Serializer):
+    """Serializer for Product Search Response"""
+
+    count = serializers.IntegerField()
+    results = ProductListSerializer(many=True)
+    facets = FacetsSerializer()
@@ -0,0 +1,53 @@
+"""
+Signals for the Product Catalog
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Brand, Category, Product, Promotion
+
+from . import cdn, pricing, tree
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_tree(**kwargs):
+    """Drop the cached category tree once the change is committed"""
+    transaction.on_commit(tree.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Promotion)
+def invalidate_price_book(**kwargs):
+    """Drop the compiled promotions once the change is committed"""
+    transaction.on_commit(pricing.invalidate)
+
+
+@receiver(post_save, sender=Product)
+def purge_saved_product(instance, created, **kwargs):
+    """Purge the pages showing a product, and every product listing when it is new"""
+    if created:
+        cdn.purge(cdn.PRODUCTS, cdn.product_key(instance.pk))
+    else:
+        cdn.purge(cdn.product_key(instance.pk))
+
+
+@receiver(post_delete, sender=Product)
+def purge_deleted_product(instance, **kwargs):
+    cdn.purge(cdn.PRODUCTS, cdn.product_key(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Brand)
+def purge_brand(instance, **kwargs):
+    """Purge the brand list and the pages showing the brand's products"""
+    cdn.purge(cdn.BRANDS, cdn.brand_key(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def purge_category(instance, **kwargs):
+    """
+    Purge the category listings and the pages naming the category. Moving a category
+    changes which products every filtered listing of its old and new ancestors holds,
+    so product listings are purged as well.
+    """
+    cdn.purge(cdn.CATEGORIES, cdn.PRODUCTS, cdn.category_key(instance.pk))
@@ -0,0 +1,142 @@
+"""
+Test CDN caching headers and surrogate key purging for the Product Catalog
+"""
+
+from unittest.mock import patch
+
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from core.helpers import API_Client
+from core.models import Brand, Category, Product
+from products import cdn, tree
+
+
+class CDNTestCase(TestCase):
+    """Base class with a small catalog and an empty local purger"""
+
+    def setUp(self):
+        self.client = API_Client()
+        self.brand = Brand.objects.create(name="Acme", slug="acme")
+        self.tools = Category.objects.create(name="Tools", slug="tools")
+        self.drills = Category.objects.create(name="Drills", slug="drills", parent=self.tools)
+        self.product = Product.objects.create(
+            sku="SKU-1", name="Cordless Drill", price="89.00", brand=self.brand, category=self.drills
+        )
+        tree.invalidate()
+        cdn.flush()
+        self.purged = cdn.get_purger().batches
+        self.purged.clear()
+
+    def surrogate_keys(self, response):
+        return response["Surrogate-Key"].split()
+
+
+class Catalog_Cache_Headers(CDNTestCase):
+    """Test catalog responses can be cached by a CDN"""
+
+    def test_list_headers(self):
+        """Test a product list is public and tagged with the products on the page"""
+        response = self.client.get(reverse("product-list"))
+        self.assertEqual(response["Cache-Control"], f"public, max-age={cdn.BROWSER_MAX_AGE}")
+        self.assertTrue(response["Surrogate-Control"].startswith("max-age=300,"))
+        self.assertEqual(
+            self.surrogate_keys(response),
+            ["products", f"product-{self.product.id}", f"brand-{self.brand.id}", f"category-{self.drills.id}"],
+        )
+
+    def test_detail_tagged_with_breadcrumb(self):
+        """Test a product page is tagged with its brand and every category in its breadcrumb"""
+        response = self.client.get(reverse("product-detail", args=[self.product.id]))
+        self.assertEqual(
+            self.surrogate_keys(response),
+            [
+                f"product-{self.product.id}",
+                f"brand-{self.brand.id}",
+                f"category-{self.tools.id}",
+                f"category-{self.drills.id}",
+            ],
+        )
+        self.assertIn(f"max-age={cdn.SURROGATE_MAX_AGE}", response["Surrogate-Control"])
+
+    def test_search_expires_with_search_cache(self):
+        """Test search results are tagged with their products and kept no longer than the search cache"""
+        response = self.client.get(reverse("product-search"), {"q": "drill"})
+        self.assertEqual(self.surrogate_keys(response), ["products", f"product-{self.product.id}"])
+        self.assertTrue(response["Surrogate-Control"].startswith("max-age=30,"))
+
+    def test_brand_and_category_lists(self):
+        """Test brand and category listings are tagged with their collection keys"""
+        self.assertEqual(self.surrogate_keys(self.client.get(reverse("brand-list"))), ["brands"])
+        self.assertEqual(self.surrogate_keys(self.client.get(reverse("category-tree"))), ["categories"])
+
+    def test_errors_are_not_cached(self):
+        """Test error responses carry no shared caching headers"""
+        response = self.client.get(reverse("product-detail", args=[self.product.id + 1]))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("Surrogate-Key", response)
+
+
+class Surrogate_Key_Purging(CDNTestCase):
+    """Test model changes purge the keys of the pages showing them"""
+
+    def test_price_change_purges_product(self):
+        """Test updating a product purges only that product once the change commits"""
+        self.product.price = "79.00"
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.product.save()
+            self.assertEqual(self.purged, [])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.purged, [[f"product-{self.product.id}"]])
+
+    def test_new_product_purges_listings(self):
+        """Test creating a product purges every product listing"""
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(sku="SKU-2", name="Saw", price="20", brand=self.brand, category=self.tools)
+        self.assertEqual(self.purged, [sorted(["products", f"product-{product.id}"])])
+
+    def test_transaction_purges_once(self):
+        """Test the keys queued by one transaction are sent together"""
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.product.save()
+                self.brand.name = "Makita"
+                self.brand.save()
+        self.assertEqual(self.purged, [sorted(["brands", f"brand-{self.brand.id}", f"product-{self.product.id}"])])
+
+    def test_category_change_purges_listings(self):
+        """Test changing a category purges the category and product listings"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.drills.move_to(None)
+        self.assertEqual(self.purged, [sorted(["categories", "products", f"category-{self.drills.id}"])])
+
+    @patch.object(cdn, "PURGE_BATCH_SIZE", 2)
+    def test_purges_are_batched(self):
+        """Test large purges are split into batches the CDN accepts"""
+        with self.captureOnCommitCallbacks(execute=True):
+            cdn.purge("a", "b", "c")
+        self.assertEqual(self.purged, [["a", "b"], ["c"]])
+
+    def test_purge_failure_is_logged(self):
+        """Test an unreachable CDN does not fail the request that committed the change"""
+        with (
+            patch.object(cdn.LocalPurger, "purge", side_effect=OSError("timed out")),
+            self.assertLogs("products.cdn", "ERROR"),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            cdn.purge("a")
+
+
+class Fastly_Purger(TestCase):
+    """Test the Fastly purge backend"""
+
+    @patch("urllib.request.urlopen")
+    def test_soft_purge_request(self, patched_urlopen):
+        """Test keys are sent in one soft purge request"""
+        cdn.FastlyPurger("service", "token").purge(["product-1", "brand-2"])
+        request = patched_urlopen.call_args.args[0]
+        self.assertEqual(request.full_url, "https://api.fastly.com/service/service/purge")
+        self.assertEqual(request.get_header("Surrogate-key"), "product-1 brand-2")
+        self.assertEqual(request.get_header("Fastly-key"), "token")
+        self.assertEqual(request.get_header("Fastly-soft-purge"), "1")
@@ -0,0 +1,203 @@
+"""
+Test the product view counters and trending products
+"""
+
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase
+from django.urls import reverse
+from django_redis import get_redis_connection
+from rest_framework import status
+
+from core.helpers import API_Client
+from core.models import Brand, Category, Product
+from products import counters
+
+TRENDING_URL = reverse("product-trending")
+LIST_URL = reverse("product-list")
+
+
+def views_url(product_id):
+    return reverse("product-views", args=[product_id])
+
+
+class CounterTestCase(TestCase):
+    """Base class with a small catalog and empty counters"""
+
+    def setUp(self):
+        brand = Brand.objects.create(name="Acme", slug="acme")
+        category = Category.objects.create(name="Tools", slug="tools")
+        self.products = [
+            Product.objects.create(
+                sku=f"SKU-{n}", name=f"Product {n}", price=Decimal("5.00"), brand=brand, category=category
+            )
+            for n in range(3)
+        ]
+        self.redis = get_redis_connection("default")
+        self.clear()
+        self.addCleanup(self.clear)
+        self.client = API_Client()
+
+    def clear(self):
+        self.redis.delete(counters.PENDING_KEY, counters.TRENDING_KEY, counters.DECAYED_AT_KEY)
+
+    def view(self, product, times=1):
+        for _ in range(times):
+            counters.record_view(product.id)
+
+    def view_count(self, product):
+        return Product.objects.values_list("view_count", flat=True).get(pk=product.pk)
+
+
+class View_Counters(CounterTestCase):
+    """Test counting views in Redis and flushing them to Postgres"""
+
+    def test_record_view_skips_postgres(self):
+        """Test a view is counted in Redis without a query"""
+        with self.assertNumQueries(0):
+            self.view(self.products[0], 2)
+        self.assertEqual(self.redis.hget(counters.PENDING_KEY, self.products[0].id), b"2")
+        self.assertEqual(self.redis.zscore(counters.TRENDING_KEY, self.products[0].id), 2)
+        self.assertEqual(self.view_count(self.products[0]), 0)
+
+    def test_flush_is_one_update(self):
+        """Test a flush adds every pending count with a single statement and empties the buffer"""
+        a, b, c = self.products
+        self.view(a, 3)
+        self.view(b)
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.flush_views(), 4)
+        self.assertEqual([self.view_count(product) for product in (a, b, c)], [3, 1, 0])
+        self.assertFalse(self.redis.exists(counters.PENDING_KEY))
+
+        self.view(a)
+        with self.assertNumQueries(1):
+            counters.flush_views()
+        self.assertEqual(self.view_count(a), 4)
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.flush_views(), 0)
+
+    def test_failed_flush_keeps_counts(self):
+        """Test counts are put back for the next flush when Postgres fails"""
+        self.view(self.products[0], 2)
+        with mock.patch.object(counters, "add_views", side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            counters.flush_views()
+        self.view(self.products[0])
+        self.assertEqual(counters.flush_views(), 3)
+        self.assertEqual(self.view_count(self.products[0]), 3)
+        self.assertEqual(self.redis.keys("views:flushing:*"), [])
+
+    def test_unknown_products_are_dropped(self):
+        """Test views of products that do not exist are dropped by the flush and removed from trending"""
+        missing = self.products[-1].id + 1
+        for product_id in (0, missing, counters.MAX_PRODUCT_ID + 1):
+            counters.record_view(product_id)
+        self.view(self.products[0])
+        self.assertEqual(counters.flush_views(), 1)
+        self.assertEqual(self.view_count(self.products[0]), 1)
+        self.assertEqual(self.redis.zrange(counters.TRENDING_KEY, 0, -1), [str(self.products[0].id).encode()])
+
+        # Nothing is put back for the next flush
+        self.view(self.products[0])
+        self.assertEqual(counters.flush_views(), 1)
+        self.assertEqual(self.view_count(self.products[0]), 2)
+
+    def test_command(self):
+        """Test the command flushes the counters"""
+        self.view(self.products[0], 2)
+        out = StringIO()
+        call_command("flush_views", stdout=out)
+        self.assertIn("Flushed 2 views", out.getvalue())
+        self.assertEqual(self.view_count(self.products[0]), 2)
+
+
+class Trending_Decay(CounterTestCase):
+    """Test the trending scores decay with time"""
+
+    def test_scores_halve_every_half_life(self):
+        """Test a half-life after the last decay every score is halved, and faded ones are dropped"""
+        a, b, _ = self.products
+        self.view(a, 4)
+        self.redis.zadd(counters.TRENDING_KEY, {b.id: counters.MIN_SCORE * 1.5})
+        now = time.time()
+        counters.decay(now)
+        self.assertEqual(self.redis.zscore(counters.TRENDING_KEY, a.id), 4)
+
+        counters.decay(now + counters.HALF_LIFE)
+        self.assertAlmostEqual(self.redis.zscore(counters.TRENDING_KEY, a.id), 2)
+        self.assertIsNone(self.redis.zscore(counters.TRENDING_KEY, b.id))
+
+    def test_recent_views_outrank_old_ones(self):
+        """Test fewer recent views beat more views from several half-lives ago"""
+        a, b, _ = self.products
+        now = time.time()
+        counters.decay(now)
+        self.view(a, 10)
+        counters.decay(now + 3 * counters.HALF_LIFE)
+        self.view(b, 2)
+        self.assertEqual(counters.trending(), [b, a])
+
+    def test_trending_is_trimmed(self):
+        """Test only the best scores are kept"""
+        for n, product in enumerate(self.products):
+            self.view(product, n + 1)
+        counters.decay(time.time())
+        with mock.patch.object(counters, "TRENDING_SIZE", 2):
+            counters.decay(time.time())
+        self.assertEqual(counters.trending(), [self.products[2], self.products[1]])
+
+    def test_unknown_products_do_not_crowd_out(self):
+        """Test views of unknown products before a flush do not push real ones out of trending"""
+        missing = self.products[-1].id + 1
+        for product_id in range(missing, missing + 2):
+            for _ in range(3):
+                counters.record_view(product_id)
+        self.view(self.products[0])
+        self.assertEqual(counters.trending(2), [self.products[0]])
+
+
+class Popularity_API(CounterTestCase):
+    """Test the view beacon, trending products and sorting by popularity"""
+
+    def test_beacon(self):
+        """Test the beacon counts a view without touching Postgres or being cached"""
+        with self.assertNumQueries(0):
+            response = self.client.post(views_url(self.products[0].id))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertNotIn("Surrogate-Key", response)
+        self.assertEqual(self.redis.hget(counters.PENDING_KEY, self.products[0].id), b"1")
+
+    def test_beacon_refuses_ids_out_of_range(self):
+        """Test ids no product can have are refused rather than counted"""
+        response = self.client.post(views_url(counters.MAX_PRODUCT_ID + 1))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(self.redis.exists(counters.PENDING_KEY))
+
+    def test_trending(self):
+        """Test trending lists the active products viewed most, best first"""
+        a, b, c = self.products
+        self.view(a)
+        self.view(b, 3)
+        self.view(c, 2)
+        Product.objects.filter(pk=c.pk).update(is_active=False)
+        response = self.client.get(TRENDING_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["id"] for row in response.data], [b.id, a.id])
+
+        response = self.client.get(TRENDING_URL, {"limit": 1})
+        self.assertEqual([row["id"] for row in response.data], [b.id])
+
+    def test_popular_ordering(self):
+        """Test the catalog sorts by flushed view counts, most viewed first"""
+        a, b, c = self.products
+        self.view(b, 2)
+        self.view(c)
+        counters.flush_views()
+        response = self.client.get(LIST_URL, {"ordering": "popular"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["id"] for row in response.data["results"]], [b.id, c.id, a.id])
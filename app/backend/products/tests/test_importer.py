@@ -0,0 +1,210 @@
+"""
+Test the streaming Product Importer
+"""
+
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Brand, Category, ImportJob, Product, Task
+from products import cdn
+from products.importer import ProductImporter, run_import
+
+CSV_HEADER = "sku,name,description,price,brand,category,is_active\n"
+
+
+def create_job(content, format="csv", chunk_size=5000):
+    """Create an ImportJob for the given feed content"""
+    job = ImportJob(format=format, chunk_size=chunk_size)
+    job.file.save(f"feed.{format}", ContentFile(content.encode()), save=False)
+    job.save()
+    return job
+
+
+class ImporterTestCase(TestCase):
+    """Base class keeping uploaded feeds in a temporary media root"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = Path(media.name)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.tools = Category.objects.create(name="Tools", slug="tools")
+
+
+class Product_Importer(ImporterTestCase):
+    """Test importing product feeds"""
+
+    def test_import_csv(self):
+        """Test a CSV feed creates products, and brands it has not seen before"""
+        Brand.objects.create(name="Acme", slug="acme")
+        job = create_job(CSV_HEADER + "SKU-1,Hammer,Claw hammer,12.50,Acme,tools,true\nSKU-2,Drill,,89,Bosch,tools,\n")
+        job = ProductImporter(job).run()
+
+        self.assertEqual(job.status, ImportJob.Status.COMPLETED)
+        self.assertEqual((job.rows_processed, job.rows_imported, job.rows_failed), (2, 2, 0))
+        drill = Product.objects.get(sku="SKU-2")
+        self.assertEqual(drill.brand.slug, "bosch")
+        self.assertEqual(drill.brand_name, "Bosch")
+        self.assertEqual(str(drill.price), "89.00")
+        self.assertEqual(Brand.objects.count(), 2)
+
+    def test_import_jsonl(self):
+        """Test a JSON Lines feed is imported and unparsable lines are reported"""
+        lines = [
+            json.dumps({"sku": "SKU-1", "name": "Hammer", "price": 12.5, "brand": "Acme", "category": "tools"}),
+            "{not json",
+            json.dumps({"sku": "SKU-2", "name": "Saw", "price": "20", "brand": "Acme", "category": "tools"}),
+        ]
+        job = ProductImporter(create_job("\n".join(lines), format="jsonl")).run()
+        self.assertEqual((job.rows_imported, job.rows_failed), (2, 1))
+        self.assertEqual(job.errors[0]["row"], 2)
+
+    def test_row_errors_do_not_abort(self):
+        """Test invalid rows are recorded and the valid rows still import"""
+        job = create_job(
+            CSV_HEADER
+            + "SKU-1,Hammer,,cheap,Acme,tools,\n"
+            + "SKU-2,Saw,,20,Acme,garden,\n"
+            + ",Nameless,,20,Acme,tools,\n"
+            + "SKU-4,Drill,,30,Acme,tools,maybe\n"
+            + "SKU-5,Level,,15,Acme,tools,\n"
+        )
+        job = ProductImporter(job).run()
+        self.assertEqual(job.status, ImportJob.Status.COMPLETED)
+        self.assertEqual((job.rows_imported, job.rows_failed), (1, 4))
+        self.assertEqual(
+            [(error["row"], error["sku"]) for error in job.errors],
+            [(1, "SKU-1"), (2, "SKU-2"), (3, ""), (4, "SKU-4")],
+        )
+        self.assertIn("Unknown category", job.errors[1]["error"])
+        self.assertEqual(list(Product.objects.values_list("sku", flat=True)), ["SKU-5"])
+
+    def test_brand_name_taken_by_another_slug(self):
+        """Test a feed brand whose name an existing brand has under another slug is that brand"""
+        acme = Brand.objects.create(name="Acme", slug="acme-tools")
+        job = ProductImporter(create_job(CSV_HEADER + "SKU-1,Hammer,,12,Acme,tools,\n")).run()
+        self.assertEqual((job.status, job.rows_imported), (ImportJob.Status.COMPLETED, 1))
+        self.assertEqual(Product.objects.get().brand, acme)
+        self.assertEqual(Brand.objects.count(), 1)
+
+    def test_unresolved_brand_is_a_row_error(self):
+        """Test rows whose brand could not be created are recorded as errors instead of failing the job"""
+        with patch.object(Brand.objects, "bulk_create"):
+            job = ProductImporter(create_job(CSV_HEADER + "SKU-1,Hammer,,12,Acme,tools,\n")).run()
+        self.assertEqual(job.status, ImportJob.Status.COMPLETED)
+        self.assertEqual((job.rows_imported, job.rows_failed), (0, 1))
+        self.assertEqual(job.errors, [{"row": 1, "sku": "SKU-1", "error": "Brand 'Acme' could not be created"}])
+        self.assertFalse(Product.objects.exists())
+
+    def test_import_upserts_by_sku(self):
+        """Test existing SKUs are updated and the last row wins when a SKU repeats"""
+        ProductImporter(create_job(CSV_HEADER + "SKU-1,Hammer,,12,Acme,tools,\n")).run()
+        job = create_job(CSV_HEADER + "SKU-1,Hammer v2,,14,Acme,tools,\nSKU-1,Hammer v3,,15,Acme,tools,false\n")
+        ProductImporter(job).run()
+
+        product = Product.objects.get(sku="SKU-1")
+        self.assertEqual((product.name, str(product.price), product.is_active), ("Hammer v3", "15.00", False))
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_failed_import_resumes_after_last_committed_chunk(self):
+        """Test a failed import restarts at the chunk that did not commit"""
+        rows = "".join(f"SKU-{number},Item {number},,10,Acme,tools,\n" for number in range(1, 8))
+        job = create_job(CSV_HEADER + rows, chunk_size=3)
+        original = ProductImporter.commit_chunk
+        calls = []
+
+        def fail_second_chunk(importer, *args):
+            calls.append(args[-1])
+            if len(calls) == 2:
+                raise RuntimeError("database went away")
+            return original(importer, *args)
+
+        with patch.object(ProductImporter, "commit_chunk", fail_second_chunk), self.assertRaises(RuntimeError):
+            ProductImporter(job).run()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_processed), (ImportJob.Status.FAILED, 3))
+        self.assertEqual(job.error, "database went away")
+
+        clean_calls = []
+        original_clean = ProductImporter.clean
+
+        def count_clean(importer, record):
+            clean_calls.append(record["sku"])
+            return original_clean(importer, record)
+
+        with patch.object(ProductImporter, "clean", count_clean):
+            job = ProductImporter(job).run()
+        self.assertEqual(clean_calls[0], "SKU-4")
+        self.assertEqual((job.status, job.rows_processed, job.rows_imported), (ImportJob.Status.COMPLETED, 7, 7))
+        self.assertEqual(Product.objects.count(), 7)
+
+    def test_import_purges_changed_products(self):
+        """Test the CDN is told about the products a chunk wrote, since the upsert bypasses model signals"""
+        ProductImporter(create_job(CSV_HEADER + "SKU-1,Hammer,,12,Acme,tools,\n")).run()
+        cdn.flush()
+        purged = cdn.get_purger().batches
+        purged.clear()
+        job = create_job(CSV_HEADER + "SKU-1,Hammer,,12,Acme,tools,\nSKU-2,Saw,,20,Acme,tools,\n")
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImporter(job).run()
+        saw = Product.objects.get(sku="SKU-2")
+        self.assertEqual(purged, [[f"product-{saw.id}", "products"]])
+
+    def test_completed_import_cannot_rerun(self):
+        """Test an import only runs from pending or failed"""
+        job = ProductImporter(create_job(CSV_HEADER)).run()
+        with self.assertRaises(RuntimeError):
+            ProductImporter(job).run()
+
+
+class Import_Products_Command(ImporterTestCase):
+    """Test the import_products command"""
+
+    def test_import_file(self):
+        """Test importing a feed from a path"""
+        feed = self.media_root / "supplier.csv"
+        feed.write_text(CSV_HEADER + "SKU-1,Hammer,,12,Acme,tools,\n")
+        out = StringIO()
+        call_command("import_products", str(feed), stdout=out)
+        self.assertIn("Imported 1 rows, 0 failed", out.getvalue())
+        self.assertTrue(Product.objects.filter(sku="SKU-1").exists())
+
+    def test_unknown_format(self):
+        """Test a feed whose format cannot be told from its extension is refused"""
+        feed = self.media_root / "supplier.txt"
+        feed.write_text(CSV_HEADER)
+        with self.assertRaises(CommandError):
+            call_command("import_products", str(feed), stdout=StringIO())
+
+
+class Import_Admin(ImporterTestCase):
+    """Test uploading a feed through the admin"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="password123", date_of_birth="1990-01-01"
+        )
+        self.client.force_login(self.admin)
+
+    def test_upload_starts_import(self):
+        """Test uploading a feed creates a job and queues it for a worker"""
+        feed = ContentFile(CSV_HEADER.encode(), name="feed.csv")
+        response = self.client.post(
+            reverse("admin:core_importjob_add"), {"file": feed, "format": "csv", "chunk_size": 1000}
+        )
+        self.assertEqual(response.status_code, 302)
+        job = ImportJob.objects.get()
+        self.assertEqual(job.created_by, self.admin)
+        self.assertEqual(list(Task.objects.values_list("name", "args")), [(run_import.name, [job.pk])])
@@ -0,0 +1,213 @@
+"""
+Test promotion pricing
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from basket.store import Basket
+from core.helpers import API_Client
+from core.models import Brand, Category, Product, Promotion
+from products import pricing, tree
+
+TOTALS_URL = reverse("basket-totals")
+
+
+class PricingTestCase(TestCase):
+    """Base class with a small catalog and a fresh price book"""
+
+    def setUp(self):
+        self.acme = Brand.objects.create(name="Acme", slug="acme")
+        self.globex = Brand.objects.create(name="Globex", slug="globex")
+        self.tools = Category.objects.create(name="Tools", slug="tools")
+        self.saws = Category.objects.create(name="Saws", slug="saws", parent=self.tools)
+        self.hammer = Product.objects.create(
+            sku="SKU-1", name="Hammer", price=Decimal("10.00"), brand=self.acme, category=self.tools
+        )
+        self.saw = Product.objects.create(
+            sku="SKU-2", name="Saw", price=Decimal("20.00"), brand=self.globex, category=self.saws
+        )
+        tree.invalidate()
+        pricing.invalidate()
+        self.addCleanup(pricing.invalidate)
+
+    def price(self, lines):
+        pricing.invalidate()
+        priced = pricing.quote(lines)
+        return {line.product: line.discount for line in priced.lines}, priced
+
+
+class Promotion_Pricing(PricingTestCase):
+    """Test applying promotions to basket lines"""
+
+    def test_no_promotions(self):
+        """Test lines without a promotion cost their price"""
+        discounts, priced = self.price({self.hammer.id: 2})
+        self.assertEqual(discounts, {self.hammer.id: 0})
+        self.assertEqual(priced.total, Decimal("20.00"))
+
+    def test_targets(self):
+        """Test promotions apply to their product, their brand, and their category with its subcategories"""
+        Promotion.objects.create(name="Hammer", product=self.hammer, percent=10)
+        discounts, _ = self.price({self.hammer.id: 1, self.saw.id: 1})
+        self.assertEqual(discounts, {self.hammer.id: Decimal("1.00"), self.saw.id: 0})
+
+        Promotion.objects.create(name="Globex", brand=self.globex, percent=25)
+        discounts, _ = self.price({self.saw.id: 1})
+        self.assertEqual(discounts, {self.saw.id: Decimal("5.00")})
+
+        Promotion.objects.create(name="Tools", category=self.tools, percent=50)
+        discounts, _ = self.price({self.hammer.id: 1, self.saw.id: 1})
+        self.assertEqual(discounts, {self.hammer.id: Decimal("5.00"), self.saw.id: Decimal("10.00")})
+
+    def test_best_promotion_wins(self):
+        """Test a line takes its single best promotion rather than stacking them"""
+        Promotion.objects.create(name="Acme", brand=self.acme, percent=10)
+        best = Promotion.objects.create(
+            name="3 for 2", product=self.hammer, kind=Promotion.Kind.BUY_X_GET_Y, buy_quantity=2, free_quantity=1
+        )
+        _, priced = self.price({self.hammer.id: 3})
+        line = priced.lines[0]
+        self.assertEqual((line.discount, line.promotion.id), (Decimal("10.00"), best.id))
+        self.assertEqual((priced.subtotal, priced.discount, priced.total), (30, 10, 20))
+
+        _, priced = self.price({self.hammer.id: 2})
+        self.assertEqual(priced.lines[0].discount, Decimal("2.00"))
+
+    def test_buy_x_get_y(self):
+        """Test every complete group of buy plus free units gets its free units"""
+        Promotion.objects.create(
+            name="Buy 2 get 1", product=self.hammer, kind=Promotion.Kind.BUY_X_GET_Y, buy_quantity=2, free_quantity=1
+        )
+        discounts, _ = self.price({self.hammer.id: 8})
+        self.assertEqual(discounts[self.hammer.id], Decimal("20.00"))
+
+    def test_schedule(self):
+        """Test inactive, ended and future promotions do not apply, and the book expires when one starts"""
+        now = timezone.now()
+        Promotion.objects.create(name="Off", product=self.hammer, percent=90, is_active=False)
+        Promotion.objects.create(name="Ended", product=self.hammer, percent=80, ends_at=now - timedelta(days=1))
+        Promotion.objects.create(name="Soon", product=self.hammer, percent=70, starts_at=now + timedelta(hours=1))
+        discounts, _ = self.price({self.hammer.id: 1})
+        self.assertEqual(discounts, {self.hammer.id: 0})
+
+        book = pricing.get_price_book()
+        self.assertFalse(book.expired(now))
+        self.assertTrue(book.expired(now + timedelta(hours=2)))
+        later = pricing.compile_promotions(now=now + timedelta(hours=2))
+        self.assertEqual(later.price({self.hammer.id: 1}, pricing.product_terms([self.hammer.id])).discount, 7)
+
+    def test_unavailable_products(self):
+        """Test lines of products not for sale are reported instead of priced"""
+        Product.objects.filter(pk=self.saw.pk).update(is_active=False)
+        _, priced = self.price({self.hammer.id: 1, self.saw.id: 1})
+        self.assertEqual(priced.unavailable, [self.saw.id])
+        self.assertEqual(priced.total, Decimal("10.00"))
+
+    def test_validation(self):
+        """Test a promotion needs one target and the settings of its kind"""
+        with self.assertRaises(ValidationError):
+            Promotion(name="Nothing", percent=10).full_clean()
+        with self.assertRaises(ValidationError):
+            Promotion(name="Both", product=self.hammer, brand=self.acme, percent=10).full_clean()
+        with self.assertRaises(ValidationError):
+            Promotion(name="Too much", product=self.hammer, percent=150).full_clean()
+        with self.assertRaises(ValidationError):
+            Promotion(name="Half", product=self.hammer, kind=Promotion.Kind.BUY_X_GET_Y, buy_quantity=2).full_clean()
+
+    def test_database_refuses_invalid_kinds(self):
+        """Test promotions saved without validation still need the settings of their kind"""
+        invalid = [
+            {"percent": None},
+            {"percent": 150},
+            {"kind": Promotion.Kind.BUY_X_GET_Y},
+            {"kind": Promotion.Kind.BUY_X_GET_Y, "buy_quantity": 2, "free_quantity": 0},
+        ]
+        for fields in invalid:
+            with self.subTest(**fields), self.assertRaises(IntegrityError), transaction.atomic():
+                Promotion.objects.create(name="Broken", product=self.hammer, **fields)
+
+    def test_invalid_promotions_are_skipped(self):
+        """Test promotions without the settings of their kind are left out of the book rather than failing it"""
+        promotions = [
+            Promotion(id=1, name="Broken", product=self.hammer, kind=Promotion.Kind.BUY_X_GET_Y),
+            Promotion(id=2, name="Broken", product=self.hammer, percent=None),
+            Promotion(id=3, name="Hammer", product=self.hammer, percent=Decimal("10")),
+        ]
+        book = pricing.PriceBook(promotions, tree.get_tree(), timezone.now())
+        priced = book.price({self.hammer.id: 3}, pricing.product_terms([self.hammer.id]))
+        self.assertEqual((priced.discount, priced.lines[0].promotion.id), (Decimal("3.00"), 3))
+
+
+class Price_Book_Snapshot(PricingTestCase):
+    """Test the compiled promotions are cached and recompiled on change"""
+
+    def test_snapshot_is_reused(self):
+        """Test pricing reuses the compiled book until something changes"""
+        book = pricing.get_price_book()
+        with self.assertNumQueries(0):
+            self.assertIs(pricing.get_price_book(), book)
+
+    def test_promotion_change_recompiles(self):
+        """Test saving a promotion recompiles the book once committed"""
+        book = pricing.get_price_book()
+        with self.captureOnCommitCallbacks(execute=True):
+            Promotion.objects.create(name="Hammer", product=self.hammer, percent=10)
+        new_book = pricing.get_price_book()
+        self.assertIsNot(new_book, book)
+        self.assertIn(self.hammer.id, new_book.by_product)
+
+    def test_category_change_recompiles(self):
+        """Test moving a category moves the category promotions with it"""
+        Promotion.objects.create(name="Tools", category=self.tools, percent=10)
+        pricing.invalidate()
+        self.assertIn(self.saws.id, pricing.get_price_book().by_category)
+
+        self.saws.move_to(None)
+        tree.invalidate()
+        self.assertNotIn(self.saws.id, pricing.get_price_book().by_category)
+
+
+class Basket_Totals_API(PricingTestCase):
+    """Test pricing the basket"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="password123", date_of_birth=date(1990, 1, 1)
+        )
+        self.basket = Basket(user_id=self.user.id)
+        self.addCleanup(self.basket.clear)
+        self.client = API_Client()
+        self.client.authorize(self.user)
+
+    def test_totals(self):
+        """Test the totals price every line after its promotion in a single query"""
+        promotion = Promotion.objects.create(name="Hammer", product=self.hammer, percent=10)
+        self.basket.add(self.hammer.id, 2)
+        self.basket.add(self.saw.id, 1)
+        pricing.invalidate()
+        pricing.get_price_book()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(TOTALS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (response.data["subtotal"], response.data["discount"], response.data["total"]), ("40.00", "2.00", "38.00")
+        )
+        self.assertEqual(response.data["lines"][0]["promotion"], {"id": promotion.id, "name": "Hammer"})
+        self.assertIsNone(response.data["lines"][1]["promotion"])
+
+    def test_empty_basket(self):
+        """Test an empty basket costs nothing"""
+        response = self.client.get(TOTALS_URL)
+        self.assertEqual(response.data["total"], "0.00")
+        self.assertEqual(response.data["lines"], [])
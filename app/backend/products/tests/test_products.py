@@ -0,0 +1,183 @@
+"""
+Test the Product Catalog endpoints
+"""
+
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.helpers import API_Client
+from core.models import Brand, Category, Product
+from products import tree
+
+LIST_URL = reverse("product-list")
+
+
+def create_product(number, brand, category, price="10.00", **fields):
+    """Create a Product with a SKU and creation time derived from number"""
+    product = Product.objects.create(
+        sku=f"SKU-{number}",
+        name=f"Product {number}",
+        price=price,
+        brand=brand,
+        category=category,
+        **fields,
+    )
+    Product.objects.filter(pk=product.pk).update(created_at=timezone.now() - timedelta(minutes=number))
+    return product
+
+
+class Product_List(TestCase):
+    """Test listing Products"""
+
+    def setUp(self):
+        self.client = API_Client()
+        self.brand = Brand.objects.create(name="Acme", slug="acme")
+        self.other_brand = Brand.objects.create(name="Globex", slug="globex")
+        self.category = Category.objects.create(name="Tools", slug="tools")
+        self.other_category = Category.objects.create(name="Garden", slug="garden")
+        tree.invalidate()
+
+    def test_list_is_public(self):
+        """Test anonymous users can list Products"""
+        create_product(1, self.brand, self.category)
+        response = self.client.get(LIST_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["brand"], "Acme")
+        self.assertEqual(response.data["results"][0]["category"], "Tools")
+
+    def test_list_hides_inactive_products(self):
+        """Test inactive Products are not listed"""
+        create_product(1, self.brand, self.category, is_active=False)
+        response = self.client.get(LIST_URL)
+        self.assertEqual(response.data["results"], [])
+
+    def test_list_newest_first(self):
+        """Test Products are listed newest first by default"""
+        for number in (3, 1, 2):
+            create_product(number, self.brand, self.category)
+        response = self.client.get(LIST_URL)
+        self.assertEqual([row["sku"] for row in response.data["results"]], ["SKU-1", "SKU-2", "SKU-3"])
+
+    def test_list_filters(self):
+        """Test filtering by category, brand and price range"""
+        create_product(1, self.brand, self.category, price="5.00")
+        create_product(2, self.brand, self.category, price="15.00")
+        create_product(3, self.other_brand, self.category, price="15.00")
+        create_product(4, self.brand, self.other_category, price="15.00")
+
+        params = {"category": self.category.id, "brand": self.brand.id, "min_price": "10", "max_price": "20"}
+        response = self.client.get(LIST_URL, params)
+        self.assertEqual([row["sku"] for row in response.data["results"]], ["SKU-2"])
+
+    def test_list_category_includes_subcategories(self):
+        """Test filtering by a category includes the products of its subcategories"""
+        child = Category.objects.create(name="Drills", slug="drills", parent=self.category)
+        grandchild = Category.objects.create(name="Cordless", slug="cordless", parent=child)
+        tree.invalidate()
+        create_product(1, self.brand, self.category)
+        create_product(2, self.brand, child)
+        create_product(3, self.brand, grandchild)
+        create_product(4, self.brand, self.other_category)
+
+        response = self.client.get(LIST_URL, {"category": child.id})
+        self.assertEqual([row["sku"] for row in response.data["results"]], ["SKU-2", "SKU-3"])
+        response = self.client.get(LIST_URL, {"category": self.category.id})
+        self.assertEqual([row["sku"] for row in response.data["results"]], ["SKU-1", "SKU-2", "SKU-3"])
+
+    def test_list_invalid_filter(self):
+        """Test a malformed filter is rejected"""
+        response = self.client.get(LIST_URL, {"min_price": "cheap"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_invalid_ordering(self):
+        """Test an unsupported ordering is rejected"""
+        response = self.client.get(LIST_URL, {"ordering": "name"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_pages_cover_every_product_once(self):
+        """Test following next links visits every Product once, including price ties"""
+        for number in range(1, 8):
+            create_product(number, self.brand, self.category, price="10.00" if number % 2 else "20.00")
+
+        seen, url, params = [], LIST_URL, {"ordering": "price", "page_size": 2}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(row["sku"] for row in response.data["results"])
+            url, params = response.data["next"], None
+
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+        prices = [Product.objects.get(sku=sku).price for sku in seen]
+        self.assertEqual(prices, sorted(prices))
+
+    def test_invalid_cursor(self):
+        """Test a tampered cursor returns 404"""
+        response = self.client.get(LIST_URL, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_query_count(self):
+        """Test a page is rendered with a single query regardless of its size"""
+        for number in range(1, 11):
+            create_product(number, self.brand, self.category)
+        with self.assertNumQueries(1):
+            self.client.get(LIST_URL)
+
+
+class Product_Detail(TestCase):
+    """Test retrieving a single Product"""
+
+    def setUp(self):
+        self.client = API_Client()
+        self.brand = Brand.objects.create(name="Acme", slug="acme")
+        self.category = Category.objects.create(name="Tools", slug="tools")
+        tree.invalidate()
+
+    def test_get_product(self):
+        """Test retrieving a Product with its brand and category"""
+        product = create_product(1, self.brand, self.category)
+        response = self.client.get(reverse("product-detail", args=[product.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["brand"]["slug"], "acme")
+        self.assertEqual(response.data["category"]["slug"], "tools")
+        self.assertEqual([node["slug"] for node in response.data["breadcrumb"]], ["tools"])
+
+    def test_get_inactive_product(self):
+        """Test an inactive Product is not found"""
+        product = create_product(1, self.brand, self.category, is_active=False)
+        response = self.client.get(reverse("product-detail", args=[product.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class Category_Tree(TestCase):
+    """Test the cached Category tree"""
+
+    def setUp(self):
+        self.client = API_Client()
+        self.tools = Category.objects.create(name="Tools", slug="tools")
+        self.drills = Category.objects.create(name="Drills", slug="drills", parent=self.tools)
+        tree.invalidate()
+
+    def test_tree_endpoint(self):
+        """Test the tree endpoint nests children under their parents"""
+        response = self.client.get(reverse("category-tree"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["slug"], "tools")
+        self.assertEqual(response.data[0]["children"][0]["slug"], "drills")
+
+    def test_tree_is_served_from_memory(self):
+        """Test the snapshot is reused without querying the database"""
+        tree.get_tree()
+        with self.assertNumQueries(0):
+            self.assertEqual(tree.get_tree().descendant_ids(self.tools.id), [self.tools.id, self.drills.id])
+
+    def test_tree_rebuilt_after_change_is_committed(self):
+        """Test a committed Category change invalidates the snapshot"""
+        tree.get_tree()
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Saws", slug="saws", parent=self.tools)
+        self.assertEqual([node.slug for node in tree.get_tree().nodes[self.tools.id].children], ["drills", "saws"])
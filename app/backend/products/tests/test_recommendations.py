@@ -0,0 +1,171 @@
+"""
+Test the frequently bought together recommendations
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.helpers import API_Client
+from core.models import Brand, Category, Order, OrderItem, Product, ProductPair, ProductRecommendation
+from products import recommendations
+
+
+def recommendations_url(product_id):
+    return reverse("product-recommendations", args=[product_id])
+
+
+class RecommendationTestCase(TestCase):
+    """Base class with a catalog and a customer"""
+
+    def setUp(self):
+        brand = Brand.objects.create(name="Acme", slug="acme")
+        category = Category.objects.create(name="Tools", slug="tools")
+        self.products = [
+            Product.objects.create(
+                sku=f"SKU-{n}", name=f"Product {n}", price=Decimal("5.00"), brand=brand, category=category
+            )
+            for n in range(5)
+        ]
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="password123", date_of_birth=date(1990, 1, 1)
+        )
+
+    def create_order(self, *products, created_at=None, status=Order.Status.PAID):
+        """Create an Order holding one of each of products, paid when it was placed unless told otherwise"""
+        order = Order.objects.create(user=self.user, status=status, total=sum(product.price for product in products))
+        if created_at is not None:
+            Order.objects.filter(pk=order.pk).update(created_at=created_at, updated_at=created_at)
+            order.created_at = created_at
+        for product in products:
+            OrderItem.objects.create(
+                order=order, product=product, quantity=1, unit_price=product.price, created_at=order.created_at
+            )
+        return order
+
+    def related(self, product):
+        return ProductRecommendation.objects.get(pk=product.pk).related
+
+
+class Recommendation_Refresh(RecommendationTestCase):
+    """Test building the co-occurrence counts and top-k lists"""
+
+    def test_pairs_are_counted_both_ways(self):
+        """Test products in the same order count each other, once per order"""
+        a, b, c = self.products[:3]
+        self.create_order(a, b, c)
+        self.create_order(a, b)
+        recommendations.refresh(lag=0)
+        self.assertEqual(ProductPair.objects.get(product=a, other=b).orders, 2)
+        self.assertEqual(ProductPair.objects.get(product=b, other=a).orders, 2)
+        self.assertEqual(ProductPair.objects.get(product=c, other=a).orders, 1)
+        self.assertEqual(ProductPair.objects.count(), 6)
+
+    def test_top_k_best_first(self):
+        """Test each product keeps its top_k neighbours, most bought together first"""
+        a, b, c, d, _ = self.products
+        self.create_order(a, d)
+        self.create_order(a, c)
+        self.create_order(a, c)
+        self.create_order(a, b)
+        recommendations.refresh(lag=0, top_k=2)
+        self.assertEqual(self.related(a), [c.pk, b.pk])
+        self.assertEqual(self.related(d), [a.pk])
+
+    def test_incremental_refresh(self):
+        """Test a refresh only counts orders placed since the last one, and re-ranks only what they touched"""
+        a, b, c, d, e = self.products
+        self.create_order(a, b, created_at=timezone.now() - timedelta(days=3))
+        self.create_order(d, e, created_at=timezone.now() - timedelta(days=3))
+        recommendations.refresh(lag=0)
+        # An old list the next refresh should leave alone
+        ProductRecommendation.objects.filter(pk=d.pk).update(related=[])
+
+        self.create_order(a, c)
+        self.create_order(a, c)
+        self.assertEqual(recommendations.refresh(lag=0), 2)
+        self.assertEqual(ProductPair.objects.get(product=a, other=b).orders, 1)
+        self.assertEqual(self.related(a), [c.pk, b.pk])
+        self.assertEqual(self.related(d), [])
+        self.assertEqual(recommendations.refresh(lag=0), 0)
+
+    def test_recent_orders_wait_for_the_lag(self):
+        """Test orders placed within the lag are counted by a later refresh"""
+        a, b = self.products[:2]
+        self.create_order(a, b, created_at=timezone.now() - timedelta(days=1))
+        self.create_order(a, b)
+        recommendations.refresh(lag=600)
+        self.assertEqual(ProductPair.objects.get(product=a, other=b).orders, 1)
+        recommendations.refresh(lag=0)
+        self.assertEqual(ProductPair.objects.get(product=a, other=b).orders, 2)
+
+    def test_only_paid_orders_count(self):
+        """Test orders left unpaid or cancelled add no pairs, and an order paid late is counted when paid"""
+        a, b, c = self.products[:3]
+        placed = timezone.now() - timedelta(days=2)
+        self.create_order(a, b, created_at=placed, status=Order.Status.CANCELLED)
+        late = self.create_order(a, c, created_at=placed, status=Order.Status.PENDING_PAYMENT)
+        recommendations.refresh(lag=0)
+        self.assertFalse(ProductPair.objects.exists())
+
+        Order.objects.filter(pk=late.pk).update(status=Order.Status.PAID, updated_at=timezone.now())
+        recommendations.refresh(lag=0)
+        pairs = ProductPair.objects.order_by("product", "other").values_list("product", "other", "orders")
+        self.assertEqual(list(pairs), [(a.pk, c.pk, 1), (c.pk, a.pk, 1)])
+
+    def test_large_baskets_are_skipped(self):
+        """Test orders with more products than the limit add no pairs"""
+        self.create_order(*self.products)
+        self.create_order(self.products[0])
+        original = recommendations.MAX_BASKET
+        recommendations.MAX_BASKET = 4
+        self.addCleanup(setattr, recommendations, "MAX_BASKET", original)
+        recommendations.refresh(lag=0)
+        self.assertFalse(ProductPair.objects.exists())
+
+    def test_command(self):
+        """Test the command refreshes the recommendations"""
+        self.create_order(*self.products[:2])
+        out = StringIO()
+        call_command("recommend_products", "--lag", "0", stdout=out)
+        self.assertIn("Re-ranked 2 products", out.getvalue())
+
+
+class Recommendation_API(RecommendationTestCase):
+    """Test serving the recommendations"""
+
+    def setUp(self):
+        super().setUp()
+        a, b, c = self.products[:3]
+        self.create_order(a, b)
+        self.create_order(a, b)
+        self.create_order(a, c)
+        recommendations.refresh(lag=0)
+        self.client = API_Client()
+
+    def test_recommendations(self):
+        """Test a product's recommendations are listed best first, in two primary key queries"""
+        with self.assertNumQueries(2):
+            response = self.client.get(recommendations_url(self.products[0].pk))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["id"] for row in response.data], [self.products[1].pk, self.products[2].pk])
+        self.assertEqual(response.data[0]["brand"], "Acme")
+
+    def test_inactive_products_are_hidden(self):
+        """Test products taken off sale are not recommended"""
+        Product.objects.filter(pk=self.products[1].pk).update(is_active=False)
+        response = self.client.get(recommendations_url(self.products[0].pk))
+        self.assertEqual([row["id"] for row in response.data], [self.products[2].pk])
+
+    def test_no_recommendations(self):
+        """Test a product never bought with another has an empty list"""
+        response = self.client.get(recommendations_url(self.products[4].pk))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
@@ -0,0 +1,101 @@
+"""
+Test the Product Search endpoint
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from core.helpers import API_Client
+from core.models import Brand, Category, Product
+from products import tree
+
+SEARCH_URL = reverse("product-search")
+
+
+class Product_Search(TestCase):
+    """Test searching Products"""
+
+    def setUp(self):
+        self.client = API_Client()
+        cache.delete_pattern("catalog:search:*")
+        self.acme = Brand.objects.create(name="Acme", slug="acme")
+        self.bosch = Brand.objects.create(name="Bosch", slug="bosch")
+        self.tools = Category.objects.create(name="Tools", slug="tools")
+        self.drills = Category.objects.create(name="Drills", slug="drills", parent=self.tools)
+        tree.invalidate()
+
+        def create(sku, name, brand, category, price, description=""):
+            return Product.objects.create(
+                sku=sku, name=name, description=description, price=price, brand=brand, category=category
+            )
+
+        create("SKU-1", "Cordless Drill", self.bosch, self.drills, "89.00")
+        create("SKU-2", "Hammer", self.acme, self.tools, "12.00", description="Pairs well with a drill")
+        create("SKU-3", "Drill Bits", self.acme, self.drills, "9.50")
+        create("SKU-4", "Garden Hose", self.acme, self.tools, "30.00")
+
+    def test_search_ranks_name_matches_first(self):
+        """Test a match in the name outranks a match in the description"""
+        response = self.client.get(SEARCH_URL, {"q": "drill"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(response.data["results"][-1]["sku"], "SKU-2")
+
+    def test_search_matches_brand_name(self):
+        """Test the brand name is searchable"""
+        response = self.client.get(SEARCH_URL, {"q": "bosch"})
+        self.assertEqual([row["sku"] for row in response.data["results"]], ["SKU-1"])
+
+    def test_brand_rename_is_searchable(self):
+        """Test renaming a brand updates the searchable copy on its products"""
+        self.bosch.name = "Makita"
+        self.bosch.save()
+        response = self.client.get(SEARCH_URL, {"q": "makita"})
+        self.assertEqual([row["sku"] for row in response.data["results"]], ["SKU-1"])
+
+    def test_facet_counts(self):
+        """Test brand, category and price facets count the filtered matches"""
+        response = self.client.get(SEARCH_URL, {"q": "drill"})
+        facets = response.data["facets"]
+        self.assertEqual({facet["name"]: facet["count"] for facet in facets["brands"]}, {"Acme": 2, "Bosch": 1})
+        self.assertEqual({facet["name"]: facet["count"] for facet in facets["categories"]}, {"Drills": 2, "Tools": 1})
+        self.assertEqual(
+            [(facet["min"], facet["max"], facet["count"]) for facet in facets["prices"]],
+            [(None, 10, 1), (10, 25, 1), (50, 100, 1)],
+        )
+
+    def test_filters_apply_to_results_and_facets(self):
+        """Test filters narrow both the results and the facet counts"""
+        response = self.client.get(SEARCH_URL, {"category": self.drills.id, "max_price": "50"})
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual([row["sku"] for row in response.data["results"]], ["SKU-3"])
+        self.assertEqual(response.data["facets"]["brands"], [{"id": self.acme.id, "name": "Acme", "count": 1}])
+
+    def test_category_filter_includes_subcategories(self):
+        """Test searching a category includes its subcategories"""
+        response = self.client.get(SEARCH_URL, {"category": self.tools.id})
+        self.assertEqual(response.data["count"], 4)
+
+    def test_search_runs_two_queries_then_hits_cache(self):
+        """Test facets come from one query and repeated searches are served from cache"""
+        tree.get_tree()
+        with self.assertNumQueries(2):
+            first = self.client.get(SEARCH_URL, {"q": "drill"})
+        with self.assertNumQueries(0):
+            second = self.client.get(SEARCH_URL, {"q": "  Drill "})
+        self.assertEqual(first.data, second.data)
+
+    def test_search_no_matches(self):
+        """Test a search without matches returns empty facets"""
+        response = self.client.get(SEARCH_URL, {"q": "saxophone"})
+        self.assertEqual(response.data["count"], 0)
+        self.assertEqual(response.data["facets"], {"brands": [], "categories": [], "prices": []})
+
+    def test_search_invalid_params(self):
+        """Test malformed parameters are rejected"""
+        response = self.client.get(SEARCH_URL, {"min_price": "cheap", "page": 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("min_price", response.data)
+        self.assertIn("page", response.data)
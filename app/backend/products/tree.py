@@ -0,0 +1,111 @@
+"""
+In-process snapshot of the category tree
+
+Menus, breadcrumbs and subtree filters are answered from memory. Every process
+keeps its own snapshot and rebuilds it with one query when the version stored
+in the cache changes, which happens after any category change is committed.
+"""
+
+import threading
+import uuid
+
+from django.core.cache import cache
+
+from core.models import Category
+from core.warmup import register_warmer
+
+VERSION_KEY = "catalog:category-tree:version"
+
+
+class CategoryNode:
+    """A category and its children"""
+
+    __slots__ = ("id", "name", "slug", "parent_id", "depth", "children")
+
+    def __init__(self, id, name, slug, parent_id, depth):
+        self.id = id
+        self.name = name
+        self.slug = slug
+        self.parent_id = parent_id
+        self.depth = depth
+        self.children = []
+
+
+class CategoryTree:
+    """Every category, indexed by id and linked to its children"""
+
+    def __init__(self, rows):
+        self.nodes = {row[0]: CategoryNode(*row) for row in rows}
+        self.roots = []
+        for node in self.nodes.values():
+            parent = self.nodes.get(node.parent_id)
+            (parent.children if parent else self.roots).append(node)
+
+    def descendant_ids(self, category_id, include_self=True):
+        """Ids of the category and everything below it, or [] for an unknown category"""
+        node = self.nodes.get(category_id)
+        if node is None:
+            return []
+        ids, stack = [], [node]
+        while stack:
+            current = stack.pop()
+            ids.append(current.id)
+            stack.extend(current.children)
+        return ids if include_self else ids[1:]
+
+    def breadcrumb(self, category_id):
+        """Categories from the root down to category_id"""
+        trail = []
+        node = self.nodes.get(category_id)
+        while node is not None:
+            trail.append(node)
+            node = self.nodes.get(node.parent_id)
+        return trail[::-1]
+
+    def as_menu(self):
+        """The tree as nested dicts, ready to render"""
+
+        def render(node):
+            return {
+                "id": node.id,
+                "name": node.name,
+                "slug": node.slug,
+                "children": [render(child) for child in node.children],
+            }
+
+        return [render(root) for root in self.roots]
+
+
+_lock = threading.Lock()
+_snapshot = (None, None)
+
+
+def get_tree():
+    """Return the current snapshot, rebuilding it if a category changed since it was taken"""
+    global _snapshot
+
+    version, tree = _snapshot
+    current = cache.get(VERSION_KEY)
+    if tree is not None and version == current:
+        return tree
+
+    with _lock:
+        if current is None:
+            cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            current = cache.get(VERSION_KEY)
+        # The version is read before the query, so a change committed meanwhile triggers another rebuild
+        rows = Category.objects.order_by("name").values_list("id", "name", "slug", "parent_id", "depth")
+        tree = CategoryTree(rows)
+        _snapshot = (current, tree)
+    return tree
+
+
+def invalidate():
+    """Make every process rebuild its snapshot on next use"""
+    global _snapshot
+
+    _snapshot = (None, None)
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+register_warmer(get_tree)
@@ -0,0 +1,29 @@
+"""
+URLs for the Product Catalog
+"""
+
+from django.urls import path
+
+from .views import (
+    BrandListView,
+    CategoryListView,
+    CategoryTreeView,
+    ProductDetailView,
+    ProductListView,
+    ProductRecommendationView,
+    ProductSearchView,
+    ProductViewCountView,
+    TrendingProductsView,
+)
+
+urlpatterns = [
+    path("", ProductListView.as_view(), name="product-list"),
+    path("search/", ProductSearchView.as_view(), name="product-search"),
+    path("trending/", TrendingProductsView.as_view(), name="product-trending"),
+    path("<int:pk>/", ProductDetailView.as_view(), name="product-detail"),
+    path("<int:pk>/recommendations/", ProductRecommendationView.as_view(), name="product-recommendations"),
+    path("<int:pk>/views/", ProductViewCountView.as_view(), name="product-views"),
+    path("brands/", BrandListView.as_view(), name="brand-list"),
+    path("categories/", CategoryListView.as_view(), name="category-list"),
+    path("categories/tree/", CategoryTreeView.as_view(), name="category-tree"),
+]
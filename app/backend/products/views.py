@@ -0,0 +1,256 @@
+"""
+API Views for the Product Catalog
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import ListAPIView, RetrieveAPIView
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.models import Brand, Category, Product
+from core.pagination import KeysetPagination
+
+from . import cdn
+from .counters import MAX_PRODUCT_ID, record_view, trending
+from .recommendations import recommended
+from .search import CACHE_TIMEOUT, ProductSearch
+from .serializers import (
+    BrandSerializer,
+    CategorySerializer,
+    CategoryTreeSerializer,
+    ProductDetailSerializer,
+    ProductListSerializer,
+    ProductSearchRequestSerializer,
+    ProductSearchResponseSerializer,
+)
+from .tree import get_tree
+
+
+class CatalogView:
+    """Public, anonymous read access shared by the catalog views, cacheable by a CDN"""
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    surrogate_max_age = None
+
+    def get_surrogate_keys(self, response):
+        """Keys tagging a successful response, purging any of them evicts it from the CDN"""
+        return []
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method in ("GET", "HEAD") and response.status_code == 200:
+            cdn.add_cache_headers(response, self.get_surrogate_keys(response), self.surrogate_max_age)
+        return response
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter("category", int, description="Only products in this category or its subcategories"),
+        OpenApiParameter("brand", int, description="Only products of this brand"),
+        OpenApiParameter("min_price", str, description="Lowest price to include"),
+        OpenApiParameter("max_price", str, description="Highest price to include"),
+    ]
+)
+class ProductListView(CatalogView, ListAPIView):
+    """
+    View for listing Products
+    GET - products/
+    """
+
+    serializer_class = ProductListSerializer
+    pagination_class = KeysetPagination
+    # Keys only name the products on the page, so a product whose price moves it onto another
+    # page of a price-ordered list only shows up there once this expires
+    surrogate_max_age = 5 * 60
+    keyset_orderings = {
+        "newest": ("-created_at", "-id"),
+        "price": ("price", "id"),
+        "-price": ("-price", "-id"),
+        "popular": ("-view_count", "-id"),
+    }
+
+    def get_queryset(self):
+        queryset = (
+            Product.objects.filter(is_active=True)
+            .select_related("brand", "category")
+            .only("id", "sku", "name", "price", "view_count", "created_at", "brand__name", "category__name")
+        )
+        params = self.request.query_params
+        if params.get("category"):
+            category_ids = get_tree().descendant_ids(self._int(params, "category"))
+            if len(category_ids) == 1:
+                queryset = queryset.filter(category_id=category_ids[0])
+            else:
+                queryset = queryset.filter(category_id__in=category_ids)
+        if params.get("brand"):
+            queryset = queryset.filter(brand_id=self._int(params, "brand"))
+        if params.get("min_price"):
+            queryset = queryset.filter(price__gte=self._decimal(params, "min_price"))
+        if params.get("max_price"):
+            queryset = queryset.filter(price__lte=self._decimal(params, "max_price"))
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        self.page = super().paginate_queryset(queryset)
+        return self.page
+
+    def get_surrogate_keys(self, response):
+        keys = [cdn.PRODUCTS]
+        for product in self.page:
+            keys += [
+                cdn.product_key(product.id),
+                cdn.brand_key(product.brand_id),
+                cdn.category_key(product.category_id),
+            ]
+        return keys
+
+    @staticmethod
+    def _int(params, name):
+        try:
+            return int(params[name])
+        except ValueError:
+            raise ValidationError({name: ["A valid integer is required."]}) from None
+
+    @staticmethod
+    def _decimal(params, name):
+        try:
+            return Decimal(params[name])
+        except InvalidOperation:
+            raise ValidationError({name: ["A valid number is required."]}) from None
+
+
+class ProductSearchView(CatalogView, APIView):
+    """
+    View for searching Products with brand, category and price facets
+    GET - products/search/
+    """
+
+    # Matches the server-side cache, since a cached page may be older than the keys it was tagged with
+    surrogate_max_age = CACHE_TIMEOUT
+
+    @extend_schema(parameters=[ProductSearchRequestSerializer], responses=ProductSearchResponseSerializer)
+    def get(self, request):
+        params = ProductSearchRequestSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        search = ProductSearch(**params.validated_data)
+        return Response(search.execute(lambda rows: ProductListSerializer(rows, many=True).data))
+
+    def get_surrogate_keys(self, response):
+        return [cdn.PRODUCTS, *(cdn.product_key(row["id"]) for row in response.data["results"])]
+
+
+class ProductDetailView(CatalogView, RetrieveAPIView):
+    """
+    View for a single Product
+    GET - products/{product_id}/
+    """
+
+    queryset = Product.objects.filter(is_active=True).select_related("brand", "category")
+    serializer_class = ProductDetailSerializer
+
+    def get_surrogate_keys(self, response):
+        product = response.data
+        return [
+            cdn.product_key(product["id"]),
+            cdn.brand_key(product["brand"]["id"]),
+            *(cdn.category_key(category["id"]) for category in product["breadcrumb"]),
+        ]
+
+
+class ProductRecommendationView(CatalogView, APIView):
+    """
+    View for the Products frequently bought with a Product, read from the precomputed top-k
+    GET - products/{product_id}/recommendations/
+    """
+
+    # Recommendations only change when they are refreshed, which purges nothing
+    surrogate_max_age = 60 * 60
+
+    @extend_schema(responses=ProductListSerializer(many=True))
+    def get(self, request, pk):
+        return Response(ProductListSerializer(recommended(pk), many=True).data)
+
+    def get_surrogate_keys(self, response):
+        return [cdn.product_key(self.kwargs["pk"]), *(cdn.product_key(row["id"]) for row in response.data)]
+
+
+class ProductViewCountView(CatalogView, APIView):
+    """
+    View counting a view of a Product, sent by the product page since the detail is served by the CDN
+    POST - products/{product_id}/views/
+    """
+
+    @extend_schema(request=None, responses={202: None, 404: None})
+    def post(self, request, pk):
+        # Not looked up in Postgres, the flush drops the views of unknown products and prunes them from trending
+        if pk > MAX_PRODUCT_ID:
+            raise NotFound()
+        record_view(pk)
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+
+class TrendingProductsView(CatalogView, APIView):
+    """
+    View for the Products viewed most lately
+    GET - products/trending/
+    """
+
+    # Trending changes with every view, this bounds how stale the CDN's copy gets
+    surrogate_max_age = 60
+
+    @extend_schema(
+        parameters=[OpenApiParameter("limit", int, description="Number of products, at most 100")],
+        responses=ProductListSerializer(many=True),
+    )
+    def get(self, request):
+        limit = min(ProductListView._int(request.query_params, "limit"), 100) if "limit" in request.query_params else 20
+        return Response(ProductListSerializer(trending(max(limit, 1)), many=True).data)
+
+    def get_surrogate_keys(self, response):
+        return [cdn.PRODUCTS, *(cdn.product_key(row["id"]) for row in response.data)]
+
+
+class BrandListView(CatalogView, ListAPIView):
+    """
+    View for listing Brands
+    GET - products/brands/
+    """
+
+    queryset = Brand.objects.all()
+    serializer_class = BrandSerializer
+
+    def get_surrogate_keys(self, response):
+        return [cdn.BRANDS]
+
+
+class CategoryListView(CatalogView, ListAPIView):
+    """
+    View for listing Categories
+    GET - products/categories/
+    """
+
+    queryset = Category.objects.all()
+    serializer_class = CategorySerializer
+
+    def get_surrogate_keys(self, response):
+        return [cdn.CATEGORIES]
+
+
+class CategoryTreeView(CatalogView, APIView):
+    """
+    View for the Category tree, served from the in-process snapshot
+    GET - products/categories/tree/
+    """
+
+    @extend_schema(responses=CategoryTreeSerializer(many=True))
+    def get(self, request):
+        return Response(get_tree().as_menu())
+
+    def get_surrogate_keys(self, response):
+        return [cdn.CATEGORIES]
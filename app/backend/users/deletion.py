@@ -0,0 +1,179 @@
+"""
+Account deletion in the background
+
+Deleting a User in one go cascades through its tokens, profile, basket and
+everything else pointing at it in a single transaction, holding locks for as
+long as that takes. request_deletion() only does what has to happen at once:
+the accounts are deactivated, which fails their access and refresh tokens from
+the next request, their live refresh tokens are blacklisted, and an
+AccountDeletion is queued for each.
+
+A worker then works through STEPS, each deleting at most BATCH_SIZE rows per
+transaction under a short lock_timeout, and records its progress after every
+batch. Erasing many accounts so never holds a lock for long, a batch that
+cannot get its locks quickly fails and is retried later instead of queueing
+behind checkout traffic, and every step can run again after a failure.
+
+Orders are kept for the accounts, so a User with orders is anonymised, its
+personal data overwritten, rather than deleted.
+"""
+
+from contextlib import contextmanager
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from basket.store import Basket
+from core import outbox
+from core.models import AccountDeletion, BasketSnapshot, Order, Profile, User
+from core.tasks import task
+
+BATCH_SIZE = getattr(settings, "ACCOUNT_DELETION_BATCH_SIZE", 1000)
+# Longest a batch waits for a lock before failing, to be retried later
+LOCK_TIMEOUT = getattr(settings, "ACCOUNT_DELETION_LOCK_TIMEOUT", "2s")
+# date_of_birth is required, anonymised Users all get this one
+ANONYMOUS_DATE_OF_BIRTH = date(1900, 1, 1)
+
+
+@contextmanager
+def _batch():
+    """A transaction that gives up on locks held by others after LOCK_TIMEOUT"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('lock_timeout', %s, true)", [LOCK_TIMEOUT])
+        yield
+
+
+def delete_tokens(deletion, batch_size):
+    """Delete the User's outstanding refresh tokens and their blacklist entries, a batch at a time"""
+    tokens = OutstandingToken.objects.filter(user_id=deletion.user_pk).order_by("id").values_list("id", flat=True)
+    while True:
+        with _batch():
+            ids = list(tokens[:batch_size])
+            if not ids:
+                return
+            deleted, _ = BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            deleted += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+        yield deleted
+
+
+def delete_profile(deletion, batch_size):
+    with _batch():
+        profile = Profile.objects.filter(user_id=deletion.user_pk).first()
+        if profile is None:
+            return
+        avatar = profile.avatar
+        deleted, _ = profile.delete()
+    # Files are not transactional, so the avatar goes once its row is gone
+    if avatar:
+        avatar.storage.delete(avatar.name)
+    yield deleted
+
+
+def delete_basket(deletion, batch_size):
+    Basket(user_id=deletion.user_pk).clear()
+    with _batch():
+        deleted, _ = BasketSnapshot.objects.filter(user_id=deletion.user_pk).delete()
+    if deleted:
+        yield deleted
+
+
+def erase_user(deletion, batch_size):
+    """Delete the User, or anonymise it when it has orders"""
+    with _batch():
+        user = User.objects.select_for_update().filter(pk=deletion.user_pk).first()
+        if user is None:
+            return
+        if Order.objects.filter(user_id=user.pk).exists():
+            anonymize(user)
+            AccountDeletion.objects.filter(pk=deletion.pk).update(anonymized=True)
+            deleted = 0
+        else:
+            deleted, _ = user.delete()
+    yield deleted
+
+
+def anonymize(user):
+    """Overwrite the personal data of a User that has to be kept"""
+    user.groups.clear()
+    user.user_permissions.clear()
+    User.objects.filter(pk=user.pk).update(
+        email=f"deleted-{user.pk}@deleted.invalid",
+        first_name="",
+        last_name="",
+        date_of_birth=ANONYMOUS_DATE_OF_BIRTH,
+        password=make_password(None),
+        is_active=False,
+        is_staff=False,
+        is_superuser=False,
+        last_login=None,
+    )
+    # For consumers the account is gone, whatever is kept of it here
+    outbox.emit("user", "user.deleted", user.pk, {"id": user.pk})
+
+
+STEPS = [
+    ("tokens", delete_tokens),
+    ("profile", delete_profile),
+    ("basket", delete_basket),
+    ("user", erase_user),
+]
+
+
+@task(priority=-1)
+def run_deletion(deletion_id, batch_size=BATCH_SIZE):
+    """Work through the steps of an AccountDeletion, recording its progress after every batch"""
+    deletion = AccountDeletion.objects.get(pk=deletion_id)
+    if deletion.status == AccountDeletion.Status.COMPLETED:
+        return
+    progress = AccountDeletion.objects.filter(pk=deletion.pk)
+    progress.update(status=AccountDeletion.Status.RUNNING, started_at=deletion.started_at or timezone.now(), error="")
+    try:
+        for name, step in STEPS:
+            progress.update(step=name)
+            for deleted in step(deletion, batch_size):
+                progress.update(rows_deleted=F("rows_deleted") + deleted)
+    except Exception as exc:
+        progress.update(status=AccountDeletion.Status.FAILED, error=str(exc))
+        raise
+    progress.update(status=AccountDeletion.Status.COMPLETED, step="", finished_at=timezone.now())
+
+
+def request_deletion(user_ids, requested_by=None):
+    """
+    Deactivate Users at once and queue the erasure of their accounts, returning the AccountDeletions queued.
+    Users already being deleted are skipped.
+    """
+    user_ids = sorted(set(user_ids))
+    deletions = []
+    # Batched too, so a bulk erasure does not hold the locks of thousands of User rows at once
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        with transaction.atomic():
+            chunk = user_ids[start : start + BATCH_SIZE]
+            open_ = AccountDeletion.objects.filter(user_pk__in=chunk).exclude(status=AccountDeletion.Status.COMPLETED)
+            chunk = sorted(set(chunk) - set(open_.values_list("user_pk", flat=True)))
+            if not chunk:
+                continue
+            User.objects.filter(pk__in=chunk).update(is_active=False, password=make_password(None))
+            live_tokens = OutstandingToken.objects.filter(
+                user_id__in=chunk, expires_at__gt=timezone.now(), blacklistedtoken__isnull=True
+            ).values_list("id", flat=True)
+            BlacklistedToken.objects.bulk_create(
+                [BlacklistedToken(token_id=token_id) for token_id in live_tokens], ignore_conflicts=True
+            )
+            queued = AccountDeletion.objects.bulk_create(
+                [AccountDeletion(user_pk=user_pk, requested_by=requested_by) for user_pk in chunk]
+            )
+            for deletion in queued:
+                run_deletion.enqueue(deletion.pk)
+            deletions += queued
+    return deletions
+
+
+def resume_deletion(deletion):
+    """Queue a failed AccountDeletion again, it carries on from where it stopped"""
+    run_deletion.enqueue(deletion.pk)
@@ -0,0 +1,35 @@
+"""
+Django command to delete user accounts
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import User
+from users.deletion import request_deletion
+
+
+class Command(BaseCommand):
+    """
+    Deactivate accounts by email and queue their deletion for the workers, for erasure
+    requests of many accounts at once. Follow their progress in the admin.
+    """
+
+    help = "Deactivate user accounts and delete them in the background"
+
+    def add_arguments(self, parser):
+        parser.add_argument("emails", nargs="*", help="Emails of the accounts to delete")
+        parser.add_argument("--file", help="File with one email per line")
+
+    def handle(self, *args, **options):
+        emails = set(options["emails"])
+        if options["file"]:
+            with open(options["file"]) as lines:
+                emails.update(line.strip() for line in lines if line.strip())
+        if not emails:
+            raise CommandError("Give the emails of the accounts to delete")
+
+        found = dict(User.objects.filter(email__in=emails).values_list("email", "pk"))
+        for email in sorted(emails - found.keys()):
+            self.stderr.write(f"No account for {email}")
+        deletions = request_deletion(found.values())
+        self.stdout.write(self.style.SUCCESS(f"Queued the deletion of {len(deletions):,} accounts"))
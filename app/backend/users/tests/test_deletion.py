@@ -0,0 +1,210 @@
+"""
+Test deleting accounts in the background
+"""
+
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client as HttpTestClient
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from basket.store import Basket
+from core.helpers import API_Client
+from core.models import AccountDeletion, BasketSnapshot, Order, OutboxEvent, Profile, Task
+from users import deletion
+
+User = get_user_model()
+
+
+class DeletionTestCase(TestCase):
+    """Base class with a user holding tokens, a profile and a basket"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com",
+            password="password123",
+            first_name="Jane",
+            last_name="Doe",
+            date_of_birth=date(1990, 1, 1),
+        )
+        Profile.objects.create(user=self.user, display_name="Jane", location="Leeds")
+        self.tokens = [RefreshToken.for_user(self.user) for _ in range(5)]
+        BasketSnapshot.objects.create(user=self.user, items={"1": 2})
+        self.basket = Basket(user_id=self.user.id)
+        self.basket.add(1, 2)
+        self.addCleanup(self.basket.clear)
+
+    def run_deletion(self, batch_size=deletion.BATCH_SIZE):
+        (queued,) = AccountDeletion.objects.filter(user_pk=self.user.pk).exclude(status="completed")
+        deletion.run_deletion(queued.pk, batch_size=batch_size)
+        queued.refresh_from_db()
+        return queued
+
+
+class Request_Deletion(DeletionTestCase):
+    """Test what happens at once when a deletion is requested"""
+
+    def test_deactivates_and_queues(self):
+        """Test the account is deactivated, its live tokens blacklisted and its deletion queued"""
+        (queued,) = deletion.request_deletion([self.user.pk])
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertFalse(self.user.has_usable_password())
+        self.assertEqual(BlacklistedToken.objects.filter(token__user=self.user).count(), 5)
+        self.assertEqual(queued.status, AccountDeletion.Status.PENDING)
+        self.assertEqual(list(Task.objects.values_list("name", "args")), [(deletion.run_deletion.name, [queued.pk])])
+        # Nothing else is deleted in the request
+        self.assertTrue(Profile.objects.filter(user=self.user).exists())
+
+    def test_tokens_stop_working(self):
+        """Test access tokens are refused and refresh tokens cannot be used once requested"""
+        client = API_Client()
+        client.authorize(self.user)
+        url = reverse("user-detail", args=[self.user.pk])
+        self.assertEqual(client.get(url).status_code, status.HTTP_200_OK)
+
+        deletion.request_deletion([self.user.pk])
+        self.assertEqual(client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = API_Client().post(reverse("refresh"), {"refresh": str(self.tokens[0])})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_open_deletions_are_not_repeated(self):
+        """Test requesting the deletion of an account already being deleted queues nothing"""
+        deletion.request_deletion([self.user.pk])
+        self.assertEqual(deletion.request_deletion([self.user.pk]), [])
+        self.assertEqual(AccountDeletion.objects.count(), 1)
+
+
+class Run_Deletion(DeletionTestCase):
+    """Test the background deletion"""
+
+    def setUp(self):
+        super().setUp()
+        deletion.request_deletion([self.user.pk])
+
+    def test_deletes_everything(self):
+        """Test the tokens, profile, basket and user are deleted and the progress recorded"""
+        done = self.run_deletion(batch_size=2)
+        self.assertEqual(done.status, AccountDeletion.Status.COMPLETED)
+        self.assertFalse(done.anonymized)
+        self.assertIsNotNone(done.finished_at)
+        # 5 outstanding and 5 blacklisted tokens, the profile, the snapshot and the user
+        self.assertEqual(done.rows_deleted, 13)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(OutstandingToken.objects.exists())
+        self.assertFalse(Profile.objects.exists())
+        self.assertFalse(BasketSnapshot.objects.exists())
+        self.assertEqual(self.basket.items(), {})
+        self.assertTrue(OutboxEvent.objects.filter(event_type="user.deleted", key=str(self.user.pk)).exists())
+
+    def test_tokens_in_batches(self):
+        """Test tokens are deleted a batch per transaction"""
+        with patch.object(deletion, "_batch", wraps=deletion._batch) as batch:
+            self.run_deletion(batch_size=2)
+        # Three batches of tokens and the empty check, then the profile, snapshot and user
+        self.assertEqual(batch.call_count, 7)
+
+    def test_user_with_orders_is_anonymised(self):
+        """Test a user with orders is anonymised and keeps its orders"""
+        order = Order.objects.create(user=self.user, total=Decimal("10.00"))
+        done = self.run_deletion()
+        self.assertTrue(done.anonymized)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(
+            (user.email, user.first_name, user.last_name, user.date_of_birth, user.is_active),
+            (f"deleted-{user.pk}@deleted.invalid", "", "", deletion.ANONYMOUS_DATE_OF_BIRTH, False),
+        )
+        self.assertTrue(Order.objects.filter(pk=order.pk, user=user).exists())
+        self.assertFalse(Profile.objects.exists())
+        self.assertTrue(OutboxEvent.objects.filter(event_type="user.deleted", key=str(user.pk)).exists())
+
+    def test_failure_resumes(self):
+        """Test a failed deletion records its error and finishes when run again"""
+        with (
+            patch.object(Basket, "clear", side_effect=ConnectionError("Redis is down")),
+            self.assertRaises(ConnectionError),
+        ):
+            self.run_deletion()
+        failed = AccountDeletion.objects.get()
+        self.assertEqual((failed.status, failed.step, failed.error), ("failed", "basket", "Redis is down"))
+        self.assertFalse(OutstandingToken.objects.exists())
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+
+        done = self.run_deletion()
+        self.assertEqual((done.status, done.error), (AccountDeletion.Status.COMPLETED, ""))
+        self.assertEqual(done.rows_deleted, 13)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+
+class Deletion_Admin(DeletionTestCase):
+    """Test deleting accounts from the admin"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user = User.objects.create_superuser(
+            email="admin@example.com", password="password123", date_of_birth=date(1990, 1, 1)
+        )
+        self.client = HttpTestClient()
+        self.client.force_login(self.admin_user)
+
+    def test_delete_action(self):
+        """Test the action deactivates the selected accounts and queues their deletion"""
+        response = self.client.post(
+            reverse("admin:core_user_changelist"),
+            {"action": "delete_accounts", "_selected_action": [self.user.pk]},
+            follow=True,
+        )
+        self.assertContains(response, "queued the deletion of 1 account(s)")
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+        self.assertEqual(AccountDeletion.objects.get().requested_by, self.admin_user)
+
+    def test_delete_button(self):
+        """Test deleting from the change form queues the deletion instead of cascading, even with orders"""
+        Order.objects.create(user=self.user, total=Decimal("10.00"))
+        url = reverse("admin:core_user_delete", args=[self.user.pk])
+        self.assertContains(self.client.get(url), "user@example.com")
+        response = self.client.post(url, {"post": "yes"}, follow=True)
+        self.assertContains(response, "queued the deletion of the account")
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+        self.assertEqual(AccountDeletion.objects.get().requested_by, self.admin_user)
+        self.assertTrue(Profile.objects.filter(user=self.user).exists())
+
+    def test_no_cascading_delete_action(self):
+        """Test the site-wide delete action is replaced by the background one"""
+        response = self.client.get(reverse("admin:core_user_changelist"))
+        actions = [name for name, _ in response.context["action_form"].fields["action"].choices]
+        self.assertEqual(actions[1:], ["delete_accounts"])
+
+    def test_progress_page(self):
+        """Test the deletions are listed with their progress"""
+        deletion.request_deletion([self.user.pk])
+        self.run_deletion()
+        response = self.client.get(reverse("admin:core_accountdeletion_changelist"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, "Completed")
+
+
+class Delete_Accounts_Command(DeletionTestCase):
+    """Test the delete_accounts command"""
+
+    def test_delete_accounts(self):
+        """Test the command queues the deletion of the accounts listed in a file and reports unknown emails"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "emails.txt")
+            with open(path, "w") as emails:
+                emails.write("user@example.com\n\nnobody@example.com\n")
+            out, err = StringIO(), StringIO()
+            call_command("delete_accounts", "--file", path, stdout=out, stderr=err)
+        self.assertIn("Queued the deletion of 1 accounts", out.getvalue())
+        self.assertIn("No account for nobody@example.com", err.getvalue())
+        self.assertEqual(AccountDeletion.objects.get().user_pk, self.user.pk)
@@ -3,6 +3,7 @@ API Views for Users
 """
 
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework.generics import RetrieveUpdateAPIView
 from rest_framework.permissions import IsAuthenticated
 
@@ -23,6 +24,11 @@ class UserDetailViews(RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated, UserIsOwner]
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        # The outbox event is written by a signal, in the same transaction as the change
+        super().perform_update(serializer)
+
 
 class ProfileViews(RetrieveUpdateAPIView):
     """
@@ -34,3 +40,7 @@ class ProfileViews(RetrieveUpdateAPIView):
     queryset = Profile.objects.all()
     serializer_class = ProfileSerializer
     permission_classes = [IsAuthenticated, UserIsOwnerOrReadOnly]
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        super().perform_update(serializer)